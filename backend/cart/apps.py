@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class CartConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "cart"
+
+    def ready(self):
+        # Import signal handlers (order status automation, customer stats)
+        try:
+            from . import stock_management  # noqa: F401
+        except Exception:
+            # Avoid breaking startup if migrations are running
+            pass
@@ -0,0 +1,100 @@
+"""
+Views async dos endpoints de pagamento (modo ASGI)
+Sob uvicorn (SERVER_MODE=asgi) as chamadas à PaySuite de initiate_payment e
+payment_status são aguardadas no event loop (httpx) em vez de prenderem um
+worker/thread durante a ida à rede. O resto continua a ser o código síncrono
+de cart.views — autenticação/permissões DRF, ORM, serializers — executado via
+sync_to_async na thread do pedido (thread_sensitive), pela mesma ordem:
+    1. autenticação + preparação (sync)
+    2. chamada PaySuite (async)
+    3. processamento da resposta (sync)
+Ativadas em cart/urls.py quando ASYNC_PAYMENT_VIEWS=True.
+"""
+import logging
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from . import views
+from .payments.paysuite import AsyncPaysuiteClient
+from .payments.safe_paysuite import SafePaysuiteClient
+
+logger = logging.getLogger(__name__)
+
+
+class _PaymentGate(APIView):
+    """Autenticação, permissões e parsers DRF das views async (sem dispatch)"""
+    permission_classes = [IsAuthenticated]
+
+
+def _open(request, **kwargs):
+    """Executa a fase inicial do DRF; devolve (view, request DRF, resposta de erro ou None)"""
+    view = _PaymentGate()
+    view.args, view.kwargs = (), kwargs
+    view.headers = view.default_response_headers
+    drf_request = view.initialize_request(request, **kwargs)
+    view.request = drf_request
+    try:
+        view.initial(drf_request, **kwargs)
+    except Exception as exc:
+        return view, drf_request, view.handle_exception(exc)
+    return view, drf_request, None
+
+
+def _async_client():
+    return AsyncPaysuiteClient(base_url=settings.PAYSUITE_BASE_URL, api_key=settings.PAYSUITE_API_KEY)
+
+
+async def initiate_payment(request):
+    """Versão async de cart.views.initiate_payment"""
+    view, drf_request, error = await sync_to_async(_open)(request)
+    if error is not None:
+        return view.finalize_response(drf_request, error)
+
+    prepared = await sync_to_async(views.prepare_payment)(drf_request)
+    if isinstance(prepared, Response):
+        return view.finalize_response(drf_request, prepared)
+
+    try:
+        if isinstance(prepared.client, SafePaysuiteClient):
+            # Cliente mock (PAYSUITE_TEST_MODE=mock): sem rede
+            api_resp = await sync_to_async(prepared.client.create_payment)(**prepared.creation_data)
+        else:
+            api_resp = await _async_client().create_payment(**prepared.creation_data)
+    except Exception as e:
+        logger.exception('Error initiating payment')
+        response = Response({'error': f'Failed to initiate payment: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return view.finalize_response(drf_request, response)
+
+    response = await sync_to_async(views.complete_payment)(prepared, api_resp)
+    return view.finalize_response(drf_request, response)
+
+
+async def payment_status(request, order_id: int):
+    """Versão async de cart.views.payment_status"""
+    view, drf_request, error = await sync_to_async(_open)(request, order_id=order_id)
+    if error is not None:
+        return view.finalize_response(drf_request, error)
+
+    prefetched = None
+    reference = await sync_to_async(views.pending_paysuite_reference)(drf_request.user, order_id)
+    if reference:
+        try:
+            prefetched = {reference: await _async_client().get_payment_status(reference)}
+        except Exception as e:
+            # Como na view síncrona: sem resposta da PaySuite devolve o estado atual
+            logger.warning(f"⚠️ Active polling failed (non-fatal): {e}")
+
+    response = await sync_to_async(views.payment_status_response)(drf_request, order_id, prefetched)
+    return view.finalize_response(drf_request, response)
+
+
+# As views DRF (APIView.as_view) são isentas de CSRF; a SessionAuthentication
+# aplica a verificação ela própria. csrf_exempt do Django 4.2 não aceita
+# funções async, por isso a marca é posta diretamente.
+initiate_payment.csrf_exempt = True
+payment_status.csrf_exempt = True
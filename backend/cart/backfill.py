@@ -0,0 +1,246 @@
+"""
+Framework de backfill em lotes
+Percorre uma tabela por keyset (pk > último pk, ordenado por pk), grava o
+progresso em BackfillCheckpoint após cada lote para que uma execução
+interrompida continue de onde parou e pausa enquanto a carga do banco
+estiver acima do limite configurado. Os comandos de backfill herdam de
+BackfillCommand e só definem as classes Backfill a executar.
+"""
+import logging
+import os
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+from django.db.models import F
+from django.utils import timezone
+
+from .models import BackfillCheckpoint
+
+logger = logging.getLogger(__name__)
+
+# Pausa máxima por lote à espera de capacidade no banco
+THROTTLE_MAX_WAIT_SECONDS = 300
+THROTTLE_POLL_SECONDS = 1.0
+
+
+class Backfill(ABC):
+    """
+    Um backfill: `name` identifica o checkpoint, `queryset()` as linhas a
+    percorrer e `process()` trata um lote, devolvendo o número de itens
+    processados. `process()` deve ser idempotente: o lote em curso quando a
+    execução é interrompida é processado de novo ao retomar.
+    """
+    name: str = ''
+    chunk_size: int = 500
+
+    @abstractmethod
+    def queryset(self):
+        """Linhas a percorrer (o runner ordena por pk)"""
+
+    def count_items(self, rows: List) -> int:
+        """Itens que `process()` trataria (usado no dry-run)"""
+        return len(rows)
+
+    @abstractmethod
+    def process(self, rows: List, executor: Optional[Executor] = None) -> int:
+        """Trata um lote e devolve o número de itens processados"""
+
+
+@dataclass
+class BackfillReport:
+    name: str
+    dry_run: bool = False
+    resumed_from: int = 0
+    last_pk: int = 0
+    rows: int = 0
+    items: int = 0
+    chunks: int = 0
+    throttled_seconds: float = 0.0
+    elapsed: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def items_per_second(self) -> float:
+        return self.items / self.elapsed if self.elapsed else 0.0
+
+
+def database_load() -> int:
+    """Sessões ativas no banco (exceto esta); 0 fora do Postgres"""
+    if connection.vendor != 'postgresql':
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT count(*) FROM pg_stat_activity "
+            "WHERE datname = current_database() AND state = 'active' AND pid <> pg_backend_pid()"
+        )
+        return cursor.fetchone()[0]
+
+
+def wait_for_capacity(max_load: Optional[int], sleep: Callable[[float], None] = time.sleep) -> float:
+    """Espera enquanto a carga do banco exceder `max_load`; devolve os segundos em pausa"""
+    if not max_load:
+        return 0.0
+
+    waited = 0.0
+    while database_load() > max_load:
+        if waited >= THROTTLE_MAX_WAIT_SECONDS:
+            logger.warning(f"⚠️ Carga do banco acima de {max_load} há {waited:.0f}s; continuando o backfill")
+            break
+        sleep(THROTTLE_POLL_SECONDS)
+        waited += THROTTLE_POLL_SECONDS
+    return waited
+
+
+def run_backfill(
+    backfill: Backfill,
+    dry_run: bool = False,
+    restart: bool = False,
+    max_db_load: Optional[int] = None,
+    executor: Optional[Executor] = None,
+    progress: Optional[Callable[[BackfillReport], None]] = None,
+) -> BackfillReport:
+    """
+    Executa o backfill lote a lote. No dry-run nada é alterado (nem o
+    checkpoint): só percorre as linhas e conta os itens pendentes.
+    """
+    report = BackfillReport(name=backfill.name, dry_run=dry_run)
+    checkpoint = None
+    cursor = 0
+
+    if not dry_run:
+        checkpoint, created = BackfillCheckpoint.objects.get_or_create(name=backfill.name)
+        if not created and (restart or checkpoint.status == 'done'):
+            checkpoint.last_pk = 0
+            checkpoint.processed = 0
+            checkpoint.status = 'running'
+            checkpoint.started_at = timezone.now()
+            checkpoint.finished_at = None
+            checkpoint.save()
+        cursor = checkpoint.last_pk
+        report.resumed_from = cursor
+
+    queryset = backfill.queryset().order_by('pk')
+    started = time.monotonic()
+    while True:
+        if not dry_run:
+            report.throttled_seconds += wait_for_capacity(max_db_load)
+
+        rows = list(queryset.filter(pk__gt=cursor)[:backfill.chunk_size])
+        if not rows:
+            break
+        cursor = rows[-1].pk
+
+        if dry_run:
+            items = backfill.count_items(rows)
+        else:
+            items = backfill.process(rows, executor)
+            BackfillCheckpoint.objects.filter(pk=checkpoint.pk).update(
+                last_pk=cursor, processed=F('processed') + items, updated_at=timezone.now()
+            )
+
+        report.rows += len(rows)
+        report.items += items
+        report.chunks += 1
+        report.last_pk = cursor
+        report.elapsed = time.monotonic() - started
+        if progress:
+            progress(report)
+
+    report.elapsed = time.monotonic() - started
+    if checkpoint is not None:
+        BackfillCheckpoint.objects.filter(pk=checkpoint.pk).update(
+            status='done', finished_at=timezone.now(), updated_at=timezone.now()
+        )
+    return report
+
+
+class BackfillCommand(BaseCommand):
+    """Comando base: executa `backfill_classes` em sequência com as opções comuns"""
+    backfill_classes = ()
+    # Backfills com trabalho de CPU (ex: imagens) recebem um pool de processos
+    uses_process_pool = False
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=None,
+            help='Linhas por lote (padrão: definido por cada backfill)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Só conta o trabalho pendente e mede a leitura, sem alterar nada',
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Ignora o checkpoint e recomeça do início',
+        )
+        parser.add_argument(
+            '--max-db-load',
+            type=int,
+            default=settings.BACKFILL_MAX_DB_LOAD,
+            help='Pausa enquanto houver mais sessões ativas no banco do que este valor (0 desliga)',
+        )
+        if self.uses_process_pool:
+            parser.add_argument(
+                '--workers',
+                type=int,
+                default=max(1, (os.cpu_count() or 2) - 1),
+                help='Processos do pool (padrão: CPUs - 1)',
+            )
+
+    def handle(self, *args, **options):
+        workers = max(1, options.get('workers') or 1)
+        executor = None
+        if self.uses_process_pool and workers > 1 and not options['dry_run']:
+            executor = ProcessPoolExecutor(max_workers=workers)
+
+        try:
+            for backfill_class in self.backfill_classes:
+                backfill = backfill_class()
+                if options['chunk_size']:
+                    backfill.chunk_size = max(1, options['chunk_size'])
+                close_old_connections()
+                report = run_backfill(
+                    backfill,
+                    dry_run=options['dry_run'],
+                    restart=options['restart'],
+                    max_db_load=options['max_db_load'],
+                    executor=executor,
+                    progress=self._write_progress,
+                )
+                self._write_summary(report)
+        except KeyboardInterrupt:
+            self.stdout.write('Backfill interrompido; execute de novo para continuar do checkpoint')
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+    def _write_progress(self, report: BackfillReport):
+        self.stdout.write(
+            f'⏳ {report.name}: {report.rows} linhas / {report.items} itens '
+            f'(até pk {report.last_pk}, {report.rows_per_second:.0f} linhas/s)'
+        )
+
+    def _write_summary(self, report: BackfillReport):
+        prefix = '🔍 [dry-run] ' if report.dry_run else '✅ '
+        message = (
+            f'{prefix}{report.name}: {report.rows} linhas, {report.items} itens em {report.chunks} lotes, '
+            f'{report.elapsed:.1f}s ({report.rows_per_second:.0f} linhas/s, {report.items_per_second:.1f} itens/s)'
+        )
+        if report.resumed_from:
+            message += f' - retomado do pk {report.resumed_from}'
+        if report.throttled_seconds:
+            message += f' - {report.throttled_seconds:.0f}s em pausa por carga do banco'
+        self.stdout.write(self.style.SUCCESS(message))
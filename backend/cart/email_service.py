@@ -125,6 +125,57 @@ class EmailService:
             logger.error(f"❌ Erro inesperado ao enviar email: {e}")
             return False
 
+    def _send_batch_email(
+        self,
+        subject: str,
+        html_content: str,
+        versions: List[Dict],
+    ) -> bool:
+        """
+        Envia um único pedido à Brevo com vários destinatários (messageVersions).
+
+        Cada versão é um dict com 'email', 'name', 'params' e opcionalmente
+        'subject'. O html_content deve usar placeholders {{ params.X }}.
+        """
+        if not self.enabled:
+            logger.info(f"Email desabilitado: lote de {len(versions)} emails ({subject})")
+            return False
+
+        if not versions:
+            return True
+
+        try:
+            import sib_api_v3_sdk
+
+            message_versions = []
+            for version in versions:
+                message_version = sib_api_v3_sdk.SendSmtpEmailMessageVersions(
+                    to=[{"email": version['email'], "name": version.get('name') or version['email']}],
+                    params=version.get('params') or {},
+                )
+                if version.get('subject'):
+                    message_version.subject = version['subject']
+                message_versions.append(message_version)
+
+            send_smtp_email = sib_api_v3_sdk.SendSmtpEmail(
+                sender={"email": self.sender_email, "name": self.sender_name},
+                subject=subject,
+                html_content=html_content,
+                message_versions=message_versions,
+            )
+
+            api_response = self.api_instance.send_transac_email(send_smtp_email)
+            logger.info(f"✅ Lote enviado com sucesso: {len(versions)} emails ({subject})")
+            logger.debug(f"Brevo response: {api_response}")
+            return True
+
+        except self.ApiException as e:
+            logger.error(f"❌ Erro ao enviar lote via Brevo: {e}")
+            return False
+        except Exception as e:
+            logger.error(f"❌ Erro inesperado ao enviar lote: {e}")
+            return False
+
     # ========================================
     # EMAILS PARA CLIENTES
     # ========================================
@@ -321,11 +372,19 @@ class EmailService:
         if not template:
             return False
 
-        # Buscar items do carrinho
-        cart_items = cart.items.all()
-        items_count = cart_items.count()
+        context = self._cart_recovery_context(cart, customer_name, recovery_url)
+        html_content = self._render_template(template, context)
+        return self._send_email(customer_email, customer_name, subject, html_content)
+
+    def _cart_recovery_context(self, cart, customer_name: str, recovery_url: str) -> Dict[str, str]:
+        """
+        Monta as variáveis do template de recuperação de carrinho.
+        Usa cart.items.all() para aproveitar prefetch_related quando disponível.
+        """
+        cart_items = list(cart.items.all())
+        items_count = len(cart_items)
         items_text = "item" if items_count == 1 else "itens"
-        
+
         items_html = ""
         for item in cart_items:
             items_html += f"""
@@ -345,7 +404,7 @@ class EmailService:
             </table>
             """
 
-        context = {
+        return {
             'CUSTOMER_NAME': customer_name,
             'ITEMS_COUNT': str(items_count),
             'ITEMS_TEXT': items_text,
@@ -354,8 +413,40 @@ class EmailService:
             'RECOVERY_URL': recovery_url
         }
 
-        html_content = self._render_template(template, context)
-        return self._send_email(customer_email, customer_name, subject, html_content)
+
+    def send_cart_recovery_batch(self, entries: List[Dict]) -> bool:
+        """
+        Envia emails de recuperação para vários carrinhos numa única chamada à Brevo
+
+        Cada entrada é um dict com 'cart', 'customer_email', 'customer_name'
+        e 'recovery_url'. Retorna True se o lote foi aceite pela Brevo.
+        """
+        if not settings.SEND_CART_RECOVERY:
+            return False
+
+        template = self._load_template('cart_recovery.html')
+        if not template:
+            return False
+
+        # Placeholders {{KEY}} passam a ser resolvidos pela Brevo por destinatário.
+        # CART_ITEMS contém HTML e não deve ser escapado.
+        html_content = template
+        for key in ['CUSTOMER_NAME', 'ITEMS_COUNT', 'ITEMS_TEXT', 'CART_TOTAL', 'RECOVERY_URL']:
+            html_content = html_content.replace(f"{{{{{key}}}}}", f"{{{{ params.{key} }}}}")
+        html_content = html_content.replace("{{CART_ITEMS}}", "{{ params.CART_ITEMS | safe }}")
+
+        versions = []
+        for entry in entries:
+            customer_name = entry['customer_name']
+            versions.append({
+                'email': entry['customer_email'],
+                'name': customer_name,
+                'subject': f"🛒 {customer_name}, seu carrinho te espera na Chiva Computer!",
+                'params': self._cart_recovery_context(entry['cart'], customer_name, entry['recovery_url']),
+            })
+
+        subject = "🛒 Seu carrinho te espera na Chiva Computer!"
+        return self._send_batch_email(subject, html_content, versions)
 
 
     # ========================================
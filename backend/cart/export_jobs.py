@@ -0,0 +1,439 @@
+"""
+Exportações Administrativas Assíncronas
+Datasets de exportação (pedidos, clientes, dashboard) partilhados pelos
+endpoints síncronos e pelo worker `run_export_jobs`, criação de jobs com
+reutilização de artefatos idênticos e geração do ficheiro com progresso.
+Enquanto um job corre, um heartbeat renova updated_at (também durante o
+doc.build de um PDF, que não lê linhas); cada claim incrementa `attempts`,
+e só o worker com o claim atual grava o resultado
+"""
+import hashlib
+import json
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files import File
+from django.db import connection, transaction
+from django.db.models import F, OuterRef, Q, Subquery
+from django.utils import timezone
+
+from customers.search import KIND_ORDER, matching_ids
+
+from .export_service import ExportService
+from .models import ExportJob, Order, Payment
+from .order_analytics import order_totals
+
+logger = logging.getLogger(__name__)
+
+# Registros lidos do banco por ida ao servidor durante exportações
+EXPORT_CHUNK_SIZE = 2000
+
+# Frequência (em linhas) com que o progresso do job é gravado
+PROGRESS_EVERY_ROWS = 500
+
+# Intervalo do heartbeat de um job em curso (bem abaixo de EXPORT_JOB_STALE_MINUTES)
+HEARTBEAT_SECONDS = 60
+
+# Claims de um job (ex: worker morto por OOM) antes de o dar como falhado
+MAX_ATTEMPTS = 3
+
+
+@dataclass
+class ExportDataset:
+    rows: Iterable[Dict[str, Any]]
+    headers: Dict[str, str]
+    filename: str
+    title: str
+    total: Optional[int] = None
+
+
+# ========================================
+# DATASETS
+# ========================================
+
+def _export_orders_queryset(params):
+    """
+    Queryset de pedidos para exportação com os filtros do admin_orders_list
+
+    O método de pagamento é anotado via subquery (último Payment, como
+    order.payments.first()) para evitar uma query por pedido.
+    """
+    latest_payment_method = Payment.objects.filter(
+        order=OuterRef('pk')
+    ).order_by('-created_at').values('method')[:1]
+
+    orders = Order.objects.select_related('user').annotate(
+        payment_method=Subquery(latest_payment_method)
+    ).order_by('-created_at')
+
+    # Aplicar filtros (mesmos do admin_orders_list)
+    status_filter = params.get('status')
+    if status_filter and status_filter != 'all':
+        orders = orders.filter(status=status_filter)
+
+    search_query = (params.get('search') or '').strip()
+    if search_query:
+        orders = orders.filter(pk__in=matching_ids(KIND_ORDER, search_query))
+
+    date_from = params.get('date_from')
+    if date_from:
+        orders = orders.filter(created_at__gte=date_from)
+
+    date_to = params.get('date_to')
+    if date_to:
+        orders = orders.filter(created_at__lte=date_to)
+
+    return orders
+
+
+def _iter_order_export_rows(orders):
+    """Gera as linhas de exportação lendo o queryset em blocos (memória constante)"""
+    for order in orders.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        # Endereço de entrega como string amigável
+        try:
+            shipping_addr_display = order.get_shipping_address_display()
+        except Exception:
+            shipping_addr_display = ''
+        shipping_addr_display = shipping_addr_display[:100] if shipping_addr_display else 'N/A'
+
+        yield {
+            'order_number': order.order_number,
+            'status': order.get_status_display(),
+            'customer_email': order.user.email if order.user else 'N/A',
+            'total': float(order.total_amount),
+            'payment_method': order.payment_method or 'N/A',
+            'created_at': order.created_at,
+            'updated_at': order.updated_at,
+            'shipping_address': shipping_addr_display,
+            'tracking_number': order.tracking_number or 'N/A',
+        }
+
+
+def build_orders_export(params, with_total=False) -> ExportDataset:
+    """Pedidos (filtros: status, date_from, date_to, search)"""
+    orders = _export_orders_queryset(params)
+    now = timezone.now()
+    return ExportDataset(
+        rows=_iter_order_export_rows(orders),
+        headers={
+            'order_number': 'Nº Pedido',
+            'status': 'Status',
+            'customer_email': 'Cliente',
+            'total': 'Valor Total (MT)',
+            'payment_method': 'Método Pagamento',
+            'created_at': 'Data Criação',
+            'updated_at': 'Última Atualização',
+            'shipping_address': 'Endereço Entrega',
+            'tracking_number': 'Rastreamento',
+        },
+        filename=f'pedidos_{now.strftime("%Y%m%d_%H%M%S")}',
+        title=f'Relatório de Pedidos - {now.strftime("%d/%m/%Y")}',
+        total=orders.count() if with_total else None,
+    )
+
+
+def build_customers_export(params, with_total=False) -> ExportDataset:
+    """
+    Clientes (usuários não-staff)
+
+    Nº de pedidos e total gasto vêm dos agregados mantidos em CustomerProfile
+    (customers.analytics), lidos com um JOIN em vez de duas queries por cliente.
+    """
+    User = get_user_model()
+    customers = User.objects.filter(is_staff=False).select_related('profile').order_by('-date_joined')
+
+    def rows():
+        for user in customers.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            profile = getattr(user, 'profile', None)
+            orders_count = profile.total_orders if profile else 0
+            total_spent = profile.total_spent if profile else 0
+
+            yield {
+                'email': user.email,
+                'uid': user.uid if hasattr(user, 'uid') else 'N/A',
+                'date_joined': user.date_joined,
+                'last_login': user.last_login or 'Nunca',
+                'orders_count': orders_count,
+                'total_spent': float(total_spent),
+                'avg_order_value': round(float(total_spent) / orders_count, 2) if orders_count else 0.0,
+                'last_order_date': (profile.last_order_date if profile else None) or 'Nunca',
+                'is_active': user.is_active,
+            }
+
+    now = timezone.now()
+    return ExportDataset(
+        rows=rows(),
+        headers={
+            'email': 'Email',
+            'uid': 'UID',
+            'date_joined': 'Data Cadastro',
+            'last_login': 'Último Acesso',
+            'orders_count': 'Nº Pedidos',
+            'total_spent': 'Total Gasto (MT)',
+            'avg_order_value': 'Ticket Médio (MT)',
+            'last_order_date': 'Último Pedido',
+            'is_active': 'Ativo',
+        },
+        filename=f'clientes_{now.strftime("%Y%m%d_%H%M%S")}',
+        title=f'Relatório de Clientes - {now.strftime("%d/%m/%Y")}',
+        total=customers.count() if with_total else None,
+    )
+
+
+def build_dashboard_export(params, with_total=False) -> ExportDataset:
+    """Estatísticas do dashboard (filtro: days, padrão 30)"""
+    days = int(params.get('days') or 30)
+    today = timezone.localdate()
+
+    # Estatísticas gerais e vendas por status a partir do rollup diário
+    totals = order_totals(start=today - timedelta(days=days), end=today)
+    status_counts = sorted(
+        ({'status': key, 'count': value['orders'], 'total': value['revenue']}
+         for key, value in totals['by_status'].items()),
+        key=lambda stat: -stat['count'],
+    )
+
+    # Resumo geral
+    total_orders = totals['orders']
+    total_revenue = totals['revenue']
+
+    data = [
+        {'metric': 'RESUMO GERAL', 'value': '', 'details': ''},
+        {'metric': 'Total de Pedidos', 'value': str(total_orders), 'details': f'Últimos {days} dias'},
+        {'metric': 'Receita Total', 'value': f'{float(total_revenue):.2f} MT', 'details': f'Últimos {days} dias'},
+        {
+            'metric': 'Ticket Médio',
+            'value': f'{float(total_revenue / total_orders if total_orders > 0 else 0):.2f} MT',
+            'details': ''
+        },
+        # Espaço
+        {'metric': '', 'value': '', 'details': ''},
+        # Vendas por status
+        {'metric': 'PEDIDOS POR STATUS', 'value': '', 'details': ''},
+    ]
+
+    status_labels = dict(Order.STATUS_CHOICES)
+    for stat in status_counts:
+        data.append({
+            'metric': status_labels.get(stat['status'], stat['status']),
+            'value': str(stat['count']),
+            'details': f'{float(stat["total"] or 0):.2f} MT'
+        })
+
+    now = timezone.now()
+    return ExportDataset(
+        rows=data,
+        headers={
+            'metric': 'Métrica',
+            'value': 'Valor',
+            'details': 'Detalhes',
+        },
+        filename=f'dashboard_stats_{now.strftime("%Y%m%d_%H%M%S")}',
+        title=f'Estatísticas do Dashboard - Últimos {days} dias',
+        total=len(data),
+    )
+
+
+# kind -> (builder, parâmetros aceites)
+EXPORT_DATASETS: Dict[str, tuple] = {
+    'orders': (build_orders_export, ('status', 'search', 'date_from', 'date_to')),
+    'customers': (build_customers_export, ()),
+    'dashboard': (build_dashboard_export, ('days',)),
+}
+
+FILE_EXTENSIONS = {'excel': 'xlsx', 'csv': 'csv', 'pdf': 'pdf'}
+
+
+# ========================================
+# JOBS
+# ========================================
+
+def normalize_params(kind: str, params) -> Dict[str, str]:
+    """Mantém só os filtros aceites pelo dataset, sem valores vazios"""
+    _, allowed = EXPORT_DATASETS[kind]
+    normalized = {}
+    for key in allowed:
+        value = params.get(key)
+        if value not in (None, ''):
+            normalized[key] = str(value).strip()
+    return normalized
+
+
+def export_fingerprint(kind: str, export_format: str, params: Dict[str, str]) -> str:
+    payload = json.dumps([kind, export_format, params], sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def request_export(kind: str, export_format: str, params, user=None):
+    """
+    Cria um job de exportação, ou devolve um job idêntico (mesmo tipo,
+    formato e filtros) ainda válido: concluído e não expirado, ou em curso.
+
+    Retorna (job, created).
+    """
+    if kind not in EXPORT_DATASETS:
+        raise ValueError(f"Tipo de exportação não suportado: {kind}")
+    if export_format not in FILE_EXTENSIONS:
+        raise ValueError(f"Formato não suportado: {export_format}")
+
+    params = normalize_params(kind, params)
+    fingerprint = export_fingerprint(kind, export_format, params)
+    now = timezone.now()
+
+    existing = ExportJob.objects.filter(fingerprint=fingerprint).filter(
+        Q(status__in=['pending', 'running']) |
+        Q(status='done', expires_at__gt=now)
+    ).order_by('-created_at').first()
+    if existing:
+        return existing, False
+
+    job = ExportJob.objects.create(
+        kind=kind,
+        export_format=export_format,
+        params=params,
+        fingerprint=fingerprint,
+        requested_by=user if user is not None and user.is_authenticated else None,
+    )
+    return job, True
+
+
+def claim_next_job() -> Optional[ExportJob]:
+    """
+    Reserva o próximo job pendente (SKIP LOCKED permite vários workers).
+    Jobs 'running' sem heartbeat há EXPORT_JOB_STALE_MINUTES (worker
+    interrompido) voltam a ser elegíveis, até MAX_ATTEMPTS claims; depois
+    disso ficam 'failed'.
+    """
+    now = timezone.now()
+    stale = Q(status='running', updated_at__lt=now - timedelta(minutes=settings.EXPORT_JOB_STALE_MINUTES))
+    ExportJob.objects.filter(stale, attempts__gte=MAX_ATTEMPTS).update(
+        status='failed',
+        error=f'Worker interrompido {MAX_ATTEMPTS} vezes durante a exportação',
+        finished_at=now,
+        updated_at=now,
+    )
+    with transaction.atomic():
+        job = ExportJob.objects.select_for_update(skip_locked=True).filter(
+            Q(status='pending') | stale
+        ).order_by('created_at').first()
+        if job is None:
+            return None
+        job.status = 'running'
+        job.started_at = timezone.now()
+        job.rows_done = 0
+        job.attempts = F('attempts') + 1
+        job.save(update_fields=['status', 'started_at', 'rows_done', 'attempts', 'updated_at'])
+    job.refresh_from_db(fields=['attempts'])
+    return job
+
+
+def _current_claim(job: ExportJob):
+    """O job, só enquanto o claim deste worker for o atual"""
+    return ExportJob.objects.filter(pk=job.pk, status='running', attempts=job.attempts)
+
+
+@contextmanager
+def _heartbeat(job: ExportJob):
+    """Renova updated_at a cada HEARTBEAT_SECONDS numa thread, enquanto o bloco corre"""
+    stop = threading.Event()
+
+    def beat():
+        try:
+            while not stop.wait(HEARTBEAT_SECONDS):
+                _current_claim(job).update(updated_at=timezone.now())
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=beat, name=f'export-heartbeat-{job.pk}', daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def _track_progress(job: ExportJob, rows: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """Repassa as linhas gravando rows_done a cada PROGRESS_EVERY_ROWS"""
+    done = 0
+    for row in rows:
+        yield row
+        done += 1
+        if done % PROGRESS_EVERY_ROWS == 0:
+            _current_claim(job).update(rows_done=done, updated_at=timezone.now())
+    job.rows_done = done
+
+
+def run_job(job: ExportJob, on_progress: Callable[[ExportJob], None] = None) -> ExportJob:
+    """Gera o ficheiro do job no storage configurado (MEDIA_ROOT por padrão)"""
+    with _heartbeat(job):
+        _generate(job)
+    return job
+
+
+def _finish(job: ExportJob, **fields) -> bool:
+    """Grava o resultado se o claim ainda é deste worker; senão recarrega o job"""
+    if _current_claim(job).update(updated_at=timezone.now(), **fields):
+        for name, value in fields.items():
+            setattr(job, name, value)
+        return True
+    logger.warning(f"⚠️ Exportação {job.id} foi retomada por outro worker; resultado descartado")
+    if job.file:
+        job.file.delete(save=False)
+    job.refresh_from_db()
+    return False
+
+
+def _generate(job: ExportJob) -> None:
+    builder, _ = EXPORT_DATASETS[job.kind]
+    try:
+        dataset = builder(job.params, with_total=True)
+        job.rows_total = dataset.total
+        _current_claim(job).update(rows_total=dataset.total, updated_at=timezone.now())
+
+        rows = _track_progress(job, dataset.rows)
+        with tempfile.TemporaryFile() as output:
+            if job.export_format == 'excel':
+                ExportService.write_excel(rows, dataset.headers, output, dataset.title)
+            elif job.export_format == 'csv':
+                for line in ExportService.iter_csv(rows, dataset.headers):
+                    output.write(line.encode('utf-8'))
+            else:
+                ExportService.write_pdf(rows, dataset.headers, output, dataset.title or dataset.filename)
+
+            output.seek(0)
+            job.filename = f'{dataset.filename}.{FILE_EXTENSIONS[job.export_format]}'
+            job.file.save(job.filename, File(output), save=False)
+
+        now = timezone.now()
+        if _finish(
+            job, status='done', error='', file=job.file.name, filename=job.filename, rows_done=job.rows_done,
+            finished_at=now, expires_at=now + timedelta(minutes=settings.EXPORT_JOB_TTL_MINUTES),
+        ):
+            logger.info(f"✅ Exportação {job.id} concluída ({job.rows_done} linhas)")
+    except Exception as e:
+        logger.error(f"❌ Erro na exportação {job.id}: {e}")
+        _finish(job, status='failed', error=str(e), finished_at=timezone.now(), rows_done=job.rows_done)
+
+
+def purge_expired_jobs() -> int:
+    """Remove jobs expirados (ou falhados há mais de um TTL) e os respetivos ficheiros"""
+    now = timezone.now()
+    expired = ExportJob.objects.filter(
+        Q(status='done', expires_at__lt=now) |
+        Q(status='failed', finished_at__lt=now - timedelta(minutes=settings.EXPORT_JOB_TTL_MINUTES))
+    )
+    count = 0
+    for job in expired.iterator():
+        if job.file:
+            job.file.delete(save=False)
+        job.delete()
+        count += 1
+    return count
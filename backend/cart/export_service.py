@@ -4,12 +4,15 @@ Suporta Excel, CSV e PDF para relatórios administrativos
 """
 import csv
 import io
+import itertools
+import tempfile
 from datetime import datetime
 from decimal import Decimal
-from typing import List, Dict, Any
+from typing import List, Dict, Any, BinaryIO, Iterable, Iterator, Tuple
 
-from django.http import HttpResponse
+from django.http import HttpResponse, FileResponse, StreamingHttpResponse
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
 from openpyxl.utils import get_column_letter
 from reportlab.lib import colors
@@ -19,6 +22,20 @@ from reportlab.lib.units import inch
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
 from reportlab.pdfgen import canvas
 
+# Linhas lidas para estimar a largura das colunas do Excel
+EXCEL_WIDTH_SAMPLE_ROWS = 200
+
+# Linhas por tabela no PDF: tabelas menores evitam o custo quadrático do
+# layout do ReportLab numa única tabela gigante
+PDF_TABLE_CHUNK_ROWS = 250
+
+
+class _Echo:
+    """Pseudo-buffer para csv.writer: devolve a linha em vez de a guardar"""
+
+    def write(self, value):
+        return value
+
 
 class ExportService:
     """
@@ -86,29 +103,52 @@ class ExportService:
         
         return col_widths
     
+    @staticmethod
+    def _peek(data: Iterable[Dict[str, Any]], size: int) -> Tuple[List[Dict[str, Any]], Iterator[Dict[str, Any]]]:
+        """
+        Lê as primeiras `size` linhas de um iterável sem consumi-lo:
+        retorna (amostra, iterador que repete a amostra seguida do resto)
+        """
+        rows = iter(data)
+        sample = list(itertools.islice(rows, size))
+        return sample, itertools.chain(sample, rows)
+    
+    @staticmethod
+    def _estimate_excel_col_widths(
+        headers: Dict[str, str],
+        sample: List[Dict[str, Any]]
+    ) -> List[float]:
+        """
+        Estima larguras das colunas do Excel a partir dos cabeçalhos e de uma
+        amostra das primeiras linhas (o modo write-only não permite reler células)
+        """
+        widths = []
+        for key, header in headers.items():
+            max_length = len(str(header))
+            for row_data in sample:
+                max_length = max(max_length, len(ExportService._sanitize_value(row_data.get(key, ''))))
+            widths.append(min(max_length + 2, 50))
+        return widths
+    
     # ========================================
     # EXPORTAÇÃO PARA EXCEL
     # ========================================
     
     @staticmethod
-    def export_to_excel(
-        data: List[Dict[str, Any]],
+    def write_excel(
+        data: Iterable[Dict[str, Any]],
         headers: Dict[str, str],
-        filename: str,
+        output: BinaryIO,
         title: str = None
-    ) -> HttpResponse:
+    ) -> int:
         """
-        Exporta dados para Excel (.xlsx) com formatação profissional
+        Escreve dados em Excel (.xlsx) no ficheiro `output` e retorna o número de linhas
         
-        Args:
-            data: Lista de dicionários com os dados
-            headers: Dicionário {chave: nome_coluna}
-            filename: Nome do arquivo sem extensão
-            title: Título opcional da planilha
+        Usa o modo write-only do openpyxl: cada linha é serializada assim que é
+        escrita, por isso a memória não cresce com o número de registros.
         """
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Dados"
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("Dados")
         
         # Estilos
         header_font = Font(bold=True, color="FFFFFF", size=12)
@@ -124,104 +164,131 @@ class ExportService:
             top=Side(style='thin'),
             bottom=Side(style='thin')
         )
+        right_alignment = Alignment(horizontal="right")
+        left_alignment = Alignment(horizontal="left")
+        
+        def styled_cell(value, **styles):
+            cell = WriteOnlyCell(ws, value=value)
+            for attr, style in styles.items():
+                setattr(cell, attr, style)
+            return cell
         
-        row_num = 1
+        # Larguras precisam ser definidas antes da primeira linha
+        sample, rows = ExportService._peek(data, EXCEL_WIDTH_SAMPLE_ROWS)
+        for col_num, width in enumerate(ExportService._estimate_excel_col_widths(headers, sample), 1):
+            ws.column_dimensions[get_column_letter(col_num)].width = width
         
         # Adicionar título se fornecido
         if title:
-            ws.merge_cells(f'A1:{get_column_letter(len(headers))}1')
-            title_cell = ws['A1']
-            title_cell.value = title
-            title_cell.font = title_font
-            title_cell.alignment = title_alignment
-            row_num = 2
+            last_column = get_column_letter(len(headers))
+            ws.merged_cells.add(f'A1:{last_column}1')
+            ws.append([styled_cell(title, font=title_font, alignment=title_alignment)])
             
             # Data de geração
-            ws.merge_cells(f'A2:{get_column_letter(len(headers))}2')
-            date_cell = ws['A2']
-            date_cell.value = f"Gerado em: {datetime.now().strftime('%d/%m/%Y %H:%M')}"
-            date_cell.alignment = Alignment(horizontal="center")
-            row_num = 4
+            ws.merged_cells.add(f'A2:{last_column}2')
+            ws.append([styled_cell(
+                f"Gerado em: {datetime.now().strftime('%d/%m/%Y %H:%M')}",
+                alignment=Alignment(horizontal="center")
+            )])
+            ws.append([])
         
         # Cabeçalhos
-        for col_num, (key, header) in enumerate(headers.items(), 1):
-            cell = ws.cell(row=row_num, column=col_num)
-            cell.value = header
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = header_alignment
-            cell.border = border_style
+        ws.append([
+            styled_cell(header, font=header_font, fill=header_fill, alignment=header_alignment, border=border_style)
+            for header in headers.values()
+        ])
         
         # Dados
-        for row_data in data:
-            row_num += 1
-            for col_num, key in enumerate(headers.keys(), 1):
-                cell = ws.cell(row=row_num, column=col_num)
-                cell.value = ExportService._sanitize_value(row_data.get(key, ''))
-                cell.border = border_style
-                
-                # Alinhamento baseado no tipo
+        count = 0
+        for row_data in rows:
+            row = []
+            for key in headers.keys():
                 value = row_data.get(key)
-                if isinstance(value, (int, float, Decimal)):
-                    cell.alignment = Alignment(horizontal="right")
-                else:
-                    cell.alignment = Alignment(horizontal="left")
-        
-        # Auto-ajustar largura das colunas
-        for col_num in range(1, len(headers) + 1):
-            column_letter = get_column_letter(col_num)
-            max_length = 0
-            for cell in ws[column_letter]:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 50)
-            ws.column_dimensions[column_letter].width = adjusted_width
-        
-        # Gerar resposta HTTP
-        response = HttpResponse(
+                # Alinhamento baseado no tipo
+                row.append(styled_cell(
+                    ExportService._sanitize_value(row_data.get(key, '')),
+                    border=border_style,
+                    alignment=right_alignment if isinstance(value, (int, float, Decimal)) else left_alignment
+                ))
+            ws.append(row)
+            count += 1
+        
+        wb.save(output)
+        return count
+    
+    @staticmethod
+    def export_to_excel(
+        data: Iterable[Dict[str, Any]],
+        headers: Dict[str, str],
+        filename: str,
+        title: str = None
+    ) -> FileResponse:
+        """
+        Exporta dados para Excel (.xlsx) com formatação profissional
+        
+        Args:
+            data: Iterável de dicionários com os dados (ex: gerador sobre queryset.iterator())
+            headers: Dicionário {chave: nome_coluna}
+            filename: Nome do arquivo sem extensão
+            title: Título opcional da planilha
+        """
+        # Ficheiro temporário em disco: o workbook não é mantido em memória
+        output = tempfile.TemporaryFile()
+        ExportService.write_excel(data, headers, output, title)
+        output.seek(0)
+        return FileResponse(
+            output,
+            as_attachment=True,
+            filename=f'{filename}.xlsx',
             content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
         )
-        response['Content-Disposition'] = f'attachment; filename="{filename}.xlsx"'
-        wb.save(response)
-        return response
     
     # ========================================
     # EXPORTAÇÃO PARA CSV
     # ========================================
     
     @staticmethod
-    def export_to_csv(
-        data: List[Dict[str, Any]],
-        headers: Dict[str, str],
-        filename: str
-    ) -> HttpResponse:
+    def iter_csv(
+        data: Iterable[Dict[str, Any]],
+        headers: Dict[str, str]
+    ) -> Iterator[str]:
         """
-        Exporta dados para CSV
-        
-        Args:
-            data: Lista de dicionários com os dados
-            headers: Dicionário {chave: nome_coluna}
-            filename: Nome do arquivo sem extensão
+        Gera o CSV linha a linha (BOM + cabeçalhos + dados)
         """
-        response = HttpResponse(content_type='text/csv; charset=utf-8-sig')
-        response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+        writer = csv.writer(_Echo(), delimiter=';')
         
         # BOM para Excel reconhecer UTF-8
-        response.write('\ufeff')
-        
-        writer = csv.writer(response, delimiter=';')
+        yield '\ufeff'
         
         # Cabeçalhos
-        writer.writerow(headers.values())
+        yield writer.writerow(headers.values())
         
         # Dados
         for row_data in data:
-            row = [ExportService._sanitize_value(row_data.get(key, '')) for key in headers.keys()]
-            writer.writerow(row)
+            yield writer.writerow(
+                [ExportService._sanitize_value(row_data.get(key, '')) for key in headers.keys()]
+            )
+    
+    @staticmethod
+    def export_to_csv(
+        data: Iterable[Dict[str, Any]],
+        headers: Dict[str, str],
+        filename: str
+    ) -> StreamingHttpResponse:
+        """
+        Exporta dados para CSV em streaming
         
+        Args:
+            data: Iterável de dicionários com os dados (ex: gerador sobre queryset.iterator())
+            headers: Dicionário {chave: nome_coluna}
+            filename: Nome do arquivo sem extensão
+        """
+        # Codificado aqui: com charset utf-8-sig o Django repetiria o BOM em cada bloco
+        response = StreamingHttpResponse(
+            (line.encode('utf-8') for line in ExportService.iter_csv(data, headers)),
+            content_type='text/csv; charset=utf-8-sig'
+        )
+        response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
         return response
     
     # ========================================
@@ -229,33 +296,24 @@ class ExportService:
     # ========================================
     
     @staticmethod
-    def export_to_pdf(
-        data: List[Dict[str, Any]],
+    def write_pdf(
+        data: Iterable[Dict[str, Any]],
         headers: Dict[str, str],
-        filename: str,
+        output: BinaryIO,
         title: str = "Relatório",
         orientation: str = 'landscape'
-    ) -> HttpResponse:
+    ) -> int:
         """
-        Exporta dados para PDF com tabela formatada
+        Escreve dados em PDF com tabela formatada no ficheiro `output` e
+        retorna o número de linhas
         
-        Args:
-            data: Lista de dicionários com os dados
-            headers: Dicionário {chave: nome_coluna}
-            filename: Nome do arquivo sem extensão
-            title: Título do relatório
-            orientation: 'portrait' ou 'landscape'
+        A tabela é dividida em blocos de PDF_TABLE_CHUNK_ROWS linhas (com o
+        cabeçalho repetido), o que mantém o layout do ReportLab linear.
         """
-        response = HttpResponse(content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="{filename}.pdf"'
-        
-        # Buffer
-        buffer = io.BytesIO()
-        
         # Configurar página
         pagesize = landscape(A4) if orientation == 'landscape' else A4
         doc = SimpleDocTemplate(
-            buffer,
+            output,
             pagesize=pagesize,
             rightMargin=30,
             leftMargin=30,
@@ -306,27 +364,14 @@ class ExportService:
             fontName='Helvetica-Bold'
         )
         
-        table_data = [[Paragraph(str(header), header_style) for header in headers.values()]]
-        
-        # Dados com Paragraphs para quebra automática
-        for row_data in data:
-            row = []
-            for key in headers.keys():
-                cell_value = ExportService._sanitize_value(row_data.get(key, ''))
-                # Usar Paragraph para permitir quebra de linha
-                cell_paragraph = Paragraph(str(cell_value), normal_style)
-                row.append(cell_paragraph)
-            table_data.append(row)
+        header_row = [Paragraph(str(header), header_style) for header in headers.values()]
         
         # Calcular larguras de coluna dinamicamente usando método otimizado
         available_width = pagesize[0] - 60  # Margem total (30 left + 30 right)
-        col_widths = ExportService._calculate_optimal_col_widths(headers, data, available_width)
-        
-        # Criar tabela com larguras personalizadas
-        table = Table(table_data, colWidths=col_widths, repeatRows=1)
+        col_widths = ExportService._calculate_optimal_col_widths(headers, [], available_width)
         
         # Estilo da tabela com VALIGN para alinhamento vertical
-        table.setStyle(TableStyle([
+        table_style = TableStyle([
             # Cabeçalho
             ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1F4788')),
             ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
@@ -358,24 +403,69 @@ class ExportService:
             
             # Quebra de linha automática
             ('WORDWRAP', (0, 0), (-1, -1), True),
-        ]))
+        ])
         
-        elements.append(table)
+        # Dados com Paragraphs para quebra automática
+        count = 0
+        rows = iter(data)
+        while True:
+            table_data = [header_row]
+            for row_data in itertools.islice(rows, PDF_TABLE_CHUNK_ROWS):
+                # Usar Paragraph para permitir quebra de linha
+                table_data.append([
+                    Paragraph(str(ExportService._sanitize_value(row_data.get(key, ''))), normal_style)
+                    for key in headers.keys()
+                ])
+            if len(table_data) == 1 and count:
+                break
+            
+            # Criar tabela com larguras personalizadas
+            table = Table(table_data, colWidths=col_widths, repeatRows=1)
+            table.setStyle(table_style)
+            elements.append(table)
+            count += len(table_data) - 1
+            if len(table_data) - 1 < PDF_TABLE_CHUNK_ROWS:
+                break
         
         # Footer com número de registros
         elements.append(Spacer(1, 20))
         elements.append(Paragraph(
-            f"Total de registros: {len(data)}",
+            f"Total de registros: {count}",
             styles['Normal']
         ))
         
         # Gerar PDF
         doc.build(elements)
+        return count
+    
+    @staticmethod
+    def export_to_pdf(
+        data: Iterable[Dict[str, Any]],
+        headers: Dict[str, str],
+        filename: str,
+        title: str = "Relatório",
+        orientation: str = 'landscape'
+    ) -> HttpResponse:
+        """
+        Exporta dados para PDF com tabela formatada
+        
+        Args:
+            data: Iterável de dicionários com os dados
+            headers: Dicionário {chave: nome_coluna}
+            filename: Nome do arquivo sem extensão
+            title: Título do relatório
+            orientation: 'portrait' ou 'landscape'
+        """
+        response = HttpResponse(content_type='application/pdf')
+        response['Content-Disposition'] = f'attachment; filename="{filename}.pdf"'
+        
+        # Buffer
+        buffer = io.BytesIO()
+        ExportService.write_pdf(data, headers, buffer, title, orientation)
         
         # Retornar resposta
-        pdf = buffer.getvalue()
+        response.write(buffer.getvalue())
         buffer.close()
-        response.write(pdf)
         
         return response
     
@@ -385,7 +475,7 @@ class ExportService:
     
     @staticmethod
     def export_data(
-        data: List[Dict[str, Any]],
+        data: Iterable[Dict[str, Any]],
         headers: Dict[str, str],
         format_type: str,
         filename: str,
@@ -0,0 +1,110 @@
+"""
+Cria os OrderItems de pedidos antigos que ficaram sem itens
+- Usa Payment.request_data['items'] do pagamento mais recente, quando existir
+- Caso contrário, usa os itens do carrinho ligado ao pedido
+Uso: python manage.py backfill_order_items [--chunk-size 200]
+     python manage.py backfill_order_items --dry-run   (só conta os pedidos)
+     python manage.py backfill_order_items --restart   (ignora o checkpoint)
+Execuções interrompidas continuam do último lote concluído.
+"""
+import logging
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+from cart.backfill import Backfill, BackfillCommand
+from cart.models import CartItem, Order, OrderItem, Payment
+
+logger = logging.getLogger(__name__)
+
+
+def _items_from_payment(order, payload):
+    items = []
+    for it in payload:
+        qty = int(it.get('quantity', 1))
+        unit_price = Decimal(str(it.get('unit_price') or it.get('price') or '0'))
+        items.append(OrderItem(
+            order=order,
+            product_id=it.get('product_id') or it.get('product'),
+            product_name=it.get('name', ''),
+            sku=it.get('sku', ''),
+            product_image=it.get('product_image', ''),
+            color_id=it.get('color_id') or it.get('color'),
+            color_name=it.get('color_name', ''),
+            quantity=qty,
+            unit_price=unit_price,
+            subtotal=unit_price * qty,
+        ))
+    return items
+
+
+def _items_from_cart(order, cart_items):
+    return [
+        OrderItem(
+            order=order,
+            product_id=ci.product.id if ci.product else None,
+            product_name=ci.product.name if ci.product else '',
+            sku=getattr(ci.product, 'sku', ''),
+            color_id=ci.color.id if ci.color else None,
+            color_name=ci.color.name if ci.color else '',
+            quantity=ci.quantity,
+            unit_price=ci.price,
+            subtotal=ci.price * ci.quantity,
+        )
+        for ci in cart_items
+    ]
+
+
+class OrderItemsBackfill(Backfill):
+    name = 'order_items'
+    chunk_size = 200
+
+    def queryset(self):
+        return Order.objects.filter(
+            ~Exists(OrderItem.objects.filter(order=OuterRef('pk')))
+        ).only('id', 'order_number', 'cart_id')
+
+    def process(self, rows, executor=None):
+        order_ids = [order.pk for order in rows]
+
+        # Pagamento mais recente de cada pedido numa única consulta
+        latest_payment = {}
+        for payment in Payment.objects.filter(order_id__in=order_ids).order_by('order_id', '-created_at').only(
+            'order_id', 'request_data', 'created_at'
+        ):
+            latest_payment.setdefault(payment.order_id, payment)
+
+        cart_ids = {order.cart_id for order in rows if order.cart_id}
+        cart_items = {}
+        for item in CartItem.objects.filter(cart_id__in=cart_ids).select_related('product', 'color'):
+            cart_items.setdefault(item.cart_id, []).append(item)
+
+        fixed = 0
+        for order in rows:
+            payment = latest_payment.get(order.pk)
+            payload = []
+            if payment and payment.request_data:
+                payload = payment.request_data.get('items') or []
+            try:
+                if payload:
+                    items = _items_from_payment(order, payload)
+                else:
+                    items = _items_from_cart(order, cart_items.get(order.cart_id, []))
+
+                if not items:
+                    logger.warning(f"⚠️ Nenhum item encontrado para o pedido {order.order_number}")
+                    continue
+
+                with transaction.atomic():
+                    OrderItem.objects.bulk_create(items)
+                fixed += 1
+                logger.info(f"✅ {len(items)} itens criados para o pedido {order.order_number}")
+            except Exception as e:
+                logger.error(f"❌ Erro ao criar itens do pedido {order.order_number}: {e}")
+        return fixed
+
+
+class Command(BackfillCommand):
+    help = 'Cria os itens de pedidos antigos sem OrderItems (retomável)'
+    backfill_classes = (OrderItemsBackfill,)
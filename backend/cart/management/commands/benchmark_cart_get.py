@@ -0,0 +1,89 @@
+"""
+Benchmark de latência do GET do carrinho (CartAPIView.get) com conexões novas
+a cada pedido (CONN_MAX_AGE=0) e com conexões persistentes
+Cada iteração reproduz o ciclo de um pedido: request_started ->
+view -> request_finished (close_old_connections), de modo que o custo de
+abrir a conexão (TCP, autenticação, SSL) entra na medição.
+Uso: python manage.py benchmark_cart_get [--requests 300] [--warmup 20]
+Cria um usuário e um carrinho temporários, removidos no fim.
+"""
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from cart.models import Cart
+from cart.views import CartAPIView
+
+BENCHMARK_USERNAME = 'benchmark-cart-get'
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = 'Mede p50/p99 do GET /api/cart/ com e sem conexões persistentes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=300, help='Pedidos medidos por modo')
+        parser.add_argument('--warmup', type=int, default=20, help='Pedidos de aquecimento por modo')
+        parser.add_argument(
+            '--max-age',
+            type=int,
+            default=60,
+            help='CONN_MAX_AGE usado no modo persistente (segundos)',
+        )
+
+    def handle(self, *args, **options):
+        user, _ = User.objects.get_or_create(username=BENCHMARK_USERNAME)
+        view = CartAPIView.as_view()
+        factory = APIRequestFactory()
+
+        def cart_get():
+            close_old_connections()  # request_started
+            request = factory.get('/api/cart/')
+            force_authenticate(request, user=user)
+            started = time.perf_counter()
+            response = view(request)
+            close_old_connections()  # request_finished
+            elapsed = time.perf_counter() - started
+            if response.status_code != 200:
+                raise RuntimeError(f'GET /api/cart/ respondeu {response.status_code}')
+            return elapsed
+
+        original = (connection.settings_dict['CONN_MAX_AGE'], connection.settings_dict['CONN_HEALTH_CHECKS'])
+        results = {}
+        try:
+            for label, max_age, health_checks in (
+                ('conexão nova por pedido', 0, False),
+                ('conexão persistente', options['max_age'], True),
+            ):
+                connection.close()
+                connection.settings_dict['CONN_MAX_AGE'] = max_age
+                connection.settings_dict['CONN_HEALTH_CHECKS'] = health_checks
+                for _ in range(options['warmup']):
+                    cart_get()
+                samples = [cart_get() * 1000 for _ in range(max(1, options['requests']))]
+                results[label] = samples
+                self.stdout.write(
+                    f"{label:<26} p50 {percentile(samples, 50):7.2f} ms   "
+                    f"p99 {percentile(samples, 99):7.2f} ms   "
+                    f"média {statistics.mean(samples):7.2f} ms"
+                )
+        finally:
+            connection.close()
+            connection.settings_dict['CONN_MAX_AGE'], connection.settings_dict['CONN_HEALTH_CHECKS'] = original
+            Cart.objects.filter(user=user).delete()
+            user.delete()
+
+        fresh, persistent = results.values()
+        for pct in (50, 99):
+            before, after = percentile(fresh, pct), percentile(persistent, pct)
+            gain = (1 - after / before) * 100 if before else 0
+            self.stdout.write(self.style.SUCCESS(f'p{pct}: {before:.2f} -> {after:.2f} ms ({gain:.0f}% mais rápido)'))
@@ -0,0 +1,229 @@
+"""
+Teste de carga do checkout: gunicorn WSGI (workers síncronos) vs ASGI (uvicorn)
+Cada "checkout" é o que o frontend faz: POST /api/cart/payments/initiate/
+seguido de um GET /api/cart/payments/status/<payment_id>/. Uma PaySuite falsa
+local responde com --paysuite-latency-ms de atraso, para que a espera pela
+rede (o que prende os workers síncronos) entre na medição.
+Para cada modo sobe um gunicorn com --workers processos, dispara
+--concurrency clientes em paralelo até completar --checkouts checkouts e
+mostra checkouts/s e p50/p99.
+Uso: python manage.py load_test_checkout [--modes wsgi,asgi] [--concurrency 50]
+Usa o banco configurado (DB_*): cria usuários, categoria, produto e carrinhos
+temporários, removidos no fim. A autenticação usa tokens não assinados, por
+isso os servidores sobem com DEV_FIREBASE_ACCEPT_UNVERIFIED=1 — não usar contra
+produção. O modo asgi requer uvicorn e httpx (requirements.prod.txt).
+"""
+import base64
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from cart.models import Cart, CartItem, Payment
+from products.models import Category, Product
+
+from .benchmark_cart_get import percentile
+
+LOAD_TEST_PREFIX = 'load-test-checkout'
+
+SERVER_MODES = {
+    'wsgi': ['chiva_backend.wsgi:application'],
+    'asgi': ['chiva_backend.asgi:application', '-k', 'uvicorn.workers.UvicornWorker'],
+}
+
+
+class FakePaysuiteHandler(BaseHTTPRequestHandler):
+    """PaySuite falsa: cria pagamentos e responde 'ainda pendente' aos pollings"""
+    latency = 0.0
+
+    def _reply(self, payload):
+        time.sleep(self.latency)
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        payment_id = uuid.uuid4().hex
+        self._reply({
+            'status': 'success',
+            'data': {
+                'id': payment_id,
+                'reference': payment_id[:12],
+                'checkout_url': f'http://paysuite.invalid/checkout/{payment_id}',
+            },
+        })
+
+    def do_GET(self):
+        self._reply({'status': 'success', 'data': {'id': self.path.rsplit('/', 1)[-1], 'transaction': None}})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def unsigned_token(uid: str) -> str:
+    """JWT sem assinatura aceite pelo FirebaseAuthentication com DEV_FIREBASE_ACCEPT_UNVERIFIED"""
+    def encode(data):
+        return base64.urlsafe_b64encode(json.dumps(data).encode()).rstrip(b'=').decode()
+    return f"{encode({'alg': 'none'})}.{encode({'sub': uid, 'email': f'{uid}@example.com'})}.x"
+
+
+class Command(BaseCommand):
+    help = 'Compara a capacidade de checkouts concorrentes em gunicorn WSGI vs ASGI (uvicorn)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--modes', default='wsgi,asgi', help='Modos a medir, separados por vírgula')
+        parser.add_argument('--workers', type=int, default=3, help='Processos gunicorn por modo')
+        parser.add_argument('--concurrency', type=int, default=50, help='Clientes em paralelo')
+        parser.add_argument('--checkouts', type=int, default=300, help='Checkouts medidos por modo')
+        parser.add_argument('--paysuite-latency-ms', type=int, default=800, help='Atraso da PaySuite falsa')
+        parser.add_argument('--port', type=int, default=8765, help='Porta dos servidores de teste')
+
+    def handle(self, *args, **options):
+        modes = [m.strip() for m in options['modes'].split(',') if m.strip()]
+        unknown = set(modes) - set(SERVER_MODES)
+        if unknown:
+            raise CommandError(f"Modos desconhecidos: {', '.join(sorted(unknown))}")
+
+        FakePaysuiteHandler.latency = options['paysuite_latency_ms'] / 1000.0
+        paysuite = ThreadingHTTPServer(('127.0.0.1', 0), FakePaysuiteHandler)
+        paysuite.daemon_threads = True
+        threading.Thread(target=paysuite.serve_forever, daemon=True).start()
+        paysuite_url = f'http://127.0.0.1:{paysuite.server_address[1]}'
+
+        users = self._setup(options['concurrency'])
+        results = {}
+        try:
+            for mode in modes:
+                results[mode] = self._run_mode(mode, users, paysuite_url, options)
+        finally:
+            paysuite.shutdown()
+            self._cleanup()
+
+        self.stdout.write('')
+        for mode, (throughput, latencies, errors) in results.items():
+            self.stdout.write(
+                f"{mode:<5} {throughput:7.1f} checkouts/s   "
+                f"p50 {percentile(latencies, 50):8.0f} ms   p99 {percentile(latencies, 99):8.0f} ms   "
+                f"erros {errors}"
+            )
+        if 'wsgi' in results and 'asgi' in results and results['wsgi'][0]:
+            gain = results['asgi'][0] / results['wsgi'][0]
+            self.stdout.write(self.style.SUCCESS(f'ASGI: {gain:.1f}x a capacidade de checkout do WSGI'))
+
+    def _setup(self, count):
+        self._cleanup()
+        category = Category.objects.create(name=f'{LOAD_TEST_PREFIX} category')
+        product = Product.objects.create(
+            name=f'{LOAD_TEST_PREFIX} product',
+            category=category,
+            sku=f'{LOAD_TEST_PREFIX}-sku',
+            price=Decimal('100.00'),
+            stock_quantity=1000000,
+            status='active',
+        )
+        users = []
+        for index in range(count):
+            user = User.objects.create(username=f'{LOAD_TEST_PREFIX}-{index}', email=f'{LOAD_TEST_PREFIX}-{index}@example.com')
+            cart = Cart.objects.create(user=user, status='active')
+            CartItem.objects.create(cart=cart, product=product, quantity=1, price=product.price)
+            users.append(user.username)
+        return users
+
+    def _cleanup(self):
+        Payment.objects.filter(cart__user__username__startswith=LOAD_TEST_PREFIX).delete()
+        Cart.objects.filter(user__username__startswith=LOAD_TEST_PREFIX).delete()
+        User.objects.filter(username__startswith=LOAD_TEST_PREFIX).delete()
+        Product.objects.filter(sku=f'{LOAD_TEST_PREFIX}-sku').delete()
+        Category.objects.filter(name=f'{LOAD_TEST_PREFIX} category').delete()
+
+    def _run_mode(self, mode, users, paysuite_url, options):
+        base_url = f"http://127.0.0.1:{options['port']}"
+        env = {
+            **os.environ,
+            'SERVER_MODE': mode,
+            'PAYSUITE_BASE_URL': paysuite_url,
+            'PAYSUITE_TEST_MODE': 'production',
+            'DEV_FIREBASE_ACCEPT_UNVERIFIED': '1',
+            'DEBUG': 'False',
+            'SECURE_SSL_REDIRECT': 'False',
+        }
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', *SERVER_MODES[mode],
+             '--bind', f"127.0.0.1:{options['port']}", '--workers', str(options['workers']),
+             '--timeout', '120', '--graceful-timeout', '5'],
+            cwd=settings.BASE_DIR, env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            self._wait_ready(server, base_url)
+            self.stdout.write(f"{mode}: {options['checkouts']} checkouts, {len(users)} clientes em paralelo...")
+            return self._load(base_url, users, options['checkouts'])
+        finally:
+            server.terminate()
+            try:
+                server.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                server.kill()
+                server.wait()
+
+    def _wait_ready(self, server, base_url):
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError('O gunicorn terminou ao arrancar (uvicorn/httpx instalados?)')
+            try:
+                requests.get(f'{base_url}/api/cart/', timeout=2)
+                return
+            except requests.RequestException:
+                time.sleep(0.5)
+        raise CommandError('O gunicorn não respondeu em 60s')
+
+    def _load(self, base_url, users, checkouts):
+        remaining = iter(range(checkouts))
+        lock = threading.Lock()
+        latencies, errors = [], [0]
+
+        def client(uid):
+            session = requests.Session()
+            session.headers['Authorization'] = f'Bearer {unsigned_token(uid)}'
+            while True:
+                with lock:
+                    if next(remaining, None) is None:
+                        return
+                started = time.perf_counter()
+                try:
+                    initiated = session.post(
+                        f'{base_url}/api/cart/payments/initiate/',
+                        json={'method': 'card', 'shipping_address': {'name': 'Load Test'}},
+                        timeout=120,
+                    )
+                    initiated.raise_for_status()
+                    payment_id = initiated.json()['payment_id']
+                    session.get(f'{base_url}/api/cart/payments/status/{payment_id}/', timeout=120).raise_for_status()
+                except (requests.RequestException, KeyError, ValueError):
+                    with lock:
+                        errors[0] += 1
+                    continue
+                with lock:
+                    latencies.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(users)) as pool:
+            list(pool.map(client, users))
+        elapsed = time.perf_counter() - started
+        return len(latencies) / elapsed, latencies or [0.0], errors[0]
@@ -0,0 +1,32 @@
+"""
+Recalcula o rollup diário de pedidos (OrderDailyStats) a partir da tabela Order
+Uso: python manage.py rebuild_order_daily_stats                 (todo o histórico)
+     python manage.py rebuild_order_daily_stats --days 7        (últimos 7 dias)
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from cart.order_analytics import rebuild_daily_stats
+
+
+class Command(BaseCommand):
+    help = 'Recalcula as estatísticas diárias de pedidos usadas pelo dashboard'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=None,
+            help='Recalcula apenas os últimos N dias (padrão: todo o histórico)',
+        )
+
+    def handle(self, *args, **options):
+        start = None
+        if options['days']:
+            start = timezone.localdate() - timedelta(days=options['days'])
+
+        rows = rebuild_daily_stats(start=start)
+        scope = f"desde {start}" if start else "para todo o histórico"
+        self.stdout.write(self.style.SUCCESS(f'✅ {rows} linhas de estatísticas diárias recalculadas {scope}'))
@@ -0,0 +1,63 @@
+"""
+Worker de exportações administrativas assíncronas
+Uso: python manage.py run_export_jobs          (loop contínuo)
+     python manage.py run_export_jobs --once   (processa a fila e termina; ex: cron)
+"""
+import time
+import logging
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from cart.export_jobs import claim_next_job, run_job, purge_expired_jobs
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Gera os ficheiros das exportações pendentes (ExportJob)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Processa os jobs pendentes e termina',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=2.0,
+            help='Segundos entre verificações da fila quando vazia (padrão: 2)',
+        )
+
+    def handle(self, *args, **options):
+        once = options['once']
+        interval = options['interval']
+
+        self.stdout.write('📦 Worker de exportações iniciado')
+        purged = purge_expired_jobs()
+        if purged:
+            self.stdout.write(f'🧹 {purged} exportações expiradas removidas')
+
+        try:
+            while True:
+                close_old_connections()
+                job = claim_next_job()
+                if job is None:
+                    if once:
+                        break
+                    time.sleep(interval)
+                    continue
+
+                self.stdout.write(f'⏳ Exportação {job.id} ({job.kind}/{job.export_format})...')
+                run_job(job)
+                if job.status == 'done':
+                    self.stdout.write(self.style.SUCCESS(
+                        f'✅ {job.filename}: {job.rows_done} linhas'
+                    ))
+                else:
+                    self.stdout.write(self.style.ERROR(f'❌ Falhou: {job.error}'))
+
+                purge_expired_jobs()
+        except KeyboardInterrupt:
+            self.stdout.write('Worker interrompido')
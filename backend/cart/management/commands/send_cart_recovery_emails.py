@@ -1,14 +1,19 @@
 """
 Comando Django para enviar emails de recuperação de carrinhos abandonados
 Uso: python manage.py send_cart_recovery_emails
+
+Execução paralela por faixas de IDs (um processo por shard):
+    python manage.py send_cart_recovery_emails --shards 4 --shard-index 0
+    python manage.py send_cart_recovery_emails --shards 4 --shard-index 1
+    ...
 """
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.utils import timezone
 from django.conf import settings
-from datetime import timedelta
-from cart.models import Cart, AbandonedCart
 from cart.email_service import get_email_service
+from cart.models import RecoveryCheckpoint
+from cart.recovery_campaign import RecoveryCampaign, shard_bounds
 import logging
 
 logger = logging.getLogger(__name__)
@@ -28,157 +33,107 @@ class Command(BaseCommand):
             action='store_true',
             help='Força envio mesmo se já atingiu limite de emails',
         )
+        parser.add_argument(
+            '--campaign',
+            help='Identificador da campanha/checkpoint (padrão: recovery-AAAAMMDD; '
+                 'cada execução depois de uma passagem concluída recomeça do início)',
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Descarta o checkpoint da campanha e recomeça do primeiro carrinho',
+        )
+        parser.add_argument(
+            '--shards',
+            type=int,
+            default=1,
+            help='Número total de shards (faixas de IDs de carrinho)',
+        )
+        parser.add_argument(
+            '--shard-index',
+            type=int,
+            default=0,
+            help='Shard processado por este processo (0 a shards-1)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help=f'Destinatários por pedido à Brevo (padrão: {settings.CART_RECOVERY_BATCH_SIZE})',
+        )
+        parser.add_argument(
+            '--rate',
+            type=float,
+            default=None,
+            help=f'Emails por segundo (padrão: {settings.CART_RECOVERY_RATE_PER_SECOND})',
+        )
 
     def handle(self, *args, **options):
         dry_run = options['dry_run']
-        force = options['force']
+        shards = options['shards']
+        shard_index = options['shard_index']
 
         if dry_run:
             self.stdout.write(self.style.WARNING('🔍 Modo DRY-RUN ativado - nenhum email será enviado'))
 
-        # Configurações
-        abandonment_hours = settings.CART_ABANDONMENT_HOURS
-        max_recovery_emails = settings.MAX_RECOVERY_EMAILS
-        
-        cutoff_time = timezone.now() - timedelta(hours=abandonment_hours)
-
-        self.stdout.write(f'⏰ Buscando carrinhos abandonados há mais de {abandonment_hours} horas...')
-
-        # Buscar carrinhos abandonados com condições:
-        # 1. Tem items
-        # 2. Última atividade há mais de X horas
-        # 3. Usuário tem email
-        # 4. Não atingiu limite de emails de recuperação
-        # 5. Status = 'active' ou 'abandoned'
-
-        carts_to_recover = Cart.objects.filter(
-            last_activity__lt=cutoff_time,
-            status__in=['active', 'abandoned'],
-            user__isnull=False,  # Apenas usuários autenticados
-        ).exclude(
-            user__email=''
-        ).select_related('user').prefetch_related('items')
-
-        if not force:
-            # Verificar quantos emails já foram enviados
-            abandoned_carts_ids = AbandonedCart.objects.filter(
-                recovery_emails_sent__gte=max_recovery_emails
-            ).values_list('cart_id', flat=True)
-            carts_to_recover = carts_to_recover.exclude(id__in=abandoned_carts_ids)
-
-        # Filtrar carrinhos com items
-        carts_with_items = []
-        for cart in carts_to_recover:
-            if cart.items.exists():
-                carts_with_items.append(cart)
-
-        self.stdout.write(f'📦 Encontrados {len(carts_with_items)} carrinhos para recuperação')
-
-        if not carts_with_items:
-            self.stdout.write(self.style.SUCCESS('✅ Nenhum carrinho para recuperar no momento'))
-            return
-
-        email_service = get_email_service()
-        sent_count = 0
-        failed_count = 0
-
-        for cart in carts_with_items:
+        campaign = options['campaign'] or f"recovery-{timezone.localdate():%Y%m%d}"
+        shard = None
+        if shards > 1:
+            campaign = f"{campaign}-shard{shard_index}of{shards}"
             try:
-                # Obter ou criar AbandonedCart
-                abandoned_cart, created = AbandonedCart.objects.get_or_create(
-                    cart=cart,
-                    defaults={
-                        'abandonment_stage': 'browsing',
-                        'recovery_emails_sent': 0,
-                        'last_recovery_sent': timezone.now()
-                    }
-                )
-
-                # Verificar se já atingiu limite de emails
-                if abandoned_cart.recovery_emails_sent >= max_recovery_emails and not force:
-                    self.stdout.write(
-                        self.style.WARNING(
-                            f'⏭️  Carrinho {cart.id} já atingiu limite de {max_recovery_emails} emails'
-                        )
-                    )
-                    continue
-
-                # Gerar URL de recuperação
-                recovery_url = f"https://chivacomputer.co.mz/carrinho?recovery={cart.recovery_token}"
-
-                customer_email = cart.user.email
-                customer_name = cart.user.username or cart.user.first_name or 'Cliente'
-
-                if dry_run:
-                    self.stdout.write(
-                        self.style.WARNING(
-                            f'📧 [DRY-RUN] Enviaria email para {customer_email} - '
-                            f'Carrinho {cart.id} com {cart.items.count()} items '
-                            f'(Total: {cart.total} MZN)'
-                        )
-                    )
-                else:
-                    # Enviar email
-                    success = email_service.send_cart_recovery_email(
-                        cart=cart,
-                        customer_email=customer_email,
-                        customer_name=customer_name,
-                        recovery_url=recovery_url
-                    )
-
-                    if success:
-                        # Atualizar contadores
-                        abandoned_cart.recovery_emails_sent += 1
-                        abandoned_cart.last_recovery_sent = timezone.now()
-                        abandoned_cart.save()
-
-                        # Atualizar status do cart
-                        if cart.status == 'active':
-                            cart.status = 'abandoned'
-                            cart.save(update_fields=['status'])
-
-                        sent_count += 1
-                        self.stdout.write(
-                            self.style.SUCCESS(
-                                f'✅ Email enviado para {customer_email} - '
-                                f'Carrinho {cart.id} ({abandoned_cart.recovery_emails_sent}/{max_recovery_emails} emails)'
-                            )
-                        )
-                    else:
-                        failed_count += 1
-                        self.stdout.write(
-                            self.style.ERROR(
-                                f'❌ Falha ao enviar email para {customer_email} - Carrinho {cart.id}'
-                            )
-                        )
+                shard = shard_bounds(shard_index, shards)
+            except ValueError as e:
+                raise CommandError(str(e))
+            if shard is None:
+                self.stdout.write(self.style.SUCCESS('✅ Nenhum carrinho para recuperar no momento'))
+                return
+
+        if options['restart'] and not dry_run:
+            RecoveryCheckpoint.objects.filter(campaign=campaign).delete()
+
+        self.stdout.write(
+            f'⏰ Buscando carrinhos abandonados há mais de {settings.CART_ABANDONMENT_HOURS} horas '
+            f'(campanha {campaign}{f", carrinhos {shard[0]}-{shard[1]}" if shard else ""})...'
+        )
 
-            except Exception as e:
-                failed_count += 1
-                logger.error(f'Erro ao processar carrinho {cart.id}: {e}')
-                self.stdout.write(
-                    self.style.ERROR(
-                        f'❌ Erro ao processar carrinho {cart.id}: {str(e)}'
-                    )
-                )
+        runner = RecoveryCampaign(
+            campaign=campaign,
+            email_service=None if dry_run else get_email_service(),
+            shard=shard,
+            batch_size=options['batch_size'],
+            rate_per_second=options['rate'],
+            force=options['force'],
+            dry_run=dry_run,
+            log=self.stdout.write,
+        )
+        result = runner.run()
 
         # Resumo
         self.stdout.write('\n' + '='*60)
+        if result.resumed_from:
+            self.stdout.write(f'↩️  Retomado após o carrinho {result.resumed_from}')
         if dry_run:
             self.stdout.write(
                 self.style.SUCCESS(
-                    f'🔍 DRY-RUN COMPLETO: {len(carts_with_items)} carrinhos seriam processados'
+                    f'🔍 DRY-RUN COMPLETO: {result.processed} carrinhos seriam processados'
                 )
             )
         else:
             self.stdout.write(
                 self.style.SUCCESS(
-                    f'✅ Emails enviados: {sent_count}'
+                    f'✅ Emails enviados: {result.sent}'
                 )
             )
-            if failed_count > 0:
+            if result.failed > 0:
                 self.stdout.write(
                     self.style.ERROR(
-                        f'❌ Falhas: {failed_count}'
+                        f'❌ Falhas: {result.failed}'
+                    )
+                )
+            if result.quota_exhausted:
+                self.stdout.write(
+                    self.style.WARNING(
+                        '⏸️  Cota diária atingida; a próxima execução retoma a campanha'
                     )
                 )
 
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-19 15:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0016_alter_orderitem_options_orderitem_color_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecoveryCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('campaign', models.CharField(max_length=100, unique=True)),
+                ('shard_start', models.BigIntegerField(blank=True, null=True)),
+                ('shard_end', models.BigIntegerField(blank=True, null=True)),
+                ('last_cart_id', models.BigIntegerField(default=0)),
+                ('sent_count', models.PositiveIntegerField(default=0)),
+                ('failed_count', models.PositiveIntegerField(default=0)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Checkpoint de Recuperação',
+                'verbose_name_plural': 'Checkpoints de Recuperação',
+                'ordering': ['-updated_at'],
+            },
+        ),
+    ]
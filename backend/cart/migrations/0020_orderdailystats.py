@@ -0,0 +1,57 @@
+# Generated by Django 4.2.7 on 2026-10-19 15:56
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+
+def populate_daily_stats(apps, schema_editor):
+    Order = apps.get_model('cart', 'Order')
+    OrderDailyStats = apps.get_model('cart', 'OrderDailyStats')
+    rows = Order.objects.order_by().annotate(
+        day=TruncDate('created_at', tzinfo=timezone.get_current_timezone())
+    ).values('day', 'status').annotate(
+        orders=Count('id'),
+        revenue=Coalesce(Sum('total_amount'), Decimal('0.00')),
+        shipping=Coalesce(Sum('shipping_cost'), Decimal('0.00')),
+    )
+    OrderDailyStats.objects.bulk_create([
+        OrderDailyStats(
+            date=row['day'], status=row['status'], orders=row['orders'],
+            revenue=row['revenue'], shipping=row['shipping'],
+        )
+        for row in rows
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0019_backfillcheckpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('status', models.CharField(choices=[('pending', 'Pendente'), ('confirmed', 'Confirmado'), ('processing', 'Processando'), ('shipped', 'Enviado'), ('delivered', 'Entregue'), ('cancelled', 'Cancelado'), ('refunded', 'Reembolsado'), ('paid', 'Pago'), ('failed', 'Falhou')], max_length=20)),
+                ('orders', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('shipping', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+            ],
+            options={
+                'verbose_name': 'Estatística Diária de Pedidos',
+                'verbose_name_plural': 'Estatísticas Diárias de Pedidos',
+                'ordering': ['-date', 'status'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='orderdailystats',
+            constraint=models.UniqueConstraint(fields=('date', 'status'), name='unique_order_daily_stats'),
+        ),
+        migrations.RunPython(populate_daily_stats, migrations.RunPython.noop),
+    ]
@@ -59,10 +59,19 @@ class Cart(models.Model):
             return f"Carrinho de {self.user.username} ({self.status})"
         return f"Carrinho anônimo {self.session_key[:8]} ({self.status})"
     
-    def calculate_totals(self):
-        """Calculate cart subtotal, discount, and total"""
+    def get_price_rules(self, at=None):
+        """Promotion rules of the cart owner (now, or at `at`, e.g. when a payment was created)"""
+        from promotions.pricing import get_price_rules
+        return get_price_rules(self.user, at)
+
+    def calculate_totals(self, rules=None):
+        """Calculate cart subtotal (with active promotions), discount, and total"""
         items = self.items.filter(product__status='active')
-        self.subtotal = sum(item.get_total_price() for item in items)
+        # Promoções ativas do usuário aplicadas ao preço guardado de cada item
+        rules = rules or self.get_price_rules()
+        self.subtotal = sum(
+            (item.get_total_price(rules) for item in items), Decimal('0.00')
+        )
         
         # Apply coupon discount if available
         if self.applied_coupon and self.applied_coupon.is_valid():
@@ -125,9 +134,14 @@ class CartItem(models.Model):
         color_info = f" - {self.color.name}" if self.color else ""
         return f"{self.product.name}{color_info} x{self.quantity}"
     
-    def get_total_price(self):
-        """Calculate total price for this cart item"""
-        return self.price * self.quantity
+    def get_total_price(self, rules=None):
+        """Calculate total price for this cart item (with promotion `rules`, if given)"""
+        return self.get_final_price(rules) * self.quantity if rules else self.price * self.quantity
+
+    def get_final_price(self, rules):
+        """Unit price after the best promotion in `rules` (promotions.pricing.PriceRules)"""
+        final_price, _ = rules.apply(self.price)
+        return final_price
     
     def save(self, *args, **kwargs):
         # Store current product price if not set
@@ -343,10 +357,34 @@ class AbandonedCart(models.Model):
             time_since_last = timezone.now() - self.last_recovery_sent
             if time_since_last < timezone.timedelta(hours=24):
                 return False
-        
+
         return True
 
 
+class RecoveryCheckpoint(models.Model):
+    """
+    Progress of a cart recovery campaign run (one row per campaign/shard),
+    so an interrupted run resumes after the last processed cart.
+    """
+    campaign = models.CharField(max_length=100, unique=True)
+    shard_start = models.BigIntegerField(null=True, blank=True)
+    shard_end = models.BigIntegerField(null=True, blank=True)
+    last_cart_id = models.BigIntegerField(default=0)
+    sent_count = models.PositiveIntegerField(default=0)
+    failed_count = models.PositiveIntegerField(default=0)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Checkpoint de Recuperação"
+        verbose_name_plural = "Checkpoints de Recuperação"
+        ordering = ['-updated_at']
+
+    def __str__(self):
+        return f"{self.campaign} (último carrinho {self.last_cart_id})"
+
+
 class Order(models.Model):
     """
     Complete Order model for modern e-commerce functionality
@@ -408,6 +446,12 @@ class Order(models.Model):
             models.Index(fields=['user', 'status']),
             models.Index(fields=['order_number']),
             models.Index(fields=['tracking_number']),
+            # Keyset pagination (cart.order_listing): sort key + id tie-breaker
+            models.Index(fields=['created_at', 'id'], name='order_created_id_idx'),
+            models.Index(fields=['updated_at', 'id'], name='order_updated_id_idx'),
+            models.Index(fields=['total_amount', 'id'], name='order_total_id_idx'),
+            models.Index(fields=['status', 'created_at', 'id'], name='order_status_created_id_idx'),
+            models.Index(fields=['user', 'created_at', 'id'], name='order_user_created_id_idx'),
         ]
 
     def __str__(self):
@@ -648,3 +692,118 @@ class Payment(models.Model):
 
     def __str__(self):
         return f"Payment {self.id} ({self.method}) - {self.get_status_display()}"
+
+
+class ExportJob(models.Model):
+    """
+    Asynchronous admin export (orders, customers, dashboard stats).
+    Created by the API, generated by the `run_export_jobs` worker and reused
+    by identical requests (same fingerprint) until `expires_at`.
+    """
+    KIND_CHOICES = [
+        ('orders', 'Pedidos'),
+        ('customers', 'Clientes'),
+        ('dashboard', 'Estatísticas do Dashboard'),
+    ]
+
+    FORMAT_CHOICES = [
+        ('excel', 'Excel'),
+        ('csv', 'CSV'),
+        ('pdf', 'PDF'),
+    ]
+
+    STATUS_CHOICES = [
+        ('pending', 'Pendente'),
+        ('running', 'Em processamento'),
+        ('done', 'Concluído'),
+        ('failed', 'Falhou'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    export_format = models.CharField(max_length=10, choices=FORMAT_CHOICES)
+    params = models.JSONField(default=dict, blank=True)
+    fingerprint = models.CharField(max_length=64, db_index=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    rows_total = models.PositiveIntegerField(null=True, blank=True)
+    rows_done = models.PositiveIntegerField(default=0)
+    file = models.FileField(upload_to='exports/%Y/%m/', null=True, blank=True)
+    filename = models.CharField(max_length=255, blank=True)
+    error = models.TextField(blank=True)
+    # Claims pelo worker; também identifica o claim atual (ver cart.export_jobs)
+    attempts = models.PositiveIntegerField(default=0)
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='export_jobs')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Exportação"
+        verbose_name_plural = "Exportações"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"Export {self.kind}/{self.export_format} - {self.get_status_display()}"
+
+    @property
+    def progress(self):
+        """Percentagem concluída (0-100)"""
+        if self.status == 'done':
+            return 100
+        if not self.rows_total:
+            return 0
+        return min(99, int(self.rows_done * 100 / self.rows_total))
+
+
+class OrderDailyStats(models.Model):
+    """
+    Rollup diário de pedidos por status (quantidade, receita e entrega),
+    mantido pelos signals de Order em cart.order_analytics
+    """
+    date = models.DateField()
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    orders = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    shipping = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+
+    class Meta:
+        verbose_name = "Estatística Diária de Pedidos"
+        verbose_name_plural = "Estatísticas Diárias de Pedidos"
+        ordering = ['-date', 'status']
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'status'], name='unique_order_daily_stats'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.status}: {self.orders} pedidos"
+
+
+class BackfillCheckpoint(models.Model):
+    """
+    Progresso de um backfill em lotes (cart.backfill): último PK processado,
+    para que uma execução interrompida continue de onde parou.
+    """
+    STATUS_CHOICES = [
+        ('running', 'Em execução'),
+        ('done', 'Concluído'),
+    ]
+
+    name = models.CharField(max_length=100, unique=True)
+    last_pk = models.BigIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='running')
+    started_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Checkpoint de Backfill"
+        verbose_name_plural = "Checkpoints de Backfill"
+
+    def __str__(self):
+        return f"{self.name} (até {self.last_pk}) - {self.get_status_display()}"
@@ -0,0 +1,201 @@
+"""
+Analytics de pedidos para o dashboard admin
+- OrderDailyStats: rollup por (dia, status) com quantidade, receita e entrega,
+  ajustado pelos signals de Order a cada criação, transição de status,
+  alteração de valores ou remoção
+- order_totals/daily_series: consultas de intervalos arbitrários sobre o rollup
+- live_today: números de hoje numa única consulta com agregação condicional,
+  filtrando created_at por intervalo [início do dia, início do dia seguinte)
+  para usar o índice (status, created_at)
+"""
+import logging
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Dict, Iterable, Optional, Tuple
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .models import Order, OrderDailyStats
+
+logger = logging.getLogger(__name__)
+
+# Status que contam como receita no dashboard
+REVENUE_STATUSES = ('delivered', 'shipped', 'processing')
+
+ZERO = Decimal('0.00')
+
+
+def day_bounds(day: date) -> Tuple[datetime, datetime]:
+    """[início do dia, início do dia seguinte) no fuso horário atual"""
+    tz = timezone.get_current_timezone()
+    start = timezone.make_aware(datetime.combine(day, time.min), tz)
+    end = timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min), tz)
+    return start, end
+
+
+# Campos que definem o bucket do pedido no rollup
+TRACKED_FIELDS = ('created_at', 'status', 'total_amount', 'shipping_cost')
+
+# Snapshot de instâncias carregadas com .only()/.defer() sem os campos acima
+UNKNOWN = object()
+
+
+def _bucket(order) -> Optional[tuple]:
+    """(dia, status, total, entrega) com que o pedido entra no rollup"""
+    if order.pk is None or order.created_at is None:
+        return None
+    return (
+        timezone.localdate(order.created_at),
+        order.status,
+        order.total_amount or ZERO,
+        order.shipping_cost or ZERO,
+    )
+
+
+def _adjust(day: date, status: str, orders: int, revenue: Decimal, shipping: Decimal) -> None:
+    values = {
+        'orders': F('orders') + orders,
+        'revenue': F('revenue') + revenue,
+        'shipping': F('shipping') + shipping,
+    }
+    if OrderDailyStats.objects.filter(date=day, status=status).update(**values):
+        return
+    try:
+        with transaction.atomic():
+            OrderDailyStats.objects.create(
+                date=day, status=status, orders=orders, revenue=revenue, shipping=shipping
+            )
+    except IntegrityError:
+        # Criado em paralelo por outra transação
+        OrderDailyStats.objects.filter(date=day, status=status).update(**values)
+
+
+def snapshot_order(order) -> None:
+    """Guarda o bucket atual do pedido (chamado em post_init e após cada ajuste)"""
+    # Em post_init não se pode ler campos adiados (geraria uma consulta por linha)
+    if order.pk is not None and any(field not in order.__dict__ for field in TRACKED_FIELDS):
+        order._analytics_bucket = UNKNOWN
+        return
+    order._analytics_bucket = _bucket(order)
+
+
+def record_order_change(order, update_fields=None) -> None:
+    """Move o pedido do bucket anterior para o atual, se mudou"""
+    if update_fields is not None and not set(TRACKED_FIELDS) & set(update_fields):
+        return
+
+    old = getattr(order, '_analytics_bucket', None)
+    new = _bucket(order)
+    if old is UNKNOWN:
+        # Estado anterior desconhecido: recalcula o dia do pedido
+        if new is not None:
+            rebuild_daily_stats(new[0], new[0])
+    elif old != new:
+        if old is not None:
+            _adjust(old[0], old[1], -1, -old[2], -old[3])
+        if new is not None:
+            _adjust(new[0], new[1], 1, new[2], new[3])
+    order._analytics_bucket = new
+
+
+def record_order_delete(order) -> None:
+    bucket = getattr(order, '_analytics_bucket', None)
+    if bucket is None or bucket is UNKNOWN:
+        bucket = _bucket(order)
+    if bucket is not None:
+        _adjust(bucket[0], bucket[1], -1, -bucket[2], -bucket[3])
+
+
+def rebuild_daily_stats(start: Optional[date] = None, end: Optional[date] = None) -> int:
+    """Recalcula o rollup a partir dos pedidos (intervalo inclusivo, ou tudo)"""
+    orders = Order.objects.order_by()
+    rollup = OrderDailyStats.objects.all()
+    if start:
+        orders = orders.filter(created_at__gte=day_bounds(start)[0])
+        rollup = rollup.filter(date__gte=start)
+    if end:
+        orders = orders.filter(created_at__lt=day_bounds(end)[1])
+        rollup = rollup.filter(date__lte=end)
+
+    rows = orders.annotate(day=TruncDate('created_at', tzinfo=timezone.get_current_timezone())).values(
+        'day', 'status'
+    ).annotate(
+        orders=Count('id'),
+        revenue=Coalesce(Sum('total_amount'), ZERO),
+        shipping=Coalesce(Sum('shipping_cost'), ZERO),
+    )
+
+    with transaction.atomic():
+        rollup.delete()
+        created = OrderDailyStats.objects.bulk_create([
+            OrderDailyStats(
+                date=row['day'], status=row['status'], orders=row['orders'],
+                revenue=row['revenue'], shipping=row['shipping'],
+            )
+            for row in rows
+        ])
+    return len(created)
+
+
+def order_totals(start: Optional[date] = None, end: Optional[date] = None) -> dict:
+    """
+    Totais do rollup no intervalo [start, end] (inclusivo; None = sem limite):
+    {'orders', 'revenue', 'shipping', 'by_status': {status: {...}}}
+    """
+    rollup = OrderDailyStats.objects.order_by()
+    if start:
+        rollup = rollup.filter(date__gte=start)
+    if end:
+        rollup = rollup.filter(date__lte=end)
+
+    totals = {'orders': 0, 'revenue': ZERO, 'shipping': ZERO, 'by_status': {}}
+    for row in rollup.values('status').annotate(
+        total_orders=Sum('orders'), total_revenue=Sum('revenue'), total_shipping=Sum('shipping')
+    ):
+        if not row['total_orders']:
+            continue
+        totals['by_status'][row['status']] = {
+            'orders': row['total_orders'],
+            'revenue': row['total_revenue'],
+            'shipping': row['total_shipping'],
+        }
+        totals['orders'] += row['total_orders']
+        totals['revenue'] += row['total_revenue']
+        totals['shipping'] += row['total_shipping']
+    return totals
+
+
+def sum_statuses(totals: dict, statuses: Iterable[str], field: str):
+    return sum((totals['by_status'].get(s, {}).get(field, 0) for s in statuses), 0)
+
+
+def daily_series(start: date, end: date, statuses: Optional[Iterable[str]] = None) -> Dict[date, dict]:
+    """{dia: {'orders', 'revenue', 'shipping'}} para cada dia de [start, end]"""
+    series = {start + timedelta(days=i): {'orders': 0, 'revenue': ZERO, 'shipping': ZERO}
+              for i in range((end - start).days + 1)}
+    rollup = OrderDailyStats.objects.filter(date__gte=start, date__lte=end).order_by()
+    if statuses is not None:
+        rollup = rollup.filter(status__in=list(statuses))
+    for row in rollup.values('date').annotate(
+        total_orders=Sum('orders'), total_revenue=Sum('revenue'), total_shipping=Sum('shipping')
+    ):
+        series[row['date']] = {
+            'orders': row['total_orders'],
+            'revenue': row['total_revenue'],
+            'shipping': row['total_shipping'],
+        }
+    return series
+
+
+def live_today() -> dict:
+    """Pedidos de hoje direto da tabela Order, numa única consulta"""
+    start, end = day_bounds(timezone.localdate())
+    revenue = Q(status__in=REVENUE_STATUSES)
+    return Order.objects.filter(created_at__gte=start, created_at__lt=end).aggregate(
+        orders=Count('id'),
+        revenue=Coalesce(Sum('total_amount', filter=revenue), ZERO),
+        shipping=Coalesce(Sum('shipping_cost', filter=revenue), ZERO),
+    )
@@ -0,0 +1,151 @@
+"""
+Listagem paginada de pedidos (admin_orders_list e user_orders)
+- Ordenação só por chaves da lista SORT_FIELDS, sempre desempatada por id e
+  servida pelos índices compostos (<campo>, id) / (user, created_at, id)
+- Paginação por cursor (keyset): `cursor` codifica o último (valor, id) da
+  página, e a próxima página é `WHERE (campo, id) < (valor, id)`, com custo
+  constante seja qual for a profundidade. `page` continua a funcionar (OFFSET)
+  para os clientes existentes, e cada resposta traz `next_cursor`
+- Contagem exata, estimada (pg_class.reltuples) ou omitida via `count`; em
+  `auto` listas sem filtros acima de ORDER_LIST_ESTIMATE_THRESHOLD usam a
+  estimativa
+- Dados aninhados do OrderSerializer (user, items) carregados de uma vez
+"""
+import base64
+import binascii
+import json
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.db.models import Q
+
+from .models import Order
+from .serializers import OrderSerializer
+
+# sort_by aceito -> campo do modelo (prefixo '-' para ordem decrescente)
+SORT_FIELDS = {
+    'created_at': 'created_at',
+    'updated_at': 'updated_at',
+    'total_amount': 'total_amount',
+}
+
+COUNT_MODES = ('auto', 'exact', 'estimate', 'none')
+
+
+class OrderListingError(ValueError):
+    """Parâmetro de listagem inválido (a view responde 400)"""
+
+
+def _positive_int(value, name: str, default: int, maximum: Optional[int] = None) -> int:
+    if value in (None, ''):
+        return default
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise OrderListingError(f'{name} inválido')
+    if number < 1:
+        raise OrderListingError(f'{name} inválido')
+    return min(number, maximum) if maximum else number
+
+
+def parse_sort(sort_by: Optional[str]) -> Tuple[str, bool]:
+    """'-created_at' -> ('created_at', True)"""
+    sort_by = (sort_by or '-created_at').strip()
+    descending = sort_by.startswith('-')
+    key = sort_by.lstrip('-')
+    if key not in SORT_FIELDS:
+        raise OrderListingError(f"sort_by inválido; use um de: {', '.join(sorted(SORT_FIELDS))}")
+    return SORT_FIELDS[key], descending
+
+
+def encode_cursor(order: Order, field: str, descending: bool) -> str:
+    value = Order._meta.get_field(field).value_to_string(order)
+    payload = json.dumps({'s': f"{'-' if descending else ''}{field}", 'v': value, 'id': order.pk})
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, field: str, descending: bool) -> Tuple[object, int]:
+    """(valor, id) do último pedido da página anterior"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if payload['s'] != f"{'-' if descending else ''}{field}":
+            raise OrderListingError('cursor não corresponde a sort_by')
+        value = Order._meta.get_field(field).to_python(payload['v'])
+        return value, int(payload['id'])
+    except OrderListingError:
+        raise
+    except (binascii.Error, ValueError, KeyError, TypeError, ValidationError):
+        raise OrderListingError('cursor inválido')
+
+
+def estimated_count() -> Optional[int]:
+    """Linhas da tabela segundo as estatísticas do Postgres (None se desconhecido)"""
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [Order._meta.db_table])
+        row = cursor.fetchone()
+    # reltuples = -1 numa tabela ainda não analisada
+    return row[0] if row and row[0] >= 0 else None
+
+
+def _count(queryset, mode: str, filtered: bool) -> Tuple[Optional[int], bool]:
+    """(total, é estimativa)"""
+    if mode == 'none':
+        return None, False
+    if mode in ('auto', 'estimate') and not filtered:
+        estimate = estimated_count()
+        if estimate is not None and (mode == 'estimate' or estimate >= settings.ORDER_LIST_ESTIMATE_THRESHOLD):
+            return estimate, True
+    return queryset.count(), False
+
+
+def paginate_orders(request, queryset, filtered: bool = True, default_page_size: int = 20) -> dict:
+    """
+    Aplica ordenação, cursor/página e contagem a `queryset` e devolve o corpo
+    da resposta ({'orders', 'pagination'}). `filtered=False` indica que o
+    queryset cobre a tabela inteira (permite a contagem estimada).
+    """
+    params = request.GET
+    field, descending = parse_sort(params.get('sort_by'))
+    page_size = _positive_int(params.get('page_size'), 'page_size', default_page_size, settings.ORDER_LIST_MAX_PAGE_SIZE)
+    count_mode = params.get('count') or 'auto'
+    if count_mode not in COUNT_MODES:
+        raise OrderListingError(f"count inválido; use um de: {', '.join(COUNT_MODES)}")
+
+    prefix = '-' if descending else ''
+    ordered = queryset.order_by(f'{prefix}{field}', f'{prefix}id')
+    total, estimated = _count(queryset, count_mode, filtered)
+
+    cursor = params.get('cursor')
+    page = None
+    if cursor:
+        value, last_id = decode_cursor(cursor, field, descending)
+        op = 'lt' if descending else 'gt'
+        ordered = ordered.filter(Q(**{f'{field}__{op}': value}) | Q(**{field: value, f'id__{op}': last_id}))
+        rows = list(ordered.select_related('user').prefetch_related('items')[:page_size + 1])
+    else:
+        page = _positive_int(params.get('page'), 'page', 1)
+        start = (page - 1) * page_size
+        rows = list(ordered.select_related('user').prefetch_related('items')[start:start + page_size + 1])
+
+    has_next = len(rows) > page_size
+    rows = rows[:page_size]
+
+    pagination = {
+        'page_size': page_size,
+        'total': total,
+        'total_is_estimate': estimated,
+        'has_next': has_next,
+        'next_cursor': encode_cursor(rows[-1], field, descending) if has_next else None,
+    }
+    if page is not None:
+        pagination.update({'page': page, 'has_previous': page > 1})
+
+    return {
+        'orders': OrderSerializer(rows, many=True).data,
+        'pagination': pagination,
+    }
@@ -6,12 +6,14 @@ Modern e-commerce order management endpoints
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from customers.views import IsAdmin
+from customers.search import KIND_ORDER, matching_ids
 from rest_framework.response import Response
 from rest_framework import status
 from django.shortcuts import get_object_or_404
-from django.db.models import Q, Count, Sum, F
+from django.urls import reverse
+from django.db.models import Q, F
 from django.utils import timezone
-from datetime import timedelta
+from datetime import date, timedelta
 import logging
 
 from .models import Order, Payment, OrderStatusHistory, StockMovement
@@ -20,6 +22,8 @@ from .serializers import (
     StockMovementSerializer
 )
 from .stock_management import OrderManager, StockManager
+from .order_analytics import REVENUE_STATUSES, day_bounds, live_today, order_totals, sum_statuses
+from .order_listing import OrderListingError, paginate_orders
 
 logger = logging.getLogger(__name__)
 
@@ -30,36 +34,17 @@ def user_orders(request):
     """
     Get all orders for the authenticated user
     """
-    orders = Order.objects.filter(
-        user=request.user
-    ).prefetch_related('payments', 'status_history').order_by('-created_at')
+    orders = Order.objects.filter(user=request.user)
     
     # Filter by status if provided
     status_filter = request.GET.get('status')
     if status_filter:
         orders = orders.filter(status=status_filter)
     
-    # Pagination
-    page_size = int(request.GET.get('page_size', 20))
-    page = int(request.GET.get('page', 1))
-    start = (page - 1) * page_size
-    end = start + page_size
-    
-    total_count = orders.count()
-    orders_page = orders[start:end]
-    
-    serializer = OrderSerializer(orders_page, many=True)
-    
-    return Response({
-        'orders': serializer.data,
-        'pagination': {
-            'page': page,
-            'page_size': page_size,
-            'total': total_count,
-            'has_next': end < total_count,
-            'has_previous': page > 1
-        }
-    })
+    try:
+        return Response(paginate_orders(request, orders, default_page_size=20))
+    except OrderListingError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 # Debug endpoint to confirm routing without hitting permissions
 @api_view(['GET'])
@@ -174,55 +159,38 @@ def admin_orders_list(request):
     """
     Admin view to list all orders with filters
     """
-    orders = Order.objects.select_related('user').prefetch_related('payments')
+    orders = Order.objects.all()
+    filtered = False
     
     # Filters
     status_filter = request.GET.get('status')
     if status_filter:
         orders = orders.filter(status=status_filter)
+        filtered = True
     
-    date_from = request.GET.get('date_from')
-    if date_from:
-        orders = orders.filter(created_at__date__gte=date_from)
-    
-    date_to = request.GET.get('date_to')
-    if date_to:
-        orders = orders.filter(created_at__date__lte=date_to)
+    # Datas como intervalo de created_at (created_at__date impede o uso do índice)
+    try:
+        date_from = request.GET.get('date_from')
+        if date_from:
+            orders = orders.filter(created_at__gte=day_bounds(date.fromisoformat(date_from))[0])
+            filtered = True
+        
+        date_to = request.GET.get('date_to')
+        if date_to:
+            orders = orders.filter(created_at__lt=day_bounds(date.fromisoformat(date_to))[1])
+            filtered = True
+    except ValueError:
+        return Response({'error': 'Data inválida (use AAAA-MM-DD)'}, status=status.HTTP_400_BAD_REQUEST)
     
     search = request.GET.get('search')
     if search:
-        orders = orders.filter(
-            Q(order_number__icontains=search) |
-            Q(user__email__icontains=search) |
-            Q(user__first_name__icontains=search) |
-            Q(user__last_name__icontains=search)
-        )
-    
-    # Sorting
-    sort_by = request.GET.get('sort_by', '-created_at')
-    orders = orders.order_by(sort_by)
-    
-    # Pagination
-    page_size = int(request.GET.get('page_size', 50))
-    page = int(request.GET.get('page', 1))
-    start = (page - 1) * page_size
-    end = start + page_size
+        orders = orders.filter(pk__in=matching_ids(KIND_ORDER, search))
+        filtered = True
     
-    total_count = orders.count()
-    orders_page = orders[start:end]
-    
-    serializer = OrderSerializer(orders_page, many=True)
-    
-    return Response({
-        'orders': serializer.data,
-        'pagination': {
-            'page': page,
-            'page_size': page_size,
-            'total': total_count,
-            'has_next': end < total_count,
-            'has_previous': page > 1
-        }
-    })
+    try:
+        return Response(paginate_orders(request, orders, filtered=filtered, default_page_size=50))
+    except OrderListingError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 
 @api_view(['PUT', 'PATCH'])
@@ -285,37 +253,19 @@ def admin_orders_stats(request):
     """
     Get order statistics for admin dashboard
     """
-    today = timezone.now().date()
+    today = timezone.localdate()
     last_30_days = today - timedelta(days=30)
     
-    # Basic stats
-    total_orders = Order.objects.count()
-    pending_orders = Order.objects.filter(status='pending').count()
-    processing_orders = Order.objects.filter(status='processing').count()
-    shipped_orders = Order.objects.filter(status='shipped').count()
-    delivered_orders = Order.objects.filter(status='delivered').count()
-    
-    # Revenue stats
-    total_revenue = Order.objects.filter(
-        status__in=['delivered', 'shipped', 'processing']
-    ).aggregate(total=Sum('total_amount'))['total'] or 0
+    # Basic and revenue stats from the daily rollup (one grouped query each)
+    all_time = order_totals()
+    last_30 = order_totals(start=last_30_days, end=today)
+    total_revenue = sum_statuses(all_time, REVENUE_STATUSES, 'revenue')
+    monthly_revenue = sum_statuses(last_30, REVENUE_STATUSES, 'revenue')
     
-    monthly_revenue = Order.objects.filter(
-        created_at__date__gte=last_30_days,
-        status__in=['delivered', 'shipped', 'processing']
-    ).aggregate(total=Sum('total_amount'))['total'] or 0
-    
-    # Today's metrics
-    today_orders = Order.objects.filter(created_at__date=today).count()
-    today_revenue_amount = Order.objects.filter(
-        created_at__date=today,
-        status__in=['delivered', 'shipped', 'processing']
-    ).aggregate(total=Sum('total_amount'))['total'] or 0
-    today_shipping = Order.objects.filter(
-        created_at__date=today,
-        status__in=['delivered', 'shipped', 'processing']
-    ).aggregate(total=Sum('shipping_cost'))['total'] or 0
-    today_revenue = (today_revenue_amount or 0) + (today_shipping or 0)
+    # Today's metrics, live (one conditional aggregation over today's range)
+    today_stats = live_today()
+    today_orders = today_stats['orders']
+    today_revenue = today_stats['revenue'] + today_stats['shipping']
     
     # Recent orders
     recent_orders = Order.objects.select_related('user').order_by('-created_at')[:10]
@@ -323,11 +273,11 @@ def admin_orders_stats(request):
     
     return Response({
         'stats': {
-            'total_orders': total_orders,
-            'pending_orders': pending_orders,
-            'processing_orders': processing_orders,
-            'shipped_orders': shipped_orders,
-            'delivered_orders': delivered_orders,
+            'total_orders': all_time['orders'],
+            'pending_orders': sum_statuses(all_time, ['pending'], 'orders'),
+            'processing_orders': sum_statuses(all_time, ['processing'], 'orders'),
+            'shipped_orders': sum_statuses(all_time, ['shipped'], 'orders'),
+            'delivered_orders': sum_statuses(all_time, ['delivered'], 'orders'),
             'total_revenue': total_revenue,
             'monthly_revenue': monthly_revenue,
             'today_orders': today_orders,
@@ -549,7 +499,18 @@ def admin_update_order_notes(request, order_id):
 # EXPORT ENDPOINTS
 # ========================================
 
+from chiva_backend.media import media_response
 from .export_service import ExportService
+from .export_jobs import (
+    EXPORT_DATASETS, build_orders_export, build_customers_export, build_dashboard_export,
+    request_export,
+)
+from .models import ExportJob
+
+
+def _requested_export_format(request, default='excel'):
+    # Avoid DRF format negotiation ('format' query param triggers 404); prefer 'export_format'
+    return (request.GET.get('export_format') or request.GET.get('format', default)).lower()
 
 
 @api_view(['GET'])
@@ -558,85 +519,13 @@ def export_orders(request):
     """
     Exportar pedidos em múltiplos formatos (Excel, CSV, PDF)
     Suporta filtros: status, date_from, date_to, search
+    
+    Para relatórios grandes (sobretudo PDF) use POST admin/exports/ (assíncrono)
     """
     try:
-        # Avoid DRF format negotiation ('format' query param triggers 404); prefer 'export_format'
-        export_format = (request.GET.get('export_format') or request.GET.get('format', 'excel')).lower()
-        
-        # Base queryset
-        orders = Order.objects.all().select_related('user').order_by('-created_at')
-        
-        # Aplicar filtros (mesmos do admin_orders_list)
-        status_filter = request.GET.get('status')
-        if status_filter and status_filter != 'all':
-            orders = orders.filter(status=status_filter)
-        
-        search_query = request.GET.get('search', '').strip()
-        if search_query:
-            orders = orders.filter(
-                Q(order_number__icontains=search_query) |
-                Q(user__email__icontains=search_query) |
-                Q(shipping_address__icontains=search_query)
-            )
-        
-        date_from = request.GET.get('date_from')
-        if date_from:
-            orders = orders.filter(created_at__gte=date_from)
-        
-        date_to = request.GET.get('date_to')
-        if date_to:
-            orders = orders.filter(created_at__lte=date_to)
-        
-        # Preparar dados para exportação
-        data = []
-        for order in orders:
-            customer_email = order.user.email if order.user else 'N/A'
-            payment_method = 'N/A'
-            
-            # Obter método de pagamento do primeiro Payment relacionado
-            first_payment = order.payments.first()
-            if first_payment and getattr(first_payment, 'method', None):
-                payment_method = first_payment.method
-            
-            # Endereço de entrega como string amigável
-            try:
-                shipping_addr_display = order.get_shipping_address_display()
-            except Exception:
-                shipping_addr_display = ''
-            shipping_addr_display = shipping_addr_display[:100] if shipping_addr_display else 'N/A'
-
-            data.append({
-                'order_number': order.order_number,
-                'status': order.get_status_display(),
-                'customer_email': customer_email,
-                'total': float(order.total_amount),
-                'payment_method': payment_method,
-                'created_at': order.created_at,
-                'updated_at': order.updated_at,
-                'shipping_address': shipping_addr_display,
-                'tracking_number': order.tracking_number or 'N/A',
-            })
-        
-        # Cabeçalhos
-        headers = {
-            'order_number': 'Nº Pedido',
-            'status': 'Status',
-            'customer_email': 'Cliente',
-            'total': 'Valor Total (MT)',
-            'payment_method': 'Método Pagamento',
-            'created_at': 'Data Criação',
-            'updated_at': 'Última Atualização',
-            'shipping_address': 'Endereço Entrega',
-            'tracking_number': 'Rastreamento',
-        }
-        
-        # Nome do arquivo
-        timestamp = timezone.now().strftime('%Y%m%d_%H%M%S')
-        filename = f'pedidos_{timestamp}'
-        title = f'Relatório de Pedidos - {timezone.now().strftime("%d/%m/%Y")}'
-        
-        # Exportar
-        return ExportService.export_data(data, headers, export_format, filename, title)
+        export_format = _requested_export_format(request)
+        dataset = build_orders_export(request.GET)
+        return ExportService.export_data(dataset.rows, dataset.headers, export_format, dataset.filename, dataset.title)
         
     except Exception as e:
         logger.error(f"Error exporting orders: {e}")
@@ -652,52 +541,9 @@ def export_customers(request):
     Exportar clientes em múltiplos formatos (Excel, CSV, PDF)
     """
     try:
-        export_format = (request.GET.get('export_format') or request.GET.get('format', 'excel')).lower()
-        
-        # Buscar todos os usuários (clientes)
-        from django.contrib.auth import get_user_model
-        User = get_user_model()
-        
-        customers = User.objects.filter(is_staff=False).order_by('-date_joined')
-        
-        # Preparar dados
-        data = []
-        for user in customers:
-            # Contar pedidos
-            orders_count = Order.objects.filter(user=user).count()
-            total_spent = Order.objects.filter(
-                user=user,
-                status__in=['confirmed', 'processing', 'shipped', 'delivered']
-            ).aggregate(total=Sum('total_amount'))['total'] or 0
-            
-            data.append({
-                'email': user.email,
-                'uid': user.uid if hasattr(user, 'uid') else 'N/A',
-                'date_joined': user.date_joined,
-                'last_login': user.last_login or 'Nunca',
-                'orders_count': orders_count,
-                'total_spent': float(total_spent),
-                'is_active': user.is_active,
-            })
-        
-        # Cabeçalhos
-        headers = {
-            'email': 'Email',
-            'uid': 'UID',
-            'date_joined': 'Data Cadastro',
-            'last_login': 'Último Acesso',
-            'orders_count': 'Nº Pedidos',
-            'total_spent': 'Total Gasto (MT)',
-            'is_active': 'Ativo',
-        }
-        
-        # Nome do arquivo
-        timestamp = timezone.now().strftime('%Y%m%d_%H%M%S')
-        filename = f'clientes_{timestamp}'
-        title = f'Relatório de Clientes - {timezone.now().strftime("%d/%m/%Y")}'
-        
-        # Exportar
-        return ExportService.export_data(data, headers, export_format, filename, title)
+        export_format = _requested_export_format(request)
+        dataset = build_customers_export(request.GET)
+        return ExportService.export_data(dataset.rows, dataset.headers, export_format, dataset.filename, dataset.title)
         
     except Exception as e:
         logger.error(f"Error exporting customers: {e}")
@@ -714,97 +560,97 @@ def export_dashboard_stats(request):
     Inclui: vendas por período, produtos mais vendidos, status de pedidos
     """
     try:
-        export_format = (request.GET.get('export_format') or request.GET.get('format', 'excel')).lower()
-        
-        # Período (últimos 30 dias por padrão)
-        days = int(request.GET.get('days', 30))
-        start_date = timezone.now() - timedelta(days=days)
-        
-        # Estatísticas gerais
-        orders = Order.objects.filter(created_at__gte=start_date)
-        
-        # Vendas por status
-        status_counts = orders.values('status').annotate(
-            count=Count('id'),
-            total=Sum('total_amount')
-        ).order_by('-count')
-        
-        # Preparar dados
-        data = []
-        
-        # Resumo geral
-        total_orders = orders.count()
-        total_revenue = orders.aggregate(total=Sum('total_amount'))['total'] or 0
-        
-        data.append({
-            'metric': 'RESUMO GERAL',
-            'value': '',
-            'details': ''
-        })
-        data.append({
-            'metric': 'Total de Pedidos',
-            'value': str(total_orders),
-            'details': f'Últimos {days} dias'
-        })
-        data.append({
-            'metric': 'Receita Total',
-            'value': f'{float(total_revenue):.2f} MT',
-            'details': f'Últimos {days} dias'
-        })
-        data.append({
-            'metric': 'Ticket Médio',
-            'value': f'{float(total_revenue / total_orders if total_orders > 0 else 0):.2f} MT',
-            'details': ''
-        })
-        
-        # Espaço
-        data.append({
-            'metric': '',
-            'value': '',
-            'details': ''
-        })
-        
-        # Vendas por status
-        data.append({
-            'metric': 'PEDIDOS POR STATUS',
-            'value': '',
-            'details': ''
-        })
-        
-        status_labels = {
-            'pending': 'Pendente',
-            'confirmed': 'Confirmado',
-            'processing': 'Processando',
-            'shipped': 'Enviado',
-            'delivered': 'Entregue',
-            'cancelled': 'Cancelado',
-            'failed': 'Falhou',
-        }
-        
-        for stat in status_counts:
-            data.append({
-                'metric': status_labels.get(stat['status'], stat['status']),
-                'value': str(stat['count']),
-                'details': f'{float(stat["total"] or 0):.2f} MT'
-            })
-        
-        # Cabeçalhos
-        headers = {
-            'metric': 'Métrica',
-            'value': 'Valor',
-            'details': 'Detalhes',
-        }
-        
-        # Nome do arquivo
-        timestamp = timezone.now().strftime('%Y%m%d_%H%M%S')
-        filename = f'dashboard_stats_{timestamp}'
-        title = f'Estatísticas do Dashboard - Últimos {days} dias'
-        
-        # Exportar
-        return ExportService.export_data(data, headers, export_format, filename, title)
+        export_format = _requested_export_format(request)
+        dataset = build_dashboard_export(request.GET)
+        return ExportService.export_data(dataset.rows, dataset.headers, export_format, dataset.filename, dataset.title)
         
     except Exception as e:
         logger.error(f"Error exporting dashboard stats: {e}")
         return Response({
             'error': f'Erro ao exportar estatísticas: {str(e)}'
-        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+def _export_job_data(request, job):
+    data = {
+        'id': str(job.id),
+        'kind': job.kind,
+        'export_format': job.export_format,
+        'params': job.params,
+        'status': job.status,
+        'progress': job.progress,
+        'rows_done': job.rows_done,
+        'rows_total': job.rows_total,
+        'filename': job.filename,
+        'error': job.error,
+        'created_at': job.created_at,
+        'finished_at': job.finished_at,
+        'expires_at': job.expires_at,
+        'download_url': None,
+    }
+    if job.status == 'done':
+        data['download_url'] = request.build_absolute_uri(
+            reverse('export_job_download', args=[job.id])
+        )
+    return data
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated, IsAdmin])
+def create_export_job(request):
+    """
+    Criar exportação assíncrona
+    Body: {"kind": "orders|customers|dashboard", "export_format": "excel|csv|pdf", "filters": {...}}
+    
+    Pedidos idênticos dentro do TTL reutilizam o mesmo job/ficheiro (200);
+    um novo job é criado com 202 e gerado pelo worker run_export_jobs.
+    """
+    kind = request.data.get('kind')
+    export_format = (request.data.get('export_format') or request.data.get('format') or 'excel').lower()
+    filters = request.data.get('filters') or {}
+    
+    if kind not in EXPORT_DATASETS:
+        return Response({
+            'error': f'Tipo de exportação inválido. Use: {", ".join(EXPORT_DATASETS)}'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    if not isinstance(filters, dict):
+        return Response({'error': 'filters deve ser um objeto'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        job, created = request_export(kind, export_format, filters, user=request.user)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response(
+        _export_job_data(request, job),
+        status=status.HTTP_202_ACCEPTED if created else status.HTTP_200_OK
+    )
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsAdmin])
+def export_job_detail(request, job_id):
+    """
+    Estado e progresso de uma exportação assíncrona
+    """
+    job = get_object_or_404(ExportJob, id=job_id)
+    return Response(_export_job_data(request, job))
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsAdmin])
+def export_job_download(request, job_id):
+    """
+    Download do ficheiro gerado por uma exportação assíncrona
+    """
+    job = get_object_or_404(ExportJob, id=job_id)
+    if job.status != 'done' or not job.file:
+        return Response({
+            'error': 'Exportação ainda não concluída',
+            'status': job.status,
+            'progress': job.progress,
+        }, status=status.HTTP_409_CONFLICT)
+    if job.expires_at and job.expires_at <= timezone.now():
+        return Response({'error': 'Exportação expirada'}, status=status.HTTP_410_GONE)
+    
+    return media_response(job.file.name, filename=job.filename, as_attachment=True)
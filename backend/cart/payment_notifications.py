@@ -0,0 +1,113 @@
+"""
+Emails de pagamento enviados fora do pedido
+O webhook PaySuite e o polling de payment_status enviavam os emails Brevo
+(confirmação, estado do pagamento, nova venda para o admin) dentro do pedido,
+prendendo o worker durante várias chamadas HTTP. Agora são entregues a um
+pool de threads depois do commit da transação, e a thread relê o pedido pelo
+id; com PAYMENT_EMAILS_IN_BACKGROUND=False o envio volta a ser feito no
+próprio pedido (útil em diagnóstico).
+"""
+import logging
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(
+    max_workers=settings.PAYMENT_EMAIL_WORKERS,
+    thread_name_prefix='payment-emails',
+)
+
+
+def _run_in_background(fn, *args):
+    try:
+        fn(*args)
+    finally:
+        # A thread do pool abriu a sua própria conexão (order.items, etc.)
+        connections.close_all()
+
+
+def dispatch(fn, *args) -> None:
+    """Executa fn(*args) após o commit, em segundo plano (ou no pedido, se desativado)"""
+    if settings.PAYMENT_EMAILS_IN_BACKGROUND:
+        transaction.on_commit(lambda: _executor.submit(_run_in_background, fn, *args))
+    else:
+        fn(*args)
+
+
+def _load_order(order_id):
+    from .models import Order
+
+    if order_id is None:
+        return None
+    return Order.objects.filter(pk=order_id).first()
+
+
+def send_order_paid_emails(order_id: int, source: str) -> None:
+    """Confirmação + pagamento aprovado para o cliente e nova venda para o admin"""
+    from .email_service import get_email_service
+
+    try:
+        order = _load_order(order_id)
+        if order is None:
+            logger.warning(f"⚠️ [{source}] Order {order_id} não encontrada para envio de emails")
+            return
+        logger.info(f"🚀 [{source}] Iniciando envio de emails para order {order.id}")
+        email_service = get_email_service()
+
+        customer_email = order.shipping_address.get('email', '')
+        customer_name = order.shipping_address.get('name', 'Cliente')
+        logger.info(f"📬 [{source}] Customer email: {customer_email}, name: {customer_name}")
+
+        if customer_email:
+            result1 = email_service.send_order_confirmation(
+                order=order,
+                customer_email=customer_email,
+                customer_name=customer_name
+            )
+            logger.info(f"{'✅' if result1 else '❌'} [{source}] Email de confirmação: {result1}")
+
+            result2 = email_service.send_payment_status_update(
+                order=order,
+                payment_status='paid',
+                customer_email=customer_email,
+                customer_name=customer_name
+            )
+            logger.info(f"{'✅' if result2 else '❌'} [{source}] Email de status: {result2}")
+        else:
+            logger.warning(f"⚠️ [{source}] customer_email está vazio! Não é possível enviar emails.")
+
+        result3 = email_service.send_new_order_notification_to_admin(order=order)
+        logger.info(f"{'✅' if result3 else '❌'} [{source}] Email admin: {result3}")
+    except Exception as e:
+        logger.error(f"❌ [{source}] Erro ao enviar emails de notificação: {e}")
+        logger.error(traceback.format_exc())
+
+
+def send_payment_failed_email(order_id, customer_email: str, customer_name: str, source: str) -> None:
+    from .email_service import get_email_service
+
+    try:
+        result = get_email_service().send_payment_status_update(
+            order=_load_order(order_id),
+            payment_status='failed',
+            customer_email=customer_email,
+            customer_name=customer_name
+        )
+        logger.info(f"{'✅' if result else '❌'} [{source}] Email de falha para {customer_email}: {result}")
+    except Exception as e:
+        logger.error(f"❌ [{source}] Erro ao enviar email de falha: {e}")
+
+
+def notify_order_paid(order, source: str = 'WEBHOOK') -> None:
+    dispatch(send_order_paid_emails, order.id, source)
+
+
+def notify_payment_failed(order, customer_email: str, customer_name: str = 'Cliente', source: str = 'WEBHOOK') -> None:
+    if not customer_email:
+        logger.warning(f"⚠️ [{source}] Não foi possível enviar email de falha - customer_email não encontrado")
+        return
+    dispatch(send_payment_failed_email, order.id if order else None, customer_email, customer_name, source)
@@ -19,6 +19,93 @@ _status_cache = {}
 _CACHE_TTL = 30  # Cache status queries for 30 seconds (reduces from 20 req/min to 2 req/min)
 
 
+def build_payment_payload(*, amount, method=None, reference: str, description: str | None = None,
+                          return_url: str | None = None, callback_url: str | None = None,
+                          msisdn: str | None = None, direct_payment: bool = False, **kwargs) -> dict:
+    """Payload de POST /v1/payments (partilhado pelos clientes síncrono e async)"""
+    payload: dict = {
+        'amount': float(amount),  # ensure numeric type
+        'reference': reference,
+    }
+    if method:
+        payload['method'] = method
+    if description:
+        payload['description'] = description
+    if return_url:
+        payload['return_url'] = return_url
+    if callback_url:
+        payload['callback_url'] = callback_url
+    if msisdn:
+        payload['msisdn'] = msisdn
+        
+    # For direct payments, add specific flags - but test different approaches
+    if direct_payment:
+        # Test mode determines which flags to send
+        test_mode = os.getenv('PAYSUITE_TEST_MODE', 'clean')
+        
+        if test_mode == 'direct_v1':
+            payload['direct'] = True
+        elif test_mode == 'direct_v2':
+            payload['push'] = True
+        elif test_mode == 'direct_v3':
+            payload['mobile_payment'] = True
+        elif test_mode == 'clean':
+            # Don't add any special flags, just send msisdn
+            pass
+        else:
+            # Default: original approach
+            payload['direct'] = True
+            
+        # Remove return_url for mobile payments to avoid redirects
+        payload.pop('return_url', None)
+        
+    # Add any additional fields from kwargs (card data, bank data, etc.)
+    for key, value in kwargs.items():
+        if value is not None:
+            payload[key] = value
+
+    return payload
+
+
+def cached_payment_status(payment_id: str, now: float):
+    """Estado em cache (mais novo que _CACHE_TTL) ou None"""
+    cache_key = f"status_{payment_id}"
+    if cache_key in _status_cache:
+        cached_data, cached_time = _status_cache[cache_key]
+        if now - cached_time < _CACHE_TTL:
+            logging.debug(f"🔍 Using cached status for payment {payment_id} (age: {now - cached_time:.1f}s)")
+            return cached_data
+    return None
+
+
+def payment_status_error(payment_id: str, status_code: int, resp) -> dict:
+    """Resposta de erro do GET de estado (resp: requests.Response ou httpx.Response)"""
+    # Try to parse error response
+    try:
+        error_data = resp.json()
+        error_msg = error_data.get('message') or error_data.get('error') or f'HTTP {status_code}'
+    except:
+        error_msg = f'HTTP {status_code}: {resp.text[:100]}'
+    
+    logging.error(f"PaySuite API error {status_code}: {error_msg}")
+    
+    # Special handling for rate limit
+    if status_code == 429:
+        logging.warning(f"⚠️ Rate limit hit for payment {payment_id} - will retry on next poll")
+        # Return cached data if available, even if stale
+        cache_key = f"status_{payment_id}"
+        if cache_key in _status_cache:
+            cached_data, _ = _status_cache[cache_key]
+            logging.info(f"📦 Returning stale cache for payment {payment_id} due to rate limit")
+            return cached_data
+    
+    return {
+        'status': 'error',
+        'message': error_msg,
+        'code': status_code
+    }
+
+
 class PaysuiteClient:
     """Minimal Paysuite client for initiating payments and verifying callbacks.
 
@@ -63,46 +150,11 @@ class PaysuiteClient:
         Response format: { status: 'success'|'error', data?: {...}, message?: str }
         """
         url = f"{self.base_url}/v1/payments"
-        payload: dict = {
-            'amount': float(amount),  # ensure numeric type
-            'reference': reference,
-        }
-        if method:
-            payload['method'] = method
-        if description:
-            payload['description'] = description
-        if return_url:
-            payload['return_url'] = return_url
-        if callback_url:
-            payload['callback_url'] = callback_url
-        if msisdn:
-            payload['msisdn'] = msisdn
-            
-        # For direct payments, add specific flags - but test different approaches
-        if direct_payment:
-            # Test mode determines which flags to send
-            test_mode = os.getenv('PAYSUITE_TEST_MODE', 'clean')
-            
-            if test_mode == 'direct_v1':
-                payload['direct'] = True
-            elif test_mode == 'direct_v2':
-                payload['push'] = True
-            elif test_mode == 'direct_v3':
-                payload['mobile_payment'] = True
-            elif test_mode == 'clean':
-                # Don't add any special flags, just send msisdn
-                pass
-            else:
-                # Default: original approach
-                payload['direct'] = True
-                
-            # Remove return_url for mobile payments to avoid redirects
-            payload.pop('return_url', None)
-            
-        # Add any additional fields from kwargs (card data, bank data, etc.)
-        for key, value in kwargs.items():
-            if value is not None:
-                payload[key] = value
+        payload = build_payment_payload(
+            amount=amount, method=method, reference=reference, description=description,
+            return_url=return_url, callback_url=callback_url, msisdn=msisdn,
+            direct_payment=direct_payment, **kwargs
+        )
 
         print(f"🌐 PAYSUITE CLIENT - URL: {url}")
         print(f"🌐 PAYSUITE CLIENT - PAYLOAD: {json.dumps(payload, indent=2)}")
@@ -184,11 +236,9 @@ class PaysuiteClient:
         # Check cache first
         cache_key = f"status_{payment_id}"
         now = time.time()
-        if cache_key in _status_cache:
-            cached_data, cached_time = _status_cache[cache_key]
-            if now - cached_time < _CACHE_TTL:
-                logging.debug(f"🔍 Using cached status for payment {payment_id} (age: {now - cached_time:.1f}s)")
-                return cached_data
+        cached = cached_payment_status(payment_id, now)
+        if cached is not None:
+            return cached
         
         # Use the proxy with cache to avoid rate limits
         # The 10s cache reduces requests from 20/min to 6/min
@@ -208,29 +258,7 @@ class PaysuiteClient:
             
             # Handle error responses before raise_for_status
             if resp.status_code >= 400:
-                # Try to parse error response
-                try:
-                    error_data = resp.json()
-                    error_msg = error_data.get('message') or error_data.get('error') or f'HTTP {resp.status_code}'
-                except:
-                    error_msg = f'HTTP {resp.status_code}: {resp.text[:100]}'
-                
-                logging.error(f"PaySuite API error {resp.status_code}: {error_msg}")
-                
-                # Special handling for rate limit
-                if resp.status_code == 429:
-                    logging.warning(f"⚠️ Rate limit hit for payment {payment_id} - will retry on next poll")
-                    # Return cached data if available, even if stale
-                    if cache_key in _status_cache:
-                        cached_data, _ = _status_cache[cache_key]
-                        logging.info(f"📦 Returning stale cache for payment {payment_id} due to rate limit")
-                        return cached_data
-                
-                return {
-                    'status': 'error',
-                    'message': error_msg,
-                    'code': resp.status_code
-                }
+                return payment_status_error(payment_id, resp.status_code, resp)
             
             result = resp.json()
             print(f"🔍 [PAYSUITE] Parsed JSON: {json.dumps(result, indent=2)[:500]}")
@@ -260,3 +288,73 @@ class PaysuiteClient:
                 'status': 'error',
                 'message': f'Failed to query payment status: {str(e)}'
             }
+
+
+class AsyncPaysuiteClient:
+    """Async counterpart of PaysuiteClient (httpx) used by the ASGI views.
+
+    Shares the payment payload and the in-memory status cache with the sync
+    client, so both serving modes behave the same towards PaySuite.
+    """
+
+    def __init__(self, base_url=None, api_key=None, timeout=None):
+        self.base_url = base_url or PAYSUITE_BASE_URL
+        self.api_key = api_key or PAYSUITE_API_KEY
+        self.timeout = timeout if timeout is not None else float(os.getenv('PAYSUITE_TIMEOUT', '15'))
+
+    def _client(self, retries: int = 0):
+        import httpx
+
+        headers = {'Content-Type': 'application/json'}
+        if self.api_key:
+            headers['Authorization'] = f'Bearer {self.api_key}'
+        transport = httpx.AsyncHTTPTransport(retries=retries)
+        return httpx.AsyncClient(headers=headers, timeout=self.timeout, transport=transport)
+
+    async def create_payment(self, **kwargs) -> dict:
+        """Same contract as PaysuiteClient.create_payment (raises on HTTP errors)"""
+        import httpx
+
+        url = f"{self.base_url}/v1/payments"
+        payload = build_payment_payload(**kwargs)
+        async with self._client() as client:
+            try:
+                resp = await client.post(url, content=json.dumps(payload))
+                logging.debug("🌐 PAYSUITE ASYNC CLIENT - STATUS: %s", resp.status_code)
+                resp.raise_for_status()
+            except httpx.HTTPError as e:
+                logging.error("Failed to initiate payment: %s", e)
+                raise
+        if resp.text.strip():
+            return resp.json()
+        logging.error("PaySuite returned empty response")
+        return {'status': 'error', 'message': 'Empty response from PaySuite', 'http_status': resp.status_code}
+
+    async def get_payment_status(self, payment_id: str) -> dict:
+        """Same contract as PaysuiteClient.get_payment_status"""
+        import httpx
+
+        now = time.time()
+        cached = cached_payment_status(payment_id, now)
+        if cached is not None:
+            return cached
+
+        url = f"{self.base_url}/v1/payments/{payment_id}"
+        logging.info(f"🔍 Polling PaySuite status for payment {payment_id} (async)")
+        try:
+            # Like the sync session, only GET is retried on connection errors
+            async with self._client(retries=int(os.getenv('PAYSUITE_RETRY_TOTAL', '2'))) as client:
+                resp = await client.get(url)
+        except httpx.HTTPError as e:
+            logging.error(f"Failed to get payment status from PaySuite: {e}")
+            return {
+                'status': 'error',
+                'message': f'Failed to query payment status: {str(e)}'
+            }
+
+        if resp.status_code >= 400:
+            return payment_status_error(payment_id, resp.status_code, resp)
+
+        result = resp.json()
+        _status_cache[f"status_{payment_id}"] = (result, now)
+        return result
@@ -0,0 +1,331 @@
+"""
+Campanha de Recuperação de Carrinhos Abandonados
+Seleção numa query anotada, envio em lotes via Brevo (messageVersions) com
+rate limit, checkpoint para retomar execuções interrompidas (uma passagem
+concluída faz a execução seguinte recomeçar do início) e shards por faixa de
+IDs de carrinho para rodar em vários processos
+"""
+import logging
+import math
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Callable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Max, Min
+from django.utils import timezone
+
+from .models import Cart, AbandonedCart, CartHistory, RecoveryCheckpoint
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Rate limiter token bucket: `rate` tokens por segundo, acumulando até `capacity`
+    """
+
+    def __init__(self, rate: float, capacity: float, clock=time.monotonic, sleep=time.sleep):
+        self.rate = max(float(rate), 0.001)
+        self.capacity = max(float(capacity), 1.0)
+        self.tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._last = clock()
+
+    def _refill(self):
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def acquire(self, amount: float = 1) -> float:
+        """Bloqueia até existirem `amount` tokens. Retorna os segundos de espera"""
+        amount = min(float(amount), self.capacity)
+        waited = 0.0
+        self._refill()
+        while self.tokens < amount:
+            delay = (amount - self.tokens) / self.rate
+            self._sleep(delay)
+            waited += delay
+            self._refill()
+        self.tokens -= amount
+        return waited
+
+
+def shard_bounds(shard_index: int, shard_count: int) -> Optional[Tuple[int, int]]:
+    """
+    Divide a faixa de IDs de Cart em `shard_count` faixas contíguas e
+    retorna (início, fim) inclusivos da faixa `shard_index` (base 0)
+    """
+    if shard_count < 1 or not 0 <= shard_index < shard_count:
+        raise ValueError(f"Shard inválido: {shard_index}/{shard_count}")
+
+    bounds = Cart.objects.aggregate(lo=Min('id'), hi=Max('id'))
+    if bounds['lo'] is None:
+        return None
+
+    size = math.ceil((bounds['hi'] - bounds['lo'] + 1) / shard_count)
+    start = bounds['lo'] + shard_index * size
+    return start, start + size - 1
+
+
+@dataclass
+class CampaignResult:
+    campaign: str
+    resumed_from: int = 0
+    processed: int = 0
+    sent: int = 0
+    failed: int = 0
+    quota_exhausted: bool = False
+
+
+class RecoveryCampaign:
+    """
+    Executa uma campanha de recuperação de carrinhos
+
+    Os carrinhos elegíveis são percorridos por ordem de ID (keyset) em lotes
+    de `batch_size`; cada lote é um único pedido HTTP à Brevo. Após cada lote
+    o progresso é gravado em RecoveryCheckpoint na mesma transação que
+    atualiza AbandonedCart, por isso uma execução interrompida retoma do
+    último lote confirmado; depois de uma passagem completa, a execução
+    seguinte recomeça do primeiro carrinho.
+    """
+
+    def __init__(
+        self,
+        campaign: str,
+        email_service=None,
+        shard: Optional[Tuple[int, int]] = None,
+        batch_size: Optional[int] = None,
+        rate_per_second: Optional[float] = None,
+        daily_quota: Optional[int] = None,
+        force: bool = False,
+        dry_run: bool = False,
+        log: Callable[[str], None] = logger.info,
+    ):
+        self.campaign = campaign
+        self.email_service = email_service
+        self.shard = shard
+        self.batch_size = max(1, batch_size or settings.CART_RECOVERY_BATCH_SIZE)
+        self.daily_quota = settings.CART_RECOVERY_DAILY_QUOTA if daily_quota is None else daily_quota
+        self.force = force
+        self.dry_run = dry_run
+        self.log = log
+        self.bucket = TokenBucket(
+            rate=rate_per_second or settings.CART_RECOVERY_RATE_PER_SECOND,
+            capacity=self.batch_size,
+        )
+
+    def eligible_carts(self):
+        """
+        Carrinhos elegíveis para recuperação, numa única query anotada:
+        inativos há mais de CART_ABANDONMENT_HOURS, de usuários com email,
+        com itens e (sem --force) abaixo do limite de emails e sem envio
+        nas últimas 24 horas
+        """
+        now = timezone.now()
+        cutoff = now - timedelta(hours=settings.CART_ABANDONMENT_HOURS)
+
+        carts = Cart.objects.filter(
+            last_activity__lt=cutoff,
+            status__in=['active', 'abandoned'],
+            user__isnull=False,
+        ).exclude(
+            user__email=''
+        ).annotate(
+            items_count=Count('items')
+        ).filter(
+            items_count__gt=0
+        )
+
+        if not self.force:
+            carts = carts.exclude(
+                abandonment_info__recovered=True
+            ).exclude(
+                abandonment_info__recovery_emails_sent__gte=settings.MAX_RECOVERY_EMAILS
+            ).exclude(
+                abandonment_info__last_recovery_sent__gte=now - timedelta(hours=24)
+            )
+
+        if self.shard:
+            carts = carts.filter(id__range=self.shard)
+
+        return carts.order_by('id')
+
+    def sent_today(self) -> int:
+        """Emails de recuperação já enviados hoje (todas as execuções/shards)"""
+        day_start = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+        return CartHistory.objects.filter(event='recovery_sent', timestamp__gte=day_start).count()
+
+    def _load_checkpoint(self) -> RecoveryCheckpoint:
+        defaults = {}
+        if self.shard:
+            defaults = {'shard_start': self.shard[0], 'shard_end': self.shard[1]}
+
+        if self.dry_run:
+            checkpoint = RecoveryCheckpoint.objects.filter(campaign=self.campaign).first()
+            return checkpoint or RecoveryCheckpoint(campaign=self.campaign, **defaults)
+
+        checkpoint, _ = RecoveryCheckpoint.objects.get_or_create(campaign=self.campaign, defaults=defaults)
+        return checkpoint
+
+    @staticmethod
+    def _entry(cart) -> dict:
+        user = cart.user
+        return {
+            'cart': cart,
+            'customer_email': user.email,
+            'customer_name': user.username or user.first_name or 'Cliente',
+            'recovery_url': f"{settings.CART_RECOVERY_BASE_URL}?recovery={cart.recovery_token}",
+        }
+
+    def _send(self, batch: List[Cart]) -> Tuple[List[int], List[int], bool]:
+        """
+        Envia o lote numa chamada; se a Brevo rejeitar o lote (ex: um endereço
+        inválido), reenvia individualmente para isolar os destinatários com erro.
+        Retorna (enviados, falhas, indisponível): indisponível quando nenhum
+        envio individual chegou a ter resposta (todos levantaram exceção)
+        """
+        entries = [self._entry(cart) for cart in batch]
+        try:
+            if self.email_service.send_cart_recovery_batch(entries):
+                return [cart.id for cart in batch], [], False
+        except Exception as e:
+            logger.error(f'Erro ao enviar lote de recuperação ({self.campaign}): {e}')
+
+        sent_ids, failed_ids = [], []
+        answered = False
+        for entry in entries:
+            try:
+                ok = self.email_service.send_cart_recovery_email(
+                    cart=entry['cart'],
+                    customer_email=entry['customer_email'],
+                    customer_name=entry['customer_name'],
+                    recovery_url=entry['recovery_url'],
+                )
+                answered = True
+            except Exception as e:
+                logger.error(f"Erro ao processar carrinho {entry['cart'].id}: {e}")
+                ok = False
+            (sent_ids if ok else failed_ids).append(entry['cart'].id)
+        return sent_ids, failed_ids, not answered
+
+    @transaction.atomic
+    def _record_batch(self, checkpoint: RecoveryCheckpoint, cursor: int, sent_ids: List[int], failed_ids: List[int]):
+        """Grava o resultado de um lote e avança o checkpoint até `cursor`"""
+        if sent_ids:
+            now = timezone.now()
+            existing = set(
+                AbandonedCart.objects.filter(cart_id__in=sent_ids).values_list('cart_id', flat=True)
+            )
+            AbandonedCart.objects.filter(cart_id__in=existing).update(
+                recovery_emails_sent=F('recovery_emails_sent') + 1,
+                last_recovery_sent=now,
+            )
+            AbandonedCart.objects.bulk_create(
+                [
+                    AbandonedCart(cart_id=cart_id, recovery_emails_sent=1, last_recovery_sent=now)
+                    for cart_id in sent_ids if cart_id not in existing
+                ],
+                ignore_conflicts=True,
+            )
+            Cart.objects.filter(id__in=sent_ids, status='active').update(status='abandoned')
+            CartHistory.objects.bulk_create([
+                CartHistory(
+                    cart_id=cart_id,
+                    event='recovery_sent',
+                    description='Email de recuperação enviado',
+                    metadata={'campaign': self.campaign},
+                )
+                for cart_id in sent_ids
+            ])
+
+        checkpoint.sent_count += len(sent_ids)
+        checkpoint.failed_count += len(failed_ids)
+        checkpoint.last_cart_id = cursor
+        checkpoint.save()
+
+    def _start_new_pass(self, checkpoint: RecoveryCheckpoint):
+        """
+        Recomeça do primeiro carrinho quando a passagem anterior terminou: o
+        cron corre várias vezes por dia com a mesma campanha, e carrinhos
+        abaixo do cursor que entretanto ficaram elegíveis também recebem o
+        email (os contactados nas últimas 24h continuam excluídos)
+        """
+        self.log(
+            f'Campanha {self.campaign} concluída em {checkpoint.completed_at:%d/%m/%Y %H:%M}; '
+            f'nova passagem desde o primeiro carrinho'
+        )
+        checkpoint.last_cart_id = 0
+        checkpoint.completed_at = None
+        checkpoint.shard_start, checkpoint.shard_end = self.shard or (None, None)
+        if not self.dry_run:
+            checkpoint.save(update_fields=['last_cart_id', 'completed_at', 'shard_start', 'shard_end', 'updated_at'])
+
+    def run(self) -> CampaignResult:
+        checkpoint = self._load_checkpoint()
+        if checkpoint.completed_at:
+            self._start_new_pass(checkpoint)
+        result = CampaignResult(campaign=self.campaign, resumed_from=checkpoint.last_cart_id)
+
+        if checkpoint.shard_start is not None:
+            # Mantém a faixa original ao retomar, mesmo que novos carrinhos tenham sido criados
+            self.shard = (checkpoint.shard_start, checkpoint.shard_end)
+
+        carts = self.eligible_carts().select_related(
+            'user'
+        ).prefetch_related(
+            'items__product', 'items__color'
+        )
+        cursor = checkpoint.last_cart_id
+
+        while True:
+            limit = self.batch_size
+            if not self.dry_run:
+                remaining = self.daily_quota - self.sent_today()
+                if remaining <= 0:
+                    result.quota_exhausted = True
+                    self.log(f'Cota diária de recuperação atingida ({self.daily_quota} emails)')
+                    break
+                limit = min(limit, remaining)
+
+            batch = list(carts.filter(id__gt=cursor)[:limit])
+            if not batch:
+                if not self.dry_run:
+                    checkpoint.completed_at = timezone.now()
+                    checkpoint.save(update_fields=['completed_at', 'updated_at'])
+                break
+
+            cursor = batch[-1].id
+            result.processed += len(batch)
+
+            if self.dry_run:
+                for cart in batch:
+                    self.log(
+                        f'[DRY-RUN] Enviaria email para {cart.user.email} - '
+                        f'Carrinho {cart.id} com {cart.items_count} items (Total: {cart.total} MZN)'
+                    )
+                continue
+
+            self.bucket.acquire(len(batch))
+            sent_ids, failed_ids, unavailable = self._send(batch)
+
+            if unavailable:
+                # Nenhum envio teve resposta: provável indisponibilidade da Brevo.
+                # Não avança o checkpoint para que a próxima execução retome este lote.
+                # (Carrinhos recusados um a um avançam o checkpoint como falhas.)
+                result.failed += len(failed_ids)
+                self.log(f'Falha no lote: carrinhos {batch[0].id}-{batch[-1].id}; execução interrompida')
+                break
+
+            self._record_batch(checkpoint, cursor, sent_ids, failed_ids)
+            result.sent += len(sent_ids)
+            result.failed += len(failed_ids)
+            self.log(
+                f'Lote enviado: carrinhos {batch[0].id}-{batch[-1].id} '
+                f'({len(sent_ids)} enviados, {len(failed_ids)} falhas)'
+            )
+
+        return result
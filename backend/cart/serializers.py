@@ -57,6 +57,8 @@ class CartItemSerializer(serializers.ModelSerializer):
     product = ProductListSerializer(read_only=True)
     color = ColorSerializer(read_only=True)
     total_price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True, source='get_total_price')
+    final_price = serializers.SerializerMethodField()
+    final_total_price = serializers.SerializerMethodField()
     
     # For creating/updating items
     product_id = serializers.IntegerField(write_only=True)
@@ -66,9 +68,23 @@ class CartItemSerializer(serializers.ModelSerializer):
         model = CartItem
         fields = [
             'id', 'product', 'color', 'quantity', 'price', 'total_price',
+            'final_price', 'final_total_price',
             'added_at', 'updated_at', 'product_id', 'color_id'
         ]
-        read_only_fields = ['id', 'price', 'added_at', 'updated_at']
+        read_only_fields = ['id', 'price', 'final_price', 'final_total_price', 'added_at', 'updated_at']
+
+    def _price_rules(self, obj):
+        # As mesmas regras de Cart.calculate_totals, uma vez por carrinho
+        rules = self.context.setdefault('price_rules', {})
+        if obj.cart_id not in rules:
+            rules[obj.cart_id] = obj.cart.get_price_rules()
+        return rules[obj.cart_id]
+
+    def get_final_price(self, obj):
+        return str(obj.get_final_price(self._price_rules(obj)))
+
+    def get_final_total_price(self, obj):
+        return str(obj.get_total_price(self._price_rules(obj)))
     
     def validate_quantity(self, value):
         if value <= 0:
@@ -7,6 +7,7 @@ from django.db import transaction
 from django.db import models
 from django.contrib.auth.models import User
 from products.models import Product
+from products.metrics import get_catalog_metrics, mark_catalog_metrics_dirty
 from .models import StockMovement, Order, OrderStatusHistory
 from decimal import Decimal
 import logging
@@ -121,21 +122,13 @@ class StockManager:
         """
         Get comprehensive stock report
         """
-        from django.db.models import Count, Sum, F
-        
-        total_products = Product.objects.count()
-        active_products = Product.objects.filter(status='active').count()
-        out_of_stock = Product.objects.filter(stock_quantity=0).count()
-        low_stock = Product.objects.filter(
-            stock_quantity__lte=F('min_stock_level'),
-            stock_quantity__gt=0
-        ).count()
-        
-        total_stock_value = Product.objects.filter(
-            status='active'
-        ).aggregate(
-            total_value=Sum(F('stock_quantity') * F('price'))
-        )['total_value'] or Decimal('0.00')
+        # Same metrics row as products.views.product_stats
+        metrics = get_catalog_metrics()
+        total_products = metrics.total_products
+        active_products = metrics.active_products
+        out_of_stock = metrics.out_of_stock_products
+        low_stock = metrics.low_stock_products
+        total_stock_value = metrics.total_stock_value
         
         return {
             'total_products': total_products,
@@ -350,8 +343,9 @@ class OrderManager:
 
 
 # Signal handlers for automatic stock management
-from django.db.models.signals import post_save
+from django.db.models.signals import post_init, post_save, post_delete
 from django.dispatch import receiver
+from .order_analytics import record_order_change, record_order_delete, snapshot_order
 
 @receiver(post_save, sender=Order)
 def handle_order_status_change(sender, instance, created, **kwargs):
@@ -364,4 +358,52 @@ def handle_order_status_change(sender, instance, created, **kwargs):
     
     # Generate tracking number when order is shipped
     if instance.status == 'shipped' and not instance.tracking_number:
-        OrderManager.generate_tracking_number(instance)
\ No newline at end of file
+        OrderManager.generate_tracking_number(instance)
+
+
+@receiver(post_save, sender=Order)
+def refresh_customer_stats_on_order_change(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Keep CustomerProfile LTV aggregates (total_orders/total_spent) in sync
+    whenever an order is created or its status/amount/owner changes
+    """
+    if not instance.user_id:
+        return
+    if not created and update_fields is not None and not {'status', 'total_amount', 'user'} & set(update_fields):
+        return
+
+    from customers.analytics import refresh_customer_stats
+    user_id = instance.user_id
+    transaction.on_commit(lambda: refresh_customer_stats([user_id]))
+
+
+
+@receiver(post_delete, sender=Order)
+def refresh_customer_stats_on_order_delete(sender, instance, **kwargs):
+    if instance.user_id:
+        from customers.analytics import refresh_customer_stats
+        user_id = instance.user_id
+        transaction.on_commit(lambda: refresh_customer_stats([user_id]))
+
+
+@receiver(post_save, sender=StockMovement)
+def mark_catalog_metrics_on_stock_movement(sender, instance, created, **kwargs):
+    """Stock movements change out-of-stock/low-stock counts and stock value"""
+    if created:
+        mark_catalog_metrics_dirty()
+
+
+@receiver(post_init, sender=Order)
+def snapshot_order_analytics(sender, instance, **kwargs):
+    snapshot_order(instance)
+
+
+@receiver(post_save, sender=Order)
+def update_order_daily_stats(sender, instance, update_fields=None, **kwargs):
+    """Keep the OrderDailyStats rollup in sync with status/amount changes"""
+    record_order_change(instance, update_fields)
+
+
+@receiver(post_delete, sender=Order)
+def remove_order_from_daily_stats(sender, instance, **kwargs):
+    record_order_delete(instance)
@@ -0,0 +1,93 @@
+from decimal import Decimal
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.db import SessionStore
+from django.test import TestCase
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from cart import async_views, payment_notifications
+from cart.models import Cart, CartItem, Order, Payment
+from products.models import Category, Product
+
+
+class AsyncPaymentViewsTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='async-buyer')
+        self.cart = Cart.objects.create(user=self.user, status='active')
+        self.factory = APIRequestFactory()
+
+    def request(self, method, path, user=None, **kwargs):
+        request = getattr(self.factory, method)(path, format='json', **kwargs)
+        request.session = SessionStore()
+        if user is not None:
+            force_authenticate(request, user=user)
+        return request
+
+    @mock.patch('cart.payments.paysuite.PaysuiteClient.create_payment')
+    def test_initiate_payment_awaits_paysuite(self, sync_create_payment):
+        category = Category.objects.create(name='Portateis')
+        product = Product.objects.create(name='Portatil', category=category, price=Decimal('100.00'), stock_quantity=5)
+        CartItem.objects.create(cart=self.cart, product=product, quantity=1, price=product.price)
+
+        create_payment = mock.AsyncMock(return_value={
+            'status': 'success',
+            'data': {'id': 'ps-1', 'reference': 'PAY-REF', 'checkout_url': 'https://paysuite.test/c/ps-1'},
+        })
+        with mock.patch.object(async_views.AsyncPaysuiteClient, 'create_payment', create_payment):
+            response = async_to_sync(async_views.initiate_payment)(
+                self.request('post', '/api/cart/payments/initiate/', self.user, data={'method': 'card'})
+            )
+        response.render()
+
+        self.assertEqual(response.status_code, 200)
+        sync_create_payment.assert_not_called()
+        self.assertEqual(create_payment.call_args.kwargs['method'], 'card')
+        payment = Payment.objects.get(pk=response.data['payment_id'])
+        self.assertEqual((payment.status, payment.paysuite_reference), ('pending', 'ps-1'))
+        self.assertEqual(response.data['payment']['checkout_url'], 'https://paysuite.test/c/ps-1')
+
+    @mock.patch('cart.payments.paysuite.PaysuiteClient.get_payment_status')
+    def test_payment_status_uses_awaited_paysuite_response(self, sync_get_status):
+        payment = Payment.objects.create(
+            cart=self.cart, method='mpesa', amount=Decimal('50.00'),
+            status='pending', paysuite_reference='ps-2',
+        )
+        get_status = mock.AsyncMock(return_value={'status': 'error', 'message': 'Saldo insuficiente'})
+        with mock.patch.object(async_views.AsyncPaysuiteClient, 'get_payment_status', get_status):
+            response = async_to_sync(async_views.payment_status)(
+                self.request('get', f'/api/cart/payments/status/{payment.id}/', self.user), order_id=payment.id
+            )
+        response.render()
+
+        self.assertEqual(response.status_code, 200)
+        get_status.assert_awaited_once_with('ps-2')
+        sync_get_status.assert_not_called()
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, 'failed')
+        self.assertEqual(response.data['payments'][0]['status'], 'failed')
+
+    def test_payment_status_requires_authentication(self):
+        get_status = mock.AsyncMock()
+        with mock.patch.object(async_views.AsyncPaysuiteClient, 'get_payment_status', get_status):
+            response = async_to_sync(async_views.payment_status)(
+                self.request('get', '/api/cart/payments/status/1/'), order_id=1
+            )
+        self.assertIn(response.status_code, (401, 403))
+        get_status.assert_not_called()
+
+
+class PaymentNotificationsTest(TestCase):
+    def test_emails_are_queued_after_commit(self):
+        user = User.objects.create_user(username='notified-buyer')
+        order = Order.objects.create(user=user, total_amount=Decimal('10.00'), shipping_address={'email': 'a@example.com'})
+
+        with mock.patch.object(payment_notifications, '_executor') as executor:
+            with self.captureOnCommitCallbacks(execute=True):
+                payment_notifications.notify_order_paid(order, source='WEBHOOK')
+                executor.submit.assert_not_called()
+            executor.submit.assert_called_once_with(
+                payment_notifications._run_in_background,
+                payment_notifications.send_order_paid_emails, order.id, 'WEBHOOK',
+            )
@@ -0,0 +1,105 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from cart import backfill as backfill_module
+from cart.backfill import Backfill, run_backfill, wait_for_capacity
+from cart.management.commands.backfill_order_items import OrderItemsBackfill
+from cart.models import BackfillCheckpoint, Cart, CartItem, Order, OrderItem, Payment
+from products.models import Category, Product
+
+
+class Interrupted(Exception):
+    pass
+
+
+class RecordingBackfill(Backfill):
+    name = 'test.orders'
+    chunk_size = 2
+
+    def __init__(self, fail_after=None):
+        self.seen = []
+        self.fail_after = fail_after
+
+    def queryset(self):
+        return Order.objects.all()
+
+    def process(self, rows, executor=None):
+        if self.fail_after is not None and len(self.seen) >= self.fail_after:
+            raise Interrupted()
+        self.seen.extend(order.pk for order in rows)
+        return len(rows)
+
+
+class BackfillFrameworkTest(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username='cliente')
+        self.orders = [
+            Order.objects.create(user=user, total_amount=Decimal('10.00'), status='confirmed') for _ in range(5)
+        ]
+        self.ids = [order.pk for order in self.orders]
+
+    def test_interrupted_run_resumes_from_checkpoint(self):
+        first = RecordingBackfill(fail_after=2)
+        with self.assertRaises(Interrupted):
+            run_backfill(first)
+        self.assertEqual(first.seen, self.ids[:2])
+        checkpoint = BackfillCheckpoint.objects.get(name='test.orders')
+        self.assertEqual((checkpoint.last_pk, checkpoint.processed, checkpoint.status), (self.ids[1], 2, 'running'))
+
+        second = RecordingBackfill()
+        report = run_backfill(second)
+        self.assertEqual(second.seen, self.ids[2:])
+        self.assertEqual((report.resumed_from, report.rows, report.chunks), (self.ids[1], 3, 2))
+        checkpoint.refresh_from_db()
+        self.assertEqual((checkpoint.processed, checkpoint.status), (5, 'done'))
+
+        # Um backfill concluído recomeça do início
+        third = RecordingBackfill()
+        run_backfill(third)
+        self.assertEqual(third.seen, self.ids)
+
+    def test_dry_run_counts_without_processing(self):
+        dry = RecordingBackfill()
+        report = run_backfill(dry, dry_run=True)
+
+        self.assertEqual(dry.seen, [])
+        self.assertEqual((report.rows, report.items, report.chunks), (5, 5, 3))
+        self.assertFalse(BackfillCheckpoint.objects.exists())
+
+    def test_throttle_waits_while_database_is_busy(self):
+        sleeps = []
+        with mock.patch.object(backfill_module, 'database_load', side_effect=[30, 25, 4]):
+            waited = wait_for_capacity(10, sleep=sleeps.append)
+        self.assertEqual(len(sleeps), 2)
+        self.assertEqual(waited, 2 * backfill_module.THROTTLE_POLL_SECONDS)
+
+
+class OrderItemsBackfillTest(TestCase):
+    def test_creates_items_from_payment_or_cart(self):
+        user = User.objects.create_user(username='cliente')
+        category = Category.objects.create(name='Acessórios')
+        product = Product.objects.create(name='Rato', description='x', category=category, price=Decimal('50.00'))
+
+        from_payment = Order.objects.create(user=user, total_amount=Decimal('100.00'), status='paid')
+        Payment.objects.create(
+            order=from_payment, method='mpesa', amount=Decimal('100.00'),
+            request_data={'items': [{'product_id': product.id, 'name': 'Rato', 'quantity': 2, 'unit_price': '50.00'}]},
+        )
+        cart = Cart.objects.create(user=user)
+        CartItem.objects.create(cart=cart, product=product, quantity=3, price=Decimal('50.00'))
+        from_cart = Order.objects.create(user=user, total_amount=Decimal('150.00'), status='paid', cart=cart)
+        Order.objects.create(user=user, total_amount=Decimal('10.00'), status='paid')
+
+        report = run_backfill(OrderItemsBackfill())
+
+        self.assertEqual(report.items, 2)
+        item = OrderItem.objects.get(order=from_payment)
+        self.assertEqual((item.quantity, item.subtotal), (2, Decimal('100.00')))
+        item = OrderItem.objects.get(order=from_cart)
+        self.assertEqual((item.quantity, item.product_name), (3, 'Rato'))
+
+        # Pedidos já corrigidos não são processados de novo
+        self.assertEqual(run_backfill(OrderItemsBackfill()).rows, 1)
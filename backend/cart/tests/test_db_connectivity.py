@@ -0,0 +1,50 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase
+from rest_framework.test import APIClient
+
+from chiva_backend.middleware import StatementTimeoutMiddleware
+from customers.models import ExternalAuthUser
+
+
+def show_statement_timeout():
+    with connection.cursor() as cursor:
+        cursor.execute('SHOW statement_timeout')
+        return cursor.fetchone()[0]
+
+
+class StatementTimeoutMiddlewareTest(TestCase):
+    def setUp(self):
+        self.seen = []
+
+        def view(request):
+            self.seen.append(show_statement_timeout())
+            return HttpResponse('ok')
+
+        self.middleware = StatementTimeoutMiddleware(view)
+        self.factory = RequestFactory()
+
+    def test_route_class_timeout_is_scoped_to_the_request(self):
+        default = show_statement_timeout()
+        with self.settings(DB_ROUTE_STATEMENT_TIMEOUTS=[
+            ('/api/cart/admin/export/', None, 300000),
+            ('/api/products/', ('GET', 'HEAD'), 5000),
+        ]):
+            self.middleware(self.factory.get('/api/products/'))
+            self.middleware(self.factory.post('/api/products/'))
+            self.middleware(self.factory.get('/api/cart/admin/export/orders/'))
+
+        self.assertEqual(self.seen, ['5s', default, '5min'])
+        self.assertEqual(show_statement_timeout(), default)
+
+    def test_db_metrics_endpoint(self):
+        admin = User.objects.create_user(username='admin-uid', is_staff=True)
+        ExternalAuthUser.objects.create(firebase_uid='admin-uid', user=admin, is_admin=True)
+        client = APIClient()
+        client.force_authenticate(admin)
+
+        metrics = client.get('/api/health/db/').json()
+        self.assertGreaterEqual(metrics['requests'], 1)
+        self.assertIn('connections_opened', metrics)
+        self.assertIn('conn_max_age', metrics)
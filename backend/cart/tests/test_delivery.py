@@ -0,0 +1,80 @@
+import gzip
+import os
+import shutil
+import tempfile
+from decimal import Decimal
+
+import brotli
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from cart.export_jobs import claim_next_job, request_export, run_job
+from cart.models import Order
+from customers.models import ExternalAuthUser
+
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, API_COMPRESSION_MIN_SIZE=1024)
+class DeliveryTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        admin = User.objects.create_user(username='admin-uid', email='admin@example.com', is_staff=True)
+        ExternalAuthUser.objects.create(firebase_uid='admin-uid', user=admin, is_admin=True)
+        self.client = APIClient()
+        self.client.force_authenticate(admin)
+
+    def test_large_json_is_compressed_by_accept_encoding(self):
+        for i in range(20):
+            Order.objects.create(user=None, total_amount=Decimal('10.00') + i, status='confirmed')
+
+        plain = self.client.get('/api/cart/admin/orders/')
+        self.assertNotIn('Content-Encoding', plain)
+        self.assertIn('Accept-Encoding', plain['Vary'])
+
+        br = self.client.get('/api/cart/admin/orders/', HTTP_ACCEPT_ENCODING='gzip, deflate, br')
+        self.assertEqual(br['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(br.content), plain.content)
+        self.assertLess(int(br['Content-Length']), len(plain.content))
+
+        gz = self.client.get('/api/cart/admin/orders/', HTTP_ACCEPT_ENCODING='br;q=0, gzip')
+        self.assertEqual(gz['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(gz.content), plain.content)
+
+    def test_small_json_is_not_compressed(self):
+        response = self.client.get('/api/cart/admin/orders/', HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertLess(len(response.content), 1024)
+        self.assertNotIn('Content-Encoding', response)
+
+    def test_export_download_uses_x_accel_redirect(self):
+        job, _ = request_export('orders', 'csv', {})
+        run_job(claim_next_job())
+        job.refresh_from_db()
+
+        with self.settings(MEDIA_ACCEL_REDIRECT='/protected-media/'):
+            response = self.client.get(f'/api/cart/admin/exports/{job.id}/download/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{job.file.name}')
+        self.assertEqual(response['Content-Disposition'], f'attachment; filename="{job.filename}"')
+        self.assertEqual(response.content, b'')
+
+        # Diretamente por /media/ as exportações não saem
+        self.assertEqual(self.client.get(f'/media/{job.file.name}').status_code, 404)
+
+    def test_public_media_with_last_modified(self):
+        os.makedirs(os.path.join(MEDIA_ROOT, 'variants', 'ab'), exist_ok=True)
+        with open(os.path.join(MEDIA_ROOT, 'variants', 'ab', 'img-640.webp'), 'wb') as f:
+            f.write(b'RIFF')
+
+        response = self.client.get('/media/variants/ab/img-640.webp')
+        self.assertEqual(b''.join(response.streaming_content), b'RIFF')
+        self.assertIn('immutable', response['Cache-Control'])
+        cached = self.client.get('/media/variants/ab/img-640.webp', HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(self.client.get('/media/../settings.py').status_code, 404)
@@ -0,0 +1,114 @@
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from cart.export_jobs import MAX_ATTEMPTS, claim_next_job, purge_expired_jobs, request_export, run_job
+from cart.models import ExportJob, Order
+from customers.models import ExternalAuthUser
+
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, EXPORT_JOB_TTL_MINUTES=30)
+class ExportJobTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        user = User.objects.create_user(username='cliente', email='cliente@example.com')
+        for i in range(3):
+            Order.objects.create(user=user, total_amount=Decimal('10.00') * (i + 1), status='confirmed')
+
+    def test_identical_requests_reuse_job_until_expired(self):
+        job, created = request_export('orders', 'csv', {'status': 'confirmed', 'search': ''})
+        again, created_again = request_export('orders', 'csv', {'status': 'confirmed'})
+        other, created_other = request_export('orders', 'excel', {'status': 'confirmed'})
+
+        self.assertTrue(created)
+        self.assertFalse(created_again)
+        self.assertEqual(again.id, job.id)
+        self.assertTrue(created_other)
+
+        ExportJob.objects.filter(id=job.id).update(status='done', expires_at=timezone.now() - timedelta(minutes=1))
+        _, created_after_ttl = request_export('orders', 'csv', {'status': 'confirmed'})
+        self.assertTrue(created_after_ttl)
+
+    def test_worker_generates_file_with_progress(self):
+        job, _ = request_export('orders', 'csv', {'status': 'confirmed'})
+
+        claimed = claim_next_job()
+        self.assertEqual(claimed.id, job.id)
+        self.assertIsNone(claim_next_job())
+        run_job(claimed)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'done')
+        self.assertEqual((job.rows_done, job.rows_total, job.progress), (3, 3, 100))
+        self.assertTrue(job.filename.endswith('.csv'))
+        with job.file.open('rb') as f:
+            self.assertEqual(len(f.read().decode('utf-8').splitlines()), 4)
+
+        ExportJob.objects.filter(id=job.id).update(expires_at=timezone.now() - timedelta(minutes=1))
+        self.assertEqual(purge_expired_jobs(), 1)
+        self.assertFalse(ExportJob.objects.exists())
+
+    @override_settings(EXPORT_JOB_STALE_MINUTES=15)
+    def test_abandoned_job_is_reclaimed_then_failed(self):
+        job, _ = request_export('orders', 'csv', {})
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            claimed = claim_next_job()
+            self.assertEqual((claimed.id, claimed.attempts), (job.id, attempt))
+            # Worker morto: sem heartbeat
+            ExportJob.objects.filter(id=job.id).update(updated_at=timezone.now() - timedelta(minutes=20))
+
+        self.assertIsNone(claim_next_job())
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+
+    def test_worker_that_lost_the_claim_discards_its_file(self):
+        request_export('orders', 'csv', {})
+        slow = claim_next_job()
+        # Outro worker retomou o job entretanto
+        ExportJob.objects.filter(id=slow.id).update(attempts=slow.attempts + 1)
+
+        run_job(slow)
+
+        self.assertEqual(slow.status, 'running')
+        self.assertFalse(ExportJob.objects.get(id=slow.id).file)
+
+    def test_api_create_status_and_download(self):
+        admin = User.objects.create_user(username='admin-uid', email='admin@example.com', is_staff=True)
+        ExternalAuthUser.objects.create(firebase_uid='admin-uid', user=admin, is_admin=True)
+        client = APIClient()
+        client.force_authenticate(admin)
+
+        response = client.post('/api/cart/admin/exports/', {'kind': 'orders', 'export_format': 'pdf'}, format='json')
+        self.assertEqual(response.status_code, 202)
+        job_id = response.data['id']
+
+        download = client.get(f'/api/cart/admin/exports/{job_id}/download/')
+        self.assertEqual(download.status_code, 409)
+
+        run_job(claim_next_job())
+        detail = client.get(f'/api/cart/admin/exports/{job_id}/')
+        self.assertEqual(detail.data['status'], 'done')
+        self.assertTrue(detail.data['download_url'].endswith(f'/api/cart/admin/exports/{job_id}/download/'))
+
+        download = client.get(f'/api/cart/admin/exports/{job_id}/download/')
+        self.assertEqual(download.status_code, 200)
+        self.assertTrue(b''.join(download.streaming_content).startswith(b'%PDF'))
+
+        self.assertEqual(
+            client.post('/api/cart/admin/exports/', {'kind': 'orders', 'export_format': 'pdf'}, format='json').status_code,
+            200,
+        )
+        self.assertEqual(client.post('/api/cart/admin/exports/', {'kind': 'x'}, format='json').status_code, 400)
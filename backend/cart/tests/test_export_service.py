@@ -0,0 +1,68 @@
+import io
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.http import StreamingHttpResponse
+from django.test import TestCase
+from django.utils import timezone
+from openpyxl import load_workbook
+
+from cart.export_service import ExportService
+from cart.models import Order, Payment
+from cart.export_jobs import _export_orders_queryset, _iter_order_export_rows
+
+
+HEADERS = {'name': 'Nome', 'total': 'Total'}
+
+
+def rows(n):
+    for i in range(n):
+        yield {'name': f'Cliente {i}', 'total': Decimal('10.50') * i}
+
+
+class ExportServiceStreamingTest(TestCase):
+    def test_csv_is_streamed_row_by_row(self):
+        response = ExportService.export_to_csv(rows(3), HEADERS, 'clientes')
+
+        self.assertIsInstance(response, StreamingHttpResponse)
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="clientes.csv"')
+        content = b''.join(response.streaming_content).decode('utf-8')
+        self.assertEqual(
+            content.splitlines(),
+            ['\ufeffNome;Total', 'Cliente 0;0.00', 'Cliente 1;10.50', 'Cliente 2;21.00'],
+        )
+
+    def test_excel_write_only_keeps_title_header_and_widths(self):
+        output = io.BytesIO()
+        count = ExportService.write_excel(rows(300), HEADERS, output, title='Clientes')
+
+        self.assertEqual(count, 300)
+        ws = load_workbook(output).active
+        self.assertEqual(ws['A1'].value, 'Clientes')
+        self.assertIn('A1:B1', [str(r) for r in ws.merged_cells.ranges])
+        self.assertEqual([c.value for c in ws[4]], ['Nome', 'Total'])
+        self.assertEqual(ws['A304'].value, 'Cliente 299')
+        self.assertEqual(ws.column_dimensions['A'].width, len('Cliente 199') + 2)
+
+    def test_pdf_splits_rows_into_tables(self):
+        output = io.BytesIO()
+        self.assertEqual(ExportService.write_pdf(rows(600), HEADERS, output), 600)
+        self.assertTrue(output.getvalue().startswith(b'%PDF'))
+
+
+class OrderExportRowsTest(TestCase):
+    def test_payment_method_is_annotated_from_latest_payment(self):
+        user = User.objects.create_user(username='cliente', email='cliente@example.com')
+        paid = Order.objects.create(user=user, total_amount=Decimal('150.00'))
+        Order.objects.create(user=None, total_amount=Decimal('20.00'))
+        old = Payment.objects.create(order=paid, method='mpesa', amount=Decimal('150.00'))
+        Payment.objects.filter(id=old.id).update(created_at=timezone.now() - timedelta(days=1))
+        Payment.objects.create(order=paid, method='emola', amount=Decimal('150.00'))
+
+        with self.assertNumQueries(1):
+            data = list(_iter_order_export_rows(_export_orders_queryset({})))
+
+        self.assertEqual([row['payment_method'] for row in data], ['N/A', 'emola'])
+        self.assertEqual(data[1]['customer_email'], 'cliente@example.com')
+        self.assertEqual(data[1]['total'], 150.0)
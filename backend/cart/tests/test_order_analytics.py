@@ -0,0 +1,90 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from cart.models import Order, OrderDailyStats
+from cart.order_analytics import live_today, order_totals, rebuild_daily_stats
+from customers.models import ExternalAuthUser
+
+
+class OrderAnalyticsTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='cliente')
+        self.today = timezone.localdate()
+
+    def create_order(self, status, amount, shipping='0.00', days_ago=0):
+        order = Order.objects.create(
+            user=self.user, status=status, total_amount=Decimal(amount), shipping_cost=Decimal(shipping)
+        )
+        if days_ago:
+            # created_at é auto_now_add: recua a data e reconstrói o rollup
+            Order.objects.filter(pk=order.pk).update(created_at=timezone.now() - timedelta(days=days_ago))
+        return order
+
+    def test_rollup_follows_status_transitions_and_deletes(self):
+        order = self.create_order('pending', '100.00', '10.00')
+        self.create_order('processing', '50.00')
+
+        totals = order_totals(self.today, self.today)
+        self.assertEqual(totals['orders'], 2)
+        self.assertEqual(totals['by_status']['pending']['revenue'], Decimal('100.00'))
+
+        order.status = 'shipped'
+        order.save(update_fields=['status'])
+        order.status = 'delivered'
+        order.save()
+
+        totals = order_totals(self.today, self.today)
+        self.assertNotIn('pending', totals['by_status'])
+        self.assertNotIn('shipped', totals['by_status'])
+        self.assertEqual(totals['by_status']['delivered'], {
+            'orders': 1, 'revenue': Decimal('100.00'), 'shipping': Decimal('10.00'),
+        })
+
+        Order.objects.get(pk=order.pk).delete()
+        self.assertEqual(order_totals()['orders'], 1)
+
+        # O rollup mantido pelos signals coincide com um recálculo completo
+        maintained = order_totals()
+        rebuild_daily_stats()
+        self.assertEqual(order_totals(), maintained)
+
+    def test_ranges_and_live_today(self):
+        self.create_order('delivered', '200.00', '20.00')
+        self.create_order('cancelled', '80.00')
+        self.create_order('delivered', '300.00', days_ago=10)
+        self.create_order('delivered', '400.00', days_ago=45)
+        rebuild_daily_stats()
+
+        self.assertEqual(order_totals()['orders'], 4)
+        self.assertEqual(order_totals(self.today - timedelta(days=30), self.today)['orders'], 3)
+
+        with self.assertNumQueries(1):
+            today = live_today()
+        self.assertEqual(today, {'orders': 2, 'revenue': Decimal('200.00'), 'shipping': Decimal('20.00')})
+
+    def test_admin_stats_endpoint(self):
+        self.create_order('processing', '100.00', '5.00')
+        self.create_order('pending', '40.00')
+        self.create_order('delivered', '300.00', days_ago=40)
+        rebuild_daily_stats()
+
+        admin = User.objects.create_user(username='admin-uid', is_staff=True)
+        ExternalAuthUser.objects.create(firebase_uid='admin-uid', user=admin, is_admin=True)
+        client = APIClient()
+        client.force_authenticate(admin)
+
+        stats = client.get('/api/cart/admin/orders/stats/').json()['stats']
+        self.assertEqual(
+            (stats['total_orders'], stats['pending_orders'], stats['processing_orders'], stats['delivered_orders']),
+            (3, 1, 1, 1),
+        )
+        self.assertEqual(Decimal(str(stats['total_revenue'])), Decimal('400.00'))
+        self.assertEqual(Decimal(str(stats['monthly_revenue'])), Decimal('100.00'))
+        self.assertEqual(stats['today_orders'], 2)
+        self.assertEqual(Decimal(str(stats['today_revenue'])), Decimal('105.00'))
+        self.assertTrue(OrderDailyStats.objects.exists())
@@ -0,0 +1,68 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from cart.models import Order, OrderItem
+from customers.models import ExternalAuthUser
+
+
+class OrderListingTest(TestCase):
+    def setUp(self):
+        self.customer = User.objects.create_user(username='cliente')
+        admin = User.objects.create_user(username='admin-uid', is_staff=True)
+        ExternalAuthUser.objects.create(firebase_uid='admin-uid', user=admin, is_admin=True)
+        self.admin_client = APIClient()
+        self.admin_client.force_authenticate(admin)
+
+        # Valores repetidos para exercitar o desempate por id
+        self.orders = []
+        for i in range(7):
+            order = Order.objects.create(
+                user=self.customer, status='pending', total_amount=Decimal(10 * (i % 3) + 10)
+            )
+            OrderItem.objects.create(order=order, product_name=f'Produto {i}', quantity=1)
+            self.orders.append(order)
+
+    def walk(self, client, url, **params):
+        ids, cursor = [], None
+        while True:
+            query = dict(params, page_size=3)
+            if cursor:
+                query['cursor'] = cursor
+            body = client.get(url, query).json()
+            ids += [o['id'] for o in body['orders']]
+            cursor = body['pagination']['next_cursor']
+            if not cursor:
+                return ids
+
+    def test_cursor_pages_match_full_ordering(self):
+        ids = self.walk(self.admin_client, '/api/cart/admin/orders/', sort_by='total_amount')
+        expected = list(Order.objects.order_by('total_amount', 'id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+
+        ids = self.walk(self.admin_client, '/api/cart/admin/orders/')
+        self.assertEqual(ids, [o.pk for o in sorted(self.orders, key=lambda o: (o.created_at, o.pk), reverse=True)])
+
+    def test_user_orders_page_and_query_count(self):
+        client = APIClient()
+        client.force_authenticate(self.customer)
+
+        # count + pedidos (com user) + itens
+        with self.assertNumQueries(3):
+            body = client.get('/api/cart/orders/', {'page': 2, 'page_size': 3}).json()
+        self.assertEqual(len(body['orders']), 3)
+        self.assertEqual(body['orders'][0]['items'][0]['quantity'], 1)
+        self.assertEqual(body['pagination']['total'], 7)
+        self.assertTrue(body['pagination']['has_next'])
+        self.assertTrue(body['pagination']['has_previous'])
+
+    def test_rejects_unknown_sort_and_bad_cursor(self):
+        response = self.admin_client.get('/api/cart/admin/orders/', {'sort_by': 'user__password'})
+        self.assertEqual(response.status_code, 400)
+        response = self.admin_client.get('/api/cart/admin/orders/', {'cursor': 'nao-e-um-cursor'})
+        self.assertEqual(response.status_code, 400)
+        cursor = self.admin_client.get('/api/cart/admin/orders/', {'page_size': 1}).json()['pagination']['next_cursor']
+        response = self.admin_client.get('/api/cart/admin/orders/', {'cursor': cursor, 'sort_by': 'total_amount'})
+        self.assertEqual(response.status_code, 400)
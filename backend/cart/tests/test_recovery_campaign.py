@@ -0,0 +1,149 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from cart.models import Cart, CartItem, AbandonedCart, CartHistory, RecoveryCheckpoint
+from cart.recovery_campaign import RecoveryCampaign, TokenBucket
+from products.models import Category, Product
+
+
+class FakeEmailService:
+    def __init__(self, batch_ok=True):
+        self.batch_ok = batch_ok
+        self.batches = []
+        self.single = []
+
+    def send_cart_recovery_batch(self, entries):
+        self.batches.append([e['cart'].id for e in entries])
+        return self.batch_ok
+
+    def send_cart_recovery_email(self, cart, customer_email, customer_name, recovery_url):
+        self.single.append(cart.id)
+        return customer_email != 'bad@example.com'
+
+
+class TokenBucketTest(TestCase):
+    def test_waits_when_bucket_is_empty(self):
+        now = [0.0]
+        slept = []
+
+        def sleep(seconds):
+            slept.append(seconds)
+            now[0] += seconds
+
+        bucket = TokenBucket(rate=10, capacity=5, clock=lambda: now[0], sleep=sleep)
+        self.assertEqual(bucket.acquire(5), 0)
+        waited = bucket.acquire(5)
+        self.assertAlmostEqual(waited, 0.5)
+        self.assertAlmostEqual(sum(slept), 0.5)
+
+
+@override_settings(CART_ABANDONMENT_HOURS=2, MAX_RECOVERY_EMAILS=3, CART_RECOVERY_RATE_PER_SECOND=1000)
+class RecoveryCampaignTest(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Portáteis')
+        self.product = Product.objects.create(
+            name='Laptop', description='x', category=category, price=Decimal('1000.00'), stock_quantity=10
+        )
+        self.carts = [self._abandoned_cart(f'user{i}', f'user{i}@example.com') for i in range(5)]
+
+    def _abandoned_cart(self, username, email, with_items=True):
+        user = User.objects.create_user(username=username, email=email)
+        cart = Cart.objects.create(user=user)
+        if with_items:
+            CartItem.objects.create(cart=cart, product=self.product, quantity=1)
+        Cart.objects.filter(id=cart.id).update(last_activity=timezone.now() - timedelta(hours=5))
+        return cart
+
+    def test_eligible_carts_excludes_empty_and_recently_contacted(self):
+        empty = self._abandoned_cart('empty', 'empty@example.com', with_items=False)
+        AbandonedCart.objects.create(
+            cart=self.carts[0], recovery_emails_sent=1, last_recovery_sent=timezone.now() - timedelta(hours=1)
+        )
+        AbandonedCart.objects.create(cart=self.carts[1], recovery_emails_sent=3)
+
+        ids = list(RecoveryCampaign('t').eligible_carts().values_list('id', flat=True))
+
+        self.assertNotIn(empty.id, ids)
+        self.assertEqual(ids, [c.id for c in self.carts[2:]])
+
+    def test_sends_in_batches_and_records_progress(self):
+        service = FakeEmailService()
+        result = RecoveryCampaign('t', email_service=service, batch_size=2).run()
+
+        self.assertEqual(result.sent, 5)
+        self.assertEqual([len(b) for b in service.batches], [2, 2, 1])
+        self.assertEqual(AbandonedCart.objects.filter(recovery_emails_sent=1).count(), 5)
+        self.assertEqual(CartHistory.objects.filter(event='recovery_sent').count(), 5)
+        checkpoint = RecoveryCheckpoint.objects.get(campaign='t')
+        self.assertEqual(checkpoint.last_cart_id, self.carts[-1].id)
+        self.assertIsNotNone(checkpoint.completed_at)
+
+    def test_resumes_after_checkpoint(self):
+        RecoveryCheckpoint.objects.create(campaign='t', last_cart_id=self.carts[2].id)
+        service = FakeEmailService()
+        result = RecoveryCampaign('t', email_service=service, batch_size=10).run()
+
+        self.assertEqual(result.resumed_from, self.carts[2].id)
+        self.assertEqual(service.batches, [[self.carts[3].id, self.carts[4].id]])
+
+    def test_second_run_of_the_day_starts_a_new_pass(self):
+        # Ainda ativo na primeira execução; abandonado (abaixo do cursor) antes da segunda
+        late = self.carts[0]
+        Cart.objects.filter(id=late.id).update(last_activity=timezone.now())
+        service = FakeEmailService()
+        with mock.patch(
+            'cart.management.commands.send_cart_recovery_emails.get_email_service', return_value=service
+        ):
+            call_command('send_cart_recovery_emails', stdout=StringIO())
+            Cart.objects.filter(id=late.id).update(last_activity=timezone.now() - timedelta(hours=5))
+            call_command('send_cart_recovery_emails', stdout=StringIO())
+
+        self.assertEqual(service.batches, [[c.id for c in self.carts[1:]], [late.id]])
+        checkpoint = RecoveryCheckpoint.objects.get()
+        self.assertEqual((checkpoint.sent_count, checkpoint.last_cart_id), (5, late.id))
+        self.assertIsNotNone(checkpoint.completed_at)
+
+    def test_daily_quota_stops_campaign(self):
+        service = FakeEmailService()
+        result = RecoveryCampaign('t', email_service=service, batch_size=2, daily_quota=3).run()
+
+        self.assertEqual(result.sent, 3)
+        self.assertTrue(result.quota_exhausted)
+        self.assertIsNone(RecoveryCheckpoint.objects.get(campaign='t').completed_at)
+
+    def test_individually_rejected_batch_advances_the_checkpoint(self):
+        User.objects.filter(id=self.carts[0].user_id).update(email='bad@example.com')
+        service = FakeEmailService(batch_ok=False)
+        result = RecoveryCampaign('t', email_service=service, batch_size=2, daily_quota=1).run()
+
+        # O endereço recusado fica para trás e a cota vai para o carrinho seguinte
+        self.assertEqual((result.sent, result.failed), (1, 1))
+        self.assertEqual(service.single, [self.carts[0].id, self.carts[1].id])
+        checkpoint = RecoveryCheckpoint.objects.get(campaign='t')
+        self.assertEqual((checkpoint.last_cart_id, checkpoint.failed_count), (self.carts[1].id, 1))
+
+    def test_unreachable_service_keeps_the_checkpoint(self):
+        class DownService(FakeEmailService):
+            def send_cart_recovery_email(self, **kwargs):
+                raise ConnectionError('Brevo indisponível')
+
+        result = RecoveryCampaign('t', email_service=DownService(batch_ok=False), batch_size=2).run()
+
+        self.assertEqual((result.sent, result.failed), (0, 2))
+        self.assertEqual(RecoveryCheckpoint.objects.get(campaign='t').last_cart_id, 0)
+
+    def test_rejected_batch_falls_back_to_individual_sends(self):
+        User.objects.filter(id=self.carts[1].user_id).update(email='bad@example.com')
+        service = FakeEmailService(batch_ok=False)
+        result = RecoveryCampaign('t', email_service=service, batch_size=10).run()
+
+        self.assertEqual(result.sent, 4)
+        self.assertEqual(result.failed, 1)
+        self.assertFalse(AbandonedCart.objects.filter(cart=self.carts[1]).exists())
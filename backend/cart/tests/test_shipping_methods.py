@@ -78,3 +78,23 @@ class ShippingMethodAPITest(TestCase):
         # Delete
         res = self.client.delete('/api/cart/admin/shipping-methods/test_method/')
         self.assertIn(res.status_code, (200, 204))
+
+
+class ShippingMethodConditionalGetTest(TestCase):
+    def test_public_list_revalidates_with_etag(self):
+        client = APIClient()
+        method = ShippingMethod.objects.create(id='standard', name='Standard', price='100.00')
+
+        first = client.get('/api/cart/shipping-methods/')
+        self.assertEqual(first.status_code, 200)
+        self.assertIn('max-age=', first['Cache-Control'])
+        self.assertIn('Last-Modified', first)
+
+        cached = client.get('/api/cart/shipping-methods/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached.content, b'')
+
+        method.enabled = False
+        method.save()
+        changed = client.get('/api/cart/shipping-methods/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual((changed.status_code, changed.json()), (200, []))
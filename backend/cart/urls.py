@@ -1,7 +1,14 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 from . import order_views
 
+if settings.ASYNC_PAYMENT_VIEWS:
+    # Modo ASGI: chamadas PaySuite aguardadas no event loop
+    from . import async_views as payment_views
+else:
+    payment_views = views
+
 urlpatterns = [
     # Main cart operations
     path('', views.CartAPIView.as_view(), name='cart'),
@@ -20,9 +27,9 @@ urlpatterns = [
     # Abandoned carts (admin)
     path('abandoned/', views.abandoned_carts, name='abandoned-carts'),
     # Payments
-    path('payments/initiate/', views.initiate_payment, name='payments-initiate'),
+    path('payments/initiate/', payment_views.initiate_payment, name='payments-initiate'),
     path('payments/webhook/', views.paysuite_webhook, name='payments-webhook'),
-    path('payments/status/<int:order_id>/', views.payment_status, name='payments-status'),
+    path('payments/status/<int:order_id>/', payment_views.payment_status, name='payments-status'),
     # Debug endpoints
     path('debug/add-item/', views.debug_add_to_cart, name='debug-add-to-cart'),
     path('debug/clear-carts/', views.debug_clear_carts, name='debug-clear-carts'),
@@ -63,4 +70,9 @@ urlpatterns = [
     path('admin/export/orders/', order_views.export_orders, name='export_orders'),
     path('admin/export/customers/', order_views.export_customers, name='export_customers'),
     path('admin/export/dashboard/', order_views.export_dashboard_stats, name='export_dashboard_stats'),
+
+    # Async export jobs (admin)
+    path('admin/exports/', order_views.create_export_job, name='create_export_job'),
+    path('admin/exports/<uuid:job_id>/', order_views.export_job_detail, name='export_job_detail'),
+    path('admin/exports/<uuid:job_id>/download/', order_views.export_job_download, name='export_job_download'),
 ]
\ No newline at end of file
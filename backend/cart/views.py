@@ -20,7 +20,9 @@ from .serializers import (
 )
 from .models import ShippingMethod
 from .serializers import ShippingMethodSerializer
+from chiva_backend.conditional import add_validators, not_modified, queryset_validators
 import logging
+from dataclasses import dataclass
 from decimal import Decimal, ROUND_HALF_UP
 
 logger = logging.getLogger(__name__)
@@ -251,10 +253,14 @@ def shipping_method_detail(request, method_id):
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def shipping_methods_public_list(request):
-    """Public endpoint returning enabled shipping methods for checkout"""
+    """Public endpoint returning enabled shipping methods for checkout (ETag / 304)"""
     methods = ShippingMethod.objects.filter(enabled=True).order_by('created_at')
-    serializer = ShippingMethodSerializer(methods, many=True)
-    return Response(serializer.data)
+    validators = queryset_validators(request, methods)
+    response = not_modified(request, *validators)
+    if response is None:
+        serializer = ShippingMethodSerializer(methods, many=True)
+        response = Response(serializer.data)
+    return add_validators(response, *validators, max_age=settings.SHIPPING_METHODS_MAX_AGE)
 
 
 @api_view(['POST'])
@@ -722,10 +728,38 @@ def abandoned_carts(request):
 
 
 
+@dataclass
+class PreparedPayment:
+    """Estado de initiate_payment entre a preparação e a chamada à PaySuite"""
+    client: object
+    creation_data: dict
+    payment: object
+    cart: Cart
+    method: str
+    phone: str | None
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def initiate_payment(request):
     """Initiate a payment via Paysuite for the current cart with modern checkout support"""
+    prepared = prepare_payment(request)
+    if isinstance(prepared, Response):
+        return prepared
+    try:
+        api_resp = prepared.client.create_payment(**prepared.creation_data)
+    except Exception as e:
+        logger.exception('Error initiating payment')
+        return Response({'error': f'Failed to initiate payment: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    return complete_payment(prepared, api_resp)
+
+
+def prepare_payment(request):
+    """
+    Parte de initiate_payment antes da chamada à PaySuite: carrinho, cupom,
+    envio e registo Payment. Devolve um Response (erro) ou um PreparedPayment
+    (também usado pela view async em cart.async_views)
+    """
     try:
         # Determine the correct cart to use: prefer merging session cart into user cart when both exist
         # Ensure session exists
@@ -843,8 +877,10 @@ def initiate_payment(request):
         except Exception:
             logger.exception('Failed to refresh cart item prices prior to checkout')
 
-        # Recalculate totals after potential price refresh
-        cart.calculate_totals()
+        # Recalculate totals after potential price refresh; the same promotion
+        # rules give the unit prices saved for the order items below
+        price_rules = cart.get_price_rules()
+        cart.calculate_totals(price_rules)
 
         # Include shipping: prefer server-side configured shipping_method pricing to avoid client tampering
         from decimal import Decimal, ROUND_HALF_UP
@@ -1031,6 +1067,7 @@ def initiate_payment(request):
                     if first_image and hasattr(first_image, 'image') and first_image.image:
                         product_image_url = request.build_absolute_uri(first_image.image.url)
             
+            unit_price, promotion = price_rules.apply(cart_item.price)
             item_data = {
                 'product_id': cart_item.product.id if cart_item.product else None,
                 'product': cart_item.product.id if cart_item.product else None,
@@ -1041,8 +1078,11 @@ def initiate_payment(request):
                 'color': cart_item.color.id if cart_item.color else None,
                 'color_name': cart_item.color.name if cart_item.color else '',
                 'quantity': cart_item.quantity,
-                'price': str(cart_item.price),
-                'unit_price': str(cart_item.price),
+                # Preço cobrado (com a promoção) e o preço de tabela do carrinho
+                'price': str(unit_price),
+                'unit_price': str(unit_price),
+                'list_price': str(cart_item.price),
+                'promotion_id': promotion.pk if promotion else None,
             }
             cart_items_data.append(item_data)
         
@@ -1204,9 +1244,26 @@ def initiate_payment(request):
         # Log the payment creation data for debugging
         logger.info(f"Creating payment with data: {payment_creation_data}")
         print(f"🔄 PAYSUITE REQUEST: {payment_creation_data}")
-        
-        api_resp = client.create_payment(**payment_creation_data)
-        
+
+        return PreparedPayment(
+            client=client,
+            creation_data=payment_creation_data,
+            payment=payment,
+            cart=cart,
+            method=method,
+            phone=phone,
+        )
+
+    except Exception as e:
+        logger.exception('Error initiating payment')
+        return Response({'error': f'Failed to initiate payment: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+def complete_payment(prepared, api_resp):
+    """Parte de initiate_payment depois da resposta da PaySuite"""
+    payment, cart = prepared.payment, prepared.cart
+    method, phone = prepared.method, prepared.phone
+    try:
         # Log the PaySuite response
         logger.info(f"PaySuite response: {api_resp}")
         print(f"📥 PAYSUITE RESPONSE: {api_resp}")
@@ -1483,10 +1540,12 @@ def paysuite_webhook(request):
                         else:
                             # Fallback: create items from the cart snapshot
                             if payment.cart:
+                                # Promoções em vigor quando o pagamento foi preparado
+                                price_rules = payment.cart.get_price_rules(payment.created_at)
                                 for ci in payment.cart.items.select_related('product', 'color').all():
                                     try:
                                         qty = ci.quantity
-                                        unit_price = ci.price
+                                        unit_price = ci.get_final_price(price_rules)
                                         line_total = unit_price * qty
                                         
                                         # Get product image
@@ -1559,59 +1618,8 @@ def paysuite_webhook(request):
                 # ========================================
                 # ENVIAR EMAILS DE NOTIFICAÇÃO
                 # ========================================
-                try:
-                    logger.info(f"🚀 [WEBHOOK] Iniciando envio de emails para order {order.id}")
-                    print(f"🚀 [WEBHOOK] Iniciando envio de emails para order {order.id}")
-                    
-                    from .email_service import get_email_service
-                    email_service = get_email_service()
-                    
-                    # Email para o cliente: confirmação de pedido
-                    customer_email = order.shipping_address.get('email', '')
-                    customer_name = order.shipping_address.get('name', 'Cliente')
-                    
-                    logger.info(f"📬 [WEBHOOK] Customer email: {customer_email}, name: {customer_name}")
-                    print(f"📬 [WEBHOOK] Customer email: {customer_email}, name: {customer_name}")
-                    
-                    if customer_email:
-                        # Confirmação de pedido criado
-                        logger.info(f"📧 [WEBHOOK] Enviando email de confirmação...")
-                        result1 = email_service.send_order_confirmation(
-                            order=order,
-                            customer_email=customer_email,
-                            customer_name=customer_name
-                        )
-                        logger.info(f"{'✅' if result1 else '❌'} [WEBHOOK] Email de confirmação: {result1}")
-                        
-                        # Status de pagamento aprovado
-                        logger.info(f"📧 [WEBHOOK] Enviando email de status de pagamento...")
-                        result2 = email_service.send_payment_status_update(
-                            order=order,
-                            payment_status='paid',
-                            customer_email=customer_email,
-                            customer_name=customer_name
-                        )
-                        logger.info(f"{'✅' if result2 else '❌'} [WEBHOOK] Email de status: {result2}")
-                        
-                        logger.info(f"📧 [WEBHOOK] Emails de confirmação enviados para {customer_email}")
-                        print(f"📧 [WEBHOOK] Emails de confirmação enviados para {customer_email}")
-                    else:
-                        logger.warning(f"⚠️ [WEBHOOK] customer_email está vazio! Não é possível enviar emails.")
-                        print(f"⚠️ [WEBHOOK] customer_email está vazio! Não é possível enviar emails.")
-                    
-                    # Email para o admin: nova venda
-                    logger.info(f"📧 [WEBHOOK] Enviando email para admin...")
-                    result3 = email_service.send_new_order_notification_to_admin(order=order)
-                    logger.info(f"{'✅' if result3 else '❌'} [WEBHOOK] Email admin: {result3}")
-                    logger.info(f"📧 [WEBHOOK] Email de nova venda enviado para admin")
-                    print(f"📧 [WEBHOOK] Email de nova venda enviado para admin")
-                    
-                except Exception as e:
-                    logger.error(f"❌ [WEBHOOK] Erro ao enviar emails de notificação: {e}")
-                    print(f"❌ [WEBHOOK] Erro ao enviar emails de notificação: {e}")
-                    import traceback
-                    logger.error(traceback.format_exc())
-                    print(traceback.format_exc())
+                from .payment_notifications import notify_order_paid
+                notify_order_paid(order, source='WEBHOOK')
                 # ========================================
 
         # ========================================
@@ -1637,35 +1645,20 @@ def paysuite_webhook(request):
                     payment.order.save(update_fields=['status'])
             
             # Enviar email de falha ao cliente
-            try:
-                from .email_service import get_email_service
-                email_service = get_email_service()
-                
-                customer_email = None
-                customer_name = 'Cliente'
-                
-                # Try to get customer email from order or payment
-                if payment.order:
-                    customer_email = payment.order.shipping_address.get('email', '')
-                    customer_name = payment.order.shipping_address.get('name', 'Cliente')
-                elif payment.request_data and isinstance(payment.request_data, dict):
-                    # Try from saved cart data
-                    customer_email = payment.request_data.get('customer_email', '')
-                    customer_name = payment.request_data.get('customer_name', 'Cliente')
-                
-                if customer_email:
-                    email_service.send_payment_status_update(
-                        order=payment.order,
-                        payment_status='failed',
-                        customer_email=customer_email,
-                        customer_name=customer_name
-                    )
-                    logger.info(f"📧 Email de falha enviado para {customer_email}")
-                else:
-                    logger.warning(f"⚠️ Não foi possível enviar email - customer_email não encontrado")
-                    
-            except Exception as e:
-                logger.error(f"❌ Erro ao enviar email de falha: {e}")
+            customer_email = None
+            customer_name = 'Cliente'
+
+            # Try to get customer email from order or payment
+            if payment.order:
+                customer_email = payment.order.shipping_address.get('email', '')
+                customer_name = payment.order.shipping_address.get('name', 'Cliente')
+            elif payment.request_data and isinstance(payment.request_data, dict):
+                # Try from saved cart data
+                customer_email = payment.request_data.get('customer_email', '')
+                customer_name = payment.request_data.get('customer_name', 'Cliente')
+
+            from .payment_notifications import notify_payment_failed
+            notify_payment_failed(payment.order, customer_email, customer_name, source='WEBHOOK')
         # ========================================
 
         return Response({'ok': True})
@@ -1684,6 +1677,30 @@ def payment_status(request, order_id: int):
     Also performs active polling to PaySuite API when payment is still pending,
     providing a fallback when webhooks don't arrive.
     """
+    return payment_status_response(request, order_id)
+
+
+def pending_paysuite_reference(user, order_id: int):
+    """Referência PaySuite que payment_status vai consultar (pagamento pendente), ou None"""
+    from .models import Order, Payment
+
+    order = Order.objects.filter(id=order_id, user=user).first()
+    if order:
+        latest_payment = Payment.objects.filter(order=order).order_by('-created_at').first()
+    else:
+        latest_payment = Payment.objects.select_related('cart').filter(id=order_id).first()
+        if latest_payment and latest_payment.cart and latest_payment.cart.user_id not in (None, user.id):
+            return None
+    if latest_payment and latest_payment.status == 'pending' and latest_payment.paysuite_reference:
+        return latest_payment.paysuite_reference
+    return None
+
+
+def payment_status_response(request, order_id: int, prefetched_status: dict | None = None):
+    """
+    Corpo de payment_status. prefetched_status ({referência: resposta}) traz a
+    consulta à PaySuite já feita pela view async (cart.async_views)
+    """
     try:
         from .models import Order, Payment
         from .serializers import OrderSerializer, PaymentSerializer
@@ -1734,7 +1751,10 @@ def payment_status(request, order_id: int):
                     
                     print(f"🔄 [POLLING] Active polling PaySuite for payment {latest_payment.paysuite_reference}")
                     logger.info(f"🔄 Active polling PaySuite for payment {latest_payment.paysuite_reference}")
-                    paysuite_response = client.get_payment_status(latest_payment.paysuite_reference)
+                    if prefetched_status and latest_payment.paysuite_reference in prefetched_status:
+                        paysuite_response = prefetched_status[latest_payment.paysuite_reference]
+                    else:
+                        paysuite_response = client.get_payment_status(latest_payment.paysuite_reference)
                     
                     print(f"🔍 [POLLING] PaySuite response received: {paysuite_response}")
                     print(f"🔍 [POLLING] Response status field: {paysuite_response.get('status')}")
@@ -1842,41 +1862,13 @@ def payment_status(request, order_id: int):
                             # ENVIAR EMAILS APÓS ATUALIZAÇÃO VIA POLLING
                             # ========================================
                             if new_status == 'failed' and latest_payment.order:
-                                # Send failure notification email
-                                try:
-                                    logger.info(f"🚀 [POLLING-FAILED] Iniciando envio de email de falha para order {latest_payment.order.id}")
-                                    print(f"🚀 [POLLING-FAILED] Iniciando envio de email de falha para order {latest_payment.order.id}")
-                                    
-                                    from .email_service import get_email_service
-                                    email_service = get_email_service()
-                                    
-                                    customer_email = latest_payment.order.shipping_address.get('email', '')
-                                    customer_name = latest_payment.order.shipping_address.get('name', 'Cliente')
-                                    
-                                    logger.info(f"📬 [POLLING-FAILED] Customer email: {customer_email}, name: {customer_name}")
-                                    print(f"📬 [POLLING-FAILED] Customer email: {customer_email}, name: {customer_name}")
-                                    
-                                    if customer_email:
-                                        logger.info(f"📧 [POLLING-FAILED] Enviando email de falha...")
-                                        result = email_service.send_payment_status_update(
-                                            order=latest_payment.order,
-                                            payment_status='failed',
-                                            customer_email=customer_email,
-                                            customer_name=customer_name
-                                        )
-                                        logger.info(f"{'✅' if result else '❌'} [POLLING-FAILED] Email de falha: {result}")
-                                        print(f"{'✅' if result else '❌'} [POLLING-FAILED] Email de falha: {result}")
-                                        logger.info(f"📧 [POLLING] Email de falha enviado para {customer_email}")
-                                        print(f"📧 [POLLING] Email de falha enviado para {customer_email}")
-                                    else:
-                                        logger.warning(f"⚠️ [POLLING-FAILED] customer_email está vazio!")
-                                        print(f"⚠️ [POLLING-FAILED] customer_email está vazio!")
-                                except Exception as e:
-                                    logger.error(f"❌ [POLLING] Erro ao enviar email de falha: {e}")
-                                    print(f"❌ [POLLING] Erro ao enviar email de falha: {e}")
-                                    import traceback
-                                    logger.error(traceback.format_exc())
-                                    print(traceback.format_exc())
+                                from .payment_notifications import notify_payment_failed
+                                notify_payment_failed(
+                                    latest_payment.order,
+                                    latest_payment.order.shipping_address.get('email', ''),
+                                    latest_payment.order.shipping_address.get('name', 'Cliente'),
+                                    source='POLLING',
+                                )
                             # ========================================
                             
                             # If payment succeeded, CREATE ORDER if it doesn't exist yet
@@ -1988,8 +1980,11 @@ def payment_status(request, order_id: int):
                                             cart = latest_payment.cart
                                             if cart and cart.items.exists():
                                                 logger.info(f"🛒 Fallback: creating items from cart {cart.id}")
+                                                # Promoções em vigor quando o pagamento foi preparado
+                                                price_rules = cart.get_price_rules(latest_payment.created_at)
                                                 for ci in cart.items.select_related('product', 'color').all():
                                                     try:
+                                                        unit_price = ci.get_final_price(price_rules)
                                                         product_image = ''
                                                         if ci.product and hasattr(ci.product, 'images') and ci.product.images.exists():
                                                             first_image = ci.product.images.first()
@@ -2006,8 +2001,8 @@ def payment_status(request, order_id: int):
                                                             color_name=ci.color.name if ci.color else '',
                                                             color_hex=getattr(ci.color, 'hex_code', '') if ci.color else '',
                                                             quantity=ci.quantity,
-                                                            unit_price=ci.price,
-                                                            subtotal=ci.price * ci.quantity,
+                                                            unit_price=unit_price,
+                                                            subtotal=unit_price * ci.quantity,
                                                             weight=getattr(ci.product, 'weight', None) if ci.product else None,
                                                             dimensions=getattr(ci.product, 'dimensions', '') if ci.product else ''
                                                         )
@@ -2026,61 +2021,8 @@ def payment_status(request, order_id: int):
                                     # ========================================
                                     # ENVIAR EMAILS DE CONFIRMAÇÃO (PAID VIA POLLING)
                                     # ========================================
-                                    try:
-                                        logger.info(f"🚀 [POLLING] Iniciando envio de emails para order {latest_payment.order.id}")
-                                        print(f"🚀 [POLLING] Iniciando envio de emails para order {latest_payment.order.id}")
-                                        
-                                        from .email_service import get_email_service
-                                        email_service = get_email_service()
-                                        
-                                        customer_email = latest_payment.order.shipping_address.get('email', '')
-                                        customer_name = latest_payment.order.shipping_address.get('name', 'Cliente')
-                                        
-                                        logger.info(f"📬 [POLLING] Customer email: {customer_email}, name: {customer_name}")
-                                        print(f"📬 [POLLING] Customer email: {customer_email}, name: {customer_name}")
-                                        
-                                        if customer_email:
-                                            # Email de confirmação de pedido
-                                            logger.info(f"📧 [POLLING] Enviando email de confirmação...")
-                                            result1 = email_service.send_order_confirmation(
-                                                order=latest_payment.order,
-                                                customer_email=customer_email,
-                                                customer_name=customer_name
-                                            )
-                                            logger.info(f"{'✅' if result1 else '❌'} [POLLING] Email de confirmação: {result1}")
-                                            print(f"{'✅' if result1 else '❌'} [POLLING] Email de confirmação: {result1}")
-                                            
-                                            # Email de status de pagamento
-                                            logger.info(f"📧 [POLLING] Enviando email de status de pagamento...")
-                                            result2 = email_service.send_payment_status_update(
-                                                order=latest_payment.order,
-                                                payment_status='paid',
-                                                customer_email=customer_email,
-                                                customer_name=customer_name
-                                            )
-                                            logger.info(f"{'✅' if result2 else '❌'} [POLLING] Email de status: {result2}")
-                                            print(f"{'✅' if result2 else '❌'} [POLLING] Email de status: {result2}")
-                                            
-                                            logger.info(f"📧 [POLLING] Emails de confirmação enviados para {customer_email}")
-                                            print(f"📧 [POLLING] Emails de confirmação enviados para {customer_email}")
-                                        else:
-                                            logger.warning(f"⚠️ [POLLING] customer_email está vazio! Não é possível enviar emails.")
-                                            print(f"⚠️ [POLLING] customer_email está vazio! Não é possível enviar emails.")
-                                        
-                                        # Email para admin
-                                        logger.info(f"📧 [POLLING] Enviando email para admin...")
-                                        result3 = email_service.send_new_order_notification_to_admin(order=latest_payment.order)
-                                        logger.info(f"{'✅' if result3 else '❌'} [POLLING] Email admin: {result3}")
-                                        print(f"{'✅' if result3 else '❌'} [POLLING] Email admin: {result3}")
-                                        logger.info(f"📧 [POLLING] Email de nova venda enviado para admin")
-                                        print(f"📧 [POLLING] Email de nova venda enviado para admin")
-                                        
-                                    except Exception as e:
-                                        logger.error(f"❌ [POLLING] Erro ao enviar emails de confirmação: {e}")
-                                        print(f"❌ [POLLING] Erro ao enviar emails de confirmação: {e}")
-                                        import traceback
-                                        logger.error(traceback.format_exc())
-                                        print(traceback.format_exc())
+                                    from .payment_notifications import notify_order_paid
+                                    notify_order_paid(latest_payment.order, source='POLLING')
                                     # ========================================
                                     
                                     # Clear cart
@@ -2138,24 +2080,13 @@ def payment_status(request, order_id: int):
                             # ENVIAR EMAIL DE FALHA (PaySuite Error)
                             # ========================================
                             if latest_payment.order:
-                                try:
-                                    from .email_service import get_email_service
-                                    email_service = get_email_service()
-                                    
-                                    customer_email = latest_payment.order.shipping_address.get('email', '')
-                                    customer_name = latest_payment.order.shipping_address.get('name', 'Cliente')
-                                    
-                                    if customer_email:
-                                        email_service.send_payment_status_update(
-                                            order=latest_payment.order,
-                                            payment_status='failed',
-                                            customer_email=customer_email,
-                                            customer_name=customer_name
-                                        )
-                                        logger.info(f"📧 [POLLING] Email de falha (PaySuite error) enviado para {customer_email}")
-                                        print(f"📧 [POLLING] Email de falha enviado para {customer_email}")
-                                except Exception as e:
-                                    logger.error(f"❌ [POLLING] Erro ao enviar email de falha: {e}")
+                                from .payment_notifications import notify_payment_failed
+                                notify_payment_failed(
+                                    latest_payment.order,
+                                    latest_payment.order.shipping_address.get('email', ''),
+                                    latest_payment.order.shipping_address.get('name', 'Cliente'),
+                                    source='POLLING',
+                                )
                             # ========================================
                             
                             # Refresh from DB
@@ -2242,6 +2173,9 @@ def debug_set_low_prices(request):
         
         # Update all active products to the target price
         updated = Product.objects.filter(status='active').update(price=target_price)
+        # update() não dispara os signals do catálogo (preços, ETags, tabelas de preços)
+        from products.catalog import bump_catalog_version
+        bump_catalog_version()
         
         return Response({
             'message': f'Updated {updated} products to price {target_price} MZN',
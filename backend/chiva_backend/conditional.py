@@ -0,0 +1,82 @@
+"""
+GET condicional (ETag / Last-Modified -> 304) para endpoints públicos
+Os validadores saem de uma consulta barata feita antes da serialização —
+max(updated_at) + contagem, ou a versão do catálogo — e, se o cliente (SPA
+ou CDN à frente do nginx) já tem a representação atual, a resposta é 304
+sem corpo. O ETag é o validador de referência (cobre também remoções);
+Last-Modified é só indicativo. Cache-Control por endpoint vem de settings
+(*_MAX_AGE); respostas que dependem do usuário autenticado são privadas.
+"""
+import hashlib
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+# (ETag, Last-Modified)
+Validators = Tuple[str, Optional[datetime]]
+
+
+def make_etag(request, *parts) -> str:
+    """ETag fraco das partes + formato negociado (JSON vs API navegável)"""
+    accepted = getattr(request, 'accepted_renderer', None)
+    digest = hashlib.sha1(repr((getattr(accepted, 'format', None), *parts)).encode('utf-8')).hexdigest()
+    return f'W/"{digest}"'
+
+
+def queryset_validators(request, queryset, *parts) -> Validators:
+    """Validadores de uma lista: max(updated_at) + contagem numa só consulta"""
+    stats = queryset.order_by().aggregate(last_modified=Max('updated_at'), count=Count('pk'))
+    return make_etag(request, stats['last_modified'], stats['count'], *parts), stats['last_modified']
+
+
+def not_modified(request, etag: str, last_modified: Optional[datetime] = None):
+    """Resposta 304 se If-None-Match / If-Modified-Since batem, senão None"""
+    if request.method not in ('GET', 'HEAD'):
+        return None
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    return get_conditional_response(request, etag=etag, last_modified=timestamp)
+
+
+def add_validators(response, etag: str, last_modified: Optional[datetime] = None,
+                   max_age: int = 0, private: bool = False):
+    """ETag, Last-Modified e Cache-Control numa resposta 200/304"""
+    if response.status_code not in (200, 304):
+        return response
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    if private:
+        patch_cache_control(response, private=True, max_age=max_age)
+        patch_vary_headers(response, ['Authorization'])
+    else:
+        patch_cache_control(response, public=True, max_age=max_age)
+    return response
+
+
+class ConditionalGetMixin(ABC):
+    """
+    Para views genéricas DRF: get() responde 304 a partir de get_validators(),
+    sem carregar nem serializar o objeto/lista
+    """
+    # Nome do setting com o max-age do Cache-Control
+    cache_max_age_setting = None
+
+    @abstractmethod
+    def get_validators(self) -> Optional[Validators]:
+        """(ETag, Last-Modified) da resposta atual, ou None para responder sem validadores"""
+
+    def cache_is_private(self) -> bool:
+        return False
+
+    def get(self, request, *args, **kwargs):
+        validators = self.get_validators()
+        if validators is None:
+            return super().get(request, *args, **kwargs)
+        response = not_modified(request, *validators) or super().get(request, *args, **kwargs)
+        max_age = getattr(settings, self.cache_max_age_setting, 0) if self.cache_max_age_setting else 0
+        return add_validators(response, *validators, max_age=max_age, private=self.cache_is_private())
@@ -0,0 +1,84 @@
+"""
+Métricas de conexões ao banco por worker
+Contadores em memória do processo (cada worker gunicorn tem os seus):
+pedidos atendidos, conexões abertas (a diferença é a reutilização via
+CONN_MAX_AGE) e consultas canceladas por statement_timeout. Com o pool
+psycopg 3 ativo inclui também as estatísticas do pool.
+Exposto em GET /api/health/db/ (admin).
+"""
+import os
+import sys
+import threading
+import time
+
+from django.core.signals import got_request_exception, request_started
+from django.db import connection
+from django.db.backends.signals import connection_created
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
+
+from customers.views import IsAdmin
+
+_lock = threading.Lock()
+_started = time.time()
+_counters = {
+    'requests': 0,
+    'connections_opened': 0,
+    'statement_timeouts': 0,
+}
+
+
+def _increment(name: str) -> None:
+    with _lock:
+        _counters[name] += 1
+
+
+def _on_request_started(sender, **kwargs):
+    _increment('requests')
+
+
+def _on_connection_created(sender, connection, **kwargs):
+    _increment('connections_opened')
+
+
+def _on_request_exception(sender, request=None, **kwargs):
+    error = sys.exc_info()[1]
+    # Django envolve o erro do driver (QueryCanceled) em OperationalError
+    cause = getattr(error, '__cause__', None)
+    if cause is not None and getattr(cause, 'pgcode', None) == '57014':
+        _increment('statement_timeouts')
+
+
+request_started.connect(_on_request_started, dispatch_uid='db_metrics_request_started')
+connection_created.connect(_on_connection_created, dispatch_uid='db_metrics_connection_created')
+got_request_exception.connect(_on_request_exception, dispatch_uid='db_metrics_request_exception')
+
+
+def snapshot() -> dict:
+    with _lock:
+        counters = dict(_counters)
+    requests = counters['requests']
+    opened = counters['connections_opened']
+
+    pool = getattr(connection, 'pool', None)
+    pool_stats = None
+    if pool is not None and hasattr(pool, 'get_stats'):
+        pool_stats = pool.get_stats()
+
+    return {
+        'pid': os.getpid(),
+        'uptime_seconds': round(time.time() - _started),
+        **counters,
+        # Fração dos pedidos servidos por uma conexão já aberta
+        'connection_reuse_ratio': round(max(0.0, 1 - opened / requests), 3) if requests else None,
+        'conn_max_age': connection.settings_dict.get('CONN_MAX_AGE'),
+        'conn_health_checks': connection.settings_dict.get('CONN_HEALTH_CHECKS'),
+        'pool': pool_stats,
+    }
+
+
+@api_view(['GET'])
+@permission_classes([IsAdmin])
+def db_metrics(request):
+    """Métricas de conexões deste worker"""
+    return Response(snapshot())
@@ -232,79 +232,70 @@ class FirebaseAuthentication(authentication.BaseAuthentication):
         """
         Get or create a Django user based on Firebase UID.
         Admin status is managed entirely by ExternalAuthUser.is_admin field.
+        The full mirror sync runs at most once per IDENTITY_SYNC_INTERVAL_SECONDS
+        per user (customers.identity_sync); other requests resolve the user
+        and its ExternalAuthUser in a single query.
         """
+        from customers import identity_sync
+
+        user = identity_sync.cached_user(firebase_uid, email, name)
+        if user is not None:
+            return user
+
+        user = self._sync_user(firebase_uid, email, name)
+        identity_sync.mark_synced(firebase_uid, email, name)
+        return user
+
+    def _sync_user(self, firebase_uid, email, name):
+        """
+        Create/update the Django user and the ExternalAuthUser mirror
+        """
+        from customers import identity_sync
+
         try:
             # Check if email is in admin list
-            admin_emails = config('FIREBASE_ADMIN_EMAILS', default='').split(',')
-            is_admin_email = email and email.strip().lower() in [e.strip().lower() for e in admin_emails if e.strip()]
+            is_admin_email = identity_sync.is_admin_email(email)
             
-            # Try to get and sync custom claims from Firebase
-            try:
-                user_record = auth.get_user(firebase_uid)
-                custom_claims = user_record.custom_claims or {}
-                current_admin_claim = custom_claims.get('admin', False)
-                
-                # Check if claims need to be updated
-                if is_admin_email != current_admin_claim:
-                    new_claims = {**custom_claims, 'admin': is_admin_email}
-                    auth.set_custom_claims(firebase_uid, new_claims)
-                    print(f"[FirebaseAuth] Updated admin claim for {email} to {is_admin_email}")
-                
-                is_admin_claim = is_admin_email  # Use email-based admin status
-                
-            except Exception as e:
-                # Only log ADC warning if we're not in dev bypass mode
-                dev_bypass = os.getenv('DEV_FIREBASE_ACCEPT_UNVERIFIED', '0').lower() in ['1', 'true']
-                if not dev_bypass:
-                    print(f"[FirebaseAuth] Failed to sync claims: {e}")
-                is_admin_claim = False
+            # Admin custom claim is synced with Firebase in the background
+            identity_sync.schedule_claims_sync(firebase_uid, is_admin_email)
             
             # Check DEV_TREAT_ALL_AUTH_AS_ADMIN (now disabled by default)
             dev_treat_all_as_admin = config('DEV_TREAT_ALL_AUTH_AS_ADMIN', default='0', cast=bool)
             
             # Import local mirror model
-            try:
-                from customers.models import ExternalAuthUser, Role
-                # Check if user is already admin in ExternalAuthUser
+            from customers.models import ExternalAuthUser, Role
+
+            # Django user and its mirror in one query
+            user = User.objects.select_related('external_auth').filter(username=firebase_uid).first()
+            existing_ext = getattr(user, 'external_auth', None) if user else None
+            if existing_ext is None or existing_ext.firebase_uid != firebase_uid:
                 existing_ext = ExternalAuthUser.objects.filter(firebase_uid=firebase_uid).first()
-                is_already_admin = bool(existing_ext and existing_ext.is_admin)
-            except Exception as e:
-                print(f"[FirebaseAuth] Could not check ExternalAuthUser admin status: {e}")
-                is_already_admin = False
+            is_already_admin = bool(existing_ext and existing_ext.is_admin)
 
             # Determine admin status (based on email OR existing admin status)
             is_admin = is_admin_email or is_already_admin
 
             # Debugging: log how admin was determined
             try:
-                print(f"[FirebaseAuth][TRACE] uid={firebase_uid} email={email} is_admin_email={is_admin_email} is_admin_claim={is_admin_claim} is_already_admin={is_already_admin} dev_all_admin={dev_treat_all_as_admin} -> is_admin={is_admin}")
+                print(f"[FirebaseAuth][TRACE] uid={firebase_uid} email={email} is_admin_email={is_admin_email} is_already_admin={is_already_admin} dev_all_admin={dev_treat_all_as_admin} -> is_admin={is_admin}")
             except Exception:
                 pass
 
-            # ExternalAuthUser já foi importado acima
-
-            try:
-                # Try to find existing Django user
-                user = User.objects.get(username=firebase_uid)
+            if user is not None:
                 # Update basic fields
                 changed = False
                 if user.email != email and email:
                     user.email = email
                     changed = True
                 # Sync admin flags based on ExternalAuthUser status
-                try:
-                    ext_user = ExternalAuthUser.objects.filter(firebase_uid=firebase_uid).first()
-                    if ext_user:
-                        if user.is_staff != ext_user.is_admin:
-                            user.is_staff = ext_user.is_admin
-                            user.is_superuser = ext_user.is_admin
-                            changed = True
-                except Exception as e:
-                    print(f"[FirebaseAuth] Error syncing admin flags: {e}")
+                if existing_ext and user.is_staff != existing_ext.is_admin:
+                    user.is_staff = existing_ext.is_admin
+                    user.is_superuser = existing_ext.is_admin
+                    changed = True
                 
                 if changed:
                     user.save()
-            except User.DoesNotExist:
+            else:
                 # Create new Django user (local mirror user will be created below)
                 user = User.objects.create_user(
                     username=firebase_uid,
@@ -317,55 +308,50 @@ class FirebaseAuthentication(authentication.BaseAuthentication):
 
             # Create or update ExternalAuthUser mirror in PostgreSQL
             try:
-                if ExternalAuthUser:
-                    ext, created = ExternalAuthUser.objects.get_or_create(firebase_uid=firebase_uid)
-                    ext.user = user
-                    ext.email = email or ext.email
-                    ext.display_name = name or ext.display_name
-                    # providers and custom claims
+                created = existing_ext is None
+                ext = existing_ext or ExternalAuthUser(firebase_uid=firebase_uid)
+                ext.user = user
+                ext.email = email or ext.email
+                ext.display_name = name or ext.display_name
+                    
+                # Admin status management:
+                # 1. For new users: Use email-based admin status
+                # 2. For existing users: Preserve current admin status, only update if they're in admin emails
+                if created:
+                    ext.is_admin = bool(is_admin_email)
+                elif is_admin_email:  # If they're in admin emails list, make them admin
+                    ext.is_admin = True
+                # else: preserve existing admin status
+                    
+                from django.utils import timezone
+                ext.last_seen = timezone.now()
+                ext.save()
+                user.external_auth = ext
+                print(f"[FirebaseAuth][TRACE] ExternalAuthUser {'created' if created else 'updated'} firebase_uid={ext.firebase_uid} is_admin={ext.is_admin}")
+                # Optionally map admin role
+                if ext.is_admin:
+                    # Ensure there is an 'admin' role and assign
+                    role, _ = Role.objects.get_or_create(name='admin')
+                    # Log before adding
                     try:
-                        ext.providers = list(custom_claims.get('providers', ext.providers) or ext.providers)
-                    except Exception:
-                        pass
-                        
-                    # Admin status management:
-                    # 1. For new users: Use email-based admin status
-                    # 2. For existing users: Preserve current admin status, only update if they're in admin emails
-                    if created:
-                        ext.is_admin = bool(is_admin_email)
-                    elif is_admin_email:  # If they're in admin emails list, make them admin
-                        ext.is_admin = True
-                    # else: preserve existing admin status
-                        
-                    from django.utils import timezone
-                    ext.last_seen = timezone.now()
-                    ext.save()
-                    print(f"[FirebaseAuth][TRACE] ExternalAuthUser {'created' if created else 'updated'} firebase_uid={ext.firebase_uid} is_admin={ext.is_admin}")
-                    # Optionally map admin role
-                    if ext.is_admin:
-                        # Ensure there is an 'admin' role and assign
-                        role, _ = Role.objects.get_or_create(name='admin')
-                        # Log before adding
-                        try:
-                            print(f"[FirebaseAuth][TRACE] Assigning role 'admin' to external user {ext.firebase_uid}")
-                            ext.roles.add(role)
-                        except Exception as e:
-                            print(f"[FirebaseAuth][ERROR] Failed to assign admin role: {e}")
-                    else:
-                        # Remove admin role if present
-                        try:
-                            admin_role = Role.objects.filter(name='admin').first()
-                            if admin_role and admin_role in ext.roles.all():
-                                print(f"[FirebaseAuth][TRACE] Removing role 'admin' from external user {ext.firebase_uid}")
-                                ext.roles.remove(admin_role)
-                        except Exception as e:
-                            print(f"[FirebaseAuth][ERROR] Failed to remove admin role: {e}")
+                        print(f"[FirebaseAuth][TRACE] Assigning role 'admin' to external user {ext.firebase_uid}")
+                        ext.roles.add(role)
+                    except Exception as e:
+                        print(f"[FirebaseAuth][ERROR] Failed to assign admin role: {e}")
+                else:
+                    # Remove admin role if present
+                    try:
+                        admin_role = Role.objects.filter(name='admin').first()
+                        if admin_role:
+                            ext.roles.remove(admin_role)
+                    except Exception as e:
+                        print(f"[FirebaseAuth][ERROR] Failed to remove admin role: {e}")
             except Exception as e:
                 print(f"[FirebaseAuth] Failed to sync ExternalAuthUser: {e}")
 
             # Only log admin status details if debug enabled
             if os.getenv('ENABLE_TOKEN_PAYLOAD_DEBUG', '0').lower() in ['1', 'true']:
-                print(f"[FirebaseAuth] User {email} admin status: {is_admin} (email_match={is_admin_email}, claim={is_admin_claim})")
+                print(f"[FirebaseAuth] User {email} admin status: {is_admin} (email_match={is_admin_email})")
             elif is_admin:
                 # For admins, just log a short confirmation
                 print(f"[FirebaseAuth] Confirmed admin access for {email}")
@@ -373,4 +359,4 @@ class FirebaseAuthentication(authentication.BaseAuthentication):
             
         except Exception as e:
             print(f"[FirebaseAuth] Error in get_or_create_user: {e}")
-            raise
\ No newline at end of file
+            raise
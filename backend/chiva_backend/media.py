@@ -0,0 +1,75 @@
+"""
+Entrega de ficheiros de media (uploads e exportações)
+O Django só decide se o ficheiro pode ser entregue; quem o envia é o
+servidor à frente:
+- com MEDIA_ACCEL_REDIRECT (ex: /protected-media/) a resposta leva
+  X-Accel-Redirect e o nginx envia o ficheiro de uma location `internal`
+  (sendfile, sem ocupar o worker)
+- sem ele, FileResponse, que o gunicorn entrega por wsgi.file_wrapper
+  (os.sendfile)
+As exportações (MEDIA_ROOT/exports/) só saem pelo download autenticado.
+"""
+import mimetypes
+import os
+import posixpath
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+from django.utils.http import content_disposition_header, http_date
+from django.views.static import was_modified_since
+
+# Prefixos de MEDIA_ROOT que não são públicos
+PRIVATE_MEDIA_PREFIXES = ('exports/',)
+
+# Derivados endereçados pelo conteúdo (products.derivatives): nunca mudam
+IMMUTABLE_MEDIA_PREFIXES = ('variants/',)
+
+
+def media_response(name: str, *, filename: str = None, as_attachment: bool = False):
+    """Resposta que entrega o ficheiro `name` do default_storage"""
+    content_type, encoding = mimetypes.guess_type(name)
+    if encoding:
+        # Entregue como está (ex: .csv.gz), não descomprimido pelo cliente
+        content_type = 'application/octet-stream'
+    if settings.MEDIA_ACCEL_REDIRECT:
+        response = HttpResponse(content_type=content_type or 'application/octet-stream')
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_REDIRECT.rstrip('/') + '/' + quote(name)
+        disposition = content_disposition_header(as_attachment, filename or os.path.basename(name))
+        if disposition:
+            response['Content-Disposition'] = disposition
+        return response
+    return FileResponse(default_storage.open(name, 'rb'), as_attachment=as_attachment, filename=filename)
+
+
+def conditional_media_response(request, name: str):
+    """media_response com Last-Modified (mtime do ficheiro) e 304 por If-Modified-Since"""
+    try:
+        full_path = default_storage.path(name)
+        stat = os.stat(full_path)
+    except (OSError, NotImplementedError, ValueError):
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+
+    if not was_modified_since(request.META.get('HTTP_IF_MODIFIED_SINCE'), stat.st_mtime):
+        response = HttpResponseNotModified()
+    else:
+        response = media_response(name)
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    return response
+
+
+def serve_media(request, path):
+    """Ficheiros públicos de MEDIA_ROOT, com Last-Modified / 304 e Cache-Control"""
+    name = posixpath.normpath(path).lstrip('/')
+    if name.startswith('..') or name.startswith(PRIVATE_MEDIA_PREFIXES):
+        raise Http404
+    response = conditional_media_response(request, name)
+    if name.startswith(IMMUTABLE_MEDIA_PREFIXES):
+        patch_cache_control(response, public=True, max_age=365 * 24 * 3600, immutable=True)
+    else:
+        patch_cache_control(response, public=True, max_age=settings.MEDIA_MAX_AGE)
+    return response
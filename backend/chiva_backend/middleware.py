@@ -1,4 +1,18 @@
+import gzip
+
+from asgiref.sync import async_to_sync, iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connection
 from django.http import HttpResponseForbidden, HttpResponseRedirect
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+from . import db_metrics  # noqa: F401  (connects the per-worker DB counters)
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - dependência opcional
+    brotli = None
 
 try:
     # Import the project's IsAdmin permission (central logic lives in customers.views)
@@ -12,12 +26,34 @@ class AdminPathIsAdminMiddleware:
 
     This middleware runs after AuthenticationMiddleware so request.user is set.
     It returns 403 Forbidden when the IsAdmin permission denies access.
+    Sync and async capable, so async views under ASGI stay on the event loop.
     """
 
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
 
     def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        denied = self.deny(request)
+        if denied is not None:
+            return denied
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        if (request.path or '').startswith('/admin'):
+            denied = await sync_to_async(self.deny)(request)
+            if denied is not None:
+                return denied
+        return await self.get_response(request)
+
+    def deny(self, request):
         # Only protect the admin site path
         path = request.path or ''
         if path.startswith('/admin'):
@@ -34,4 +70,143 @@ class AdminPathIsAdminMiddleware:
                 # Fail closed: always return 403 so SPA can handle it centrally.
                 return HttpResponseForbidden('Forbidden')
 
-        return self.get_response(request)
+        return None
+
+
+def route_statement_timeout(request):
+    """statement_timeout (ms) da classe de rota do pedido, ou None"""
+    path = request.path or ''
+    for prefix, methods, timeout in settings.DB_ROUTE_STATEMENT_TIMEOUTS:
+        if path.startswith(prefix) and (methods is None or request.method in methods):
+            return timeout
+    return None
+
+
+class _RouteStatementTimeout:
+    """execute_wrapper: SET statement_timeout just before the request's first query"""
+
+    def __init__(self, timeout):
+        self.timeout = int(timeout)
+        self.applied = False
+
+    def __call__(self, execute, sql, params, many, context):
+        if not self.applied:
+            self.applied = True
+            # Raw cursor, like Django's own session setup (SET TIME ZONE)
+            with context['connection'].connection.cursor() as cursor:
+                cursor.execute(f'SET statement_timeout = {self.timeout}')
+        return execute(sql, params, many, context)
+
+
+class StatementTimeoutMiddleware:
+    """Apply the statement timeout of the request's route class (DB_ROUTE_STATEMENT_TIMEOUTS).
+
+    The timeout is SET lazily before the first query of the request (requests
+    served from cache pay nothing) and RESET afterwards, since persistent
+    connections (CONN_MAX_AGE) carry session settings over to the next request.
+    Under ASGI, requests outside the configured route classes pass straight
+    through to async views.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        return self.apply(request, self.get_response)
+
+    async def __acall__(self, request):
+        if not route_statement_timeout(request):
+            return await self.get_response(request)
+        # execute_wrapper is per thread: run the rest of the request in the
+        # request's sync thread, where its queries execute
+        return await sync_to_async(self.apply)(request, async_to_sync(self.get_response))
+
+    def apply(self, request, get_response):
+        timeout = route_statement_timeout(request)
+        if not timeout:
+            return get_response(request)
+
+        wrapper = _RouteStatementTimeout(timeout)
+        try:
+            with connection.execute_wrapper(wrapper):
+                return get_response(request)
+        finally:
+            if wrapper.applied and connection.connection is not None:
+                try:
+                    with connection.connection.cursor() as cursor:
+                        cursor.execute('RESET statement_timeout')
+                except Exception:
+                    # Broken connection: Django discards it at the end of the request
+                    pass
+
+
+# Sem text/html: as páginas do admin levam o token CSRF (BREACH)
+COMPRESSIBLE_CONTENT_TYPES = frozenset({
+    'application/json', 'application/xml', 'text/xml', 'text/csv', 'text/plain',
+})
+
+
+def accepted_encodings(header: str) -> set:
+    """Codificações com q > 0 no Accept-Encoding"""
+    accepted = set()
+    for part in header.split(','):
+        coding, _, params = part.partition(';')
+        quality = 1.0
+        params = params.strip().replace(' ', '')
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if coding.strip() and quality > 0:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+class APICompressionMiddleware(MiddlewareMixin):
+    """Compress large API responses: brotli when accepted (and installed), else gzip.
+
+    Like django.middleware.gzip.GZipMiddleware, but only for JSON/XML/CSV
+    bodies of at least API_COMPRESSION_MIN_SIZE bytes, so small responses skip
+    the CPU cost. Static files never reach it: WhiteNoise, above it in
+    MIDDLEWARE, serves the precompressed .br/.gz files itself.
+    """
+
+    def process_response(self, request, response):
+        if response.streaming or response.has_header('Content-Encoding'):
+            return response
+        content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+        if content_type not in COMPRESSIBLE_CONTENT_TYPES:
+            return response
+        if len(response.content) < settings.API_COMPRESSION_MIN_SIZE:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        accepted = accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if brotli is not None and 'br' in accepted:
+            encoding = 'br'
+            compressed = brotli.compress(response.content, quality=settings.API_COMPRESSION_BROTLI_QUALITY)
+        elif 'gzip' in accepted:
+            encoding = 'gzip'
+            compressed = gzip.compress(response.content, compresslevel=settings.API_COMPRESSION_GZIP_LEVEL, mtime=0)
+        else:
+            return response
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+        # A representação mudou: um ETag forte passa a fraco (como no GZipMiddleware)
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
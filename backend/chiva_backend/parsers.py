@@ -0,0 +1,29 @@
+"""
+Parser JSON da API com orjson
+Substitui o JSONParser do DRF como padrão. Corpos UTF-8 válidos são lidos
+pelo orjson; qualquer outro caso (outro charset, JSON inválido, NaN) passa
+pelo JSONParser do DRF, que produz o mesmo resultado e a mesma mensagem de
+ParseError de antes.
+"""
+import io
+
+from django.conf import settings
+from rest_framework.parsers import JSONParser
+
+from .renderers import ORJSONRenderer, orjson
+
+
+class ORJSONParser(JSONParser):
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower().replace('_', '-') not in ('utf-8', 'utf8'):
+            return super().parse(stream, media_type, parser_context)
+
+        body = stream.read()
+        try:
+            return orjson.loads(body)
+        except orjson.JSONDecodeError:
+            return super().parse(io.BytesIO(body), media_type, parser_context)
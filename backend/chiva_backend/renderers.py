@@ -0,0 +1,53 @@
+"""
+Renderer JSON da API com orjson
+Substitui o JSONRenderer do DRF como padrão (REST_FRAMEWORK em settings).
+A saída é idêntica byte a byte à do JSONRenderer nas configurações do
+projeto (UNICODE_JSON, COMPACT_JSON, STRICT_JSON): datas/horas e tipos que
+o orjson não conhece (Decimal, lazy strings, sets, ...) passam pelo encoder
+do DRF, e \\u2028/\\u2029 continuam escapados. Decimal, datetime e UUID são
+tratados sem passar por json.dumps.
+Diferenças conhecidas: floats fora de [1e-4, 1e16) saem em notação 1e16 em
+vez de 1e+16 (o mesmo número para o JSON.parse do SPA) e NaN/Infinity
+saem como null em vez de erro.
+Cai no JSONRenderer do DRF se o orjson não estiver instalado, com indent
+(ex: API navegável) ou se o orjson recusar os dados (inteiros > 64 bits).
+"""
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dependência opcional
+    orjson = None
+
+# Datas/horas pelo encoder do DRF: ele encurta time para milissegundos e
+# escreve UTC como "Z", o orjson não
+ORJSON_OPTIONS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME) if orjson else 0
+
+_LINE_SEPARATOR = '\u2028'.encode()
+_PARAGRAPH_SEPARATOR = '\u2029'.encode()
+
+# Tipos que o orjson não serializa (e as datas/horas) seguem pelo encoder do DRF
+_default = encoders.JSONEncoder().default
+
+
+class ORJSONRenderer(JSONRenderer):
+    """JSONRenderer com a mesma saída, serializado pelo orjson"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if orjson is None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=_default, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Como o DRF: JSON estritamente contido em JavaScript
+        if _LINE_SEPARATOR in ret or _PARAGRAPH_SEPARATOR in ret:
+            ret = ret.replace(_LINE_SEPARATOR, b'\\u2028').replace(_PARAGRAPH_SEPARATOR, b'\\u2029')
+        return ret
@@ -11,8 +11,9 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 from pathlib import Path
-from decouple import config, AutoConfig
+from decouple import config, AutoConfig, Csv
 import os
+import warnings
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -52,7 +53,6 @@ DEBUG = config('DEBUG', default=True, cast=bool)
 
 # Validate webhook URL in production
 if not DEBUG and WEBHOOK_BASE_URL.startswith(('http://127.0.0.1', 'http://localhost')):
-    import warnings
     warnings.warn(
         "⚠️ WARNING: WEBHOOK_BASE_URL is using localhost in production! "
         "Webhooks from Paysuite will not work. "
@@ -75,6 +75,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "rest_framework",
     "corsheaders",
     "django_filters",
@@ -88,6 +89,8 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    "whitenoise.middleware.WhiteNoiseMiddleware",
+    "chiva_backend.middleware.APICompressionMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     # "django.middleware.cache.UpdateCacheMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -95,6 +98,7 @@ MIDDLEWARE = [
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "chiva_backend.middleware.AdminPathIsAdminMiddleware",
+    "chiva_backend.middleware.StatementTimeoutMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -122,6 +126,11 @@ WSGI_APPLICATION = "chiva_backend.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Serving mode chosen by entrypoint.sh: 'wsgi' (gunicorn sync workers) or 'asgi'
+# (gunicorn + uvicorn workers). Under ASGI each request runs its sync code in a
+# fresh thread, so connections can't be reused and CONN_MAX_AGE defaults to 0.
+SERVER_MODE = config('SERVER_MODE', default='wsgi')
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
@@ -130,9 +139,94 @@ DATABASES = {
         'PASSWORD': config('DB_PASSWORD', default=''),
         'HOST': config('DB_HOST', default='localhost'),
         'PORT': config('DB_PORT', default='5432'),
+        # Persistent connections: each worker thread reuses its connection for
+        # this many seconds (0 = close after every request, None = unlimited)
+        'CONN_MAX_AGE': config(
+            'DB_CONN_MAX_AGE',
+            default=0 if SERVER_MODE == 'asgi' else 60,
+            cast=lambda v: None if v == 'none' else int(v),
+        ),
+        # Ping a reused connection before the first query of each request
+        'CONN_HEALTH_CHECKS': config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool),
+        # Required behind a transaction-mode pooler such as PgBouncer
+        'DISABLE_SERVER_SIDE_CURSORS': config('DB_DISABLE_SERVER_SIDE_CURSORS', default=False, cast=bool),
+        'OPTIONS': {
+            'connect_timeout': config('DB_CONNECT_TIMEOUT', default=5, cast=int),
+        },
     }
 }
 
+# Session-wide statement timeout in ms (0 = none). It also applies to management
+# commands and migrations; per-route limits live in DB_ROUTE_STATEMENT_TIMEOUTS.
+DB_STATEMENT_TIMEOUT_MS = config('DB_STATEMENT_TIMEOUT_MS', default=0, cast=int)
+if DB_STATEMENT_TIMEOUT_MS:
+    DATABASES['default']['OPTIONS']['options'] = f'-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}'
+
+# Optional psycopg 3 connection pool (Django >= 5.1 with psycopg[pool] installed).
+# Pooled connections are shared by the worker's threads, so CONN_MAX_AGE must be 0.
+DB_POOL = config('DB_POOL', default=False, cast=bool)
+if DB_POOL:
+    import django as _django
+    try:
+        import psycopg_pool  # noqa: F401
+    except ImportError:
+        psycopg_pool = None
+    if _django.VERSION >= (5, 1) and psycopg_pool is not None:
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': config('DB_POOL_MIN_SIZE', default=2, cast=int),
+            'max_size': config('DB_POOL_MAX_SIZE', default=10, cast=int),
+            'timeout': config('DB_POOL_TIMEOUT', default=10, cast=int),
+        }
+    else:
+        warnings.warn('DB_POOL requires Django >= 5.1 and psycopg[pool]; using persistent connections')
+
+# ==========================================
+# CACHE
+# ==========================================
+# Catalog/promotion versions, active promotions, pricing tables, favorites and
+# locks must be seen by every gunicorn worker and by management commands, so
+# the default cache is shared: Redis when REDIS_URL is set, otherwise the
+# database (table created by `createcachetable` in entrypoint.sh). The
+# per-process LocMemCache is only used for single-process development (DEBUG)
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'chiva',
+        }
+    }
+elif DEBUG:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'django_cache',
+            # Versions are stored without expiry; keep the table from culling them early
+            'OPTIONS': {'MAX_ENTRIES': config('DB_CACHE_MAX_ENTRIES', default=20000, cast=int)},
+        }
+    }
+
+# Statement timeouts per route class, applied by
+# chiva_backend.middleware.StatementTimeoutMiddleware: (path prefix, methods
+# or None for all, milliseconds). The first matching entry wins.
+DB_STATEMENT_TIMEOUT_PUBLIC_MS = config('DB_STATEMENT_TIMEOUT_PUBLIC_MS', default=5000, cast=int)
+DB_STATEMENT_TIMEOUT_EXPORT_MS = config('DB_STATEMENT_TIMEOUT_EXPORT_MS', default=300000, cast=int)
+DB_ROUTE_STATEMENT_TIMEOUTS = [
+    ('/api/cart/admin/export/', None, DB_STATEMENT_TIMEOUT_EXPORT_MS),
+    ('/api/products/', ('GET', 'HEAD'), DB_STATEMENT_TIMEOUT_PUBLIC_MS),
+    ('/api/categories/', ('GET', 'HEAD'), DB_STATEMENT_TIMEOUT_PUBLIC_MS),
+    ('/api/subcategories/', ('GET', 'HEAD'), DB_STATEMENT_TIMEOUT_PUBLIC_MS),
+    ('/api/navigation/', ('GET', 'HEAD'), DB_STATEMENT_TIMEOUT_PUBLIC_MS),
+]
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -188,6 +282,16 @@ REST_FRAMEWORK = {
         'chiva_backend.firebase_auth.FirebaseAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
+    # orjson-backed JSON with the same output as DRF's JSONRenderer/JSONParser
+    'DEFAULT_RENDERER_CLASSES': [
+        'chiva_backend.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'chiva_backend.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
@@ -243,6 +347,41 @@ STATIC_ROOT = config('STATIC_ROOT', default=BASE_DIR / 'staticfiles')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = config('MEDIA_ROOT', default=BASE_DIR / 'media')
 
+# ==========================================
+# DELIVERY (WhiteNoise, compression, media)
+# ==========================================
+# collectstatic writes hashed names plus .br/.gz copies (brotli via the Brotli
+# package); WhiteNoise serves them with far-future Cache-Control
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "chiva_backend.storage.StaticFilesStorage"},
+}
+# API responses (JSON/XML/CSV) at least this large are compressed
+# (chiva_backend.middleware.APICompressionMiddleware); 0 disables the threshold
+API_COMPRESSION_MIN_SIZE = config('API_COMPRESSION_MIN_SIZE', default=1024, cast=int)
+API_COMPRESSION_BROTLI_QUALITY = config('API_COMPRESSION_BROTLI_QUALITY', default=4, cast=int)
+API_COMPRESSION_GZIP_LEVEL = config('API_COMPRESSION_GZIP_LEVEL', default=6, cast=int)
+# Internal nginx location mapped to MEDIA_ROOT (e.g. /protected-media/): media
+# and export downloads go out via X-Accel-Redirect. Empty = Django streams the
+# file itself (FileResponse, sendfile through gunicorn's file_wrapper)
+MEDIA_ACCEL_REDIRECT = config('MEDIA_ACCEL_REDIRECT', default='')
+# Cache-Control max-age of /media/ files served by Django (variants/ are immutable)
+MEDIA_MAX_AGE = config('MEDIA_MAX_AGE', default=86400, cast=int)
+
+# Sitemaps written to MEDIA_ROOT/sitemaps/ (products.sitemaps): URLs per file
+# (protocol limit 50 000) and the absolute base of every <loc>. The request Host
+# is never used (it can be forged via X-Forwarded-Host): without a base URL the
+# files are only (re)built by `manage.py generate_sitemaps --base-url ...`
+SITEMAP_URLS_PER_FILE = config('SITEMAP_URLS_PER_FILE', default=50000, cast=int)
+SITEMAP_BASE_URL = config('SITEMAP_BASE_URL', default='')
+SITEMAP_MAX_AGE = config('SITEMAP_MAX_AGE', default=3600, cast=int)
+
+# Per-user favorite product id set behind is_favorited in product lists
+# (products.favorites); cleared whenever a favorite is added or removed. 0 disables.
+# On by default only with Redis: a per-process cache would keep stale sets in the
+# other workers, and a database cache hit costs the same query it saves
+FAVORITES_CACHE_SECONDS = config('FAVORITES_CACHE_SECONDS', default=600 if REDIS_URL else 0, cast=int)
+
 # File Upload Settings
 FILE_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
@@ -293,3 +432,95 @@ SEND_ADMIN_NOTIFICATIONS = config('SEND_ADMIN_NOTIFICATIONS', default=True, cast
 # Cart abandonment settings
 CART_ABANDONMENT_HOURS = config('CART_ABANDONMENT_HOURS', default=2, cast=int)
 MAX_RECOVERY_EMAILS = config('MAX_RECOVERY_EMAILS', default=3, cast=int)
+
+# Cart recovery campaign (send_cart_recovery_emails)
+# Share of the Brevo daily quota reserved for recovery emails, leaving room for
+# transactional emails (order confirmation, payment status, ...)
+CART_RECOVERY_DAILY_QUOTA = config('CART_RECOVERY_DAILY_QUOTA', default=150, cast=int)
+# Recipients per Brevo request (messageVersions)
+CART_RECOVERY_BATCH_SIZE = config('CART_RECOVERY_BATCH_SIZE', default=50, cast=int)
+# Token bucket: sustained emails per second across one process
+CART_RECOVERY_RATE_PER_SECOND = config('CART_RECOVERY_RATE_PER_SECOND', default=5, cast=float)
+CART_RECOVERY_BASE_URL = config('CART_RECOVERY_BASE_URL', default='https://chivacomputer.co.mz/carrinho')
+
+# ==========================================
+# ASYNC EXPORT JOBS (run_export_jobs)
+# ==========================================
+# Minutes a generated export is reused by identical requests (kind, format, filters)
+EXPORT_JOB_TTL_MINUTES = config('EXPORT_JOB_TTL_MINUTES', default=30, cast=int)
+# Running jobs without a heartbeat for this long (dead worker) are picked up again
+# by another worker, up to 3 claims (cart.export_jobs.MAX_ATTEMPTS)
+EXPORT_JOB_STALE_MINUTES = config('EXPORT_JOB_STALE_MINUTES', default=15, cast=int)
+
+# ==========================================
+# IMAGE PROCESSING (process_image_jobs)
+# ==========================================
+# When True, image saves only enqueue ImageJob rows and the worker generates
+# the WebP variants; set False to generate them inline (no worker running)
+IMAGE_PROCESSING_ASYNC = config('IMAGE_PROCESSING_ASYNC', default=True, cast=bool)
+# Running image jobs without progress for this long are picked up again
+IMAGE_JOB_STALE_MINUTES = config('IMAGE_JOB_STALE_MINUTES', default=10, cast=int)
+# Content-addressed derivatives (MEDIA_ROOT/variants/<hash>/): widths and
+# formats generated per image. 'avif' requires pillow-avif-plugin and is
+# skipped when the encoder is not available.
+IMAGE_VARIANT_WIDTHS = config('IMAGE_VARIANT_WIDTHS', default='320,640,1024', cast=Csv(int))
+IMAGE_VARIANT_FORMATS = config('IMAGE_VARIANT_FORMATS', default='webp,jpeg', cast=Csv())
+
+# ==========================================
+# BACKFILLS (cart.backfill)
+# ==========================================
+# Backfill commands pause while the database has more active sessions than this (0 disables)
+BACKFILL_MAX_DB_LOAD = config('BACKFILL_MAX_DB_LOAD', default=16, cast=int)
+
+# ==========================================
+# IDENTITY SYNC (customers.identity_sync)
+# ==========================================
+# Full Firebase -> User/ExternalAuthUser sync (and admin claim check) at most once per user per interval
+IDENTITY_SYNC_INTERVAL_SECONDS = config('IDENTITY_SYNC_INTERVAL_SECONDS', default=900, cast=int)
+# Buffered ExternalAuthUser.last_seen values are written in one UPDATE this often
+IDENTITY_LAST_SEEN_FLUSH_SECONDS = config('IDENTITY_LAST_SEEN_FLUSH_SECONDS', default=60, cast=int)
+
+# ==========================================
+# PAYMENTS UNDER ASGI (cart.async_views, cart.payment_notifications)
+# ==========================================
+# Route payment initiate/status to the async views (PaySuite calls awaited with httpx)
+ASYNC_PAYMENT_VIEWS = config('ASYNC_PAYMENT_VIEWS', default=SERVER_MODE == 'asgi', cast=bool)
+# Payment emails (Brevo) go to a background thread pool after the transaction commits
+PAYMENT_EMAILS_IN_BACKGROUND = config('PAYMENT_EMAILS_IN_BACKGROUND', default=True, cast=bool)
+PAYMENT_EMAIL_WORKERS = config('PAYMENT_EMAIL_WORKERS', default=2, cast=int)
+
+# ==========================================
+# ORDER LISTS (cart.order_listing)
+# ==========================================
+ORDER_LIST_MAX_PAGE_SIZE = config('ORDER_LIST_MAX_PAGE_SIZE', default=1000, cast=int)
+# Unfiltered admin lists use pg_class statistics instead of COUNT(*) above this many rows
+ORDER_LIST_ESTIMATE_THRESHOLD = config('ORDER_LIST_ESTIMATE_THRESHOLD', default=100000, cast=int)
+
+# ==========================================
+# CATALOG CACHES (products.catalog)
+# ==========================================
+# Entries are keyed by the catalog version (bumped on product/category changes);
+# the timeout only bounds staleness from bulk updates that bypass signals
+PRODUCT_FACETS_CACHE_SECONDS = config('PRODUCT_FACETS_CACHE_SECONDS', default=600, cast=int)
+NAVIGATION_CACHE_SECONDS = config('NAVIGATION_CACHE_SECONDS', default=3600, cast=int)
+# Browser/CDN freshness of /api/navigation/ (revalidated with ETag afterwards)
+NAVIGATION_MAX_AGE = config('NAVIGATION_MAX_AGE', default=60, cast=int)
+
+# ==========================================
+# CONDITIONAL GET (chiva_backend.conditional)
+# ==========================================
+# Cache-Control max-age of endpoints served with ETag/Last-Modified; once it
+# expires the SPA/CDN revalidates (If-None-Match -> 304 without a body).
+# Category lists default to 0 because the admin edits them through the same URL
+PRODUCT_DETAIL_MAX_AGE = config('PRODUCT_DETAIL_MAX_AGE', default=30, cast=int)
+CATEGORY_LIST_MAX_AGE = config('CATEGORY_LIST_MAX_AGE', default=0, cast=int)
+SHIPPING_METHODS_MAX_AGE = config('SHIPPING_METHODS_MAX_AGE', default=300, cast=int)
+PROMOTIONS_MAX_AGE = config('PROMOTIONS_MAX_AGE', default=60, cast=int)
+
+# ==========================================
+# PROMOTIONS (promotions.resolution)
+# ==========================================
+# The active set is cached until the next start/end boundary and keyed by the
+# promotions version; this only bounds staleness from updates that bypass signals
+PROMOTIONS_CACHE_SECONDS = config('PROMOTIONS_CACHE_SECONDS', default=3600, cast=int)
+PROMOTION_USER_ROLES_CACHE_SECONDS = config('PROMOTION_USER_ROLES_CACHE_SECONDS', default=300, cast=int)
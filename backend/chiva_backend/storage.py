@@ -0,0 +1,15 @@
+"""
+Storage dos ficheiros estáticos
+Nomes com hash e cópias .br/.gz geradas no collectstatic (WhiteNoise), que
+o WhiteNoiseMiddleware serve com Cache-Control de longa duração.
+"""
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+
+class StaticFilesStorage(CompressedManifestStaticFilesStorage):
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            # collectstatic ainda não correu (dev, testes): nome sem hash
+            return name
@@ -15,13 +15,14 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView, SpectacularRedocView
-from django.contrib.sitemaps.views import sitemap
-from products.sitemaps import ProductSitemap, CategorySitemap, SubcategorySitemap, StaticViewSitemap
+from products.sitemaps import serve_sitemap
 from cart import order_views as cart_order_views
+from chiva_backend.db_metrics import db_metrics
+from chiva_backend.media import serve_media
 
 urlpatterns = [
     path("admin/", admin.site.urls),
@@ -31,6 +32,7 @@ urlpatterns = [
     path('api/cart/admin/export/customers/', cart_order_views.export_customers, name='export_customers_root'),
     path('api/cart/admin/export/dashboard/', cart_order_views.export_dashboard_stats, name='export_dashboard_stats_root'),
     # Otherwise, 'api/' will match first and delegate, causing 404s for 'api/cart/...'
+    path('api/health/db/', db_metrics, name='db_metrics'),
     path("api/cart/", include("cart.urls")),
     path("api/", include("products.urls")),
     path("api/", include("customers.urls")),
@@ -40,18 +42,18 @@ urlpatterns = [
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
     path('api/docs/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
     path('api/redoc/', SpectacularRedocView.as_view(url_name='schema'), name='redoc'),
-    # Sitemap
-    path('sitemap.xml', sitemap, {'sitemaps': {
-        'products': ProductSitemap(),
-        'categories': CategorySitemap(),
-        'subcategories': SubcategorySitemap(),
-        'static': StaticViewSitemap(),
-    }}, name='sitemap'),
+    # Sitemap (index + fragments written to disk, see products.sitemaps)
+    path('sitemap.xml', serve_sitemap, name='sitemap'),
+    re_path(r'^(?P<name>sitemap-[a-z]+-\d+\.xml)$', serve_sitemap, name='sitemap-section'),
 ]
 
-# Serve media files during development
+# Media files (X-Accel-Redirect / sendfile, see chiva_backend.media)
+urlpatterns += [
+    re_path(r'^%s(?P<path>.+)$' % settings.MEDIA_URL.lstrip('/'), serve_media, name='media'),
+]
+
+# Serve static files during development (WhiteNoise in production)
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
 
 
@@ -0,0 +1,74 @@
+"""
+Métricas de valor do cliente (LTV)
+Agregados por cliente calculados numa única query agrupada e mantidos em
+CustomerProfile (total_orders, total_spent, last_order_date) sempre que um
+pedido muda, para que exportações e listagens leiam valores pré-calculados
+"""
+import logging
+from typing import Iterable, Optional
+
+from django.db.models import Avg, Count, Max, Min, Sum
+
+from .models import CustomerProfile
+
+logger = logging.getLogger(__name__)
+
+# Estados em que o pedido já foi pago e conta como receita do cliente
+REVENUE_ORDER_STATUSES = ('paid', 'confirmed', 'processing', 'shipped', 'delivered')
+
+STATS_FIELDS = ['total_orders', 'total_spent', 'last_order_date']
+
+
+def customer_order_aggregates(user_ids: Optional[Iterable[int]] = None):
+    """
+    Uma linha por cliente com pedidos pagos: total_orders, total_spent,
+    first_order_date, last_order_date e avg_order_value (GROUP BY user_id)
+    """
+    from cart.models import Order
+
+    orders = Order.objects.filter(user__isnull=False, status__in=REVENUE_ORDER_STATUSES)
+    if user_ids is not None:
+        orders = orders.filter(user_id__in=list(user_ids))
+
+    return orders.order_by().values('user_id').annotate(
+        total_orders=Count('id'),
+        total_spent=Sum('total_amount'),
+        first_order_date=Min('created_at'),
+        last_order_date=Max('created_at'),
+        avg_order_value=Avg('total_amount'),
+    )
+
+
+def refresh_customer_stats(user_ids: Iterable[int]) -> int:
+    """
+    Recalcula os agregados dos clientes indicados e grava-os em CustomerProfile
+    (criando o perfil se ainda não existir). Recalcular em vez de somar deltas
+    mantém os valores corretos também em cancelamentos e reembolsos.
+
+    Retorna o número de perfis atualizados.
+    """
+    user_ids = {uid for uid in user_ids if uid}
+    if not user_ids:
+        return 0
+
+    stats = {row['user_id']: row for row in customer_order_aggregates(user_ids)}
+
+    # Clientes com pedidos pagos mas sem perfil
+    missing = set(stats) - set(
+        CustomerProfile.objects.filter(user_id__in=stats).values_list('user_id', flat=True)
+    )
+    if missing:
+        CustomerProfile.objects.bulk_create(
+            [CustomerProfile(user_id=uid, status='active') for uid in missing],
+            ignore_conflicts=True,
+        )
+
+    profiles = list(CustomerProfile.objects.filter(user_id__in=user_ids).only('id', 'user_id', *STATS_FIELDS))
+    for profile in profiles:
+        row = stats.get(profile.user_id, {})
+        profile.total_orders = row.get('total_orders', 0)
+        profile.total_spent = row.get('total_spent') or 0
+        profile.last_order_date = row.get('last_order_date')
+
+    CustomerProfile.objects.bulk_update(profiles, STATS_FIELDS)
+    return len(profiles)
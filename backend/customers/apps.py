@@ -5,3 +5,11 @@ class CustomersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'customers'
     verbose_name = 'Clientes'
+
+    def ready(self):
+        # Import signal handlers (admin search documents, identity sync cache)
+        try:
+            from . import identity_sync, search  # noqa: F401
+        except Exception:
+            # Avoid breaking startup if migrations are running
+            pass
@@ -0,0 +1,78 @@
+"""
+Diretório de clientes do admin
+Lista unificada de CustomerProfile + ExternalAuthUser sem perfil, montada
+como UNION ALL no Postgres para que filtro, pesquisa, ordenação e paginação
+não dependam do número total de clientes
+"""
+from decimal import Decimal
+
+from django.db.models import CharField, DateTimeField, DecimalField, F, IntegerField, Value
+from django.db.models.functions import Coalesce
+
+from .models import ExternalAuthUser
+from .search import KIND_CUSTOMER, matching_ids
+
+# ?ordering= aceite pela listagem -> coluna do UNION
+ORDERING_COLUMNS = {
+    'registration_date': 'sort_registration',
+    'total_orders': 'sort_orders',
+    'total_spent': 'sort_spent',
+}
+DEFAULT_ORDERING = '-registration_date'
+
+SOURCE_PROFILE = 'profile'
+SOURCE_EXTERNAL = 'external'
+
+
+def external_only_users(status_filter='', province_filter='', search_term=''):
+    """
+    ExternalAuthUser ligados a um usuário Django mas ainda sem CustomerProfile
+    ("novos acessos"), com os mesmos filtros da listagem
+    """
+    ext_qs = ExternalAuthUser.objects.filter(user__isnull=False, user__profile__isnull=True)
+
+    # Status: usuários externos são tratados como 'active'
+    if status_filter and status_filter not in ['all', 'active']:
+        return ext_qs.none()
+    # Província: usuários externos não têm província; só aparecem sem esse filtro
+    if province_filter and province_filter != 'all':
+        return ext_qs.none()
+    # Pesquisa: documento do cliente (nomes, emails, firebase_uid) em customers.search
+    if search_term:
+        ext_qs = ext_qs.filter(user_id__in=matching_ids(KIND_CUSTOMER, search_term))
+    return ext_qs
+
+
+def directory_queryset(profiles, ext_users, ordering=None):
+    """
+    UNION ALL de perfis e usuários externos com colunas comuns
+    (source, ref_id, sort_registration, sort_orders, sort_spent), ordenado
+    no banco. Fatiar o resultado gera LIMIT/OFFSET no próprio UNION.
+    """
+    columns = ('source', 'ref_id', 'sort_registration', 'sort_orders', 'sort_spent')
+
+    profile_rows = profiles.order_by().annotate(
+        source=Value(SOURCE_PROFILE, output_field=CharField()),
+        ref_id=F('id'),
+        sort_registration=F('registration_date'),
+        sort_orders=F('total_orders'),
+        sort_spent=F('total_spent'),
+    ).values_list(*columns)
+
+    ext_rows = ext_users.order_by().annotate(
+        source=Value(SOURCE_EXTERNAL, output_field=CharField()),
+        ref_id=F('id'),
+        sort_registration=Coalesce('created_at', 'user__date_joined', output_field=DateTimeField()),
+        sort_orders=Value(0, output_field=IntegerField()),
+        sort_spent=Value(Decimal('0.00'), output_field=DecimalField(max_digits=12, decimal_places=2)),
+    ).values_list(*columns)
+
+    ordering = ordering or DEFAULT_ORDERING
+    column = ORDERING_COLUMNS.get(ordering.lstrip('-'), ORDERING_COLUMNS['registration_date'])
+    if ordering.startswith('-'):
+        primary = F(column).desc(nulls_last=True)
+    else:
+        primary = F(column).asc(nulls_last=True)
+
+    # source/ref_id desempatam para que a paginação seja estável
+    return profile_rows.union(ext_rows, all=True).order_by(primary, 'source', 'ref_id')
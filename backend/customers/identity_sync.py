@@ -0,0 +1,172 @@
+"""
+Sincronização de identidade Firebase -> User/ExternalAuthUser
+- A sincronização completa do espelho (FirebaseAuthentication._sync_user)
+  corre no máximo uma vez por usuário a cada IDENTITY_SYNC_INTERVAL_SECONDS,
+  ou antes se o email/nome do token ou a lista FIREBASE_ADMIN_EMAILS mudar;
+  nos outros pedidos o usuário é resolvido numa única consulta
+- As custom claims de admin no Firebase são sincronizadas fora do pedido
+  (thread em segundo plano), no máximo uma vez por intervalo
+- last_seen é acumulado em memória e gravado num único UPDATE a cada
+  IDENTITY_LAST_SEEN_FLUSH_SECONDS
+"""
+import atexit
+import hashlib
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, FrozenSet, Optional
+
+from decouple import config
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models import Case, DateTimeField, Value, When
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import ExternalAuthUser
+
+logger = logging.getLogger(__name__)
+
+SYNC_CACHE_PREFIX = 'identity_sync'
+CLAIMS_CACHE_PREFIX = 'identity_claims'
+
+_admin_emails_raw = None
+_admin_emails: FrozenSet[str] = frozenset()
+
+_seen: Dict[str, object] = {}
+_seen_lock = threading.Lock()
+_last_flush = time.monotonic()
+
+_claims_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='identity-claims')
+
+
+def admin_emails() -> FrozenSet[str]:
+    """FIREBASE_ADMIN_EMAILS normalizado (só reprocessado quando o valor muda)"""
+    global _admin_emails_raw, _admin_emails
+    raw = config('FIREBASE_ADMIN_EMAILS', default='')
+    if raw != _admin_emails_raw:
+        _admin_emails = frozenset(e.strip().lower() for e in raw.split(',') if e.strip())
+        _admin_emails_raw = raw
+    return _admin_emails
+
+
+def is_admin_email(email: str) -> bool:
+    return bool(email) and email.strip().lower() in admin_emails()
+
+
+def _sync_key(firebase_uid: str) -> str:
+    return f'{SYNC_CACHE_PREFIX}:{firebase_uid}'
+
+
+def _fingerprint(email: str, name: str) -> str:
+    """Identifica os dados do token que a sincronização completa aplicaria"""
+    raw = f'{email or ""}\x00{name or ""}\x00{is_admin_email(email)}'
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def cached_user(firebase_uid: str, email: str, name: str) -> Optional[User]:
+    """User já sincronizado neste intervalo (com external_auth), ou None"""
+    if cache.get(_sync_key(firebase_uid)) != _fingerprint(email, name):
+        return None
+    user = User.objects.select_related('external_auth').filter(username=firebase_uid).first()
+    if user is None:
+        forget(firebase_uid)
+        return None
+    record_seen(firebase_uid)
+    return user
+
+
+def mark_synced(firebase_uid: str, email: str, name: str) -> None:
+    cache.set(_sync_key(firebase_uid), _fingerprint(email, name), settings.IDENTITY_SYNC_INTERVAL_SECONDS)
+
+
+def forget(firebase_uid: str) -> None:
+    """Força a sincronização completa no próximo pedido deste usuário"""
+    cache.delete(_sync_key(firebase_uid))
+
+
+# ==========================================
+# LAST SEEN
+# ==========================================
+
+def record_seen(firebase_uid: str) -> None:
+    now = timezone.now()
+    with _seen_lock:
+        _seen[firebase_uid] = now
+        due = time.monotonic() - _last_flush >= settings.IDENTITY_LAST_SEEN_FLUSH_SECONDS
+    if due:
+        flush_last_seen()
+
+
+def flush_last_seen() -> int:
+    """Grava os last_seen acumulados num único UPDATE"""
+    global _last_flush
+    with _seen_lock:
+        pending = dict(_seen)
+        _seen.clear()
+        _last_flush = time.monotonic()
+    if not pending:
+        return 0
+    return ExternalAuthUser.objects.filter(firebase_uid__in=list(pending)).update(
+        last_seen=Case(
+            *[When(firebase_uid=uid, then=Value(seen)) for uid, seen in pending.items()],
+            output_field=DateTimeField(),
+        )
+    )
+
+
+def _flush_at_exit():
+    try:
+        flush_last_seen()
+    except Exception as e:
+        logger.warning(f"⚠️ Não foi possível gravar last_seen ao encerrar: {e}")
+
+
+atexit.register(_flush_at_exit)
+
+
+# ==========================================
+# CUSTOM CLAIMS
+# ==========================================
+
+def schedule_claims_sync(firebase_uid: str, is_admin: bool) -> None:
+    """Agenda a sincronização da claim 'admin' no Firebase (uma vez por intervalo)"""
+    key = f'{CLAIMS_CACHE_PREFIX}:{firebase_uid}'
+    if cache.get(key) == is_admin:
+        return
+    cache.set(key, is_admin, settings.IDENTITY_SYNC_INTERVAL_SECONDS)
+    _claims_executor.submit(sync_claims, firebase_uid, is_admin)
+
+
+def sync_claims(firebase_uid: str, is_admin: bool) -> None:
+    from firebase_admin import auth
+
+    try:
+        user_record = auth.get_user(firebase_uid)
+        custom_claims = user_record.custom_claims or {}
+        if custom_claims.get('admin', False) != is_admin:
+            auth.set_custom_claims(firebase_uid, {**custom_claims, 'admin': is_admin})
+            print(f"[FirebaseAuth] Updated admin claim for {firebase_uid} to {is_admin}")
+        if custom_claims.get('providers'):
+            ExternalAuthUser.objects.filter(firebase_uid=firebase_uid).update(
+                providers=list(custom_claims['providers'])
+            )
+    except Exception as e:
+        # Only log ADC warning if we're not in dev bypass mode
+        dev_bypass = os.getenv('DEV_FIREBASE_ACCEPT_UNVERIFIED', '0').lower() in ['1', 'true']
+        if not dev_bypass:
+            print(f"[FirebaseAuth] Failed to sync claims: {e}")
+
+
+@receiver(post_save, sender=ExternalAuthUser)
+@receiver(post_delete, sender=ExternalAuthUser)
+def forget_changed_identity(sender, instance, **kwargs):
+    """Alterações no espelho (ex: conceder admin) valem já no próximo pedido"""
+    update_fields = kwargs.get('update_fields')
+    if update_fields is not None and set(update_fields) <= {'last_seen', 'updated_at'}:
+        return
+    forget(instance.firebase_uid)
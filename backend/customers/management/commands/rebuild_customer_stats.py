@@ -0,0 +1,42 @@
+"""
+Recalcula os agregados de valor do cliente (total_orders, total_spent,
+last_order_date) em CustomerProfile a partir dos pedidos pagos
+Uso: python manage.py rebuild_customer_stats [--batch-size 1000]
+"""
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db.models import Exists, OuterRef, Q
+
+from cart.models import Order
+from customers.analytics import refresh_customer_stats
+
+
+class Command(BaseCommand):
+    help = 'Recalcula total_orders/total_spent/last_order_date de todos os clientes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Clientes recalculados por lote (padrão: 1000)',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+
+        users = User.objects.filter(
+            Q(profile__isnull=False) | Exists(Order.objects.filter(user=OuterRef('pk')))
+        ).order_by('id').values_list('id', flat=True)
+
+        cursor = 0
+        updated = 0
+        while True:
+            batch = list(users.filter(id__gt=cursor)[:batch_size])
+            if not batch:
+                break
+            cursor = batch[-1]
+            updated += refresh_customer_stats(batch)
+            self.stdout.write(f'⏳ {updated} perfis atualizados (até o usuário {cursor})')
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Agregados recalculados para {updated} clientes'))
@@ -0,0 +1,37 @@
+"""
+Recria os documentos da pesquisa do admin (AdminSearchDocument) de todos
+os clientes e pedidos; depois disso os signals os mantêm atualizados
+Uso: python manage.py rebuild_search_documents [--chunk-size 1000] [--dry-run] [--restart]
+"""
+from django.contrib.auth.models import User
+
+from cart.backfill import Backfill, BackfillCommand
+from cart.models import Order
+from customers.search import index_orders, index_users
+
+
+class CustomerSearchBackfill(Backfill):
+    name = 'customers.search.customers'
+    chunk_size = 1000
+
+    def queryset(self):
+        return User.objects.select_related('profile', 'external_auth')
+
+    def process(self, rows, executor=None):
+        return index_users(rows)
+
+
+class OrderSearchBackfill(Backfill):
+    name = 'customers.search.orders'
+    chunk_size = 1000
+
+    def queryset(self):
+        return Order.objects.select_related('user')
+
+    def process(self, rows, executor=None):
+        return index_orders(rows)
+
+
+class Command(BackfillCommand):
+    help = 'Recria os documentos da pesquisa do admin (clientes e pedidos)'
+    backfill_classes = (CustomerSearchBackfill, OrderSearchBackfill)
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-19 15:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0004_customerprofile_postal_code'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customerprofile',
+            index=models.Index(fields=['registration_date'], name='customer_registration_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customerprofile',
+            index=models.Index(fields=['total_spent'], name='customer_total_spent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customerprofile',
+            index=models.Index(fields=['total_orders'], name='customer_total_orders_idx'),
+        ),
+    ]
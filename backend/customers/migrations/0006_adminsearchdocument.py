@@ -0,0 +1,60 @@
+# Generated by Django 4.2.7 on 2026-10-19 18:05
+
+from django.db import migrations, models
+
+TRIGRAM_INDEX = 'admin_search_document_trgm'
+
+
+def create_trigram_index(apps, schema_editor):
+    """
+    Índice GIN pg_trgm em `document` (serve LIKE '%termo%' e word similarity).
+    Em bancos sem a extensão pg_trgm a pesquisa continua a funcionar, sem índice.
+    """
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS {TRIGRAM_INDEX} ON customers_adminsearchdocument '
+        'USING gin (document gin_trgm_ops)'
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {TRIGRAM_INDEX}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0005_customerprofile_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AdminSearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('order', 'Pedido'), ('customer', 'Cliente')], max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('title', models.CharField(blank=True, max_length=255)),
+                ('subtitle', models.CharField(blank=True, max_length=255)),
+                ('document', models.TextField(blank=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Documento de Pesquisa',
+                'verbose_name_plural': 'Documentos de Pesquisa',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='adminsearchdocument',
+            constraint=models.UniqueConstraint(fields=('kind', 'object_id'), name='admin_search_kind_object_uniq'),
+        ),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
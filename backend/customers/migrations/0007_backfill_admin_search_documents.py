@@ -0,0 +1,55 @@
+# Generated by Django 4.2.7 on 2026-10-19 19:40
+
+from django.db import migrations
+
+CHUNK_SIZE = 1000
+
+
+def _chunks(queryset):
+    last_pk = 0
+    while True:
+        rows = list(queryset.filter(pk__gt=last_pk).order_by('pk')[:CHUNK_SIZE])
+        if not rows:
+            return
+        yield rows
+        last_pk = rows[-1].pk
+
+
+def populate_search_documents(apps, schema_editor):
+    """Documentos dos clientes e pedidos existentes (os novos vêm dos signals)"""
+    from customers.search import customer_document, order_document
+
+    AdminSearchDocument = apps.get_model('customers', 'AdminSearchDocument')
+    User = apps.get_model('auth', 'User')
+    Order = apps.get_model('cart', 'Order')
+
+    def upsert(documents):
+        AdminSearchDocument.objects.bulk_create(
+            [
+                AdminSearchDocument(
+                    kind=doc.kind, object_id=doc.object_id, title=doc.title,
+                    subtitle=doc.subtitle, document=doc.document,
+                )
+                for doc in documents
+            ],
+            update_conflicts=True,
+            unique_fields=['kind', 'object_id'],
+            update_fields=['title', 'subtitle', 'document', 'updated_at'],
+        )
+
+    for users in _chunks(User.objects.select_related('profile', 'external_auth')):
+        upsert(customer_document(user) for user in users)
+    for orders in _chunks(Order.objects.select_related('user')):
+        upsert(order_document(order) for order in orders)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0006_adminsearchdocument'),
+        ('cart', '0021_order_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_search_documents, migrations.RunPython.noop),
+    ]
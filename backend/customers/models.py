@@ -20,6 +20,12 @@ class CustomerProfile(models.Model):
         verbose_name = 'Perfil do Cliente'
         verbose_name_plural = 'Perfis de Clientes'
         ordering = ['user__date_joined']
+        indexes = [
+            # Ordenações da listagem de clientes do admin
+            models.Index(fields=['registration_date'], name='customer_registration_idx'),
+            models.Index(fields=['total_spent'], name='customer_total_spent_idx'),
+            models.Index(fields=['total_orders'], name='customer_total_orders_idx'),
+        ]
 
     def __str__(self):
         return self.user.get_full_name() or self.user.email or self.user.username
@@ -120,3 +126,35 @@ class ExternalAuthUser(models.Model):
             self.user.save()
         
         return True
+
+
+class AdminSearchDocument(models.Model):
+    """
+    Denormalized search text for the admin screens (customers.search): one row
+    per order and per customer (auth User), lowercased and without accents.
+    The pg_trgm GIN index on `document` is created by migration 0006 when the
+    extension is available.
+    """
+    KIND_ORDER = 'order'
+    KIND_CUSTOMER = 'customer'
+    KIND_CHOICES = [
+        (KIND_ORDER, 'Pedido'),
+        (KIND_CUSTOMER, 'Cliente'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    title = models.CharField(max_length=255, blank=True)
+    subtitle = models.CharField(max_length=255, blank=True)
+    document = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Documento de Pesquisa'
+        verbose_name_plural = 'Documentos de Pesquisa'
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='admin_search_kind_object_uniq'),
+        ]
+
+    def __str__(self):
+        return f'{self.kind}:{self.object_id} {self.title}'
@@ -0,0 +1,278 @@
+"""
+Pesquisa do admin (pedidos e clientes)
+Cada pedido e cada cliente (auth User, com o perfil e o ExternalAuthUser)
+tem um AdminSearchDocument com número, email, nomes, telefone, cidade e
+província normalizados (minúsculas, sem acentos). A pesquisa é um
+`document LIKE '%termo%'` servido pelo índice GIN pg_trgm; a pesquisa
+global ordenada (admin/search/) junta correspondência aproximada (word
+similarity) e relevância quando a extensão existe, os filtros das listas
+ficam só com a correspondência exata. Os documentos são mantidos pelos
+signals no fim deste módulo; a migração 0007 e `rebuild_search_documents`
+preenchem os já existentes.
+"""
+import logging
+import re
+import unicodedata
+from typing import Iterable, List, Optional
+
+from django.contrib.auth.models import User
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import connection
+from django.db.models import Q, Value
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import AdminSearchDocument, CustomerProfile, ExternalAuthUser
+
+logger = logging.getLogger(__name__)
+
+KIND_ORDER = AdminSearchDocument.KIND_ORDER
+KIND_CUSTOMER = AdminSearchDocument.KIND_CUSTOMER
+
+# Chaves de Order.shipping_address incluídas no documento do pedido
+ADDRESS_KEYS = ('name', 'first_name', 'last_name', 'email', 'phone', 'address', 'city', 'province')
+
+# Campos de Order/User cuja alteração muda o documento
+ORDER_FIELDS = {'order_number', 'tracking_number', 'user', 'shipping_address'}
+USER_FIELDS = {'username', 'email', 'first_name', 'last_name'}
+
+MAX_RESULTS = 50
+
+_trigram_available = None
+
+
+def normalize(text) -> str:
+    """Minúsculas, sem acentos e com espaços simples"""
+    text = unicodedata.normalize('NFKD', str(text or ''))
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return ' '.join(text.lower().split())
+
+
+def _document(parts: Iterable) -> str:
+    words = []
+    for part in parts:
+        value = normalize(part)
+        if value and value not in words:
+            words.append(value)
+            # Telefones também só com dígitos ("84 123 4567" -> "841234567")
+            digits = re.sub(r'\D', '', value)
+            if len(digits) >= 6 and digits != value:
+                words.append(digits)
+    return ' '.join(words)
+
+
+def trigram_available() -> bool:
+    """pg_trgm instalado neste banco (verificado uma vez por processo)"""
+    global _trigram_available
+    if _trigram_available is None:
+        _trigram_available = False
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+                _trigram_available = cursor.fetchone() is not None
+    return _trigram_available
+
+
+# ==========================================
+# CONSTRUÇÃO DOS DOCUMENTOS
+# ==========================================
+
+def _user_name(user) -> str:
+    return f'{user.first_name} {user.last_name}'.strip()
+
+
+def order_document(order) -> AdminSearchDocument:
+    user = order.user
+    address = order.shipping_address if isinstance(order.shipping_address, dict) else {}
+    parts = [order.order_number, order.tracking_number]
+    if user is not None:
+        parts += [user.email, user.first_name, user.last_name]
+    parts += [address.get(key) for key in ADDRESS_KEYS]
+
+    name = (_user_name(user) if user else '') or address.get('name') or ''
+    email = (user.email if user else '') or address.get('email') or ''
+    return AdminSearchDocument(
+        kind=KIND_ORDER,
+        object_id=order.pk,
+        title=(order.order_number or f'#{order.pk}')[:255],
+        subtitle=' · '.join(filter(None, [name, email]))[:255],
+        document=_document(parts),
+    )
+
+
+def customer_document(user) -> AdminSearchDocument:
+    profile = _related(user, 'profile')
+    external = _related(user, 'external_auth')
+
+    parts = [user.first_name, user.last_name, user.email, user.username]
+    if external is not None:
+        parts += [external.display_name, external.email]
+    if profile is not None:
+        parts += [profile.phone, profile.city, profile.province]
+
+    title = _user_name(user) or (external.display_name if external else '') or user.email or user.username
+    phone = profile.phone if profile else ''
+    return AdminSearchDocument(
+        kind=KIND_CUSTOMER,
+        object_id=user.pk,
+        title=title[:255],
+        subtitle=' · '.join(filter(None, [user.email, phone]))[:255],
+        document=_document(parts),
+    )
+
+
+def _related(user, name: str):
+    """Perfil/ExternalAuthUser do usuário, ou None se não existir"""
+    try:
+        return getattr(user, name)
+    except ObjectDoesNotExist:
+        # Também os modelos históricos da migração de preenchimento
+        return None
+
+
+def _upsert(documents: List[AdminSearchDocument]) -> int:
+    if not documents:
+        return 0
+    AdminSearchDocument.objects.bulk_create(
+        documents,
+        update_conflicts=True,
+        unique_fields=['kind', 'object_id'],
+        update_fields=['title', 'subtitle', 'document', 'updated_at'],
+    )
+    return len(documents)
+
+
+def index_orders(orders) -> int:
+    """Grava os documentos dos pedidos (queryset ou lista, idealmente com select_related('user'))"""
+    return _upsert([order_document(order) for order in orders])
+
+
+def index_users(users) -> int:
+    """Grava os documentos dos clientes (idealmente com select_related('profile', 'external_auth'))"""
+    return _upsert([customer_document(user) for user in users])
+
+
+def reindex_user(user_id: Optional[int]) -> Optional[str]:
+    """Regrava o documento do cliente e devolve o texto (None se o usuário não existe)"""
+    if not user_id:
+        return None
+    user = User.objects.select_related('profile', 'external_auth').filter(pk=user_id).first()
+    if user is None:
+        AdminSearchDocument.objects.filter(kind=KIND_CUSTOMER, object_id=user_id).delete()
+        return None
+    document = customer_document(user)
+    _upsert([document])
+    return document.document
+
+
+def reindex_user_orders(user_id: int) -> int:
+    from cart.models import Order
+    orders = Order.objects.filter(user_id=user_id).select_related('user').order_by('pk')
+    indexed = 0
+    for start in range(0, orders.count(), 500):
+        indexed += index_orders(orders[start:start + 500])
+    return indexed
+
+
+# ==========================================
+# PESQUISA
+# ==========================================
+
+def _filter(queryset, term: str, fuzzy: bool = False):
+    condition = Q(document__contains=term)
+    if fuzzy and trigram_available():
+        # Aproximada: tolera erros de digitação (pg_trgm.word_similarity_threshold)
+        condition |= Q(document__trigram_word_similar=term)
+    return queryset.filter(condition)
+
+
+def matching_ids(kind: str, term: str):
+    """
+    Subquery dos object_id que contêm o termo (para `pk__in=` nos filtros das
+    listas, sem correspondência aproximada: os resultados não têm ordenação por
+    relevância que ponha os exatos primeiro)
+    """
+    term = normalize(term)
+    queryset = AdminSearchDocument.objects.filter(kind=kind)
+    if not term:
+        return queryset.values('object_id')
+    return _filter(queryset, term).values('object_id')
+
+
+def search(term: str, kinds: Optional[Iterable[str]] = None, limit: int = 20) -> List[dict]:
+    """Resultados ordenados por relevância: [{'kind', 'id', 'title', 'subtitle', 'score'}]"""
+    term = normalize(term)
+    if not term:
+        return []
+
+    queryset = _filter(AdminSearchDocument.objects.all(), term, fuzzy=True)
+    if kinds:
+        queryset = queryset.filter(kind__in=list(kinds))
+
+    if trigram_available():
+        queryset = queryset.annotate(score=TrigramWordSimilarity(Value(term), 'document'))
+    else:
+        queryset = queryset.annotate(score=Value(1.0))
+    rows = queryset.order_by('-score', '-updated_at').values(
+        'kind', 'object_id', 'title', 'subtitle', 'score'
+    )[:max(1, min(limit, MAX_RESULTS))]
+
+    return [
+        {
+            'kind': row['kind'],
+            'id': row['object_id'],
+            'title': row['title'],
+            'subtitle': row['subtitle'],
+            'score': round(float(row['score'] or 0), 3),
+        }
+        for row in rows
+    ]
+
+
+# ==========================================
+# SIGNALS
+# ==========================================
+
+def _touches(update_fields, fields) -> bool:
+    return update_fields is None or bool(set(update_fields) & fields)
+
+
+@receiver(post_save, sender='cart.Order')
+def index_order_on_save(sender, instance, update_fields=None, **kwargs):
+    if _touches(update_fields, ORDER_FIELDS):
+        index_orders([instance])
+
+
+@receiver(post_delete, sender='cart.Order')
+def remove_order_document(sender, instance, **kwargs):
+    AdminSearchDocument.objects.filter(kind=KIND_ORDER, object_id=instance.pk).delete()
+
+
+@receiver(post_save, sender=User)
+def index_user_on_save(sender, instance, created, update_fields=None, **kwargs):
+    if not _touches(update_fields, USER_FIELDS):
+        return
+    previous = AdminSearchDocument.objects.filter(
+        kind=KIND_CUSTOMER, object_id=instance.pk
+    ).values_list('document', flat=True).first()
+    document = reindex_user(instance.pk)
+    # Nome/email também estão nos documentos dos pedidos do cliente
+    if not created and previous is not None and document != previous:
+        reindex_user_orders(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def remove_user_document(sender, instance, **kwargs):
+    AdminSearchDocument.objects.filter(kind=KIND_CUSTOMER, object_id=instance.pk).delete()
+
+
+@receiver(post_save, sender=CustomerProfile)
+@receiver(post_delete, sender=CustomerProfile)
+@receiver(post_save, sender=ExternalAuthUser)
+@receiver(post_delete, sender=ExternalAuthUser)
+def index_related_user(sender, instance, **kwargs):
+    update_fields = kwargs.get('update_fields')
+    if update_fields is not None and set(update_fields) <= {'last_seen', 'updated_at', 'last_order_date', 'total_orders', 'total_spent'}:
+        return
+    reindex_user(instance.user_id)
@@ -0,0 +1,67 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from cart.models import Order
+from customers.models import AdminSearchDocument, CustomerProfile, ExternalAuthUser
+from customers.search import KIND_CUSTOMER, KIND_ORDER, search, trigram_available
+
+
+class AdminSearchTest(TestCase):
+    def setUp(self):
+        admin = User.objects.create_user(username='admin-uid', email='admin@example.com', is_staff=True)
+        ExternalAuthUser.objects.create(firebase_uid='admin-uid', user=admin, is_admin=True)
+        self.client = APIClient()
+        self.client.force_authenticate(admin)
+
+        self.customer = User.objects.create_user(
+            username='cliente-uid', email='maria@example.com', first_name='Maria', last_name='Conceição'
+        )
+        CustomerProfile.objects.create(user=self.customer, phone='+258 84 123 4567', city='Beira')
+        self.order = Order.objects.create(
+            user=self.customer, total_amount=Decimal('100.00'),
+            shipping_address={'name': 'Joao Mabunda', 'city': 'Nampula', 'phone': '84 765 4321'},
+        )
+
+    def test_documents_follow_signals(self):
+        # Sem acentos nem maiúsculas, nos pedidos e nos clientes
+        self.assertEqual(
+            {(r['kind'], r['id']) for r in search('CONCEICAO')},
+            {(KIND_ORDER, self.order.pk), (KIND_CUSTOMER, self.customer.pk)},
+        )
+        self.assertEqual([r['id'] for r in search('João', kinds=[KIND_ORDER])], [self.order.pk])
+        self.assertEqual([r['id'] for r in search('841234567', kinds=[KIND_CUSTOMER])], [self.customer.pk])
+
+        # Renomear o cliente atualiza também os documentos dos seus pedidos
+        self.customer.last_name = 'Sitoe'
+        self.customer.save()
+        self.assertEqual(search('conceicao'), [])
+        self.assertEqual([r['id'] for r in search('sitoe', kinds=[KIND_ORDER])], [self.order.pk])
+
+        self.order.delete()
+        self.assertFalse(AdminSearchDocument.objects.filter(kind=KIND_ORDER).exists())
+
+    def test_admin_screens_use_documents(self):
+        Order.objects.create(user=self.customer, shipping_address={'city': 'Maputo'})
+
+        orders = self.client.get('/api/cart/admin/orders/', {'search': 'nampula'}).json()['orders']
+        self.assertEqual([o['id'] for o in orders], [self.order.pk])
+
+        customers = self.client.get('/api/admin/customers/', {'search': 'beira'}).data
+        self.assertEqual([c['id'] for c in customers['results']], ['cliente-uid'])
+
+        results = self.client.get('/api/admin/search/', {'q': self.order.order_number}).json()['results']
+        self.assertEqual(results[0], {
+            'kind': KIND_ORDER, 'id': self.order.pk, 'title': self.order.order_number,
+            'subtitle': 'Maria Conceição · maria@example.com', 'score': results[0]['score'],
+        })
+        self.assertEqual(self.client.get('/api/admin/search/', {'q': 'x', 'kind': 'produto'}).status_code, 400)
+
+    def test_fuzzy_matches_only_in_ranked_search(self):
+        # Erro de digitação: os filtros das listas só aceitam o termo contido
+        orders = self.client.get('/api/cart/admin/orders/', {'search': 'nampla'}).json()['orders']
+        self.assertEqual(orders, [])
+        if trigram_available():
+            self.assertEqual([r['id'] for r in search('nampla', kinds=[KIND_ORDER])], [self.order.pk])
@@ -0,0 +1,63 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from cart.export_jobs import build_customers_export
+from cart.models import Order
+from customers.analytics import customer_order_aggregates, refresh_customer_stats
+from customers.models import CustomerProfile
+
+
+class CustomerAnalyticsTest(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', email='alice@example.com')
+        self.bob = User.objects.create_user(username='bob', email='bob@example.com')
+        CustomerProfile.objects.create(user=self.bob)
+
+    def _order(self, user, amount, status='pending'):
+        return Order.objects.create(user=user, total_amount=Decimal(amount), status=status)
+
+    def test_grouped_query_only_counts_paid_orders(self):
+        self._order(self.alice, '100.00', 'delivered')
+        self._order(self.alice, '50.00', 'paid')
+        self._order(self.alice, '999.00', 'cancelled')
+
+        with self.assertNumQueries(1):
+            rows = {row['user_id']: row for row in customer_order_aggregates()}
+
+        self.assertEqual(set(rows), {self.alice.id})
+        self.assertEqual(rows[self.alice.id]['total_orders'], 2)
+        self.assertEqual(rows[self.alice.id]['total_spent'], Decimal('150.00'))
+        self.assertEqual(rows[self.alice.id]['avg_order_value'], Decimal('75.00'))
+
+    def test_profile_follows_order_status_changes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            order = self._order(self.bob, '200.00')
+        self.assertEqual(CustomerProfile.objects.get(user=self.bob).total_orders, 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            order.status = 'confirmed'
+            order.save(update_fields=['status'])
+        profile = CustomerProfile.objects.get(user=self.bob)
+        self.assertEqual((profile.total_orders, profile.total_spent), (1, Decimal('200.00')))
+        self.assertIsNotNone(profile.last_order_date)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            order.status = 'cancelled'
+            order.save()
+        profile.refresh_from_db()
+        self.assertEqual((profile.total_orders, profile.total_spent), (0, Decimal('0.00')))
+
+    def test_refresh_creates_missing_profile_and_export_reads_it(self):
+        self._order(self.alice, '80.00', 'shipped')
+        refresh_customer_stats([self.alice.id, self.bob.id])
+
+        self.assertEqual(CustomerProfile.objects.get(user=self.alice).total_spent, Decimal('80.00'))
+
+        dataset = build_customers_export({})
+        with self.assertNumQueries(1):
+            rows = {row['email']: row for row in dataset.rows}
+        self.assertEqual(rows['alice@example.com']['orders_count'], 1)
+        self.assertEqual(rows['alice@example.com']['avg_order_value'], 80.0)
+        self.assertEqual(rows['bob@example.com']['total_spent'], 0.0)
@@ -0,0 +1,57 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from customers.models import CustomerProfile, ExternalAuthUser
+
+
+class CustomerDirectoryTest(TestCase):
+    def setUp(self):
+        admin = User.objects.create_user(username='admin-uid', email='admin@example.com', is_staff=True)
+        ExternalAuthUser.objects.create(firebase_uid='admin-uid', user=admin, is_admin=True)
+        self.client = APIClient()
+        self.client.force_authenticate(admin)
+
+        for i, spent in enumerate(['9.00', '100.00', '50.00']):
+            user = User.objects.create_user(username=f'cliente{i}', email=f'cliente{i}@example.com')
+            CustomerProfile.objects.create(user=user, total_spent=Decimal(spent), total_orders=i, province='Maputo')
+        novo = User.objects.create_user(username='novo-uid', email='novo@example.com')
+        ExternalAuthUser.objects.create(firebase_uid='novo-uid', user=novo, email='novo@example.com', display_name='Novo')
+
+    def _get(self, **params):
+        response = self.client.get('/api/admin/customers/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_merges_profiles_and_external_users_ordered_in_db(self):
+        data = self._get(ordering='-total_spent', page_size=3)
+
+        # 3 perfis de clientes + novo externo (o admin também é externo sem perfil)
+        self.assertEqual(data['count'], 5)
+        self.assertEqual([c['totalSpent'] for c in data['results']], ['100.00', '50.00', '9.00'])
+
+        last_page = self._get(ordering='-total_spent', page_size=3, page=2)
+        self.assertEqual({c['id'] for c in last_page['results']}, {'novo-uid', 'admin-uid'})
+        self.assertEqual(last_page['results'][0]['totalOrders'], 0)
+
+    def test_filters_apply_to_both_sources(self):
+        self.assertEqual(self._get(search='novo')['count'], 1)
+        self.assertEqual(self._get(province='Maputo')['count'], 3)
+        self.assertEqual(self._get(status='blocked')['count'], 0)
+
+    def _count_queries(self, **params):
+        with CaptureQueriesContext(connection) as ctx:
+            self._get(**params)
+        return len(ctx.captured_queries)
+
+    def test_page_queries_do_not_grow_with_customer_count(self):
+        before = self._count_queries(ordering='-total_spent', page_size=2)
+        for i in range(30):
+            user = User.objects.create_user(username=f'extra{i}', email=f'extra{i}@example.com')
+            CustomerProfile.objects.create(user=user)
+
+        self.assertEqual(self._count_queries(ordering='-total_spent', page_size=2), before)
@@ -0,0 +1,74 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from chiva_backend.firebase_auth import FirebaseAuthentication
+from customers import identity_sync
+from customers.models import ExternalAuthUser
+
+
+@mock.patch('customers.identity_sync.schedule_claims_sync')
+class IdentitySyncTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        identity_sync.flush_last_seen()
+        self.auth = FirebaseAuthentication()
+
+    def test_full_sync_once_then_single_query(self, schedule_claims_sync):
+        user = self.auth.get_or_create_user('uid-1', 'ana@example.com', 'Ana Silva')
+        self.assertEqual((user.first_name, user.last_name), ('Ana', 'Silva'))
+        ext = ExternalAuthUser.objects.get(firebase_uid='uid-1')
+        self.assertEqual(ext.user, user)
+        schedule_claims_sync.assert_called_once_with('uid-1', False)
+
+        with self.assertNumQueries(1):
+            cached = self.auth.get_or_create_user('uid-1', 'ana@example.com', 'Ana Silva')
+        self.assertEqual(cached, user)
+        self.assertEqual(cached.external_auth, ext)
+        self.assertEqual(schedule_claims_sync.call_count, 1)
+
+        # Email diferente no token: sincroniza de novo
+        self.auth.get_or_create_user('uid-1', 'ana.silva@example.com', 'Ana Silva')
+        self.assertEqual(ExternalAuthUser.objects.get(firebase_uid='uid-1').email, 'ana.silva@example.com')
+
+    def test_admin_change_invalidates_cache(self, schedule_claims_sync):
+        user = self.auth.get_or_create_user('uid-2', 'rui@example.com', 'Rui')
+        self.assertFalse(user.is_staff)
+
+        ext = ExternalAuthUser.objects.get(firebase_uid='uid-2')
+        ext.is_admin = True
+        ext.save()
+
+        user = self.auth.get_or_create_user('uid-2', 'rui@example.com', 'Rui')
+        self.assertTrue(user.is_staff)
+        self.assertTrue(ext.roles.filter(name='admin').exists())
+
+    @override_settings(IDENTITY_LAST_SEEN_FLUSH_SECONDS=3600)
+    def test_last_seen_is_batched(self, schedule_claims_sync):
+        for uid in ('uid-3', 'uid-4'):
+            self.auth.get_or_create_user(uid, f'{uid}@example.com', '')
+        synced = dict(ExternalAuthUser.objects.values_list('firebase_uid', 'last_seen'))
+
+        for uid in ('uid-3', 'uid-4'):
+            self.auth.get_or_create_user(uid, f'{uid}@example.com', '')
+        self.assertEqual(dict(ExternalAuthUser.objects.values_list('firebase_uid', 'last_seen')), synced)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(identity_sync.flush_last_seen(), 2)
+        for uid, last_seen in ExternalAuthUser.objects.values_list('firebase_uid', 'last_seen'):
+            self.assertGreater(last_seen, synced[uid])
+
+
+class ClaimsScheduleTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_claims_synced_once_per_interval(self):
+        with mock.patch.object(identity_sync, '_claims_executor') as executor:
+            identity_sync.schedule_claims_sync('uid-5', True)
+            identity_sync.schedule_claims_sync('uid-5', True)
+            executor.submit.assert_called_once_with(identity_sync.sync_claims, 'uid-5', True)
+
+            identity_sync.schedule_claims_sync('uid-5', False)
+            self.assertEqual(executor.submit.call_count, 2)
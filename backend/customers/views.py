@@ -8,6 +8,8 @@ from decouple import config
 import os, json
 from .models import CustomerProfile
 from .models import Role, ExternalAuthUser
+from .directory import directory_queryset, external_only_users, SOURCE_PROFILE
+from .search import KIND_CUSTOMER, KIND_ORDER, matching_ids, search as admin_search_documents
 from .serializers import RoleSerializer, ExternalAuthUserSerializer
 from rest_framework import status
 from rest_framework.decorators import api_view
@@ -270,7 +272,7 @@ class CustomerListAdminView(generics.ListAPIView):
     serializer_class = CustomerAdminListSerializer
     permission_classes = [IsAdmin]
     filterset_fields = ['status', 'province']
-    search_fields = ['user__first_name','user__last_name','user__email','phone','city','province']
+    # Pesquisa via customers.search (documento indexado), não SearchFilter
     ordering_fields = ['registration_date','total_orders','total_spent']
     ordering = ['-registration_date']
 
@@ -285,121 +287,72 @@ class CustomerListAdminView(generics.ListAPIView):
 
         We preserve the existing response shape (count/results) used by the
         frontend. next/previous links are not required by the SPA.
+
+        The merged list is a single UNION ALL query (customers.directory): only
+        the requested page is loaded and serialized.
         """
-        # First, get the filtered CustomerProfile queryset and serialize it
+        # Filtered CustomerProfile queryset (DjangoFilterBackend)
         queryset = self.filter_queryset(self.get_queryset())
+        search_term = (request.query_params.get('search') or '').strip()
+        if search_term:
+            queryset = queryset.filter(user_id__in=matching_ids(KIND_CUSTOMER, search_term))
 
-        # We can't easily paginate yet because we'll add external-only users
-        base_items = list(queryset)
-
-        # Serialize base items using the configured serializer
-        serializer = self.get_serializer(base_items, many=True)
-        base_data = list(serializer.data)
-
-        # Collect ExternalAuthUser entries linked to a Django user but missing a CustomerProfile
+        # ExternalAuthUser entries linked to a Django user but missing a CustomerProfile
         # These represent "new accesses" that haven't created a profile yet
-        try:
-            from customers.models import ExternalAuthUser
-            ext_qs = ExternalAuthUser.objects.select_related('user') \
-                .filter(user__isnull=False, user__profile__isnull=True)
-        except Exception:
-            ext_qs = []
-
-        # Read filters/search from query params to apply to external-only items
-        status_filter = (request.query_params.get('status') or '').strip()
-        province_filter = (request.query_params.get('province') or '').strip()
-        search_term = (request.query_params.get('search') or '').strip().lower()
-
-        # Helper to check if an external item matches the active filters
-        def _matches_filters(ext):
-            # Status: treat external users as 'active' by default
-            if status_filter and status_filter not in ['all', '']:
-                if status_filter != 'active':
-                    return False
-            # Province filter: external users don't have province info; only match when not filtering
-            if province_filter and province_filter not in ['all', '']:
-                return False
-            # Search: match by display_name or email
-            if search_term:
-                disp = (getattr(ext, 'display_name', '') or '').lower()
-                email = (getattr(ext, 'email', '') or '').lower()
-                uid = (getattr(ext, 'firebase_uid', '') or '').lower()
-                if search_term not in disp and search_term not in email and search_term not in uid:
-                    return False
-            return True
-
-        # Transform external users into the frontend customer shape with sensible defaults
-        ext_items = []
-        if ext_qs:
-            for ext in ext_qs:
-                if not _matches_filters(ext):
-                    continue
-                data = _to_frontend_customer(profile=None, ext=ext)
-                # Fill required/default fields expected by the SPA
-                try:
-                    reg_dt = getattr(ext, 'created_at', None)
-                    if not reg_dt and getattr(ext, 'user', None):
-                        reg_dt = getattr(ext.user, 'date_joined', None)
-                except Exception:
-                    reg_dt = None
-
-                data.setdefault('registrationDate', (reg_dt.isoformat() if reg_dt else None))
-                data.setdefault('lastOrderDate', None)
-                data.setdefault('totalOrders', 0)
-                data.setdefault('totalSpent', '0')
-                data.setdefault('status', 'active')
-                data.setdefault('notes', '')
-                data.setdefault('phone', '')
-                data.setdefault('address', '')
-                data.setdefault('city', '')
-                data.setdefault('province', '')
-                data.setdefault('postal_code', '')
-                data.setdefault('avatar', '')
-                # Ensure 'id' exists (use firebase UID or fallback to email)
-                if not data.get('id'):
-                    data['id'] = getattr(ext, 'firebase_uid', None) or getattr(ext, 'email', None) or 'external'
-
-                ext_items.append(data)
-
-        # Combine base data with external-only items
-        combined = base_data + ext_items
+        ext_qs = external_only_users(
+            status_filter=(request.query_params.get('status') or '').strip(),
+            province_filter=(request.query_params.get('province') or '').strip(),
+            search_term=search_term,
+        )
 
         # Ordering: support ?ordering= like DRF. Default by registrationDate desc.
-        ordering = request.query_params.get('ordering') or '-registration_date'
-        # Map serializer field name to our combined dict keys
-        key_map = {
-            'registration_date': 'registrationDate',
-            'total_orders': 'totalOrders',
-            'total_spent': 'totalSpent',
-        }
-        order_field = ordering.lstrip('-')
-        combined_key = key_map.get(order_field, 'registrationDate')
-        reverse = ordering.startswith('-')
-
-        def _sort_key(item):
-            val = item.get(combined_key)
-            return (val is None, val)  # None-safe: Nones at end
-
-        try:
-            combined.sort(key=_sort_key, reverse=reverse)
-        except Exception:
-            # If sort fails for any reason, keep original order
-            pass
+        directory = directory_queryset(queryset, ext_qs, request.query_params.get('ordering'))
 
         # Pagination: honor page/page_size query params; fallback to DRF defaults
         try:
-            page_number = int(request.query_params.get('page', '1'))
+            page_number = max(1, int(request.query_params.get('page', '1')))
         except Exception:
             page_number = 1
         try:
-            page_size = int(request.query_params.get('page_size') or 20)
+            page_size = max(1, int(request.query_params.get('page_size') or 20))
         except Exception:
             page_size = 20
 
-        total_count = len(combined)
+        total_count = directory.count()
         start = (page_number - 1) * page_size
-        end = start + page_size
-        page_results = combined[start:end]
+        page_rows = list(directory[start:start + page_size])
+
+        # Load only the rows of this page (one query per source)
+        profile_ids = [ref_id for source, ref_id, *_ in page_rows if source == SOURCE_PROFILE]
+        ext_ids = [ref_id for source, ref_id, *_ in page_rows if source != SOURCE_PROFILE]
+        profiles = CustomerProfile.objects.select_related('user').in_bulk(profile_ids)
+        externals = ExternalAuthUser.objects.select_related('user').in_bulk(ext_ids)
+
+        page_results = []
+        for source, ref_id, registration, *_ in page_rows:
+            if source == SOURCE_PROFILE:
+                page_results.append(self.get_serializer(profiles[ref_id]).data)
+                continue
+
+            ext = externals[ref_id]
+            # Transform external users into the frontend customer shape with sensible defaults
+            data = _to_frontend_customer(profile=None, ext=ext)
+            data.setdefault('registrationDate', (registration.isoformat() if registration else None))
+            data.setdefault('lastOrderDate', None)
+            data.setdefault('totalOrders', 0)
+            data.setdefault('totalSpent', '0')
+            data.setdefault('status', 'active')
+            data.setdefault('notes', '')
+            data.setdefault('phone', '')
+            data.setdefault('address', '')
+            data.setdefault('city', '')
+            data.setdefault('province', '')
+            data.setdefault('postal_code', '')
+            data.setdefault('avatar', '')
+            # Ensure 'id' exists (use firebase UID or fallback to email)
+            if not data.get('id'):
+                data['id'] = getattr(ext, 'firebase_uid', None) or getattr(ext, 'email', None) or 'external'
+            page_results.append(data)
 
         return Response({
             'count': total_count,
@@ -750,6 +703,25 @@ def admin_whoami(request):
     return Response(data)
 
 # Role management
+@api_view(['GET'])
+@permission_classes([IsAdmin])
+def admin_search(request):
+    """
+    Pesquisa única do admin sobre pedidos e clientes, ordenada por relevância
+    ?q=termo&kind=order,customer&limit=20
+    """
+    term = (request.query_params.get('q') or request.query_params.get('search') or '').strip()
+    kinds = [k for k in (request.query_params.get('kind') or '').split(',') if k]
+    if any(k not in (KIND_ORDER, KIND_CUSTOMER) for k in kinds):
+        return Response({'error': f'kind inválido; use {KIND_ORDER} e/ou {KIND_CUSTOMER}'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        limit = int(request.query_params.get('limit') or 20)
+    except ValueError:
+        return Response({'error': 'limit inválido'}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response({'query': term, 'results': admin_search_documents(term, kinds, limit)})
+
+
 class RoleListCreateAdminView(generics.ListCreateAPIView):
     queryset = Role.objects.all()
     serializer_class = RoleSerializer
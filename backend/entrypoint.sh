@@ -7,6 +7,9 @@ echo "Starting entrypoint..."
 echo "Applying database migrations..."
 python manage.py migrate --noinput || true
 
+# Cache table (only used when REDIS_URL is not set and DEBUG is off)
+python manage.py createcachetable || true
+
 # Collect static files
 echo "Collecting static files..."
 python manage.py collectstatic --noinput || true
@@ -15,6 +18,15 @@ if [ "$DJANGO_DEBUG" = "True" ] || [ "$DJANGO_DEBUG" = "1" ]; then
   echo "Running development server"
   python manage.py runserver 0.0.0.0:8000
 else
-  echo "Running gunicorn"
-  gunicorn chiva_backend.wsgi:application --bind 0.0.0.0:8000 --workers 3
+  WORKERS="${WEB_CONCURRENCY:-3}"
+  TIMEOUT="${GUNICORN_TIMEOUT:-60}"
+  if [ "$SERVER_MODE" = "asgi" ]; then
+    # Workers uvicorn: pedidos à PaySuite aguardados no event loop (cart.async_views)
+    echo "Running gunicorn (ASGI, uvicorn workers: $WORKERS)"
+    exec gunicorn chiva_backend.asgi:application -k uvicorn.workers.UvicornWorker \
+      --bind 0.0.0.0:8000 --workers "$WORKERS" --timeout "$TIMEOUT"
+  else
+    echo "Running gunicorn (WSGI, sync workers: $WORKERS)"
+    exec gunicorn chiva_backend.wsgi:application --bind 0.0.0.0:8000 --workers "$WORKERS" --timeout "$TIMEOUT"
+  fi
 fi
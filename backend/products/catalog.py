@@ -0,0 +1,39 @@
+"""
+Versão do catálogo
+Número guardado no cache e incrementado sempre que produtos, categorias ou
+subcategorias mudam. Resultados derivados do catálogo (facetas, navegação,
+...) usam a versão na chave de cache, por isso ficam invalidados sem ser
+preciso apagar chaves uma a uma.
+A versão vive no cache partilhado (CACHES: Redis ou a tabela de cache), para
+que um bump feito por um worker, pelo worker de imagens ou por um comando
+chegue a todos os processos; escritas com update() fazem o bump à mão.
+"""
+import time
+
+from django.core.cache import cache
+
+CATALOG_VERSION_KEY = 'catalog:version'
+
+# Campos de Product atualizados com frequência que não alteram o catálogo
+CATALOG_IGNORED_FIELDS = frozenset({'view_count'})
+
+
+def get_catalog_version() -> int:
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        # Valor inicial baseado no relógio: um cache reiniciado não reutiliza versões antigas
+        cache.add(CATALOG_VERSION_KEY, int(time.time() * 1000), timeout=None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def bump_catalog_version() -> int:
+    try:
+        return cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        get_catalog_version()
+        return cache.incr(CATALOG_VERSION_KEY)
+
+
+def catalog_cache_key(prefix: str, *parts) -> str:
+    return ':'.join([prefix, str(get_catalog_version()), *(str(part) for part in parts)])
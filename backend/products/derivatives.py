@@ -0,0 +1,260 @@
+"""Armazenamento de derivados de imagem endereçado por conteúdo.
+
+As variantes de cada imagem ficam em MEDIA_ROOT/variants/<hh>/<hash>/, onde
+<hash> é o SHA-256 do ficheiro original: cópias idênticas (ex: produtos
+duplicados com duplicate_product) partilham os mesmos ficheiros. Cada pasta
+tem um manifest.json com dimensões e tamanho em bytes de cada variante, que
+é guardado no banco e exposto pelos serializers como `srcset`.
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db.models import Q
+from PIL import Image
+
+from .image_utils import _variant_path, generate_webp_variants
+
+try:
+    # AVIF é opcional: requer o plugin pillow-avif-plugin
+    import pillow_avif  # noqa: F401
+except ImportError:
+    pillow_avif = None
+
+logger = logging.getLogger(__name__)
+
+VARIANTS_DIR = 'variants'
+MANIFEST_NAME = 'manifest.json'
+MANIFEST_VERSION = 1
+
+# formato -> (extensão, formato Pillow, parâmetros do encoder)
+FORMAT_OPTIONS = {
+    'avif': ('avif', 'AVIF', {'quality': 60, 'speed': 6}),
+    'webp': ('webp', 'WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('jpg', 'JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+_unsupported_logged = set()
+
+
+def configured_widths() -> List[int]:
+    return sorted({int(w) for w in settings.IMAGE_VARIANT_WIDTHS if int(w) > 0})
+
+
+def configured_formats() -> List[str]:
+    """Formatos configurados suportados por este ambiente (AVIF só com o plugin)"""
+    Image.init()
+    formats = []
+    for fmt in settings.IMAGE_VARIANT_FORMATS:
+        fmt = fmt.strip().lower()
+        if fmt not in FORMAT_OPTIONS or fmt in formats:
+            continue
+        if FORMAT_OPTIONS[fmt][1] not in Image.SAVE:
+            if fmt not in _unsupported_logged:
+                _unsupported_logged.add(fmt)
+                logger.warning(f"⚠️ Formato de imagem {fmt} não suportado pelo Pillow instalado; ignorado")
+            continue
+        formats.append(fmt)
+    return formats
+
+
+def content_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _store_name(digest: str) -> str:
+    return f'{VARIANTS_DIR}/{digest[:2]}/{digest}'
+
+
+def _load_manifest(path: str) -> Optional[dict]:
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _covers(manifest: Optional[dict], widths: Iterable[int], formats: Iterable[str]) -> bool:
+    if not manifest or manifest.get('version') != MANIFEST_VERSION:
+        return False
+    have = {(v['format'], v['width']) for v in manifest.get('variants', [])}
+    orig_w = manifest.get('width') or 0
+    return all((fmt, min(w, orig_w)) in have for fmt in formats for w in widths)
+
+
+def _prepare(image: Image.Image, fmt: str) -> Image.Image:
+    # JPEG não tem canal alfa: compõe sobre fundo branco
+    if fmt == 'jpeg' and image.mode == 'RGBA':
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image
+
+
+def build_derivatives(path: str, widths: Iterable[int] = None, formats: Iterable[str] = None) -> Optional[dict]:
+    """Gera (ou reutiliza) as variantes do ficheiro e devolve o manifest.
+
+    A origem é descodificada uma vez e cada largura é reduzida a partir da
+    anterior (da maior para a menor). Também mantém os ficheiros legados
+    `nome-<largura>.webp` ao lado do original, usados pelo frontend.
+    """
+    widths = list(widths or configured_widths())
+    formats = list(formats or configured_formats())
+    if not path or not os.path.exists(path) or not widths or not formats:
+        return None
+
+    digest = content_hash(path)
+    store_name = _store_name(digest)
+    store_dir = os.path.join(settings.MEDIA_ROOT, store_name)
+    manifest_path = os.path.join(store_dir, MANIFEST_NAME)
+
+    manifest = _load_manifest(manifest_path)
+    if not _covers(manifest, widths, formats):
+        manifest = _generate(path, digest, store_name, store_dir, widths, formats)
+        if manifest is None:
+            return None
+        tmp_path = f'{manifest_path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, manifest_path)
+
+    _link_legacy_webp(path, manifest, store_dir, widths)
+    return manifest
+
+
+def _generate(path, digest, store_name, store_dir, widths, formats) -> Optional[dict]:
+    os.makedirs(store_dir, exist_ok=True)
+    variants = []
+
+    with Image.open(path) as img:
+        orig_w, orig_h = img.size
+        if orig_w == 0 or orig_h == 0:
+            return None
+
+        # Nunca amplia além da largura original
+        targets = sorted({min(w, orig_w) for w in widths}, reverse=True)
+
+        # Deixa o decoder JPEG reduzir 1/2, 1/4 ou 1/8 durante a leitura
+        img.draft('RGB', (targets[0], max(1, int(orig_h * targets[0] / float(orig_w)))))
+        current = img if img.mode in ('RGB', 'RGBA') else img.convert('RGBA' if 'A' in img.getbands() else 'RGB')
+        current.load()
+
+        for target_w in targets:
+            h = max(1, int(orig_h * target_w / float(orig_w)))
+            if (target_w, h) != current.size:
+                current = current.resize((target_w, h), Image.LANCZOS, reducing_gap=3.0)
+
+            for fmt in formats:
+                ext, pil_format, params = FORMAT_OPTIONS[fmt]
+                filename = f'{target_w}.{ext}'
+                file_path = os.path.join(store_dir, filename)
+                _prepare(current, fmt).save(file_path, format=pil_format, **params)
+                variants.append({
+                    'format': fmt,
+                    'width': target_w,
+                    'height': h,
+                    'bytes': os.path.getsize(file_path),
+                    'name': f'{store_name}/{filename}',
+                })
+
+    variants.sort(key=lambda v: (v['format'], v['width']))
+    return {
+        'version': MANIFEST_VERSION,
+        'hash': digest,
+        'width': orig_w,
+        'height': orig_h,
+        'variants': variants,
+    }
+
+
+def _link_legacy_webp(path: str, manifest: dict, store_dir: str, widths: Iterable[int]) -> None:
+    """Cria `nome-<largura>.webp` ao lado do original (hard link para o derivado)"""
+    webp = {v['width']: v for v in manifest['variants'] if v['format'] == 'webp'}
+    if not webp:
+        # WebP fora de IMAGE_VARIANT_FORMATS: gera os ficheiros legados diretamente
+        generate_webp_variants(path)
+        return
+    src_mtime = os.path.getmtime(path)
+    for w in widths:
+        variant = webp.get(min(w, manifest['width']))
+        if not variant:
+            continue
+        legacy = _variant_path(path, w, 'webp')
+        try:
+            if os.path.exists(legacy) and os.path.getmtime(legacy) >= src_mtime:
+                continue
+            source = os.path.join(store_dir, os.path.basename(variant['name']))
+            if os.path.exists(legacy):
+                os.remove(legacy)
+            try:
+                os.link(source, legacy)
+            except OSError:
+                shutil.copyfile(source, legacy)
+        except OSError as e:
+            logger.warning(f"Não foi possível criar {legacy}: {e}")
+
+
+def attach_manifest(path: str, manifest: dict) -> int:
+    """Grava o manifest nas linhas que apontam para o ficheiro (sem disparar signals)"""
+    from .catalog import bump_catalog_version
+    from .image_jobs import PRODUCT_IMAGE_FIELDS
+    from .main_image import refresh_main_images
+    from .models import Product, ProductImage
+
+    name = os.path.relpath(path, settings.MEDIA_ROOT).replace(os.sep, '/')
+    if name.startswith('..'):
+        return 0
+
+    product_ids = set(ProductImage.objects.filter(image=name).values_list('product_id', flat=True))
+    updated = ProductImage.objects.filter(image=name).update(variants=manifest)
+    lookup = Q()
+    for field in PRODUCT_IMAGE_FIELDS:
+        lookup |= Q(**{field: name})
+    for row in Product.objects.filter(lookup).values('id', 'image_variants', *PRODUCT_IMAGE_FIELDS):
+        variants = dict(row['image_variants'] or {})
+        variants.update({field: manifest for field in PRODUCT_IMAGE_FIELDS if row[field] == name})
+        updated += Product.objects.filter(id=row['id']).update(image_variants=variants)
+        product_ids.add(row['id'])
+
+    refresh_main_images(product_ids)
+    if updated:
+        # Corre no worker de imagens: o srcset novo tem de invalidar o catálogo de todos os processos
+        bump_catalog_version()
+    return updated
+
+
+def srcset_data(manifest: Optional[dict], request=None) -> Optional[Dict]:
+    """Representação do manifest para a API: variantes com URL e `srcset` por formato"""
+    if not manifest or not manifest.get('variants'):
+        return None
+
+    variants = []
+    srcset: Dict[str, List[str]] = {}
+    for variant in manifest['variants']:
+        url = default_storage.url(variant['name'])
+        if request is not None:
+            url = request.build_absolute_uri(url)
+        variants.append({
+            'url': url,
+            'format': variant['format'],
+            'width': variant['width'],
+            'height': variant['height'],
+            'bytes': variant['bytes'],
+        })
+        srcset.setdefault(variant['format'], []).append(f"{url} {variant['width']}w")
+
+    return {
+        'width': manifest.get('width'),
+        'height': manifest.get('height'),
+        'variants': variants,
+        'srcset': {fmt: ', '.join(entries) for fmt, entries in srcset.items()},
+    }
@@ -0,0 +1,86 @@
+"""
+Filtros e facetas sobre Product.specifications
+
+Filtros: ?spec.ram=16GB (igualdade) e ?spec.storage__in=512GB,1TB (qualquer
+um dos valores). Cada condição é um `specifications @> {...}`, servido pelo
+índice GIN jsonb_path_ops.
+
+Facetas: contagem de produtos por chave/valor de especificação para o
+conjunto filtrado, numa única consulta agrupada com jsonb_each.
+"""
+import re
+from decimal import Decimal, InvalidOperation
+from typing import Dict, List
+
+from django.db import connection
+from django.db.models import Q
+
+SPEC_PARAM_PREFIX = 'spec.'
+SPEC_IN_SUFFIX = '__in'
+SPEC_KEY_PATTERN = re.compile(r'^[\w\- ]{1,64}$')
+
+# Valores devolvidos por chave (os mais frequentes)
+MAX_FACET_VALUES = 50
+
+
+def spec_filters_from_params(params) -> Dict[str, List[str]]:
+    """Extrai {chave: [valores]} dos parâmetros spec.<chave> / spec.<chave>__in"""
+    filters = {}
+    for param in params.keys():
+        if not param.startswith(SPEC_PARAM_PREFIX):
+            continue
+        key = param[len(SPEC_PARAM_PREFIX):]
+        if key.endswith(SPEC_IN_SUFFIX):
+            key = key[:-len(SPEC_IN_SUFFIX)]
+            values = [v.strip() for raw in params.getlist(param) for v in raw.split(',')]
+        else:
+            values = [v.strip() for v in params.getlist(param)]
+        values = [v for v in values if v]
+        if values and SPEC_KEY_PATTERN.match(key):
+            filters.setdefault(key, []).extend(values)
+    return filters
+
+
+def _json_candidates(value: str) -> list:
+    """O valor como texto e, se numérico, também como número (ex: {"cores": 8})"""
+    candidates = [value]
+    try:
+        number = Decimal(value)
+    except InvalidOperation:
+        return candidates
+    if number.is_finite():
+        candidates.append(int(number) if number == number.to_integral_value() else float(number))
+    return candidates
+
+
+def apply_spec_filters(queryset, filters: Dict[str, List[str]]):
+    for key, values in filters.items():
+        condition = Q()
+        for value in values:
+            for candidate in _json_candidates(value):
+                condition |= Q(specifications__contains={key: candidate})
+        queryset = queryset.filter(condition)
+    return queryset
+
+
+def spec_facets(queryset) -> Dict[str, List[dict]]:
+    """{chave: [{'value', 'count'}, ...]} para os produtos do queryset"""
+    products_sql, params = queryset.order_by().values('pk').query.sql_with_params()
+    sql = (
+        "SELECT spec.key, spec.value #>> '{}' AS value, COUNT(*) AS total "
+        f"FROM {queryset.model._meta.db_table} p, jsonb_each("
+        "CASE WHEN jsonb_typeof(p.specifications) = 'object' THEN p.specifications ELSE '{}'::jsonb END"
+        ") AS spec "
+        f"WHERE p.id IN ({products_sql}) "
+        "AND jsonb_typeof(spec.value) IN ('string', 'number', 'boolean') "
+        "GROUP BY spec.key, value "
+        "ORDER BY spec.key, total DESC, value"
+    )
+    facets: Dict[str, List[dict]] = {}
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        for key, value, total in cursor.fetchall():
+            values = facets.setdefault(key, [])
+            if len(values) < MAX_FACET_VALUES and value != '':
+                values.append({'value': value, 'count': total})
+    return facets
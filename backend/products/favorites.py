@@ -0,0 +1,71 @@
+"""
+Favoritos em lote
+- favorited_among(): quais de uma lista de produtos o usuário favoritou,
+  numa só consulta (product_id IN (...)) — o endpoint favorites/check/
+- favorite_product_ids(): o conjunto de ids favoritos do usuário, no cache,
+  para os serializers de listas emitirem is_favorited sem consultas por
+  produto, só ativo por omissão com o cache partilhado em Redis
+  (FAVORITES_CACHE_SECONDS). A chave inclui uma geração por usuário que
+  forget_favorites() incrementa a cada favorito criado/removido
+  (products.signals): um conjunto lido antes de uma mudança fica gravado
+  numa geração que já ninguém lê, em vez de tapar a mudança
+"""
+import time
+from typing import FrozenSet, Iterable, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Favorite
+
+FAVORITES_CACHE_PREFIX = 'favorites:user'
+
+
+def _generation_key(user_id: int) -> str:
+    return f'{FAVORITES_CACHE_PREFIX}:{user_id}:generation'
+
+
+def _generation(user_id: int) -> int:
+    key = _generation_key(user_id)
+    generation = cache.get(key)
+    if generation is None:
+        # Valor inicial baseado no relógio: uma geração despejada não reutiliza conjuntos antigos
+        cache.add(key, int(time.time() * 1000), timeout=None)
+        generation = cache.get(key)
+    return generation
+
+
+def favorited_among(user, product_ids: Iterable[int]) -> List[int]:
+    """Ids de `product_ids` que estão nos favoritos do usuário"""
+    product_ids = set(product_ids)
+    if user is None or not user.is_authenticated or not product_ids:
+        return []
+    return sorted(
+        Favorite.objects.filter(user=user, product_id__in=product_ids).values_list('product_id', flat=True)
+    )
+
+
+def favorite_product_ids(user) -> FrozenSet[int]:
+    """Todos os ids de produtos favoritos do usuário (vazio para anónimos)"""
+    if user is None or not user.is_authenticated:
+        return frozenset()
+    timeout = settings.FAVORITES_CACHE_SECONDS
+    if not timeout:
+        return frozenset(Favorite.objects.filter(user=user).values_list('product_id', flat=True))
+    # Geração lida antes da consulta: uma mudança a meio invalida o que se vai gravar
+    key = f'{FAVORITES_CACHE_PREFIX}:{user.pk}:{_generation(user.pk)}'
+    product_ids = cache.get(key)
+    if product_ids is None:
+        product_ids = frozenset(Favorite.objects.filter(user=user).values_list('product_id', flat=True))
+        cache.add(key, product_ids, timeout)
+    return product_ids
+
+
+def forget_favorites(user_id: Optional[int]) -> None:
+    if user_id is None:
+        return
+    try:
+        cache.incr(_generation_key(user_id))
+    except ValueError:
+        # Sem geração no cache: a próxima leitura cria uma nova
+        pass
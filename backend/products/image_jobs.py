@@ -0,0 +1,165 @@
+"""Fila de processamento de imagens fora do request.
+
+Os signals de Product/ProductImage apenas enfileiram (caminho, mtime) quando
+um campo de imagem muda; o comando `process_image_jobs` consome a fila, gera
+as variantes (products.derivatives) num pool de processos e grava o manifest
+resultante nas linhas que usam o ficheiro.
+"""
+import logging
+import os
+from datetime import timedelta
+from concurrent.futures import Executor
+from typing import Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .derivatives import attach_manifest, build_derivatives
+from .models import ImageJob
+
+logger = logging.getLogger(__name__)
+
+PRODUCT_IMAGE_FIELDS = ['main_image', 'image_2', 'image_3', 'image_4']
+
+# Tentativas antes de um job ficar como 'failed'
+MAX_ATTEMPTS = 3
+
+
+def _file_name(instance, field: str) -> str:
+    # Lê o valor bruto: evita criar FieldFile para cada instância carregada
+    value = instance.__dict__.get(field)
+    return getattr(value, 'name', value) or ''
+
+
+def snapshot_image_names(instance, fields: Iterable[str]) -> None:
+    """Guarda os nomes atuais dos campos de imagem (chamado em post_init)"""
+    instance._image_names = {field: _file_name(instance, field) for field in fields}
+
+
+def changed_image_fields(instance, fields: Iterable[str], created: bool, update_fields=None) -> List[str]:
+    """Campos de imagem alterados desde o carregamento da instância"""
+    if update_fields is not None and not set(fields) & set(update_fields):
+        return []
+
+    original = getattr(instance, '_image_names', {})
+    changed = []
+    for field in fields:
+        name = _file_name(instance, field)
+        if name and (created or original.get(field, '') != name):
+            changed.append(field)
+    return changed
+
+
+def enqueue_image(path: str) -> Optional[ImageJob]:
+    """Enfileira a geração de variantes para a versão atual do ficheiro"""
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+
+    job, _ = ImageJob.objects.get_or_create(path=path, source_mtime=mtime)
+    return job
+
+
+def enqueue_field_files(instance, fields: Iterable[str]) -> None:
+    """
+    Enfileira os ficheiros dos campos indicados após o commit da transação.
+    Com IMAGE_PROCESSING_ASYNC=False (ex: desenvolvimento sem worker) as
+    variantes são geradas na hora, como antes.
+    """
+    paths = []
+    for field in fields:
+        file_field = getattr(instance, field, None)
+        try:
+            if file_field and getattr(file_field, 'path', None):
+                paths.append(file_field.path)
+        except Exception:
+            # Storage sem caminho local
+            continue
+
+    if not paths:
+        return
+
+    if not getattr(settings, 'IMAGE_PROCESSING_ASYNC', True):
+        for path in paths:
+            error, manifest = process_image(path)
+            if error:
+                logger.warning(f"⚠️ Falha ao processar imagem {path}: {error}")
+            elif manifest:
+                attach_manifest(path, manifest)
+        return
+
+    def _enqueue():
+        for path in paths:
+            enqueue_image(path)
+
+    transaction.on_commit(_enqueue)
+
+
+def claim_jobs(limit: int) -> List[ImageJob]:
+    """
+    Reserva até `limit` jobs pendentes (SKIP LOCKED permite vários workers).
+    Jobs 'running' parados há mais de IMAGE_JOB_STALE_MINUTES são retomados.
+    """
+    stale_before = timezone.now() - timedelta(minutes=settings.IMAGE_JOB_STALE_MINUTES)
+    with transaction.atomic():
+        jobs = list(
+            ImageJob.objects.select_for_update(skip_locked=True).filter(
+                Q(status='pending') | Q(status='running', updated_at__lt=stale_before)
+            ).order_by('created_at')[:limit]
+        )
+        if jobs:
+            ImageJob.objects.filter(id__in=[job.id for job in jobs]).update(
+                status='running', attempts=F('attempts') + 1, updated_at=timezone.now()
+            )
+    return jobs
+
+
+def process_image(path: str) -> Tuple[Optional[str], Optional[dict]]:
+    """Executado nos processos do pool: gera as variantes e devolve (erro, manifest)"""
+    if not os.path.exists(path):
+        return 'Ficheiro não encontrado', None
+    try:
+        return None, build_derivatives(path)
+    except Exception as e:
+        return str(e), None
+
+
+def run_jobs(jobs: List[ImageJob], executor: Optional[Executor] = None) -> dict:
+    """Processa os jobs (no pool, se fornecido) e grava o resultado de cada um"""
+    paths = [job.path for job in jobs]
+    if executor is not None:
+        outcomes = list(executor.map(process_image, paths))
+    else:
+        outcomes = [process_image(path) for path in paths]
+
+    done_ids, result = [], {'done': 0, 'failed': 0, 'retry': 0}
+    for job, (error, manifest) in zip(jobs, outcomes):
+        if error is None:
+            if manifest:
+                attach_manifest(job.path, manifest)
+            done_ids.append(job.id)
+            result['done'] += 1
+            continue
+
+        # job.attempts ainda tem o valor anterior ao claim
+        final = job.attempts + 1 >= MAX_ATTEMPTS
+        ImageJob.objects.filter(id=job.id).update(
+            status='failed' if final else 'pending', error=error, updated_at=timezone.now()
+        )
+        result['failed' if final else 'retry'] += 1
+        logger.warning(f"⚠️ Falha ao processar imagem {job.path}: {error}")
+
+    if done_ids:
+        ImageJob.objects.filter(id__in=done_ids).update(status='done', error='', updated_at=timezone.now())
+    return result
+
+
+def purge_finished_jobs(days: int = 7) -> int:
+    """Remove jobs concluídos há mais de `days` dias"""
+    deleted, _ = ImageJob.objects.filter(
+        status='done', updated_at__lt=timezone.now() - timedelta(days=days)
+    ).delete()
+    return deleted
@@ -5,54 +5,70 @@ from PIL import Image
 
 TARGET_WIDTHS = [320, 640, 1024]
 
+# Esforço do encoder WebP (0-6). 6 é ~2x mais lento que 4 para ganhos de
+# poucos bytes; as variantes são geradas em lote pelo worker.
+WEBP_METHOD = 4
+
 
 def _variant_path(original_path: str, width: int, ext: str = "webp") -> str:
     base, _ = os.path.splitext(original_path)
     return f"{base}-{width}.{ext}"
 
 
+def _is_fresh(variant: str, src_mtime: float) -> bool:
+    try:
+        return os.path.exists(variant) and os.path.getmtime(variant) >= src_mtime
+    except Exception:
+        return False
+
+
 def generate_webp_variants(image_path: str) -> None:
     """Generate WebP variants at multiple widths for a given image path.
 
     Creates files alongside the original with the pattern: name-<width>.webp
     Skips generation if the variant exists and is newer than the source.
+
+    The source is decoded once (JPEG decoding is already reduced with draft()
+    to the largest needed size) and each variant is resized from the previous,
+    larger one instead of from the full-resolution original.
     """
     try:
         if not image_path or not os.path.exists(image_path):
             return
 
-        with Image.open(image_path) as img:
-            # Convert to RGB to avoid issues with PNG/CMYK, etc.
-            if img.mode not in ("RGB", "RGBA"):
-                img = img.convert("RGB")
+        src_mtime = os.path.getmtime(image_path)
+        pending = [w for w in TARGET_WIDTHS if not _is_fresh(_variant_path(image_path, w, "webp"), src_mtime)]
+        if not pending:
+            return
 
+        with Image.open(image_path) as img:
             orig_w, orig_h = img.size
             if orig_w == 0 or orig_h == 0:
                 return
 
-            for w in TARGET_WIDTHS:
+            # Let the JPEG decoder downscale by 1/2, 1/4 or 1/8 while decoding
+            largest = min(max(pending), orig_w)
+            img.draft("RGB", (largest, max(1, int(orig_h * largest / float(orig_w)))))
+
+            # Convert to RGB to avoid issues with PNG/CMYK, etc.
+            current = img if img.mode in ("RGB", "RGBA") else img.convert("RGB")
+            current.load()
+
+            # Progressive downscale: largest width first, each step from the previous
+            for w in sorted(pending, reverse=True):
                 # Keep the filename as requested width to match frontend URLs,
                 # but never upscale the actual image content beyond original width
-                target_w = min(w, orig_w)
-                variant = _variant_path(image_path, w, "webp")
-                try:
-                    src_mtime = os.path.getmtime(image_path)
-                    if os.path.exists(variant) and os.path.getmtime(variant) >= src_mtime:
-                        continue
-                except Exception:
-                    pass
-
-                # Create resized copy preserving aspect ratio
-                ratio = target_w / float(orig_w)
-                h = int(orig_h * ratio)
-                resized = img.resize((target_w, h), Image.LANCZOS)
+                target_w = min(w, orig_w, current.width)
+                h = max(1, int(orig_h * target_w / float(orig_w)))
+                if (target_w, h) != current.size:
+                    current = current.resize((target_w, h), Image.LANCZOS, reducing_gap=3.0)
 
                 # Save as WebP with reasonable quality
-                params = {"format": "WEBP", "quality": 80, "method": 6}
+                params = {"format": "WEBP", "quality": 80, "method": WEBP_METHOD}
                 # Preserve transparency where applicable
-                if resized.mode == "RGBA":
+                if current.mode == "RGBA":
                     params["lossless"] = False
-                resized.save(variant, **params)
+                current.save(_variant_path(image_path, w, "webp"), **params)
     except Exception:
-        # Fail-safe: never break the request path due to optimization issues
+        # Fail-safe: never break the caller due to optimization issues
         return
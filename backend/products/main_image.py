@@ -0,0 +1,57 @@
+"""
+Imagem principal resolvida de cada produto, desnormalizada em
+Product.resolved_main_image ({'name': <ficheiro>, 'variants': <manifest>}).
+
+A regra é a mesma de Product.get_main_image: ProductImage marcada como
+principal, senão a primeira ProductImage, senão o campo legado main_image.
+Os signals de ProductImage/Product mantêm a coluna atualizada; o comando
+`rebuild_main_images` recalcula todos os produtos.
+"""
+from typing import Dict, Iterable
+
+from .catalog import bump_catalog_version
+from .models import Product, ProductImage
+
+
+def resolve_main_images(product_ids: Iterable[int]) -> Dict[int, dict]:
+    """Calcula a imagem principal dos produtos com duas consultas"""
+    product_ids = list(product_ids)
+    resolved = {}
+
+    images = ProductImage.objects.filter(product_id__in=product_ids).order_by(
+        'product_id', '-is_main', 'order', 'created_at', 'id'
+    ).values_list('product_id', 'image', 'variants')
+    for product_id, name, variants in images:
+        if product_id not in resolved and name:
+            resolved[product_id] = {'name': name, 'variants': variants or {}}
+
+    missing = [pk for pk in product_ids if pk not in resolved]
+    legacy = Product.objects.filter(pk__in=missing).values_list('pk', 'main_image', 'image_variants')
+    for product_id, name, variants in legacy:
+        if name:
+            resolved[product_id] = {'name': name, 'variants': (variants or {}).get('main_image', {})}
+        else:
+            resolved[product_id] = {}
+    return resolved
+
+
+def refresh_main_images(product_ids: Iterable[int]) -> Dict[int, dict]:
+    """
+    Grava a imagem principal resolvida (update direto, sem disparar signals)
+    e devolve os valores calculados por produto
+    """
+    product_ids = {pk for pk in product_ids if pk}
+    if not product_ids:
+        return {}
+
+    current = dict(Product.objects.filter(pk__in=product_ids).values_list('pk', 'resolved_main_image'))
+    resolved = resolve_main_images(current)
+    changed = False
+    for product_id, value in resolved.items():
+        if current.get(product_id) != value:
+            Product.objects.filter(pk=product_id).update(resolved_main_image=value)
+            changed = True
+    if changed:
+        # update() não dispara signals (ex: rebuild_main_images, worker de imagens)
+        bump_catalog_version()
+    return resolved
@@ -0,0 +1,164 @@
+"""
+Micro-benchmark do JSON da API: JSONRenderer/JSONParser do DRF vs
+ORJSONRenderer/ORJSONParser (chiva_backend.renderers / parsers)
+Os payloads são os das listas reais: uma página de produtos
+(ProductListSerializer) e uma página de pedidos (OrderSerializer, com itens).
+Só a codificação/decodificação é medida — os serializers correm uma vez antes.
+Também confirma que as duas implementações geram exatamente os mesmos bytes.
+Uso: python manage.py benchmark_json_rendering [--products 100] [--orders 50] [--iterations 200]
+Se o banco tiver menos linhas do que o pedido, cria produtos/pedidos
+temporários dentro de uma transação que é desfeita no fim.
+"""
+import io
+import statistics
+import time
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from cart.models import Order, OrderItem
+from cart.serializers import OrderSerializer
+from chiva_backend import renderers
+from chiva_backend.parsers import ORJSONParser
+from chiva_backend.renderers import ORJSONRenderer
+from products.models import Category, Color, Product
+from products.serializers import ProductListSerializer
+
+BENCHMARK_PREFIX = 'benchmark-json'
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Compara o tempo de render/parse JSON do DRF com o orjson em listas de produtos e pedidos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=100, help='Produtos no payload da lista')
+        parser.add_argument('--orders', type=int, default=50, help='Pedidos no payload da lista')
+        parser.add_argument('--iterations', type=int, default=200, help='Repetições medidas por caso')
+
+    def handle(self, *args, **options):
+        if renderers.orjson is None:
+            raise CommandError('orjson não está instalado (requirements.txt)')
+        try:
+            with transaction.atomic():
+                payloads = self._payloads(options['products'], options['orders'])
+                raise _Rollback
+        except _Rollback:
+            pass
+
+        iterations = max(1, options['iterations'])
+        for label, data in payloads.items():
+            expected = JSONRenderer().render(data)
+            if ORJSONRenderer().render(data) != expected:
+                raise CommandError(f'{label}: o ORJSONRenderer gerou bytes diferentes do JSONRenderer')
+            self.stdout.write(f'{label} ({len(expected) / 1024:.0f} KiB)')
+            self._compare('render', iterations,
+                          lambda: JSONRenderer().render(data),
+                          lambda: ORJSONRenderer().render(data))
+            self._compare('parse', iterations,
+                          lambda: JSONParser().parse(io.BytesIO(expected)),
+                          lambda: ORJSONParser().parse(io.BytesIO(expected)))
+
+    def _compare(self, label, iterations, baseline, candidate):
+        before = self._time(baseline, iterations)
+        after = self._time(candidate, iterations)
+        self.stdout.write(
+            f'  {label:<7} DRF {before:8.3f} ms   orjson {after:8.3f} ms   '
+            + self.style.SUCCESS(f'{before / after:5.1f}x')
+        )
+
+    @staticmethod
+    def _time(fn, iterations):
+        for _ in range(min(10, iterations)):
+            fn()
+        samples = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            fn()
+            samples.append((time.perf_counter() - started) * 1000)
+        return statistics.median(samples)
+
+    def _payloads(self, product_count, order_count):
+        self._ensure_products(product_count)
+        self._ensure_orders(order_count)
+        products = (
+            Product.objects.filter(status='active')
+            .select_related('category', 'subcategory')
+            .prefetch_related('colors')
+            .order_by('-created_at')[:product_count]
+        )
+        orders = (
+            Order.objects.select_related('user')
+            .prefetch_related('items')
+            .order_by('-created_at')[:order_count]
+        )
+        return {
+            f'lista de produtos ({product_count})': {
+                'count': product_count,
+                'next': None,
+                'previous': None,
+                'results': ProductListSerializer(products, many=True).data,
+            },
+            f'lista de pedidos ({order_count})': {
+                'orders': OrderSerializer(orders, many=True).data,
+                'pagination': {'page': 1, 'page_size': order_count, 'total': order_count, 'next_cursor': None},
+            },
+        }
+
+    def _ensure_products(self, count):
+        missing = count - Product.objects.filter(status='active').count()
+        if missing <= 0:
+            return
+        category = Category.objects.create(name=f'{BENCHMARK_PREFIX} category')
+        colors = [
+            Color.objects.create(name=f'{BENCHMARK_PREFIX} {name}', hex_code=hex_code)
+            for name, hex_code in (('preto', '#000000'), ('prata', '#C0C0C0'), ('azul', '#1E40AF'))
+        ]
+        for index in range(missing):
+            product = Product.objects.create(
+                name=f'Portátil {BENCHMARK_PREFIX} {index} 15.6" 16GB RAM 512GB SSD',
+                description='Processador de 8 núcleos, ecrã Full HD, Wi-Fi 6 e garantia de 12 meses. ' * 4,
+                short_description='Portátil para trabalho e estudo',
+                category=category,
+                sku=f'{BENCHMARK_PREFIX}-{index}',
+                price=Decimal('45999.90') + index,
+                original_price=Decimal('52999.00') + index,
+                stock_quantity=index % 40,
+                status='active',
+            )
+            product.colors.set(colors[: 1 + index % len(colors)])
+
+    def _ensure_orders(self, count):
+        missing = count - Order.objects.count()
+        if missing <= 0:
+            return
+        user = User.objects.create(username=f'{BENCHMARK_PREFIX}-user', email=f'{BENCHMARK_PREFIX}@example.com')
+        products = list(Product.objects.order_by('-created_at')[:3])
+        for index in range(missing):
+            order = Order.objects.create(
+                user=user,
+                order_number=f'{BENCHMARK_PREFIX}-{index}',
+                total_amount=Decimal('98249.70'),
+                shipping_cost=Decimal('350.00'),
+                status='paid',
+                shipping_method='standard',
+                shipping_address={
+                    'name': 'Cliente Benchmark', 'email': f'{BENCHMARK_PREFIX}@example.com',
+                    'phone': '+258840000000', 'address': 'Av. 24 de Julho, 100',
+                    'city': 'Maputo', 'province': 'Maputo',
+                },
+                billing_address={},
+            )
+            for position, product in enumerate(products):
+                OrderItem.objects.create(
+                    order=order, product=product, product_name=product.name, sku=product.sku or '',
+                    quantity=1 + position, unit_price=product.price, subtotal=product.price * (1 + position),
+                    weight=Decimal('2.10'), dimensions='36x25x2',
+                )
@@ -0,0 +1,30 @@
+"""
+Gera os sitemaps em MEDIA_ROOT/sitemaps/ (índice + ficheiros de até
+SITEMAP_URLS_PER_FILE URLs). Só os ficheiros cujo conteúdo mudou são reescritos.
+Uso: python manage.py generate_sitemaps [--base-url https://...] [--force]
+(ex: via cron; o /sitemap.xml também regenera sozinho quando o catálogo muda)
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from products.sitemaps import generate_sitemaps, generation_lock, sitemap_base_url
+
+
+class Command(BaseCommand):
+    help = 'Gera os sitemaps (índice + fragmentos) em disco, reescrevendo só os que mudaram'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', help='Base absoluta dos URLs (por omissão SITEMAP_BASE_URL)')
+        parser.add_argument('--force', action='store_true', help='Reescreve todos os ficheiros')
+
+    def handle(self, *args, **options):
+        try:
+            base_url = options['base_url'] or sitemap_base_url()
+        except ValueError as exc:
+            raise CommandError(f'{exc} (use --base-url)')
+        # Espera por uma geração em curso noutro processo
+        with generation_lock():
+            result = generate_sitemaps(base_url, force=options['force'])
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Sitemaps: {result.urls} URLs em {len(result.files)} ficheiros '
+            f'({len(result.written)} reescritos, {len(result.removed)} removidos)'
+        ))
@@ -0,0 +1,75 @@
+"""
+Worker de geração de variantes de imagem (fila ImageJob)
+Uso: python manage.py process_image_jobs              (loop contínuo)
+     python manage.py process_image_jobs --once       (esvazia a fila e termina)
+     python manage.py process_image_jobs --workers 4  (processos do pool)
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from products.image_jobs import claim_jobs, run_jobs, purge_finished_jobs
+
+
+class Command(BaseCommand):
+    help = 'Gera as variantes WebP das imagens enfileiradas (ImageJob)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=max(1, (os.cpu_count() or 2) - 1),
+            help='Processos para o processamento de imagens (padrão: CPUs - 1)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Jobs reservados por ciclo (padrão: 4 x workers)',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Processa os jobs pendentes e termina',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=2.0,
+            help='Segundos entre verificações da fila quando vazia (padrão: 2)',
+        )
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        batch_size = options['batch_size'] or workers * 4
+
+        self.stdout.write(f'🖼️  Worker de imagens iniciado ({workers} processos)')
+        purged = purge_finished_jobs()
+        if purged:
+            self.stdout.write(f'🧹 {purged} jobs concluídos removidos')
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            try:
+                while True:
+                    close_old_connections()
+                    jobs = claim_jobs(batch_size)
+                    if not jobs:
+                        if options['once']:
+                            break
+                        time.sleep(options['interval'])
+                        continue
+
+                    started = time.monotonic()
+                    result = run_jobs(jobs, executor)
+                    elapsed = time.monotonic() - started
+                    message = f"✅ {result['done']} imagens processadas em {elapsed:.1f}s"
+                    if result['retry']:
+                        message += f" ({result['retry']} para nova tentativa)"
+                    self.stdout.write(message)
+                    if result['failed']:
+                        self.stdout.write(self.style.ERROR(f"❌ {result['failed']} imagens falharam"))
+            except KeyboardInterrupt:
+                self.stdout.write('Worker interrompido')
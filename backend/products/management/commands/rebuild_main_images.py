@@ -0,0 +1,24 @@
+"""
+Recalcula a imagem principal desnormalizada (Product.resolved_main_image)
+de todos os produtos
+Uso: python manage.py rebuild_main_images [--chunk-size 1000] [--dry-run] [--restart]
+"""
+from cart.backfill import Backfill, BackfillCommand
+from products.main_image import refresh_main_images
+from products.models import Product
+
+
+class MainImageBackfill(Backfill):
+    name = 'products.main_image'
+    chunk_size = 1000
+
+    def queryset(self):
+        return Product.objects.only('id')
+
+    def process(self, rows, executor=None):
+        return len(refresh_main_images(row.pk for row in rows))
+
+
+class Command(BackfillCommand):
+    help = 'Recalcula a imagem principal resolvida de todos os produtos'
+    backfill_classes = (MainImageBackfill,)
@@ -0,0 +1,19 @@
+"""
+Recalcula as métricas do catálogo (CatalogMetrics) usadas por product_stats
+e pelo relatório de stock
+Uso: python manage.py refresh_catalog_metrics   (ex: via cron, a cada hora)
+"""
+from django.core.management.base import BaseCommand
+
+from products.metrics import refresh_catalog_metrics
+
+
+class Command(BaseCommand):
+    help = 'Recalcula as métricas agregadas do catálogo numa única passagem'
+
+    def handle(self, *args, **options):
+        metrics = refresh_catalog_metrics()
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Métricas atualizadas: {metrics.total_products} produtos, '
+            f'{metrics.out_of_stock_products} sem stock, {metrics.low_stock_products} com stock baixo'
+        ))
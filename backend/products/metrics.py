@@ -0,0 +1,63 @@
+"""
+Métricas do catálogo (product_stats e relatório de stock)
+Guardadas numa única linha de CatalogMetrics. Alterações de produtos,
+categorias e movimentos de stock marcam a linha como suja (um UPDATE);
+a leitura seguinte recalcula todas as métricas numa passagem com
+agregação condicional, para que os dois dashboards mostrem os mesmos números.
+"""
+from decimal import Decimal
+
+from django.db.models import Avg, Count, DecimalField, F, Q, Sum
+from django.utils import timezone
+
+from .models import CatalogMetrics, Category, Product
+
+METRICS_PK = 1
+
+LOW_STOCK = Q(stock_quantity__lte=F('min_stock_level'), stock_quantity__gt=0)
+
+
+def compute_catalog_metrics() -> dict:
+    """Todas as métricas de Product numa única consulta + contagem de categorias"""
+    active = Q(status='active')
+    metrics = Product.objects.aggregate(
+        total_products=Count('id'),
+        active_products=Count('id', filter=active),
+        inactive_products=Count('id', filter=Q(status='inactive')),
+        out_of_stock_products=Count('id', filter=Q(stock_quantity=0)),
+        low_stock_products=Count('id', filter=LOW_STOCK),
+        featured_products=Count('id', filter=Q(is_featured=True)),
+        bestsellers=Count('id', filter=Q(is_bestseller=True)),
+        products_on_sale=Count('id', filter=Q(is_on_sale=True)),
+        average_price=Avg('price', filter=active),
+        total_stock_value=Sum(
+            F('price') * F('stock_quantity'), filter=active,
+            output_field=DecimalField(max_digits=16, decimal_places=2),
+        ),
+    )
+    metrics['average_price'] = (metrics['average_price'] or Decimal('0')).quantize(Decimal('0.01'))
+    metrics['total_stock_value'] = metrics['total_stock_value'] or Decimal('0.00')
+    metrics['categories_count'] = Category.objects.count()
+    return metrics
+
+
+def refresh_catalog_metrics() -> CatalogMetrics:
+    """Recalcula e grava a linha de métricas"""
+    CatalogMetrics.objects.get_or_create(pk=METRICS_PK)
+    # Limpa o flag antes de calcular: alterações durante o cálculo voltam a sujá-lo
+    CatalogMetrics.objects.filter(pk=METRICS_PK).update(dirty=False)
+    metrics = compute_catalog_metrics()
+    CatalogMetrics.objects.filter(pk=METRICS_PK).update(computed_at=timezone.now(), **metrics)
+    return CatalogMetrics.objects.get(pk=METRICS_PK)
+
+
+def get_catalog_metrics() -> CatalogMetrics:
+    """Linha de métricas atual (recalculada se houve alterações desde o último cálculo)"""
+    row = CatalogMetrics.objects.filter(pk=METRICS_PK).first()
+    if row is None or row.dirty:
+        row = refresh_catalog_metrics()
+    return row
+
+
+def mark_catalog_metrics_dirty() -> None:
+    CatalogMetrics.objects.filter(pk=METRICS_PK, dirty=False).update(dirty=True)
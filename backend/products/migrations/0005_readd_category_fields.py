@@ -6,8 +6,10 @@ As colunas `is_active` e `order` já existem no banco (erro de DuplicateColumn e
 Objetivo: apenas registrar no histórico de migrações sem tentar recriá-las.
 
 Estratégia:
- - Usar migrations.SeparateDatabaseAndState: no database_operations deixamos vazio
-   e no state_operations adicionamos os campos para que o ORM reconheça.
+ - Usar migrations.SeparateDatabaseAndState: no database_operations usamos
+   ADD COLUMN IF NOT EXISTS (no-op onde as colunas já existem, cria-as em bancos
+   novos como o de testes) e no state_operations adicionamos os campos para que
+   o ORM reconheça.
 """
 
 class Migration(migrations.Migration):
@@ -17,7 +19,16 @@ class Migration(migrations.Migration):
 
     operations = [
         migrations.SeparateDatabaseAndState(
-            database_operations=[],
+            database_operations=[
+                migrations.RunSQL(
+                    sql=(
+                        'ALTER TABLE "products_category" '
+                        'ADD COLUMN IF NOT EXISTS "is_active" boolean NOT NULL DEFAULT true, '
+                        'ADD COLUMN IF NOT EXISTS "order" integer NOT NULL DEFAULT 0 CHECK ("order" >= 0);'
+                    ),
+                    reverse_sql=migrations.RunSQL.noop,
+                ),
+            ],
             state_operations=[
                 migrations.AddField(
                     model_name='category',
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 15:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0014_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='resolved_main_image',
+            field=models.JSONField(blank=True, editable=False, null=True, verbose_name='Imagem Principal Resolvida'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 15:52
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0015_product_resolved_main_image'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['specifications'], name='product_specs_gin', opclasses=['jsonb_path_ops']),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-19 15:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0016_product_specs_gin'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogMetrics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_products', models.PositiveIntegerField(default=0)),
+                ('active_products', models.PositiveIntegerField(default=0)),
+                ('inactive_products', models.PositiveIntegerField(default=0)),
+                ('out_of_stock_products', models.PositiveIntegerField(default=0)),
+                ('low_stock_products', models.PositiveIntegerField(default=0)),
+                ('featured_products', models.PositiveIntegerField(default=0)),
+                ('bestsellers', models.PositiveIntegerField(default=0)),
+                ('products_on_sale', models.PositiveIntegerField(default=0)),
+                ('average_price', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('total_stock_value', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('categories_count', models.PositiveIntegerField(default=0)),
+                ('dirty', models.BooleanField(default=True)),
+                ('computed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Métricas do Catálogo',
+                'verbose_name_plural': 'Métricas do Catálogo',
+            },
+        ),
+    ]
@@ -1,4 +1,6 @@
 from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.core.files.storage import default_storage
 from django.utils import timezone
 from django.utils.text import slugify
 from django.core.validators import MinValueValidator, MaxValueValidator
@@ -156,6 +158,10 @@ class Product(models.Model):
     image_2 = models.ImageField(upload_to=product_image_upload_path, blank=True, null=True, verbose_name="Imagem 2")
     image_3 = models.ImageField(upload_to=product_image_upload_path, blank=True, null=True, verbose_name="Imagem 3")
     image_4 = models.ImageField(upload_to=product_image_upload_path, blank=True, null=True, verbose_name="Imagem 4")
+    # Manifest das variantes geradas (products.derivatives), por campo de imagem
+    image_variants = models.JSONField(default=dict, blank=True, editable=False, verbose_name="Variantes das Imagens")
+    # Imagem principal resolvida ({'name', 'variants'}), mantida pelos signals (products.main_image)
+    resolved_main_image = models.JSONField(null=True, blank=True, editable=False, verbose_name="Imagem Principal Resolvida")
     
     # Technical Specifications (JSON field for flexibility)
     specifications = models.JSONField(default=dict, blank=True, verbose_name="Especificações Técnicas")
@@ -193,6 +199,8 @@ class Product(models.Model):
             models.Index(fields=['is_featured']),
             models.Index(fields=['is_bestseller']),
             models.Index(fields=['created_at']),
+            # Filtros ?spec.<chave>= (specifications @> {...}), ver products.facets
+            GinIndex(fields=['specifications'], name='product_specs_gin', opclasses=['jsonb_path_ops']),
         ]
     
     def __str__(self):
@@ -244,15 +252,16 @@ class Product(models.Model):
     
     @property
     def final_price(self):
-        """Get the final price (considering sales)"""
-        return self.price
+        """Get the final price (sale price + public promotions, see promotions.pricing)"""
+        from promotions.pricing import price_products
+        return price_products([self])[self.pk].price if self.pk else self.price
     
     def get_all_images(self):
         """Get all product images including ProductImage instances"""
         images = []
         
-        # Add images from ProductImage model (ordered)
-        for img in self.images.all().order_by('order'):
+        # Add images from ProductImage model (Meta ordering, so prefetched images are reused)
+        for img in self.images.all():
             images.append(img.image.url)
         
         # Add legacy image fields if they exist and aren't already included
@@ -265,21 +274,19 @@ class Product(models.Model):
     
     def get_main_image(self):
         """Get the main product image"""
-        # First check ProductImage model for main image
-        main_image = self.images.filter(is_main=True).first()
-        if main_image:
-            return main_image.image.url
+        return self.resolve_main_image()[0]
+    
+    def resolve_main_image(self):
+        """Get (url, variants manifest) of the main product image"""
+        resolved = self.resolved_main_image
+        if resolved is None:
+            # Not denormalized yet (see rebuild_main_images): resolve from the images
+            from .main_image import resolve_main_images
+            resolved = resolve_main_images([self.pk]).get(self.pk, {}) if self.pk else {}
         
-        # Fall back to first ProductImage if no main is set
-        first_image = self.images.first()
-        if first_image:
-            return first_image.image.url
-        
-        # Fall back to legacy main_image field
-        if self.main_image:
-            return self.main_image.url
-        
-        return None
+        if not resolved.get('name'):
+            return None, {}
+        return default_storage.url(resolved['name']), resolved.get('variants') or {}
     
     def increment_view_count(self):
         """Increment view count"""
@@ -313,6 +320,8 @@ class ProductImage(models.Model):
     alt_text = models.CharField(max_length=200, blank=True, verbose_name="Texto Alternativo")
     is_main = models.BooleanField(default=False, verbose_name="Imagem Principal")
     order = models.PositiveIntegerField(default=0, verbose_name="Ordem")
+    # Manifest das variantes geradas (products.derivatives)
+    variants = models.JSONField(default=dict, blank=True, editable=False, verbose_name="Variantes")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Criado em")
     
     class Meta:
@@ -336,12 +345,12 @@ class ProductImage(models.Model):
             else:
                 self.order = 1
         
-        # Save the instance first
-        super().save(*args, **kwargs)
-        
         # If this is set as main image, unset other main images for this product
+        # before saving, so post_save handlers see a single main image
         if self.is_main and self.product:
             ProductImage.objects.filter(product=self.product, is_main=True).exclude(id=self.id).update(is_main=False)
+        
+        super().save(*args, **kwargs)
 
 
 class Favorite(models.Model):
@@ -439,3 +448,70 @@ class ReviewHelpfulVote(models.Model):
 
     def __str__(self):
         return f"{self.user_id} votou útil na review {self.review_id}"
+
+
+class ImageJob(models.Model):
+    """Fila de geração de variantes de imagem (processada por `process_image_jobs`).
+
+    Cada job identifica a imagem pelo caminho e pelo mtime do ficheiro no
+    momento em que foi enfileirado, por isso reenfileirar a mesma versão é
+    idempotente e uma nova versão do ficheiro gera um novo job.
+    """
+
+    STATUS_CHOICES = [
+        ('pending', 'Pendente'),
+        ('running', 'Em processamento'),
+        ('done', 'Concluído'),
+        ('failed', 'Falhou'),
+    ]
+
+    path = models.CharField(max_length=500, verbose_name="Caminho")
+    source_mtime = models.FloatField(verbose_name="mtime da origem")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', verbose_name="Status")
+    attempts = models.PositiveIntegerField(default=0, verbose_name="Tentativas")
+    error = models.TextField(blank=True, verbose_name="Erro")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Criado em")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Atualizado em")
+
+    class Meta:
+        verbose_name = "Job de Imagem"
+        verbose_name_plural = "Jobs de Imagem"
+        ordering = ['created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['path', 'source_mtime'], name='unique_image_job_version'),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.path} ({self.get_status_display()})"
+
+
+class CatalogMetrics(models.Model):
+    """Métricas agregadas do catálogo para os dashboards (linha única, ver products.metrics).
+
+    Os signals de Product/Category/StockMovement apenas marcam a linha como
+    `dirty`; a próxima leitura recalcula tudo numa única passagem.
+    """
+
+    total_products = models.PositiveIntegerField(default=0)
+    active_products = models.PositiveIntegerField(default=0)
+    inactive_products = models.PositiveIntegerField(default=0)
+    out_of_stock_products = models.PositiveIntegerField(default=0)
+    low_stock_products = models.PositiveIntegerField(default=0)
+    featured_products = models.PositiveIntegerField(default=0)
+    bestsellers = models.PositiveIntegerField(default=0)
+    products_on_sale = models.PositiveIntegerField(default=0)
+    average_price = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total_stock_value = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    categories_count = models.PositiveIntegerField(default=0)
+    dirty = models.BooleanField(default=True)
+    computed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Métricas do Catálogo"
+        verbose_name_plural = "Métricas do Catálogo"
+
+    def __str__(self):
+        return f"Métricas do catálogo ({self.computed_at})"
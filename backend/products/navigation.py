@@ -0,0 +1,100 @@
+"""
+Snapshot de navegação do catálogo
+Árvore categoria -> subcategoria com contagem de produtos ativos, faixa de
+preços e marcas, montada com duas consultas agrupadas e guardada já
+serializada (JSON + ETag) no cache sob a versão do catálogo. Qualquer
+alteração de produto/categoria muda a versão e o próximo pedido reconstrói.
+"""
+import hashlib
+import json
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, Max, Min
+
+from .catalog import catalog_cache_key
+from .models import Category, Product, Subcategory
+
+NAVIGATION_CACHE_PREFIX = 'navigation'
+
+
+def _empty_bucket() -> dict:
+    return {'product_count': 0, 'price_min': None, 'price_max': None, 'brands': {}}
+
+
+def _merge(bucket: dict, count: int, price_min, price_max) -> None:
+    bucket['product_count'] += count
+    if price_min is not None and (bucket['price_min'] is None or price_min < bucket['price_min']):
+        bucket['price_min'] = price_min
+    if price_max is not None and (bucket['price_max'] is None or price_max > bucket['price_max']):
+        bucket['price_max'] = price_max
+
+
+def _finish(bucket: dict) -> dict:
+    brands = sorted(bucket['brands'].items(), key=lambda item: (-item[1], item[0].lower()))
+    return {
+        'product_count': bucket['product_count'],
+        'price_min': bucket['price_min'],
+        'price_max': bucket['price_max'],
+        'brands': [{'name': name, 'count': count} for name, count in brands],
+    }
+
+
+def build_navigation() -> dict:
+    """Monta a árvore de navegação (só categorias ativas e produtos ativos)"""
+    categories = list(Category.objects.filter(is_active=True).values('id', 'name', 'description', 'order'))
+    subcategories = list(
+        Subcategory.objects.filter(category__is_active=True).order_by('name').values('id', 'category_id', 'name')
+    )
+
+    active = Product.objects.filter(status='active', category__is_active=True).order_by()
+    category_buckets: Dict[int, dict] = {c['id']: _empty_bucket() for c in categories}
+    subcategory_buckets: Dict[int, dict] = {s['id']: _empty_bucket() for s in subcategories}
+
+    # 1) contagem e faixa de preço por (categoria, subcategoria)
+    for row in active.values('category_id', 'subcategory_id').annotate(
+        count=Count('id'), price_min=Min('price'), price_max=Max('price')
+    ):
+        _merge(category_buckets[row['category_id']], row['count'], row['price_min'], row['price_max'])
+        if row['subcategory_id'] in subcategory_buckets:
+            _merge(subcategory_buckets[row['subcategory_id']], row['count'], row['price_min'], row['price_max'])
+
+    # 2) marcas por (categoria, subcategoria)
+    for row in active.exclude(brand='').values('category_id', 'subcategory_id', 'brand').annotate(count=Count('id')):
+        targets = [category_buckets[row['category_id']]]
+        if row['subcategory_id'] in subcategory_buckets:
+            targets.append(subcategory_buckets[row['subcategory_id']])
+        for bucket in targets:
+            bucket['brands'][row['brand']] = bucket['brands'].get(row['brand'], 0) + row['count']
+
+    children: Dict[int, list] = {}
+    for sub in subcategories:
+        children.setdefault(sub['category_id'], []).append({
+            'id': sub['id'],
+            'name': sub['name'],
+            **_finish(subcategory_buckets[sub['id']]),
+        })
+
+    return {
+        'categories': [
+            {
+                **category,
+                **_finish(category_buckets[category['id']]),
+                'subcategories': children.get(category['id'], []),
+            }
+            for category in categories
+        ],
+    }
+
+
+def get_navigation_snapshot() -> Tuple[bytes, str]:
+    """(JSON serializado, ETag) da versão atual do catálogo"""
+    cache_key = catalog_cache_key(NAVIGATION_CACHE_PREFIX)
+    snapshot: Optional[Tuple[bytes, str]] = cache.get(cache_key)
+    if snapshot is None:
+        body = json.dumps(build_navigation(), cls=DjangoJSONEncoder, ensure_ascii=False).encode('utf-8')
+        snapshot = (body, hashlib.sha1(body).hexdigest())
+        cache.set(cache_key, snapshot, settings.NAVIGATION_CACHE_SECONDS)
+    return snapshot
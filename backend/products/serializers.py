@@ -1,5 +1,8 @@
 from rest_framework import serializers
 from .models import Product, Category, Color, ProductImage, Subcategory, Favorite, Review, ReviewImage, ReviewHelpfulVote
+from .derivatives import srcset_data
+from .favorites import favorite_product_ids
+from promotions.pricing import price_products
 from cart.models import OrderItem
 
 class ColorSerializer(serializers.ModelSerializer):
@@ -14,11 +17,67 @@ class ColorSerializer(serializers.ModelSerializer):
 class ProductImageSerializer(serializers.ModelSerializer):
     """Serializer for ProductImage model"""
     image_url = serializers.CharField(source='image.url', read_only=True)
+    srcset = serializers.SerializerMethodField()
     
     class Meta:
         model = ProductImage
-        fields = ['id', 'product', 'image', 'image_url', 'alt_text', 'is_main', 'order', 'created_at']
-        read_only_fields = ['id', 'created_at', 'image_url']
+        fields = ['id', 'product', 'image', 'image_url', 'srcset', 'alt_text', 'is_main', 'order', 'created_at']
+        read_only_fields = ['id', 'created_at', 'image_url', 'srcset']
+
+    def get_srcset(self, obj):
+        return srcset_data(obj.variants, self.context.get('request'))
+
+
+class MainImageFieldsMixin:
+    """main_image_url + main_image_srcset resolvidos com uma única consulta por produto"""
+
+    def _main_image(self, obj):
+        resolved = self.__dict__.setdefault('_resolved_main_images', {})
+        if obj.pk not in resolved:
+            resolved[obj.pk] = obj.resolve_main_image()
+        return resolved[obj.pk]
+
+    def get_main_image_url(self, obj):
+        main_image_url, _ = self._main_image(obj)
+        if main_image_url:
+            request = self.context.get('request')
+            if request:
+                return request.build_absolute_uri(main_image_url)
+        return None
+
+    def get_main_image_srcset(self, obj):
+        _, manifest = self._main_image(obj)
+        return srcset_data(manifest, self.context.get('request'))
+
+
+class EffectivePriceFieldsMixin:
+    """
+    final_price / final_discount_percentage / applied_promotion (promotions.pricing)
+    Com many=True o lote inteiro é calculado no primeiro produto; os preços
+    ficam no contexto, partilhado com serializers aninhados
+    """
+
+    def _effective_price(self, obj):
+        prices = self.context.setdefault('effective_prices', {})
+        if obj.pk not in prices:
+            request = self.context.get('request')
+            batch = [obj]
+            if isinstance(self.parent, serializers.ListSerializer) and self.parent.instance is not None:
+                batch = list(self.parent.instance)
+            prices.update(price_products(batch, getattr(request, 'user', None)))
+        return prices[obj.pk]
+
+    def get_final_price(self, obj):
+        return str(self._effective_price(obj).price)
+
+    def get_final_discount_percentage(self, obj):
+        return self._effective_price(obj).discount_percentage
+
+    def get_applied_promotion(self, obj):
+        effective = self._effective_price(obj)
+        if effective.promotion_id is None:
+            return None
+        return {'id': effective.promotion_id, 'name': effective.promotion_name}
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -56,15 +115,20 @@ class SubcategorySerializer(serializers.ModelSerializer):
     def get_product_count(self, obj):
         return obj.products.filter(status='active').count()
 
-class ProductListSerializer(serializers.ModelSerializer):
+class ProductListSerializer(EffectivePriceFieldsMixin, MainImageFieldsMixin, serializers.ModelSerializer):
     """Serializer for Product list view (minimal fields)"""
     category_name = serializers.CharField(source='category.name', read_only=True)
     is_in_stock = serializers.BooleanField(read_only=True)
     is_low_stock = serializers.BooleanField(read_only=True)
     discount_percentage = serializers.FloatField(read_only=True)
+    final_price = serializers.SerializerMethodField()
+    final_discount_percentage = serializers.SerializerMethodField()
+    applied_promotion = serializers.SerializerMethodField()
     main_image_url = serializers.SerializerMethodField()
+    main_image_srcset = serializers.SerializerMethodField()
     colors = ColorSerializer(many=True, read_only=True)
     subcategory_name = serializers.CharField(source='subcategory.name', read_only=True)
+    is_favorited = serializers.SerializerMethodField()
     
     class Meta:
         model = Product
@@ -72,22 +136,24 @@ class ProductListSerializer(serializers.ModelSerializer):
             'id', 'name', 'slug', 'short_description', 'price', 'original_price',
             'is_on_sale', 'stock_quantity', 'status', 'is_featured',
             'is_bestseller', 'category_name', 'subcategory_name', 'brand', 'sku',
-            'main_image_url', 'is_in_stock', 'is_low_stock',
-            'discount_percentage', 'view_count', 'sales_count',
+            'main_image_url', 'main_image_srcset', 'is_in_stock', 'is_low_stock',
+            'discount_percentage', 'final_price', 'final_discount_percentage', 'applied_promotion',
+            'view_count', 'sales_count', 'is_favorited',
             'colors', 'created_at', 'updated_at'
         ]
         read_only_fields = [
             'id', 'slug', 'is_in_stock', 'is_low_stock', 'discount_percentage',
-            'view_count', 'sales_count', 'created_at', 'updated_at'
+            'final_price', 'final_discount_percentage', 'applied_promotion',
+            'view_count', 'sales_count', 'is_favorited', 'created_at', 'updated_at'
         ]
-    
-    def get_main_image_url(self, obj):
-        main_image_url = obj.get_main_image()
-        if main_image_url:
+
+    def get_is_favorited(self, obj):
+        # Um conjunto por resposta (cache por usuário, ver products.favorites)
+        favorites = self.context.get('favorite_product_ids')
+        if favorites is None:
             request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(main_image_url)
-        return None
+            favorites = self.context['favorite_product_ids'] = favorite_product_ids(getattr(request, 'user', None))
+        return obj.pk in favorites
 
 class ReviewSerializer(serializers.ModelSerializer):
     """Serializer for Review model"""
@@ -195,15 +261,19 @@ class ReviewSerializer(serializers.ModelSerializer):
             return False
 
 
-class ProductDetailSerializer(serializers.ModelSerializer):
+class ProductDetailSerializer(EffectivePriceFieldsMixin, MainImageFieldsMixin, serializers.ModelSerializer):
     """Serializer for Product detail view (all fields)"""
     category_name = serializers.CharField(source='category.name', read_only=True)
     subcategory_name = serializers.CharField(source='subcategory.name', read_only=True)
     is_in_stock = serializers.BooleanField(read_only=True)
     is_low_stock = serializers.BooleanField(read_only=True)
     discount_percentage = serializers.FloatField(read_only=True)
+    final_price = serializers.SerializerMethodField()
+    final_discount_percentage = serializers.SerializerMethodField()
+    applied_promotion = serializers.SerializerMethodField()
     all_images = serializers.SerializerMethodField()
     main_image_url = serializers.SerializerMethodField()
+    main_image_srcset = serializers.SerializerMethodField()
     images = ProductImageSerializer(many=True, read_only=True)
     colors = ColorSerializer(many=True, read_only=True)
     average_rating = serializers.FloatField(read_only=True)
@@ -221,28 +291,22 @@ class ProductDetailSerializer(serializers.ModelSerializer):
             'id', 'name', 'description', 'short_description', 'category', 'subcategory',
             'category_name', 'subcategory_name', 'sku', 'brand', 'price', 'original_price',
             'is_on_sale', 'stock_quantity', 'min_stock_level',
-            'main_image', 'main_image_url', 'image_2', 'image_3', 'image_4', 'all_images', 'images',
+            'main_image', 'main_image_url', 'main_image_srcset', 'image_2', 'image_3', 'image_4', 'all_images', 'images',
             'specifications', 'meta_title', 'meta_description', 'slug',
             'status', 'is_featured', 'is_bestseller', 'weight', 'length',
             'width', 'height', 'colors', 'is_in_stock', 'is_low_stock',
-            'discount_percentage', 'view_count', 'sales_count',
+            'discount_percentage', 'final_price', 'final_discount_percentage', 'applied_promotion',
+            'view_count', 'sales_count',
             'average_rating', 'total_reviews', 'reviews',
             'created_at', 'updated_at'
         ]
         read_only_fields = [
             'id', 'slug', 'is_in_stock', 'is_low_stock', 'discount_percentage',
+            'final_price', 'final_discount_percentage', 'applied_promotion',
             'view_count', 'sales_count', 'created_at', 'updated_at',
             'average_rating', 'total_reviews', 'reviews'
         ]
 
-    def get_main_image_url(self, obj):
-        main_image_url = obj.get_main_image()
-        if main_image_url:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(main_image_url)
-        return None
-
     def get_all_images(self, obj):
         request = self.context.get('request')
         images = []
@@ -1,24 +1,88 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_init, post_save
 from django.dispatch import receiver
-from .models import Product, ProductImage
-from .image_utils import generate_webp_variants
+from .catalog import CATALOG_IGNORED_FIELDS, bump_catalog_version
+from .favorites import forget_favorites
+from .models import Category, Color, Favorite, Product, ProductImage, Subcategory
+from .image_jobs import (
+    PRODUCT_IMAGE_FIELDS, snapshot_image_names, changed_image_fields, enqueue_field_files,
+)
+from .main_image import refresh_main_images
+from .metrics import mark_catalog_metrics_dirty
 
 
-def _ensure_variants_for_field(instance, field_name: str):
-    file_field = getattr(instance, field_name, None)
-    try:
-        if file_field and getattr(file_field, 'path', None):
-            generate_webp_variants(file_field.path)
-    except Exception:
-        pass
+def _refresh_product_main_image(image: ProductImage):
+    resolved = refresh_main_images([image.product_id])
+    # Mantém atualizado o produto já carregado (ex: serializado logo a seguir)
+    if ProductImage.product.is_cached(image) and image.product_id in resolved:
+        image.product.resolved_main_image = resolved[image.product_id]
 
 
+@receiver(post_init, sender=ProductImage)
+def productimage_post_init(sender, instance: ProductImage, **kwargs):
+    snapshot_image_names(instance, ['image'])
+
+
+@receiver(post_init, sender=Product)
+def product_post_init(sender, instance: Product, **kwargs):
+    snapshot_image_names(instance, PRODUCT_IMAGE_FIELDS)
+
+
+@receiver(post_save, sender=ProductImage)
+def productimage_post_save(sender, instance: ProductImage, created, update_fields=None, **kwargs):
+    changed = changed_image_fields(instance, ['image'], created, update_fields)
+    if changed:
+        enqueue_field_files(instance, changed)
+    snapshot_image_names(instance, ['image'])
+    _refresh_product_main_image(instance)
+
+
+@receiver(post_delete, sender=ProductImage)
+def productimage_post_delete(sender, instance: ProductImage, **kwargs):
+    _refresh_product_main_image(instance)
+
+
+@receiver(post_save, sender=Product)
+def product_post_save(sender, instance: Product, created, update_fields=None, **kwargs):
+    # Saves que não tocam nas imagens (view_count, stock_quantity, ...) não geram trabalho
+    changed = changed_image_fields(instance, PRODUCT_IMAGE_FIELDS, created, update_fields)
+    if changed:
+        enqueue_field_files(instance, changed)
+    snapshot_image_names(instance, PRODUCT_IMAGE_FIELDS)
+
+    # Um save completo grava também resolved_main_image da instância em memória
+    if update_fields is None or 'main_image' in update_fields:
+        resolved = refresh_main_images([instance.pk])
+        instance.resolved_main_image = resolved.get(instance.pk)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
 @receiver(post_save, sender=ProductImage)
-def productimage_post_save(sender, instance: ProductImage, created, **kwargs):
-    _ensure_variants_for_field(instance, 'image')
+@receiver(post_delete, sender=ProductImage)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Subcategory)
+@receiver(post_delete, sender=Subcategory)
+@receiver(post_save, sender=Color)
+@receiver(post_delete, sender=Color)
+def catalog_changed(sender, update_fields=None, **kwargs):
+    # Contadores como view_count mudam a cada visita e não invalidam o catálogo
+    if update_fields is not None and set(update_fields) <= CATALOG_IGNORED_FIELDS:
+        return
+    bump_catalog_version()
 
 
 @receiver(post_save, sender=Product)
-def product_post_save(sender, instance: Product, created, **kwargs):
-    for field in ['main_image', 'image_2', 'image_3', 'image_4']:
-        _ensure_variants_for_field(instance, field)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def catalog_metrics_changed(sender, update_fields=None, **kwargs):
+    if update_fields is not None and set(update_fields) <= CATALOG_IGNORED_FIELDS:
+        return
+    mark_catalog_metrics_dirty()
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_delete, sender=Favorite)
+def favorites_changed(sender, instance: Favorite, **kwargs):
+    forget_favorites(instance.user_id)
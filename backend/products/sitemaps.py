@@ -1,66 +1,304 @@
-from django.contrib.sitemaps import Sitemap
+"""
+Sitemaps gerados em disco
+Em vez de consultar e fazer reverse() de cada URL a cada pedido de um crawler,
+os sitemaps são ficheiros em MEDIA_ROOT/sitemaps/:
+- sitemap-<secção>-<n>.xml com até SITEMAP_URLS_PER_FILE URLs (50 000, o
+  limite do protocolo) e o índice sitemap.xml que os lista
+- as linhas saem de .values_list() (só slug/pk e updated_at), em streaming,
+  e são escritas diretamente num ficheiro temporário
+- a regeneração é incremental: só os ficheiros cujo conteúdo mudou são
+  substituídos (os outros mantêm o mtime, ou seja o Last-Modified), e só
+  acontece quando a versão do catálogo (cache partilhado) difere da gravada
+  no manifesto em disco; um flock em sitemaps/.lock garante uma geração de
+  cada vez entre workers e o comando
+- a base dos URLs vem sempre de SITEMAP_BASE_URL, nunca do Host do pedido
+  (que com USE_X_FORWARDED_HOST pode ser forjado); sem ela não há geração
+  automática
+- os ficheiros são entregues como media (X-Accel-Redirect / sendfile), com
+  Last-Modified e 304
+Uso offline: python manage.py generate_sitemaps
+"""
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from itertools import chain, islice
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.http import Http404
 from django.urls import reverse
-from .models import Product, Category, Subcategory
+from django.utils.cache import patch_cache_control
+
+from chiva_backend.media import conditional_media_response
+
+from .catalog import get_catalog_version
+from .models import Category, Product, Subcategory
+
+logger = logging.getLogger(__name__)
+
+SITEMAP_DIR = 'sitemaps'
+INDEX_NAME = 'sitemap.xml'
+MANIFEST_NAME = 'manifest.json'
+LOCK_NAME = '.lock'
+
+ITERATOR_CHUNK_SIZE = 2000
+
+# (caminho, lastmod)
+Row = Tuple[str, Optional[datetime]]
+
+
+def _location_template(url_name: str, kwarg: str, sentinel) -> Tuple[str, str]:
+    """(prefixo, sufixo) do URL, com um único reverse() por secção"""
+    path = reverse(url_name, kwargs={kwarg: sentinel})
+    prefix, suffix = path.split(str(sentinel), 1)
+    return prefix, suffix
+
+
+def _product_rows() -> Iterator[Row]:
+    prefix, suffix = _location_template('product-detail', 'slug', 'sitemap-slug')
+    rows = (
+        Product.objects.filter(status='active').order_by('pk')
+        .values_list('slug', 'updated_at').iterator(chunk_size=ITERATOR_CHUNK_SIZE)
+    )
+    for slug, updated_at in rows:
+        yield f'{prefix}{slug}{suffix}', updated_at
+
+
+def _pk_rows(queryset, url_name: str) -> Iterator[Row]:
+    prefix, suffix = _location_template(url_name, 'pk', 2147483647)
+    rows = queryset.order_by('pk').values_list('pk', 'updated_at').iterator(chunk_size=ITERATOR_CHUNK_SIZE)
+    for pk, updated_at in rows:
+        yield f'{prefix}{pk}{suffix}', updated_at
+
+
+def _static_rows() -> Iterator[Row]:
+    for url_name in ('product-list-create', 'featured-products', 'bestseller-products', 'sale-products'):
+        yield reverse(url_name), None
+
+
+@dataclass(frozen=True)
+class SitemapSection:
+    name: str
+    changefreq: str
+    priority: str
+    rows: Callable[[], Iterable[Row]]
 
 
-class ProductSitemap(Sitemap):
-    changefreq = "weekly"
-    priority = 0.9
+SECTIONS = (
+    SitemapSection('products', 'weekly', '0.9', _product_rows),
+    SitemapSection('categories', 'weekly', '0.7', lambda: _pk_rows(Category.objects.filter(is_active=True), 'category-detail')),
+    SitemapSection('subcategories', 'weekly', '0.6', lambda: _pk_rows(Subcategory.objects.all(), 'subcategory-detail')),
+    SitemapSection('static', 'daily', '0.5', _static_rows),
+)
 
-    def items(self):
-        # Only include active products
-        return Product.objects.filter(status='active')
 
-    def lastmod(self, obj):
-        return obj.updated_at
+@dataclass
+class SitemapGeneration:
+    """Resultado de generate_sitemaps()"""
+    catalog_version: int
+    urls: int = 0
+    files: List[str] = field(default_factory=list)
+    written: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
 
-    def location(self, obj):
-        # Uses the product detail url pattern which expects a slug
-        return reverse('product-detail', kwargs={'slug': obj.slug})
 
+def sitemap_root() -> Path:
+    return Path(default_storage.path(SITEMAP_DIR))
 
-class CategorySitemap(Sitemap):
-    changefreq = "weekly"
-    priority = 0.7
 
-    def items(self):
-        return Category.objects.filter(is_active=True)
+def _lastmod(value: Optional[datetime]) -> str:
+    return value.replace(microsecond=0).isoformat() if value else ''
 
-    def lastmod(self, obj):
-        return obj.updated_at
 
-    def location(self, obj):
-        # The frontend likely builds category pages at /categories/<id>/ or similar;
-        # On the API side we expose a category endpoint so include a stable URL
-        return reverse('category-detail', kwargs={'pk': obj.pk})
+def _write_if_changed(path: Path, lines: Iterable[str], previous_digest: Optional[str]) -> Tuple[str, bool]:
+    """Escreve `lines` num temporário; só substitui `path` se o conteúdo mudou"""
+    digest = hashlib.sha1()
+    handle = tempfile.NamedTemporaryFile('wb', dir=path.parent, suffix='.tmp', delete=False)
+    try:
+        with handle:
+            for line in lines:
+                data = line.encode('utf-8')
+                digest.update(data)
+                handle.write(data)
+        hexdigest = digest.hexdigest()
+        if hexdigest == previous_digest and path.exists():
+            os.unlink(handle.name)
+            return hexdigest, False
+        os.chmod(handle.name, 0o644)
+        os.replace(handle.name, path)
+        return hexdigest, True
+    except BaseException:
+        if os.path.exists(handle.name):
+            os.unlink(handle.name)
+        raise
 
 
-class SubcategorySitemap(Sitemap):
-    changefreq = "weekly"
-    priority = 0.6
+class _ShardWriter:
+    """Linhas de um <urlset>, contando URLs e o lastmod mais recente pelo caminho"""
 
-    def items(self):
-        return Subcategory.objects.all()
+    def __init__(self, base_url: str, section: SitemapSection, rows: Iterable[Row]):
+        self.base_url = base_url
+        self.section = section
+        self.rows = rows
+        self.count = 0
+        self.lastmod: Optional[datetime] = None
 
-    def lastmod(self, obj):
-        return obj.updated_at
+    def __iter__(self):
+        yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+        yield '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+        for path, lastmod in self.rows:
+            self.count += 1
+            if lastmod and (self.lastmod is None or lastmod > self.lastmod):
+                self.lastmod = lastmod
+            entry = f'<url><loc>{escape(self.base_url + path)}</loc>'
+            if lastmod:
+                entry += f'<lastmod>{_lastmod(lastmod)}</lastmod>'
+            yield entry + f'<changefreq>{self.section.changefreq}</changefreq><priority>{self.section.priority}</priority></url>\n'
+        yield '</urlset>\n'
 
-    def location(self, obj):
-        return reverse('subcategory-detail', kwargs={'pk': obj.pk})
 
+def _index_lines(base_url: str, entries: List[Tuple[str, Optional[datetime]]]) -> Iterator[str]:
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+    for name, lastmod in entries:
+        entry = f'<sitemap><loc>{escape(f"{base_url}/{name}")}</loc>'
+        if lastmod:
+            entry += f'<lastmod>{_lastmod(lastmod)}</lastmod>'
+        yield entry + '</sitemap>\n'
+    yield '</sitemapindex>\n'
 
-class StaticViewSitemap(Sitemap):
-    changefreq = "daily"
-    priority = 0.5
 
-    def items(self):
-        # Add named views that should be discoverable. These should correspond
-        # to frontend routes or API endpoints; keep them minimal so crawlers see root pages.
-        return ['product-list-create', 'featured-products', 'bestseller-products', 'sale-products']
+def _read_manifest(root: Path) -> dict:
+    try:
+        return json.loads((root / MANIFEST_NAME).read_text())
+    except (OSError, ValueError):
+        return {}
 
-    def location(self, item):
+
+@contextmanager
+def generation_lock(wait: bool = True) -> Iterator[bool]:
+    """
+    flock exclusivo em sitemaps/.lock (partilhado por todos os processos que
+    veem o MEDIA_ROOT). Com wait=False devolve False se outro processo o tem
+    """
+    root = sitemap_root()
+    root.mkdir(parents=True, exist_ok=True)
+    with open(root / LOCK_NAME, 'a') as handle:
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX if wait else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            acquired = False
+        else:
+            acquired = True
         try:
-            return reverse(item)
-        except Exception:
-            # Fallback to root if named route missing
-            return '/'
+            yield acquired
+        finally:
+            if acquired:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def generate_sitemaps(base_url: str, force: bool = False) -> SitemapGeneration:
+    """
+    (Re)gera os ficheiros; os que não mudaram ficam intactos (a menos que `force`).
+    Quem chama deve ter o generation_lock()
+    """
+    base_url = base_url.rstrip('/')
+    root = sitemap_root()
+    root.mkdir(parents=True, exist_ok=True)
+    manifest = _read_manifest(root)
+    previous = manifest.get('files', {}) if not force and manifest.get('base_url') == base_url else {}
+    # Lida antes das consultas: uma mudança durante a geração volta a sujar os sitemaps
+    result = SitemapGeneration(catalog_version=get_catalog_version())
+
+    digests = {}
+    index_entries = []
+    per_file = settings.SITEMAP_URLS_PER_FILE
+    for section in SECTIONS:
+        rows = iter(section.rows())
+        number = 0
+        for first in rows:
+            number += 1
+            name = f'sitemap-{section.name}-{number}.xml'
+            shard = _ShardWriter(base_url, section, chain([first], islice(rows, per_file - 1)))
+            digests[name], written = _write_if_changed(root / name, shard, previous.get(name))
+            result.urls += shard.count
+            result.files.append(name)
+            if written:
+                result.written.append(name)
+            index_entries.append((name, shard.lastmod))
+
+    digests[INDEX_NAME], written = _write_if_changed(
+        root / INDEX_NAME, _index_lines(base_url, index_entries), previous.get(INDEX_NAME)
+    )
+    if written:
+        result.written.append(INDEX_NAME)
+
+    # Fragmentos que deixaram de existir (ex: menos produtos ativos)
+    for stale in root.glob('sitemap-*.xml'):
+        if stale.name not in digests:
+            stale.unlink()
+            result.removed.append(stale.name)
+
+    # Escrito por último e atomicamente: é a versão gerada que ensure_sitemaps compara
+    manifest_path = root / MANIFEST_NAME
+    temporary = manifest_path.with_suffix('.tmp')
+    temporary.write_text(json.dumps({
+        'catalog_version': result.catalog_version,
+        'base_url': base_url,
+        'files': digests,
+    }))
+    os.replace(temporary, manifest_path)
+    if result.written or result.removed:
+        logger.info(
+            f"🗺️ Sitemaps: {result.urls} URLs em {len(result.files)} ficheiros, "
+            f"{len(result.written)} reescritos, {len(result.removed)} removidos"
+        )
+    return result
+
+
+def sitemap_base_url() -> str:
+    if not settings.SITEMAP_BASE_URL:
+        raise ValueError('SITEMAP_BASE_URL não está definido')
+    return settings.SITEMAP_BASE_URL.rstrip('/')
+
+
+def _is_current(root: Path, base_url: str) -> bool:
+    manifest = _read_manifest(root)
+    return manifest.get('catalog_version') == get_catalog_version() and manifest.get('base_url') == base_url
+
+
+def ensure_sitemaps() -> None:
+    """Regenera se o catálogo mudou desde a última geração (uma geração de cada vez)"""
+    try:
+        base_url = sitemap_base_url()
+    except ValueError:
+        # Sem base configurada não se gera a partir do Host do pedido;
+        # entregam-se os ficheiros do comando generate_sitemaps, se existirem
+        logger.warning('⚠️ SITEMAP_BASE_URL não definido: sitemaps não são regenerados automaticamente')
+        return
+    root = sitemap_root()
+    if _is_current(root, base_url):
+        return
+    with generation_lock(wait=False) as acquired:
+        # Sem o lock, outra geração está em curso: entregam-se os ficheiros atuais
+        if acquired and not _is_current(root, base_url):
+            generate_sitemaps(base_url)
+
+
+def serve_sitemap(request, name: str = INDEX_NAME):
+    """sitemap.xml e sitemap-<secção>-<n>.xml a partir do disco, com Last-Modified / 304"""
+    if request.method not in ('GET', 'HEAD'):
+        raise Http404
+    ensure_sitemaps()
+    response = conditional_media_response(request, f'{SITEMAP_DIR}/{name}')
+    patch_cache_control(response, public=True, max_age=settings.SITEMAP_MAX_AGE)
+    return response
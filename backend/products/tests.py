@@ -1,3 +1,598 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+from decimal import Decimal
+from io import BytesIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import RequestFactory, TestCase, override_settings
+from rest_framework.test import APIClient
+from PIL import Image
+
+from .catalog import get_catalog_version
+from .derivatives import build_derivatives, srcset_data
+from .image_jobs import claim_jobs, run_jobs
+from .image_utils import _variant_path
+from .models import Category, ImageJob, Product, ProductImage, Subcategory
+from .serializers import ProductListSerializer
+
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def jpeg_upload(name='foto.jpg', size=(800, 600)):
+    buffer = BytesIO()
+    Image.new('RGB', size, (200, 30, 30)).save(buffer, format='JPEG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, IMAGE_PROCESSING_ASYNC=True)
+class ImageJobQueueTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        category = Category.objects.create(name='Portáteis')
+        self.product = Product.objects.create(
+            name='Laptop', description='x', category=category, price=Decimal('1000.00')
+        )
+
+    def test_saves_without_image_changes_do_not_enqueue(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.view_count = 10
+            self.product.save(update_fields=['view_count'])
+            self.product.stock_quantity = 3
+            self.product.save()
+
+        self.assertFalse(ImageJob.objects.exists())
+
+    def test_upload_enqueues_and_worker_generates_variants(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            image = ProductImage.objects.create(product=self.product, image=jpeg_upload())
+
+        path = image.image.path
+        job = ImageJob.objects.get()
+        self.assertEqual((job.path, job.status), (path, 'pending'))
+        self.assertFalse(os.path.exists(_variant_path(path, 320)))
+
+        # Reenfileirar a mesma versão do ficheiro não duplica o job
+        with self.captureOnCommitCallbacks(execute=True):
+            image.image.name = image.image.name
+            image.alt_text = 'Foto'
+            image.save()
+        self.assertEqual(ImageJob.objects.count(), 1)
+
+        version = get_catalog_version()
+        result = run_jobs(claim_jobs(10))
+
+        self.assertEqual(result['done'], 1)
+        self.assertEqual(ImageJob.objects.get().status, 'done')
+        # O manifesto novo muda o JSON servido pelas listas cacheadas
+        self.assertNotEqual(get_catalog_version(), version)
+        for width, expected in [(320, 320), (640, 640), (1024, 800)]:
+            with Image.open(_variant_path(path, width)) as variant:
+                # Nunca amplia além da largura original
+                self.assertEqual(variant.size, (expected, int(600 * expected / 800)))
+
+    def test_missing_file_is_retried_then_failed(self):
+        ImageJob.objects.create(path='/nao/existe.jpg', source_mtime=1.0)
+        for _ in range(3):
+            run_jobs(claim_jobs(10))
+
+        job = ImageJob.objects.get()
+        self.assertEqual((job.status, job.attempts), ('failed', 3))
+
+
+@override_settings(
+    MEDIA_ROOT=MEDIA_ROOT, IMAGE_PROCESSING_ASYNC=True,
+    IMAGE_VARIANT_WIDTHS=[320, 640, 1024], IMAGE_VARIANT_FORMATS=['webp', 'jpeg', 'avif'],
+)
+class ImageDerivativeStoreTest(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Monitores')
+        self.product = Product.objects.create(
+            name='Monitor', description='x', category=category, price=Decimal('300.00')
+        )
+
+    def test_identical_files_share_derivatives_and_manifest_reaches_api(self):
+        upload = jpeg_upload(size=(800, 600))
+        content = upload.read()
+        with self.captureOnCommitCallbacks(execute=True):
+            first = ProductImage.objects.create(product=self.product, image=upload, is_main=True)
+            # Cópia com outro nome (como em duplicate_product)
+            copy = ProductImage.objects.create(
+                product=self.product, image=SimpleUploadedFile('copia.jpg', content, content_type='image/jpeg')
+            )
+        self.assertNotEqual(first.image.path, copy.image.path)
+
+        self.assertEqual(run_jobs(claim_jobs(10))['done'], 2)
+        first.refresh_from_db()
+        copy.refresh_from_db()
+
+        manifest = first.variants
+        self.assertEqual(manifest, copy.variants)
+        self.assertEqual((manifest['width'], manifest['height']), (800, 600))
+        # AVIF só é gerado com o plugin instalado; 1024 não amplia além de 800
+        formats = {v['format'] for v in manifest['variants']}
+        self.assertTrue({'webp', 'jpeg'} <= formats)
+        self.assertEqual(
+            sorted(v['width'] for v in manifest['variants'] if v['format'] == 'webp'), [320, 640, 800]
+        )
+        for variant in manifest['variants']:
+            path = os.path.join(MEDIA_ROOT, variant['name'])
+            self.assertEqual(os.path.getsize(path), variant['bytes'])
+            self.assertIn(manifest['hash'], variant['name'])
+
+        # Ficheiros legados usados pelo frontend continuam a existir
+        with Image.open(_variant_path(copy.image.path, 1024)) as legacy:
+            self.assertEqual(legacy.size, (800, 600))
+
+        # O mesmo conteúdo não é recodificado
+        self.assertEqual(build_derivatives(copy.image.path)['variants'], manifest['variants'])
+
+        self.product.refresh_from_db()
+        data = ProductListSerializer(self.product).data
+        srcset = data['main_image_srcset']
+        self.assertEqual((srcset['width'], srcset['height']), (800, 600))
+        self.assertIn('640w', srcset['srcset']['webp'])
+        self.assertEqual(srcset_data({}), None)
+
+    def test_backfill_command_attaches_manifests(self):
+        from cart.backfill import run_backfill
+        from products.management.commands.backfill_image_variants import (
+            ProductImageVariantsBackfill, ProductLegacyImagesBackfill,
+        )
+
+        with self.captureOnCommitCallbacks(execute=False):
+            image = ProductImage.objects.create(product=self.product, image=jpeg_upload())
+            self.product.main_image = jpeg_upload('legado.jpg', size=(400, 300))
+            self.product.save()
+
+        self.assertEqual(run_backfill(ProductImageVariantsBackfill(), dry_run=True).items, 1)
+        self.assertEqual(run_backfill(ProductImageVariantsBackfill()).items, 1)
+        self.assertEqual(run_backfill(ProductLegacyImagesBackfill()).items, 1)
+
+        image.refresh_from_db()
+        self.product.refresh_from_db()
+        self.assertEqual(image.variants['width'], 800)
+        self.assertEqual(self.product.image_variants['main_image']['width'], 400)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, IMAGE_PROCESSING_ASYNC=True)
+class ResolvedMainImageTest(TestCase):
+    def setUp(self):
+        self.category = Category.objects.create(name='Telemóveis')
+        self.product = Product.objects.create(
+            name='Telemóvel', description='x', category=self.category, price=Decimal('500.00')
+        )
+
+    def resolved_name(self):
+        self.product.refresh_from_db()
+        return (self.product.resolved_main_image or {}).get('name')
+
+    def test_signals_keep_main_image_in_sync(self):
+        self.assertIsNone(self.resolved_name())
+
+        self.product.main_image = jpeg_upload('legado.jpg')
+        self.product.save()
+        legacy = self.product.main_image.name
+        self.assertEqual(self.resolved_name(), legacy)
+
+        first = ProductImage.objects.create(product=self.product, image=jpeg_upload('a.jpg'))
+        self.assertEqual(self.resolved_name(), first.image.name)
+
+        second = ProductImage.objects.create(product=self.product, image=jpeg_upload('b.jpg'), is_main=True)
+        self.assertEqual(self.resolved_name(), second.image.name)
+
+        second.delete()
+        self.assertEqual(self.resolved_name(), first.image.name)
+        first.delete()
+        self.assertEqual(self.resolved_name(), legacy)
+
+        # Um save completo com a instância desatualizada não reverte a coluna
+        stale = Product.objects.get(pk=self.product.pk)
+        ProductImage.objects.create(product=self.product, image=jpeg_upload('c.jpg'))
+        stale.save()
+        self.assertTrue(self.resolved_name().endswith('.jpg'))
+        self.assertNotEqual(self.resolved_name(), legacy)
+
+    def test_list_serializer_reads_denormalized_column(self):
+        for i in range(3):
+            product = Product.objects.create(
+                name=f'Produto {i}', description='x', category=self.category, price=Decimal('10.00')
+            )
+            ProductImage.objects.create(product=product, image=jpeg_upload(f'p{i}.jpg'))
+
+        products = list(Product.objects.select_related('category', 'subcategory').prefetch_related('colors'))
+        request = RequestFactory().get('/api/products/')
+        with self.assertNumQueries(0):
+            data = ProductListSerializer(products, many=True, context={'request': request}).data
+        self.assertEqual(sum(1 for item in data if item['main_image_url'] is None), 1)
+
+
+class SpecificationFacetsTest(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Portáteis')
+        specs = [
+            {'ram': '16GB', 'storage': '512GB', 'cores': 8},
+            {'ram': '16GB', 'storage': '1TB', 'cores': 8},
+            {'ram': '8GB', 'storage': '256GB', 'cores': 4},
+        ]
+        for i, spec in enumerate(specs):
+            Product.objects.create(
+                name=f'Portátil {i}', description='x', category=category,
+                price=Decimal('1000.00'), specifications=spec,
+            )
+        self.client = APIClient()
+
+    def names(self, response):
+        data = response.json()
+        return sorted(p['name'] for p in data.get('results', data))
+
+    def test_list_filters_by_specifications(self):
+        response = self.client.get('/api/products/', {'spec.ram': '16GB'})
+        self.assertEqual(self.names(response), ['Portátil 0', 'Portátil 1'])
+
+        response = self.client.get('/api/products/', {'spec.storage__in': '256GB,1TB'})
+        self.assertEqual(self.names(response), ['Portátil 1', 'Portátil 2'])
+
+        # Valores numéricos no JSON também correspondem
+        response = self.client.get('/api/products/', {'spec.cores': '4', 'spec.ram': '16GB'})
+        self.assertEqual(self.names(response), [])
+
+    def test_facets_follow_filters_and_catalog_version(self):
+        data = self.client.get('/api/products/facets/', {'spec.ram': '16GB'}).json()
+        self.assertEqual(data['count'], 2)
+        self.assertEqual(data['facets']['ram'], [{'value': '16GB', 'count': 2}])
+        self.assertEqual(
+            sorted(data['facets']['storage'], key=lambda f: f['value']),
+            [{'value': '1TB', 'count': 1}, {'value': '512GB', 'count': 1}],
+        )
+        self.assertEqual(data['facets']['cores'], [{'value': '8', 'count': 2}])
+
+        with self.assertNumQueries(0):
+            self.client.get('/api/products/facets/', {'spec.ram': '16GB'})
+
+        product = Product.objects.get(name='Portátil 2')
+        product.specifications = {'ram': '16GB'}
+        product.save()
+        data = self.client.get('/api/products/facets/', {'spec.ram': '16GB'}).json()
+        self.assertEqual(data['count'], 3)
+
+
+class NavigationSnapshotTest(TestCase):
+    def setUp(self):
+        self.laptops = Category.objects.create(name='Portáteis')
+        gaming = Subcategory.objects.create(category=self.laptops, name='Gaming')
+        Subcategory.objects.create(category=self.laptops, name='Ultrabooks')
+        Category.objects.create(name='Arquivo', is_active=False)
+        for price, brand, sub in [('900.00', 'Asus', gaming), ('1500.00', 'Asus', gaming), ('700.00', 'HP', None)]:
+            Product.objects.create(
+                name=f'{brand} {price}', description='x', category=self.laptops,
+                subcategory=sub, brand=brand, price=Decimal(price),
+            )
+        Product.objects.create(
+            name='Rascunho', description='x', category=self.laptops, price=Decimal('10.00'), status='inactive'
+        )
+        self.client = APIClient()
+
+    def test_tree_counts_prices_brands_and_etag(self):
+        with self.assertNumQueries(4):
+            response = self.client.get('/api/navigation/')
+        self.assertEqual(response.status_code, 200)
+
+        [category] = response.json()['categories']
+        self.assertEqual(
+            (category['name'], category['product_count'], category['price_min'], category['price_max']),
+            ('Portáteis', 3, '700.00', '1500.00'),
+        )
+        self.assertEqual(category['brands'], [{'name': 'Asus', 'count': 2}, {'name': 'HP', 'count': 1}])
+        gaming, ultrabooks = category['subcategories']
+        self.assertEqual((gaming['product_count'], gaming['price_min']), (2, '900.00'))
+        self.assertEqual((ultrabooks['product_count'], ultrabooks['brands']), (0, []))
+
+        etag = response['ETag']
+        with self.assertNumQueries(0):
+            cached = self.client.get('/api/navigation/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(cached.status_code, 304)
+
+        Product.objects.create(name='Novo', description='x', category=self.laptops, price=Decimal('50.00'))
+        response = self.client.get('/api/navigation/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['categories'][0]['product_count'], 4)
+
+    @override_settings(API_COMPRESSION_MIN_SIZE=0)
+    def test_revalidates_with_the_etag_of_a_compressed_response(self):
+        compressed = self.client.get('/api/navigation/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertTrue(compressed['ETag'].startswith('W/'))
+
+        cached = self.client.get('/api/navigation/', HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=compressed['ETag'])
+        self.assertEqual(cached.status_code, 304)
+
+
+class CatalogMetricsTest(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Impressoras')
+        self.products = [
+            Product.objects.create(
+                name=f'Impressora {i}', description='x', category=category, price=Decimal(price),
+                stock_quantity=stock, min_stock_level=5, status=status_value,
+            )
+            for i, (price, stock, status_value) in enumerate([
+                ('100.00', 10, 'active'), ('200.00', 3, 'active'), ('50.00', 0, 'inactive'),
+            ])
+        ]
+
+    def test_metrics_row_is_recomputed_after_changes(self):
+        from cart.stock_management import StockManager
+        from .metrics import get_catalog_metrics
+
+        metrics = get_catalog_metrics()
+        self.assertEqual(
+            (metrics.total_products, metrics.active_products, metrics.out_of_stock_products,
+             metrics.low_stock_products, metrics.total_stock_value, metrics.average_price),
+            (3, 2, 1, 1, Decimal('1600.00'), Decimal('150.00')),
+        )
+
+        with self.assertNumQueries(1):
+            get_catalog_metrics()
+
+        product = self.products[0]
+        product.stock_quantity = 0
+        product.save(update_fields=['stock_quantity'])
+        report = StockManager.get_stock_report()
+        self.assertEqual((report['out_of_stock'], report['total_stock_value']), (2, Decimal('600.00')))
+
+        # Visualizações não invalidam as métricas
+        self.products[1].increment_view_count()
+        self.assertFalse(get_catalog_metrics().dirty)
+
+
+class ORJSONRenderingTest(TestCase):
+    def test_output_matches_drf_json_renderer(self):
+        import datetime
+        import uuid
+
+        from django.utils import timezone
+        from django.utils.translation import gettext_lazy
+        from rest_framework.renderers import JSONRenderer
+
+        from chiva_backend.renderers import ORJSONRenderer
+        from .models import Color
+
+        category = Category.objects.create(name='Portáteis')
+        product = Product.objects.create(
+            name='Portátil “Pro” ', description='x', category=category,
+            price=Decimal('1499.90'), original_price=Decimal('1999.00'), stock_quantity=3,
+        )
+        product.colors.add(Color.objects.create(name='Preto', hex_code='#000000'))
+        payload = {
+            'results': ProductListSerializer(Product.objects.all(), many=True).data,
+            'decimal': Decimal('12.50'),
+            'uuid': uuid.uuid4(),
+            'aware': timezone.now(),
+            'naive': datetime.datetime(2024, 5, 1, 10, 30, 0, 123456),
+            'date': datetime.date(2024, 5, 1),
+            'time': datetime.time(10, 30, 0, 123456),
+            'lazy': gettext_lazy('Produto'),
+            1: [1.5, None, True, '\x1f '],
+        }
+
+        self.assertEqual(ORJSONRenderer().render(payload), JSONRenderer().render(payload))
+        self.assertEqual(
+            ORJSONRenderer().render(payload, 'application/json; indent=2'),
+            JSONRenderer().render(payload, 'application/json; indent=2'),
+        )
+
+    def test_parser_matches_drf_json_parser(self):
+        from io import BytesIO
+
+        from rest_framework.exceptions import ParseError
+        from rest_framework.parsers import JSONParser
+
+        from chiva_backend.parsers import ORJSONParser
+
+        body = '{"nome": "Portátil", "preco": 1499.9, "itens": [1, 2], "ok": true}'.encode()
+        self.assertEqual(ORJSONParser().parse(BytesIO(body)), JSONParser().parse(BytesIO(body)))
+
+        for invalid in (b'{"a": NaN}', b'{"a": '):
+            with self.assertRaises(ParseError) as expected:
+                JSONParser().parse(BytesIO(invalid))
+            with self.assertRaises(ParseError) as parsed:
+                ORJSONParser().parse(BytesIO(invalid))
+            self.assertEqual(str(parsed.exception), str(expected.exception))
+
+    def test_api_uses_orjson_renderer_and_parser(self):
+        from chiva_backend.renderers import ORJSONRenderer
+
+        response = APIClient().get('/api/products/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(response.accepted_renderer, ORJSONRenderer)
+
+
+class ConditionalGetTest(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+
+        cache.clear()
+        self.client = APIClient()
+        self.category = Category.objects.create(name='Monitores')
+        self.product = Product.objects.create(
+            name='Monitor 27', category=self.category, price=Decimal('300.00'), stock_quantity=4,
+        )
+
+    def test_product_detail_304_counts_view_and_follows_reviews(self):
+        from django.contrib.auth.models import User
+        from .models import Review
+
+        url = f'/api/products/{self.product.slug}/'
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        self.assertTrue(first['Cache-Control'].startswith('public'))
+
+        with self.assertNumQueries(2):  # validadores + contagem da visita
+            cached = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached['ETag'], first['ETag'])
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.view_count, 2)
+
+        Review.objects.create(product=self.product, user=User.objects.create_user('reviewer'), rating=5)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 200)
+
+    def test_category_lists_follow_the_database(self):
+        Subcategory.objects.create(category=self.category, name='Curvos')
+        for url in ('/api/categories/', '/api/subcategories/', f'/api/categories/{self.category.id}/subcategories/'):
+            first = self.client.get(url)
+            self.assertEqual(first.status_code, 200)
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
+            # Mudança feita noutro processo: a versão do catálogo deste não muda
+            with mock.patch('products.signals.bump_catalog_version'):
+                Product.objects.create(name=f'Outro {url}', category=self.category, price=Decimal('10.00'))
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 200)
+
+
+SITEMAP_MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(
+    MEDIA_ROOT=SITEMAP_MEDIA_ROOT, MEDIA_ACCEL_REDIRECT='',
+    SITEMAP_URLS_PER_FILE=2, SITEMAP_BASE_URL='https://loja.example',
+)
+class SitemapFilesTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(SITEMAP_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        from django.core.cache import cache
+
+        cache.clear()
+        shutil.rmtree(SITEMAP_MEDIA_ROOT, ignore_errors=True)
+        category = Category.objects.create(name='Impressoras')
+        self.products = [
+            Product.objects.create(name=f'Impressora {index}', category=category, price=Decimal('90.00'), status='active')
+            for index in range(3)
+        ]
+
+    def sitemap_path(self, name):
+        return os.path.join(SITEMAP_MEDIA_ROOT, 'sitemaps', name)
+
+    def test_index_and_shards_are_served_from_disk(self):
+        response = self.client.get('/sitemap.xml')
+        self.assertEqual(response.status_code, 200)
+        index = b''.join(response.streaming_content).decode()
+        self.assertIn('<loc>https://loja.example/sitemap-products-2.xml</loc>', index)
+        self.assertIn('<loc>https://loja.example/sitemap-categories-1.xml</loc>', index)
+        self.assertTrue(response['Cache-Control'].startswith('public'))
+
+        with self.assertNumQueries(0):
+            shard = self.client.get('/sitemap-products-2.xml')
+            cached = self.client.get('/sitemap-products-2.xml', HTTP_IF_MODIFIED_SINCE=shard['Last-Modified'])
+        self.assertIn(f'/api/products/{self.products[2].slug}/', b''.join(shard.streaming_content).decode())
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(self.client.get('/sitemap-products-9.xml').status_code, 404)
+
+    def test_regeneration_only_rewrites_changed_shards(self):
+        from .sitemaps import generate_sitemaps
+
+        first = generate_sitemaps('https://loja.example')
+        self.assertEqual(first.urls, 3 + 1 + 4)
+        self.assertIn('sitemap-products-2.xml', first.written)
+
+        self.products[2].name = 'Impressora laser'
+        self.products[2].save()
+        self.products[1].delete()
+        second = generate_sitemaps('https://loja.example')
+        self.assertEqual(second.removed, ['sitemap-products-2.xml'])
+        self.assertEqual(second.written, ['sitemap-products-1.xml', 'sitemap.xml'])
+        self.assertFalse(os.path.exists(self.sitemap_path('sitemap-products-2.xml')))
+        with open(self.sitemap_path('sitemap-products-1.xml')) as handle:
+            self.assertIn(self.products[2].slug, handle.read())
+
+        self.assertEqual(generate_sitemaps('https://loja.example').written, [])
+
+    def test_concurrent_request_serves_current_files_while_locked(self):
+        from .sitemaps import generation_lock
+
+        self.assertEqual(self.client.get('/sitemap.xml').status_code, 200)
+        Product.objects.create(name='Impressora nova', category=self.products[0].category, price=Decimal('10.00'))
+
+        # Outro processo tem o lock: entrega os ficheiros atuais sem esperar
+        with generation_lock() as acquired:
+            self.assertTrue(acquired)
+            shard = self.client.get('/sitemap-products-2.xml')
+            self.assertNotIn('impressora-nova', b''.join(shard.streaming_content).decode())
+
+        shard = self.client.get('/sitemap-products-2.xml')
+        self.assertIn('impressora-nova', b''.join(shard.streaming_content).decode())
+
+    @override_settings(SITEMAP_BASE_URL='')
+    def test_no_generation_from_the_request_host(self):
+        self.assertEqual(self.client.get('/sitemap.xml').status_code, 404)
+        self.assertFalse(os.path.exists(self.sitemap_path('sitemap.xml')))
+
+
+class FavoritesBulkTest(TestCase):
+    def setUp(self):
+        from django.contrib.auth.models import User
+        from django.core.cache import cache
+
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='fa')
+        category = Category.objects.create(name='Teclados')
+        self.products = [
+            Product.objects.create(name=f'Teclado {index}', category=category, price=Decimal('25.00'), status='active')
+            for index in range(4)
+        ]
+
+    def test_bulk_check_is_one_query(self):
+        from .models import Favorite
+
+        Favorite.objects.create(user=self.user, product=self.products[1])
+        Favorite.objects.create(user=self.user, product=self.products[3])
+        ids = ','.join(str(product.pk) for product in self.products[:3])
+
+        self.assertEqual(self.client.get(f'/api/favorites/check/?ids={ids}').json(), {'favorited': []})
+        self.client.force_authenticate(self.user)
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/api/favorites/check/?ids={ids}')
+        self.assertEqual(response.json(), {'favorited': [self.products[1].pk]})
+        self.assertEqual(self.client.get('/api/favorites/check/?ids=1,x').status_code, 400)
+
+    @override_settings(FAVORITES_CACHE_SECONDS=600)
+    def test_toggle_during_a_read_is_not_overwritten(self):
+        from django.core.cache import cache
+        from .favorites import favorite_product_ids
+        from .models import Favorite
+
+        self.assertEqual(favorite_product_ids(self.user), frozenset())
+        Favorite.objects.create(user=self.user, product=self.products[0])
+
+        # Favorito criado entre a consulta e a gravação no cache
+        add = cache.add
+        def racing_add(*args, **kwargs):
+            Favorite.objects.create(user=self.user, product=self.products[1])
+            return add(*args, **kwargs)
+        with mock.patch.object(cache, 'add', side_effect=racing_add):
+            self.assertEqual(favorite_product_ids(self.user), {self.products[0].pk})
+
+        self.assertEqual(favorite_product_ids(self.user), {self.products[0].pk, self.products[1].pk})
+
+    @override_settings(FAVORITES_CACHE_SECONDS=600)
+    def test_list_is_favorited_follows_toggle(self):
+        self.client.force_authenticate(self.user)
+        favorited = lambda: {p['id'] for p in self.client.get('/api/products/').json()['results'] if p['is_favorited']}
+
+        self.assertEqual(favorited(), set())
+        self.client.post(f'/api/favorites/toggle/{self.products[0].pk}/')
+        self.assertEqual(favorited(), {self.products[0].pk})
+        self.client.delete(f'/api/favorites/toggle/{self.products[0].pk}/')
+        self.assertEqual(favorited(), set())
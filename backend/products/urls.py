@@ -14,6 +14,7 @@ urlpatterns = [
     path('subcategories/', views.SubcategoryListCreateView.as_view(), name='subcategory-list-create'),
     path('subcategories/<int:pk>/', views.SubcategoryDetailView.as_view(), name='subcategory-detail'),
     path('categories/<int:category_id>/subcategories/', views.subcategories_by_category, name='subcategories-by-category'),
+    path('navigation/', views.navigation_snapshot, name='navigation-snapshot'),
     
     # Colors URLs
     path('colors/', views.ColorListCreateView.as_view(), name='color-list-create'),
@@ -29,6 +30,7 @@ urlpatterns = [
     path('products/stats/', views.product_stats, name='product-stats'),
     path('products/category/<int:category_id>/', views.products_by_category, name='products-by-category'),
     path('products/search/', views.search_products, name='search-products'),
+    path('products/facets/', views.ProductFacetsView.as_view(), name='product-facets'),
     path('products/id/<int:pk>/duplicate/', views.duplicate_product, name='product-duplicate'),
     
     # Generic Products URLs (must come after specific endpoints)
@@ -48,6 +50,7 @@ urlpatterns = [
     path('favorites/', views.FavoriteListCreateView.as_view(), name='favorite-list-create'),
     path('favorites/<int:pk>/', views.FavoriteDetailView.as_view(), name='favorite-detail'),
     path('favorites/toggle/<int:product_id>/', views.toggle_favorite, name='toggle-favorite'),
+    path('favorites/check/', views.check_favorites_bulk, name='check-favorites-bulk'),
     path('favorites/check/<int:product_id>/', views.check_favorite_status, name='check-favorite'),
     
 
@@ -5,8 +5,12 @@ from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.parsers import MultiPartParser, FormParser
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q, F, Count, Avg, Sum, Value, IntegerField, Case, When
+from django.db.models import Q, F, Count, Avg, Sum, Max, Value, IntegerField, Case, When
 from django.core.files.base import File
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.http import quote_etag
+import hashlib
 import os
 from django.utils import timezone
 from django.conf import settings
@@ -23,7 +27,17 @@ from .serializers import (
     FavoriteCreateSerializer,
     ReviewSerializer
 )
+from .catalog import catalog_cache_key, get_catalog_version
+from .favorites import favorited_among
+from .facets import apply_spec_filters, spec_facets, spec_filters_from_params
+from .metrics import get_catalog_metrics
+from .navigation import get_navigation_snapshot
 from customers.views import IsAdmin
+from chiva_backend.conditional import (
+    ConditionalGetMixin, add_validators, make_etag, not_modified, queryset_validators,
+)
+from promotions.pricing import get_price_rules
+from promotions.resolution import get_promotions_version
 
 class ColorListCreateView(generics.ListCreateAPIView):
     """
@@ -55,12 +69,26 @@ class ColorDetailView(generics.RetrieveUpdateDestroyAPIView):
             return [permissions.AllowAny()]
         return [IsAdmin()]
 
-class CategoryListCreateView(generics.ListCreateAPIView):
+def category_list_validators(request, queryset):
+    """
+    Validadores das listas de categorias/subcategorias a partir da base de dados
+    (max(updated_at) + contagem das linhas e dos produtos, que dão o product_count)
+    """
+    products = Product.objects.order_by().aggregate(last_modified=Max('updated_at'), count=Count('pk'))
+    etag, last_modified = queryset_validators(request, queryset, products['last_modified'], products['count'])
+    return etag, max(filter(None, (last_modified, products['last_modified'])), default=None)
+
+class CategoryListCreateView(ConditionalGetMixin, generics.ListCreateAPIView):
     """
     List all categories or create a new category
+    (GET revalidated against the categories and products: If-None-Match -> 304)
     """
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
+    cache_max_age_setting = 'CATEGORY_LIST_MAX_AGE'
+
+    def get_validators(self):
+        return category_list_validators(self.request, Category.objects.all())
 
     def get_permissions(self):
         # Public listing, only admins can create
@@ -84,12 +112,17 @@ class CategoryDetailView(generics.RetrieveUpdateDestroyAPIView):
             return [permissions.AllowAny()]
         return [IsAdmin()]
 
-class SubcategoryListCreateView(generics.ListCreateAPIView):
+class SubcategoryListCreateView(ConditionalGetMixin, generics.ListCreateAPIView):
     """
     List all subcategories or create a new subcategory
+    (GET revalidated against the subcategories and products: If-None-Match -> 304)
     """
     queryset = Subcategory.objects.select_related('category').all()
     serializer_class = SubcategorySerializer
+    cache_max_age_setting = 'CATEGORY_LIST_MAX_AGE'
+
+    def get_validators(self):
+        return category_list_validators(self.request, Subcategory.objects.all())
     filter_backends = [filters.SearchFilter, filters.OrderingFilter, DjangoFilterBackend]
     search_fields = ['name', 'description', 'category__name']
     ordering_fields = ['name', 'created_at']
@@ -114,6 +147,21 @@ class SubcategoryDetailView(generics.RetrieveUpdateDestroyAPIView):
             return [permissions.AllowAny()]
         return [IsAdmin()]
 
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def navigation_snapshot(request):
+    """
+    Category -> subcategory tree with active product counts, price ranges and
+    brands, served from a precomputed snapshot (ETag / If-None-Match -> 304)
+    """
+    body, etag = get_navigation_snapshot()
+    etag = quote_etag(etag)
+    # Comparação fraca: o APICompressionMiddleware devolve o ETag como W/"..."
+    response = not_modified(request, etag) or HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    response['Cache-Control'] = f'public, max-age={settings.NAVIGATION_MAX_AGE}'
+    return response
+
 @api_view(['GET'])
 def subcategories_by_category(request, category_id):
     try:
@@ -121,8 +169,12 @@ def subcategories_by_category(request, category_id):
     except Category.DoesNotExist:
         return Response({'error': 'Categoria não encontrada'}, status=status.HTTP_404_NOT_FOUND)
     subs = Subcategory.objects.filter(category=category).order_by('name')
-    serializer = SubcategorySerializer(subs, many=True)
-    return Response(serializer.data)
+    validators = category_list_validators(request, subs)
+    response = not_modified(request, *validators)
+    if response is None:
+        serializer = SubcategorySerializer(subs, many=True)
+        response = Response(serializer.data)
+    return add_validators(response, *validators, max_age=settings.CATEGORY_LIST_MAX_AGE)
 
 class ProductListCreateView(generics.ListCreateAPIView):
     """
@@ -170,25 +222,91 @@ class ProductListCreateView(generics.ListCreateAPIView):
         if low_stock == 'true':
             queryset = queryset.filter(stock_quantity__lte=F('min_stock_level'))
         
+        # Filter by specifications (?spec.ram=16GB&spec.storage__in=512GB,1TB)
+        spec_filters = spec_filters_from_params(self.request.query_params)
+        if spec_filters:
+            queryset = apply_spec_filters(queryset, spec_filters)
+        
         return queryset
 
-class ProductDetailView(generics.RetrieveUpdateDestroyAPIView):
+
+class ProductFacetsView(ProductListCreateView):
+    """
+    Value counts per specification key for the current filter set
+    (same query parameters as the product list), cached by catalog version
+    """
+    http_method_names = ['get', 'head', 'options']
+
+    def get(self, request, *args, **kwargs):
+        params = sorted(
+            (key, value) for key in request.query_params.keys()
+            for value in request.query_params.getlist(key)
+            if key not in ('page', 'page_size', 'ordering')
+        )
+        cache_key = catalog_cache_key('product_facets', hashlib.sha1(repr(params).encode()).hexdigest())
+        data = cache.get(cache_key)
+        if data is None:
+            queryset = self.filter_queryset(self.get_queryset())
+            data = {'count': queryset.count(), 'facets': spec_facets(queryset)}
+            cache.set(cache_key, data, settings.PRODUCT_FACETS_CACHE_SECONDS)
+        return Response(data)
+
+class ProductDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     Retrieve, update or delete a product
+    (GET answers 304 when the product, its reviews and the catalog are unchanged)
     """
-    queryset = Product.objects.select_related('category').all()
+    queryset = Product.objects.select_related('category', 'subcategory').prefetch_related('images', 'colors').all()
     lookup_field = 'slug'
+    cache_max_age_setting = 'PRODUCT_DETAIL_MAX_AGE'
     
     def get_serializer_class(self):
         if self.request.method in ['PUT', 'PATCH']:
             return ProductCreateUpdateSerializer
         return ProductDetailSerializer
+
+    def get_validators(self):
+        # Uma consulta: o produto e o estado das suas avaliações (reviews, helpful_count);
+        # imagens, cores e nomes de categoria mudam a versão do catálogo
+        row = (
+            Product.objects.filter(slug=self.kwargs['slug'])
+            .order_by()
+            .values('id', 'updated_at')
+            .annotate(
+                reviews_updated_at=Max('reviews__updated_at'),
+                review_count=Count('reviews'),
+                helpful_count=Sum('reviews__helpful_count'),
+            )
+            .first()
+        )
+        if row is None:
+            return None
+        self.product_id = row['id']
+        # user_has_voted_helpful depende do usuário; final_price das promoções que se lhe aplicam
+        user_id = self.request.user.pk if self.request.user.is_authenticated else None
+        etag = make_etag(
+            self.request, *row.values(), get_catalog_version(), user_id,
+            get_promotions_version(), get_price_rules(self.request.user).key,
+        )
+        return etag, max(filter(None, (row['updated_at'], row['reviews_updated_at'])))
+
+    def cache_is_private(self):
+        return self.request.user.is_authenticated
+
+    def is_preview(self, request):
+        return request.query_params.get('preview') in ['1', 'true', 'True']
+
+    def get(self, request, *args, **kwargs):
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == 304 and not self.is_preview(request):
+            # O 304 não passa por retrieve(), mas a visita conta na mesma
+            Product.objects.filter(pk=self.product_id).update(view_count=F('view_count') + 1)
+        return response
     
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
         # Increment view count unless it's a preview request
-        is_preview = request.query_params.get('preview') in ['1', 'true', 'True']
-        if not is_preview:
+        if not self.is_preview(request):
             instance.increment_view_count()
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
@@ -203,7 +321,7 @@ class ProductByIdDetailView(generics.RetrieveUpdateDestroyAPIView):
     """
     Retrieve, update or delete a product by ID (for admin use)
     """
-    queryset = Product.objects.select_related('category').all()
+    queryset = Product.objects.select_related('category', 'subcategory').prefetch_related('images', 'colors').all()
     permission_classes = [IsAdmin]
     
     def get_serializer_class(self):
@@ -289,10 +407,12 @@ def duplicate_product(request, pk: int):
 
 
 from django.views.decorators.cache import cache_page
+from django.views.decorators.vary import vary_on_headers
 from django.utils.decorators import method_decorator
 
 @api_view(['GET'])
 @cache_page(60 * 5)  # Cache for 5 minutes
+@vary_on_headers('Authorization')  # final_price e is_favorited dependem do usuário
 def featured_products(request):
     """
     Get featured products with caching
@@ -424,25 +544,19 @@ def product_stats(request):
     """
     Get product statistics for admin dashboard
     """
+    metrics = get_catalog_metrics()
     stats = {
-        'total_products': Product.objects.count(),
-        'active_products': Product.objects.filter(status='active').count(),
-        'inactive_products': Product.objects.filter(status='inactive').count(),
-        'out_of_stock_products': Product.objects.filter(stock_quantity=0).count(),
-        'low_stock_products': Product.objects.filter(
-            stock_quantity__lte=F('min_stock_level'),
-            stock_quantity__gt=0
-        ).count(),
-        'featured_products': Product.objects.filter(is_featured=True).count(),
-        'bestsellers': Product.objects.filter(is_bestseller=True).count(),
-        'products_on_sale': Product.objects.filter(is_on_sale=True).count(),
-        'average_price': Product.objects.filter(status='active').aggregate(
-            avg_price=Avg('price')
-        )['avg_price'] or 0,
-        'total_stock_value': Product.objects.filter(status='active').aggregate(
-            total_value=Sum(F('price') * F('stock_quantity'))
-        )['total_value'] or 0,
-        'categories_count': Category.objects.count(),
+        'total_products': metrics.total_products,
+        'active_products': metrics.active_products,
+        'inactive_products': metrics.inactive_products,
+        'out_of_stock_products': metrics.out_of_stock_products,
+        'low_stock_products': metrics.low_stock_products,
+        'featured_products': metrics.featured_products,
+        'bestsellers': metrics.bestsellers,
+        'products_on_sale': metrics.products_on_sale,
+        'average_price': metrics.average_price,
+        'total_stock_value': metrics.total_stock_value,
+        'categories_count': metrics.categories_count,
     }
     
     return Response(stats)
@@ -692,6 +806,30 @@ def check_favorite_status(request, product_id):
     return Response({'is_favorite': is_favorite})
 
 
+# Máximo de produtos por pedido em favorites/check/ (uma página de listagem)
+FAVORITES_CHECK_MAX_IDS = 200
+
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def check_favorites_bulk(request):
+    """
+    Which of the given products are favorited by the user
+    GET ?ids=1,2,3 (or ?ids=1&ids=2) -> {'favorited': [1, 3]}, one IN query
+    """
+    raw_ids = [part for value in request.query_params.getlist('ids') for part in value.split(',') if part.strip()]
+    try:
+        product_ids = {int(part) for part in raw_ids}
+    except ValueError:
+        return Response({'error': 'ids deve ser uma lista de inteiros'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(product_ids) > FAVORITES_CHECK_MAX_IDS:
+        return Response(
+            {'error': f'No máximo {FAVORITES_CHECK_MAX_IDS} produtos por pedido'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    return Response({'favorited': favorited_among(request.user, product_ids)})
+
+
 # =====================================================
 # AUTH DEBUG
 # =====================================================
@@ -5,3 +5,6 @@ class PromotionsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'promotions'
     verbose_name = 'Promoções'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-19 16:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('promotions', '0002_promotion_allowed_roles'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='promotion',
+            index=models.Index(fields=['status', 'end_date', 'start_date'], name='promotion_active_window_idx'),
+        ),
+    ]
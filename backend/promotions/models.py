@@ -27,6 +27,10 @@ class Promotion(models.Model):
         verbose_name = 'Promoção'
         verbose_name_plural = 'Promoções'
         ordering = ['-start_date']
+        indexes = [
+            # Promoções ativas agora (promotions.resolution): status='active' e a janela de datas
+            models.Index(fields=['status', 'end_date', 'start_date'], name='promotion_active_window_idx'),
+        ]
 
     def __str__(self):
         return self.name
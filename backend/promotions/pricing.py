@@ -0,0 +1,106 @@
+"""
+Preços efetivos dos produtos (promoções + preços de saldo)
+- O preço de saldo já está em Product.price (original_price é a referência
+  quando is_on_sale); as promoções ativas aplicam-se sobre esse preço
+- As promoções não são por produto: das que se aplicam ao usuário
+  (promotions.resolution) só interessam a maior percentual e o maior valor
+  fixo — é essa a tabela de regras (PriceRules). Por produto fica o maior
+  dos dois descontos, sem nunca passar do próprio preço
+- price_products() calcula um lote inteiro numa passagem em memória, com os
+  campos já carregados dos produtos (sem consultas por produto). Só as regras
+  vêm do cache (o conjunto de promoções ativas de promotions.resolution); o
+  preço de cada produto é aritmética sobre elas, por isso não há tabelas de
+  preços no cache a crescer com o catálogo
+"""
+import hashlib
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Dict, Iterable, List, Optional
+
+from .models import Promotion
+from .resolution import promotions_for_user
+
+CENT = Decimal('0.01')
+
+
+@dataclass(frozen=True)
+class EffectivePrice:
+    """Preço final de um produto e a promoção que o definiu (se alguma)"""
+    price: Decimal
+    compare_at_price: Decimal
+    promotion_id: Optional[int] = None
+    promotion_name: str = ''
+
+    @property
+    def discount_percentage(self) -> float:
+        if self.compare_at_price > self.price:
+            return round(float((self.compare_at_price - self.price) / self.compare_at_price * 100), 1)
+        return 0
+
+
+@dataclass(frozen=True)
+class PriceRules:
+    """A melhor promoção percentual e a de maior valor fixo de um conjunto"""
+    key: str
+    best_percentage: Optional[Promotion] = None
+    best_fixed: Optional[Promotion] = None
+
+    @classmethod
+    def from_promotions(cls, promotions: List[Promotion]) -> 'PriceRules':
+        ids = sorted(promotion.pk for promotion in promotions)
+        best = {}
+        for promotion in promotions:
+            current = best.get(promotion.discount_type)
+            if current is None or promotion.discount_value > current.discount_value:
+                best[promotion.discount_type] = promotion
+        return cls(
+            key=hashlib.sha1(repr(ids).encode('utf-8')).hexdigest()[:16] if ids else 'none',
+            best_percentage=best.get('percentage'),
+            best_fixed=best.get('fixed'),
+        )
+
+    def apply(self, price: Decimal):
+        """(preço com a melhor promoção, promoção aplicada ou None)"""
+        price = Decimal(price or 0)
+        candidates = []
+        if self.best_percentage is not None:
+            discount = (price * self.best_percentage.discount_value / 100).quantize(CENT, rounding=ROUND_HALF_UP)
+            candidates.append((discount, self.best_percentage))
+        if self.best_fixed is not None:
+            candidates.append((self.best_fixed.discount_value, self.best_fixed))
+        if not candidates:
+            return price, None
+        discount, promotion = max(candidates, key=lambda candidate: candidate[0])
+        discount = min(discount, price)
+        if discount <= 0:
+            return price, None
+        return price - discount, promotion
+
+    def price_product(self, product) -> EffectivePrice:
+        price = Decimal(product.price or 0)
+        compare_at = price
+        if product.is_on_sale and product.original_price and product.original_price > price:
+            compare_at = Decimal(product.original_price)
+        final, promotion = self.apply(price)
+        return EffectivePrice(
+            price=final,
+            compare_at_price=compare_at,
+            promotion_id=promotion.pk if promotion else None,
+            promotion_name=promotion.name if promotion else '',
+        )
+
+
+def get_price_rules(user=None, now: Optional[datetime] = None) -> PriceRules:
+    """Regras de preço do usuário (anónimo: só promoções sem roles)"""
+    return PriceRules.from_promotions(promotions_for_user(user, now))
+
+
+def price_products(products: Iterable, user=None, now: Optional[datetime] = None,
+                   rules: Optional[PriceRules] = None) -> Dict[int, EffectivePrice]:
+    """
+    {product_id: EffectivePrice} de um lote de produtos numa só passagem
+    Os produtos precisam de price, original_price e is_on_sale carregados.
+    """
+    rules = rules or get_price_rules(user, now)
+    return {product.pk: rules.price_product(product) for product in products if product.pk is not None}
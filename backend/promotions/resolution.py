@@ -0,0 +1,153 @@
+"""
+Resolução das promoções ativas
+- As promoções ativas agora (status='active' e start_date <= agora <=
+  end_date) são filtradas no SQL (índice promotion_active_window_idx), com
+  allowed_roles pré-carregados
+- O conjunto fica no cache até à próxima fronteira (o fim de uma promoção
+  ativa ou o início de uma agendada) e sob a versão das promoções, que muda
+  a cada alteração de Promotion/allowed_roles/Role (promotions.signals)
+- Versão e conjunto ativo vivem no cache partilhado (CACHES: Redis ou a
+  tabela de cache), por isso a alteração feita num worker vale para todos
+- Os roles de cada usuário também ficam no cache; a resolução por usuário é
+  só a interseção em memória, com as mesmas regras de Promotion.applies_to_user
+  (sem roles exigidos -> todos; staff -> sempre; senão, algum role em comum)
+"""
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import FrozenSet, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Min
+from django.utils import timezone
+
+from customers.models import ExternalAuthUser
+
+from .models import Promotion
+
+PROMOTIONS_VERSION_KEY = 'promotions:version'
+ACTIVE_CACHE_PREFIX = 'promotions:active'
+USER_ROLES_CACHE_PREFIX = 'promotions:user_roles'
+
+
+def get_promotions_version() -> int:
+    version = cache.get(PROMOTIONS_VERSION_KEY)
+    if version is None:
+        # Como a versão do catálogo: um cache reiniciado não reutiliza versões antigas
+        cache.add(PROMOTIONS_VERSION_KEY, int(time.time() * 1000), timeout=None)
+        version = cache.get(PROMOTIONS_VERSION_KEY)
+    return version
+
+
+def bump_promotions_version() -> int:
+    try:
+        return cache.incr(PROMOTIONS_VERSION_KEY)
+    except ValueError:
+        get_promotions_version()
+        return cache.incr(PROMOTIONS_VERSION_KEY)
+
+
+@dataclass(frozen=True)
+class ActivePromotions:
+    """Promoções ativas num intervalo [loaded_at, valid_until)"""
+    version: int
+    loaded_at: datetime
+    valid_until: Optional[datetime]
+    # (promoção, ids dos roles exigidos — vazio = todos)
+    entries: Tuple[Tuple[Promotion, FrozenSet[int]], ...]
+
+    def covers(self, now: datetime) -> bool:
+        return self.loaded_at <= now and (self.valid_until is None or now < self.valid_until)
+
+    def for_roles(self, is_staff: bool, role_ids: FrozenSet[int]) -> List[Promotion]:
+        return [
+            promotion for promotion, allowed in self.entries
+            if not allowed or is_staff or allowed & role_ids
+        ]
+
+    @property
+    def has_role_restrictions(self) -> bool:
+        return any(allowed for _, allowed in self.entries)
+
+
+def load_active_promotions(now: datetime, version: int) -> ActivePromotions:
+    active = list(
+        Promotion.objects.filter(status='active', start_date__lte=now, end_date__gte=now)
+        .prefetch_related('allowed_roles')
+    )
+    next_start = (
+        Promotion.objects.filter(status='active', start_date__gt=now)
+        .aggregate(next_start=Min('start_date'))['next_start']
+    )
+    boundaries = [p.end_date for p in active] + ([next_start] if next_start else [])
+    return ActivePromotions(
+        version=version,
+        loaded_at=now,
+        valid_until=min(boundaries) if boundaries else None,
+        entries=tuple(
+            (promotion, frozenset(role.id for role in promotion.allowed_roles.all()))
+            for promotion in active
+        ),
+    )
+
+
+def get_active_promotions(now: Optional[datetime] = None) -> ActivePromotions:
+    """Promoções ativas em `now` (por omissão, agora), do cache quando possível"""
+    # Só as resoluções do presente vão para o cache (não as de um `now` passado)
+    store = now is None
+    now = now or timezone.now()
+    version = get_promotions_version()
+    cache_key = f'{ACTIVE_CACHE_PREFIX}:{version}'
+    snapshot: Optional[ActivePromotions] = cache.get(cache_key)
+    if snapshot is not None and snapshot.covers(now):
+        return snapshot
+
+    snapshot = load_active_promotions(now, version)
+    if store:
+        timeout = settings.PROMOTIONS_CACHE_SECONDS
+        if snapshot.valid_until is not None:
+            timeout = max(1, min(timeout, int((snapshot.valid_until - now).total_seconds()) + 1))
+        cache.set(cache_key, snapshot, timeout)
+    return snapshot
+
+
+def _user_roles_key(user_id: int) -> str:
+    return f'{USER_ROLES_CACHE_PREFIX}:{get_promotions_version()}:{user_id}'
+
+
+def user_role_ids(user) -> FrozenSet[int]:
+    """Ids dos roles (customers.Role) do ExternalAuthUser do usuário"""
+    if user is None or not user.is_authenticated:
+        return frozenset()
+    key = _user_roles_key(user.pk)
+    role_ids = cache.get(key)
+    if role_ids is None:
+        role_ids = frozenset(
+            role_id for role_id in
+            ExternalAuthUser.objects.filter(user_id=user.pk).values_list('roles__id', flat=True)
+            if role_id is not None
+        )
+        cache.set(key, role_ids, settings.PROMOTION_USER_ROLES_CACHE_SECONDS)
+    return role_ids
+
+
+def forget_user_roles(user_id: Optional[int]) -> None:
+    if user_id is not None:
+        cache.delete(_user_roles_key(user_id))
+
+
+def user_role_key(user) -> Tuple[bool, FrozenSet[int]]:
+    """(is_staff, roles) — o que decide que promoções se aplicam ao usuário"""
+    is_staff = bool(user is not None and user.is_authenticated and user.is_staff)
+    return is_staff, user_role_ids(user)
+
+
+def promotions_for_user(user, now: Optional[datetime] = None) -> List[Promotion]:
+    """Promoções ativas que se aplicam ao usuário (anónimo: só as sem roles)"""
+    snapshot = get_active_promotions(now)
+    if not snapshot.entries:
+        return []
+    if not snapshot.has_role_restrictions:
+        return [promotion for promotion, _ in snapshot.entries]
+    return snapshot.for_roles(*user_role_key(user))
@@ -14,6 +14,10 @@ class PromotionSerializer(serializers.ModelSerializer):
     appliesToUser = serializers.SerializerMethodField()
 
     def get_appliesToUser(self, obj):
+        # Lista pública: já resolvida por promotions.resolution
+        applicable = self.context.get('applicable_promotion_ids')
+        if applicable is not None:
+            return obj.id in applicable
         request = self.context.get('request')
         user = getattr(request, 'user', None) if request else None
         return obj.applies_to_user(user)
@@ -0,0 +1,41 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from customers.models import ExternalAuthUser, Role
+from .models import Promotion
+from .resolution import bump_promotions_version, forget_user_roles
+
+
+@receiver(post_save, sender=Promotion)
+@receiver(post_delete, sender=Promotion)
+@receiver(m2m_changed, sender=Promotion.allowed_roles.through)
+@receiver(post_save, sender=Role)
+@receiver(post_delete, sender=Role)
+def promotions_changed(sender, action=None, **kwargs):
+    if action is not None and not action.startswith('post_'):
+        return
+    # Também invalida os roles em cache de todos os usuários (apagar um Role
+    # remove-o em cascata sem m2m_changed)
+    bump_promotions_version()
+
+
+@receiver(m2m_changed, sender=ExternalAuthUser.roles.through)
+def external_user_roles_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        user_ids = [instance.user_id]
+    elif pk_set is None:
+        # role.external_users.clear(): os usuários afetados não são indicados
+        bump_promotions_version()
+        return
+    else:
+        user_ids = ExternalAuthUser.objects.filter(pk__in=pk_set).values_list('user_id', flat=True)
+    for user_id in user_ids:
+        forget_user_roles(user_id)
+
+
+@receiver(post_save, sender=ExternalAuthUser)
+@receiver(post_delete, sender=ExternalAuthUser)
+def external_user_changed(sender, instance, **kwargs):
+    forget_user_roles(instance.user_id)
@@ -0,0 +1,132 @@
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+
+from cart import views as cart_views
+from cart.models import Cart, CartItem, Coupon, Payment
+from customers.models import ExternalAuthUser, Role
+from products.models import Category, Product
+from promotions.models import Promotion
+from promotions.pricing import get_price_rules, price_products
+
+
+def create_promotion(name, discount_type, value, **kwargs):
+    now = timezone.now()
+    return Promotion.objects.create(
+        name=name, start_date=now - timedelta(days=1), end_date=now + timedelta(days=1),
+        discount_type=discount_type, discount_value=Decimal(value), status='active', **kwargs,
+    )
+
+
+class PricingEngineTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(name='Portateis')
+        self.vip = Role.objects.create(name='vip')
+        self.user = User.objects.create_user(username='vip-buyer')
+        ExternalAuthUser.objects.create(firebase_uid='vip-buyer', user=self.user).roles.add(self.vip)
+
+    def create_product(self, name, price, **kwargs):
+        return Product.objects.create(
+            name=name, category=self.category, price=Decimal(price), stock_quantity=5, status='active', **kwargs
+        )
+
+    def test_best_promotion_applies_on_top_of_sale_price(self):
+        create_promotion('10%', 'percentage', '10.00')
+        create_promotion('Menos 50', 'fixed', '50.00')
+        cheap = self.create_product('Rato', '100.00')
+        laptop = self.create_product('Portatil', '1000.00', original_price=Decimal('1250.00'), is_on_sale=True)
+        cable = self.create_product('Cabo', '30.00')
+
+        prices = price_products([cheap, laptop, cable])
+
+        self.assertEqual((prices[cheap.pk].price, prices[cheap.pk].promotion_name), (Decimal('50.00'), 'Menos 50'))
+        self.assertEqual((prices[laptop.pk].price, prices[laptop.pk].promotion_name), (Decimal('900.00'), '10%'))
+        self.assertEqual(prices[laptop.pk].compare_at_price, Decimal('1250.00'))
+        self.assertEqual(prices[laptop.pk].discount_percentage, 28.0)
+        self.assertEqual(prices[cable.pk].price, Decimal('0.00'))
+
+    def test_role_restricted_promotions_only_price_for_role_users(self):
+        create_promotion('VIP', 'percentage', '25.00').allowed_roles.add(self.vip)
+        product = self.create_product('Monitor', '200.00')
+
+        self.assertEqual(price_products([product])[product.pk].price, Decimal('200.00'))
+        self.assertEqual(price_products([product], self.user)[product.pk].price, Decimal('150.00'))
+        self.assertNotEqual(get_price_rules().key, get_price_rules(self.user).key)
+
+    def test_batch_is_one_pass_without_product_queries(self):
+        create_promotion('10%', 'percentage', '10.00')
+        for index in range(30):
+            self.create_product(f'Produto {index}', f'{100 + index}.00')
+        products = list(Product.objects.all())
+
+        with self.assertNumQueries(3):  # só a carga das promoções ativas
+            prices = price_products(products)
+        self.assertEqual(len(prices), 30)
+        with self.assertNumQueries(0):
+            self.assertEqual(price_products(products), prices)
+
+        # O preço sai do produto carregado, sem tabela no cache a invalidar
+        products[0].price = Decimal('10.00')
+        self.assertEqual(price_products(products)[products[0].pk].price, Decimal('9.00'))
+
+    def test_list_and_detail_expose_final_price(self):
+        promotion = create_promotion('10%', 'percentage', '10.00')
+        product = self.create_product('Teclado', '80.00')
+        client = APIClient()
+
+        listed = client.get('/api/products/').json()['results'][0]
+        self.assertEqual(
+            (listed['final_price'], listed['applied_promotion']),
+            ('72.00', {'id': promotion.pk, 'name': '10%'}),
+        )
+        detail = client.get(f'/api/products/{product.slug}/')
+        self.assertEqual((detail.json()['final_price'], detail.json()['final_discount_percentage']), ('72.00', 10.0))
+
+        # Promoção nova -> novo ETag
+        create_promotion('Menos 20', 'fixed', '20.00')
+        changed = client.get(f'/api/products/{product.slug}/', HTTP_IF_NONE_MATCH=detail['ETag'])
+        self.assertEqual((changed.status_code, changed.json()['final_price']), (200, '60.00'))
+
+    def test_cart_totals_apply_promotions_before_coupon(self):
+        create_promotion('VIP', 'percentage', '20.00').allowed_roles.add(self.vip)
+        product = self.create_product('Tablet', '500.00')
+        now = timezone.now()
+        coupon = Coupon.objects.create(
+            code='MENOS10', name='Menos 10', discount_type='fixed', discount_value=Decimal('10.00'),
+            valid_from=now - timedelta(days=1), valid_until=now + timedelta(days=1),
+        )
+        cart = Cart.objects.create(user=self.user, status='active', applied_coupon=coupon)
+        CartItem.objects.create(cart=cart, product=product, quantity=2, price=product.price)
+
+        cart.calculate_totals()
+
+        self.assertEqual((cart.subtotal, cart.discount_amount, cart.total),
+                         (Decimal('800.00'), Decimal('10.00'), Decimal('790.00')))
+
+    @mock.patch('cart.payments.paysuite.PaysuiteClient.create_payment')
+    def test_payment_items_carry_the_promotion_price(self, create_payment):
+        create_payment.return_value = {'status': 'success', 'data': {'id': 'ps-9', 'checkout_url': 'https://paysuite.test/c'}}
+        promotion = create_promotion('VIP', 'percentage', '20.00')
+        promotion.allowed_roles.add(self.vip)
+        product = self.create_product('Tablet', '500.00')
+        cart = Cart.objects.create(user=self.user, status='active')
+        CartItem.objects.create(cart=cart, product=product, quantity=2, price=product.price)
+
+        request = APIRequestFactory().post('/api/cart/payments/initiate/', {'method': 'card'}, format='json')
+        request.session = SessionStore()
+        force_authenticate(request, user=self.user)
+        response = cart_views.initiate_payment(request)
+
+        self.assertEqual(response.status_code, 200)
+        payment = Payment.objects.get(pk=response.data['payment_id'])
+        item = payment.request_data['items'][0]
+        self.assertEqual((item['unit_price'], item['list_price'], item['promotion_id']), ('400.00', '500.00', promotion.pk))
+        self.assertEqual(payment.amount, Decimal(item['unit_price']) * item['quantity'])
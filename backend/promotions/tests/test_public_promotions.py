@@ -0,0 +1,96 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from customers.models import ExternalAuthUser, Role
+from promotions.models import Promotion
+from promotions.resolution import get_active_promotions, promotions_for_user
+
+
+def create_promotion(name, start, end, status='active'):
+    return Promotion.objects.create(
+        name=name, start_date=start, end_date=end,
+        discount_type='percentage', discount_value='20.00', status=status,
+    )
+
+
+class PublicPromotionsConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        now = timezone.now()
+        self.client = APIClient()
+        self.upcoming = create_promotion('Black Friday', now + timedelta(days=1), now + timedelta(days=3))
+
+    def test_etag_follows_promotion_windows(self):
+        first = self.client.get('/api/promotions/')
+        self.assertEqual((first.status_code, first.json()['results']), (200, []))
+        self.assertTrue(first['Cache-Control'].startswith('public'))
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/promotions/').status_code, 200)
+            self.assertEqual(self.client.get('/api/promotions/', HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
+        # A janela abre sem que a promoção seja editada
+        later = self.upcoming.start_date + timedelta(minutes=1)
+        with mock.patch('promotions.resolution.timezone.now', return_value=later):
+            opened = self.client.get('/api/promotions/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(opened.status_code, 200)
+        self.assertEqual([p['id'] for p in opened.json()['results']], [self.upcoming.pk])
+        self.assertTrue(opened.json()['results'][0]['appliesToUser'])
+
+    def test_authenticated_responses_are_private(self):
+        anonymous = self.client.get('/api/promotions/')
+        self.client.force_authenticate(User.objects.create_user(username='buyer'))
+        response = self.client.get('/api/promotions/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Cache-Control'].startswith('private'))
+        self.assertIn('Authorization', response['Vary'])
+        self.assertEqual(response['ETag'], anonymous['ETag'])
+
+
+class PromotionResolutionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        now = timezone.now()
+        self.vip = Role.objects.create(name='vip')
+        self.public = create_promotion('Public', now - timedelta(days=1), now + timedelta(days=1))
+        self.restricted = create_promotion('VIP', now - timedelta(days=2), now + timedelta(hours=2))
+        self.restricted.allowed_roles.add(self.vip)
+        create_promotion('Expired', now - timedelta(days=9), now - timedelta(days=8))
+        create_promotion('Draft', now - timedelta(days=1), now + timedelta(days=1), status='draft')
+        self.user = User.objects.create_user(username='vip-buyer')
+        self.ext = ExternalAuthUser.objects.create(firebase_uid='vip-buyer', user=self.user)
+
+    def test_active_set_is_cached_until_next_boundary(self):
+        snapshot = get_active_promotions()
+        self.assertEqual([p.name for p, _ in snapshot.entries], ['Public', 'VIP'])
+        self.assertEqual(snapshot.valid_until, self.restricted.end_date)
+
+        with self.assertNumQueries(0):
+            get_active_promotions()
+        with self.assertNumQueries(3):  # promoções ativas, roles e a próxima fronteira, de novo
+            get_active_promotions(self.restricted.end_date + timedelta(seconds=1))
+
+    def test_user_roles_are_intersected_and_invalidated(self):
+        self.assertEqual(promotions_for_user(self.user), [self.public])
+
+        self.ext.roles.add(self.vip)
+        self.assertEqual(promotions_for_user(self.user), [self.public, self.restricted])
+        with self.assertNumQueries(0):
+            promotions_for_user(self.user)
+
+        self.user.is_staff = True
+        self.ext.roles.remove(self.vip)
+        self.assertEqual(promotions_for_user(self.user), [self.public, self.restricted])
+        self.assertEqual(promotions_for_user(None), [self.public])
+
+    def test_promotion_edits_invalidate_the_active_set(self):
+        self.assertEqual(len(get_active_promotions().entries), 2)
+        self.public.status = 'expired'
+        self.public.save()
+        self.assertEqual([p.name for p, _ in get_active_promotions().entries], ['VIP'])
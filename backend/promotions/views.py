@@ -1,7 +1,9 @@
 from rest_framework import generics, permissions
 from .models import Promotion
+from .resolution import get_promotions_version, promotions_for_user
 from .serializers import PromotionSerializer
 from customers.views import IsAdmin
+from chiva_backend.conditional import ConditionalGetMixin, make_etag
 
 
 class PromotionListCreateAdminView(generics.ListCreateAPIView):
@@ -15,16 +17,30 @@ class PromotionDetailAdminView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = PromotionSerializer
     permission_classes = [IsAdmin]
 
-class PromotionPublicListView(generics.ListAPIView):
+class PromotionPublicListView(ConditionalGetMixin, generics.ListAPIView):
     serializer_class = PromotionSerializer
     permission_classes = [permissions.AllowAny]
+    cache_max_age_setting = 'PROMOTIONS_MAX_AGE'
+
+    def get_validators(self):
+        # Com o cache quente não há consultas: a versão das promoções cobre as
+        # edições e os ids aplicáveis cobrem as janelas de datas e os roles
+        self.promotions = promotions_for_user(self.request.user)
+        etag = make_etag(self.request, get_promotions_version(), [p.id for p in self.promotions])
+        # Last-Modified não acompanharia as janelas de datas: só o ETag
+        return etag, None
 
     def get_queryset(self):
-        user = getattr(self.request, 'user', None)
-        # Evaluate promotions and return only those active and applicable to the user
-        return [p for p in Promotion.objects.all() if p.applies_to_user(user)]
+        # Only promotions active now and applicable to the user (promotions.resolution)
+        if not hasattr(self, 'promotions'):
+            self.promotions = promotions_for_user(self.request.user)
+        return self.promotions
 
     def get_serializer_context(self):
         ctx = super().get_serializer_context()
         ctx['request'] = self.request
+        ctx['applicable_promotion_ids'] = {p.id for p in self.get_queryset()}
         return ctx
+
+    def cache_is_private(self):
+        return self.request.user.is_authenticated
@@ -109,6 +109,21 @@ const favoritesApi = {
     
     return response.json();
   },
+
+  // Check which of several products are favorited (one request for a whole list)
+  checkFavorites: async (productIds: number[]): Promise<{ favorited: number[] }> => {
+    const headers = await getAuthHeaders();
+    const response = await fetch(`${API_BASE_URL}/favorites/check/?ids=${productIds.join(',')}`, {
+      credentials: 'include',
+      headers,
+    });
+
+    if (!response.ok) {
+      throw new Error('Failed to check favorite status');
+    }
+
+    return response.json();
+  },
 };
 
 // Hook for managing favorites